@@ -0,0 +1,38 @@
+"""Composite indexes for meal plan reads
+
+Backs the single-query "today" and "weekly" reads in meal-planner-service:
+the latest plan is found by (user_id, week_start, generated_at) and its meals
+are read in (day, meal_type) order from (meal_plan_id, day, meal_type).
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        "idx_meal_plans_user_week",
+        "meal_plans",
+        ["user_id", "week_start", "generated_at"],
+        if_not_exists=True
+    )
+    op.create_index(
+        "idx_meals_plan_day_type",
+        "meals",
+        ["meal_plan_id", "day", "meal_type"],
+        if_not_exists=True
+    )
+
+
+def downgrade():
+    op.drop_index("idx_meals_plan_day_type", table_name="meals", if_exists=True)
+    op.drop_index("idx_meal_plans_user_week", table_name="meal_plans", if_exists=True)
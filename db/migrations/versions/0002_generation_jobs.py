@@ -0,0 +1,58 @@
+"""Background plan generation jobs
+
+Stores status and per-slot progress of queued weekly plan generations so
+GET /api/meal-planner/jobs/{id} can be answered by any replica.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from alembic import context, op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+job_status = postgresql.ENUM(
+    "queued", "running", "succeeded", "failed",
+    name="generation_job_status_enum",
+    create_type=False
+)
+
+
+def upgrade():
+    # The services' init_db() may already have created the table via create_all
+    if not context.is_offline_mode() and sa.inspect(op.get_bind()).has_table("generation_jobs"):
+        op.create_index("idx_generation_jobs_user_id", "generation_jobs", ["user_id"], if_not_exists=True)
+        return
+
+    job_status.create(op.get_bind(), checkfirst=True)
+    op.create_table(
+        "generation_jobs",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True,
+                  server_default=sa.text("uuid_generate_v4()")),
+        sa.Column("user_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("week_start", sa.Date(), nullable=False),
+        sa.Column("status", job_status, nullable=False, server_default="queued"),
+        sa.Column("total_slots", sa.Integer(), nullable=False, server_default="21"),
+        sa.Column("completed_slots", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("progress", postgresql.JSONB(), nullable=False, server_default=sa.text("'[]'::jsonb")),
+        sa.Column("meal_plan_id", postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False,
+                  server_default=sa.text("CURRENT_TIMESTAMP")),
+        sa.Column("started_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True)
+    )
+    op.create_index("idx_generation_jobs_user_id", "generation_jobs", ["user_id"], if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index("idx_generation_jobs_user_id", table_name="generation_jobs", if_exists=True)
+    op.drop_table("generation_jobs")
+    job_status.drop(op.get_bind(), checkfirst=True)
@@ -9,6 +9,7 @@ CREATE TYPE fitness_goal_enum AS ENUM ('cut', 'bulk', 'maintain');
 CREATE TYPE dietary_preference_enum AS ENUM ('none', 'halal', 'vegan', 'vegetarian');
 CREATE TYPE meal_type_enum AS ENUM ('breakfast', 'lunch', 'dinner');
 CREATE TYPE day_of_week_enum AS ENUM ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday');
+CREATE TYPE generation_job_status_enum AS ENUM ('queued', 'running', 'succeeded', 'failed');
 
 -- Users table (auth-service)
 CREATE TABLE IF NOT EXISTS users (
@@ -47,6 +48,7 @@ CREATE TABLE IF NOT EXISTS meal_plans (
 -- Create indexes for meal plans
 CREATE INDEX IF NOT EXISTS idx_meal_plans_user_id ON meal_plans(user_id);
 CREATE INDEX IF NOT EXISTS idx_meal_plans_week_start ON meal_plans(week_start);
+CREATE INDEX IF NOT EXISTS idx_meal_plans_user_week ON meal_plans(user_id, week_start, generated_at);
 
 -- Meals table (meal-planner-service)
 CREATE TABLE IF NOT EXISTS meals (
@@ -68,6 +70,25 @@ CREATE TABLE IF NOT EXISTS meals (
 CREATE INDEX IF NOT EXISTS idx_meals_meal_plan_id ON meals(meal_plan_id);
 CREATE INDEX IF NOT EXISTS idx_meals_user_id ON meals(user_id);
 CREATE INDEX IF NOT EXISTS idx_meals_day ON meals(day);
+CREATE INDEX IF NOT EXISTS idx_meals_plan_day_type ON meals(meal_plan_id, day, meal_type);
+
+-- Background plan generation jobs (meal-planner-service)
+CREATE TABLE IF NOT EXISTS generation_jobs (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    user_id UUID NOT NULL,
+    week_start DATE NOT NULL,
+    status generation_job_status_enum NOT NULL DEFAULT 'queued',
+    total_slots INTEGER NOT NULL DEFAULT 21,
+    completed_slots INTEGER NOT NULL DEFAULT 0,
+    progress JSONB NOT NULL DEFAULT '[]',
+    meal_plan_id UUID,
+    error TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    started_at TIMESTAMP WITH TIME ZONE,
+    finished_at TIMESTAMP WITH TIME ZONE
+);
+
+CREATE INDEX IF NOT EXISTS idx_generation_jobs_user_id ON generation_jobs(user_id);
 
 -- Chat messages table (nutrition-ai-service)
 CREATE TABLE IF NOT EXISTS chat_messages (
@@ -28,8 +28,12 @@ api.interceptors.request.use((config) => {
  * @returns {Promise} Weekly meal plan data
  */
 const generateWeeklyPlan = async (excludedFoods = []) => {
+  // One key per click: a resend of this request gets the plan already
+  // generated for it instead of starting another generation
   const res = await api.post("/generate-plan", {
     excluded_foods: excludedFoods
+  }, {
+    headers: { "Idempotency-Key": crypto.randomUUID() }
   });
   return res.data;
 };
@@ -1,10 +1,13 @@
 """
 Database configuration and session management.
 """
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.exc import OperationalError
+import asyncio
 import os
 import time
 from dotenv import load_dotenv
@@ -120,3 +123,147 @@ def check_db_connection(max_retries=5, retry_delay=2):
             return False
     return False
 
+
+# -------------------- ASYNC MODE --------------------
+# Opt-in: request handlers get an AsyncSession on asyncpg and their queries
+# stop blocking the event loop. Off by default; the sync engine stays in use
+# for everything that is not a request handler.
+DATABASE_ASYNC = os.getenv("DATABASE_ASYNC", "false").lower() == "true"
+
+
+def create_async_db_engine(url: str = DATABASE_URL) -> AsyncEngine:
+    """
+    Create an asyncpg engine for the same database, with the sync engine's
+    pool settings. Requires the asyncpg package.
+    
+    Args:
+        url: Database URL with any PostgreSQL driver
+    
+    Returns:
+        Async SQLAlchemy engine
+    """
+    return create_async_engine(
+        make_url(url).set(drivername="postgresql+asyncpg"),
+        pool_pre_ping=True,
+        pool_size=10,
+        max_overflow=20,
+        echo=False,
+        connect_args={
+            "timeout": 10,
+            "server_settings": {"statement_timeout": "30000"}
+        }
+    )
+
+
+async_engine = create_async_db_engine() if DATABASE_ASYNC else None
+# Objects stay readable after commit without another round-trip
+AsyncSessionLocal = (
+    async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    if DATABASE_ASYNC else None
+)
+
+
+async def get_async_db():
+    """
+    Dependency for getting an async database session.
+    Yields an AsyncSession and ensures it's closed after use.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# Session dependency for request handlers in either mode; query it with run_db
+get_request_db = get_async_db if DATABASE_ASYNC else get_db
+
+
+async def run_db(db, fn, *args, **kwargs):
+    """
+    Run ORM code written for a sync Session on either kind of session.
+    
+    With an AsyncSession the function runs through asyncpg without
+    blocking the event loop; with a sync Session it runs inline as before.
+    
+    Args:
+        db: Session or AsyncSession from get_request_db
+        fn: Function taking a sync Session as its first argument
+        *args: Further arguments for fn
+        **kwargs: Keyword arguments for fn
+    
+    Returns:
+        Whatever fn returns
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return fn(db, *args, **kwargs)
+
+
+async def init_db_async():
+    """
+    Initialize database tables through the async engine.
+    """
+    from models import User, UserProfile  # Import here to avoid circular imports
+    async with async_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+
+def ping_db():
+    """
+    Run one SELECT 1 on the sync engine, without retries or logging.
+    Used by the background health monitor.
+    
+    Raises:
+        Exception: If the database cannot be reached
+    """
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+
+async def ping_db_async():
+    """
+    Async variant of ping_db on the async engine.
+    
+    Raises:
+        Exception: If the database cannot be reached
+    """
+    async with async_engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+
+# Connections opened during startup warm-up, so early requests skip the connect
+DB_POOL_WARM_CONNECTIONS = int(os.getenv("DB_POOL_WARM_CONNECTIONS", "5"))
+
+
+def warm_db_pool(connections=DB_POOL_WARM_CONNECTIONS):
+    """
+    Open pooled connections on the sync engine and return them to the pool.
+    
+    Args:
+        connections: Number of connections to open
+    """
+    opened = []
+    try:
+        for _ in range(connections):
+            opened.append(engine.connect())
+    finally:
+        for conn in opened:
+            conn.close()
+
+
+async def warm_db_pool_async(connections=DB_POOL_WARM_CONNECTIONS):
+    """
+    Open pooled connections on the async engine concurrently and return
+    them to the pool.
+    
+    Args:
+        connections: Number of connections to open
+    """
+    opened = await asyncio.gather(
+        *(async_engine.connect() for _ in range(connections)),
+        return_exceptions=True
+    )
+    for conn in opened:
+        if not isinstance(conn, BaseException):
+            await conn.close()
+    errors = [conn for conn in opened if isinstance(conn, BaseException)]
+    if errors:
+        raise errors[0]
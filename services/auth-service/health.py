@@ -0,0 +1,195 @@
+"""
+Background health monitor.
+
+Dependencies (the database, LLM providers) are probed on an interval by
+background tasks and the last result is kept in memory, so /health,
+/health/live and /health/ready answer without any I/O and a slow
+dependency never stalls a request or the event loop. Critical checks
+decide readiness; the others are only reported.
+"""
+import asyncio
+import os
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Union
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+HEALTH_CHECK_INTERVAL_SECONDS = float(os.getenv("HEALTH_CHECK_INTERVAL_SECONDS", "10"))
+HEALTH_CHECK_TIMEOUT_SECONDS = float(os.getenv("HEALTH_CHECK_TIMEOUT_SECONDS", "3"))
+# LLM providers are probed less often; the probe is a model listing and uses no tokens
+HEALTH_LLM_CHECK_INTERVAL_SECONDS = float(os.getenv("HEALTH_LLM_CHECK_INTERVAL_SECONDS", "60"))
+
+CheckFn = Union[Callable[[], None], Callable[[], Awaitable[None]]]
+
+
+class CheckStatus:
+    """Last result of one dependency check."""
+
+    def __init__(self, name: str, fn: CheckFn, critical: bool, interval: float, timeout: float):
+        self.name = name
+        self.fn = fn
+        self.critical = critical
+        self.interval = interval
+        self.timeout = timeout
+        self.healthy: Optional[bool] = None  # None until the first probe finishes
+        self.latency_ms: Optional[float] = None
+        self.checked_at: Optional[datetime] = None
+        self.error: Optional[str] = None
+        self.consecutive_failures = 0
+
+    def to_dict(self) -> Dict:
+        if self.healthy is None:
+            status = "unknown"
+        else:
+            status = "up" if self.healthy else "down"
+        return {
+            "status": status,
+            "critical": self.critical,
+            "latency_ms": None if self.latency_ms is None else round(self.latency_ms, 2),
+            "checked_at": self.checked_at.isoformat() if self.checked_at else None,
+            "consecutive_failures": self.consecutive_failures,
+            "error": self.error
+        }
+
+
+def http_probe(url: str, headers: Optional[Dict[str, str]] = None) -> Callable[[], Awaitable[None]]:
+    """
+    Build a check that GETs `url` and fails on a non-2xx response.
+
+    Args:
+        url: Endpoint to request
+        headers: Request headers, e.g. the provider API key
+
+    Returns:
+        Async check function for HealthMonitor.add_check
+    """
+    async def probe():
+        import httpx
+
+        async with httpx.AsyncClient(timeout=HEALTH_CHECK_TIMEOUT_SECONDS) as client:
+            response = await client.get(url, headers=headers)
+        if response.status_code >= 300:
+            raise RuntimeError(f"HTTP {response.status_code}")
+
+    return probe
+
+
+class HealthMonitor:
+    """Runs registered checks in the background and serves their cached status."""
+
+    def __init__(self, service: str):
+        self.service = service
+        self.checks: Dict[str, CheckStatus] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    def add_check(
+        self,
+        name: str,
+        fn: CheckFn,
+        critical: bool = True,
+        interval: float = HEALTH_CHECK_INTERVAL_SECONDS,
+        timeout: float = HEALTH_CHECK_TIMEOUT_SECONDS
+    ):
+        """
+        Register a dependency check.
+
+        Args:
+            name: Name shown in health responses, e.g. "database"
+            fn: Function (sync or async) that raises if the dependency is
+                unavailable. Sync functions run in a worker thread.
+            critical: Whether the service is not ready while this check fails
+            interval: Seconds between probes
+            timeout: Seconds before a probe counts as failed
+        """
+        self.checks[name] = CheckStatus(name, fn, critical, interval, timeout)
+
+    async def run_check(self, name: str) -> bool:
+        """
+        Probe one dependency now and store the result.
+
+        Args:
+            name: Registered check name
+
+        Returns:
+            True if the dependency is healthy
+        """
+        check = self.checks[name]
+        start = time.perf_counter()
+        try:
+            if asyncio.iscoroutinefunction(check.fn):
+                await asyncio.wait_for(check.fn(), check.timeout)
+            else:
+                await asyncio.wait_for(asyncio.to_thread(check.fn), check.timeout)
+            error = None
+        except asyncio.TimeoutError:
+            error = f"timed out after {check.timeout}s"
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+
+        healthy = error is None
+        if healthy != check.healthy:
+            # Log transitions only, not every probe
+            print(f"Health check {name}: {'up' if healthy else 'down'}" + (f" ({error})" if error else ""))
+        check.healthy = healthy
+        check.error = error
+        check.latency_ms = (time.perf_counter() - start) * 1000
+        check.checked_at = datetime.now(timezone.utc)
+        check.consecutive_failures = 0 if healthy else check.consecutive_failures + 1
+        return healthy
+
+    async def run_all(self):
+        """Probe every dependency once, concurrently."""
+        await asyncio.gather(*(self.run_check(name) for name in self.checks))
+
+    async def _probe_loop(self, name: str):
+        check = self.checks[name]
+        while True:
+            await asyncio.sleep(check.interval)
+            await self.run_check(name)
+
+    async def start(self):
+        """Probe everything once, then keep probing in the background."""
+        if self._tasks:
+            return
+        await self.run_all()
+        self._tasks = [asyncio.create_task(self._probe_loop(name)) for name in self.checks]
+
+    async def stop(self):
+        """Cancel the background probes."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def is_up(self, name: str) -> bool:
+        """Whether a check's last probe succeeded (False if never probed)."""
+        check = self.checks.get(name)
+        return bool(check and check.healthy)
+
+    def is_ready(self) -> bool:
+        """Whether every critical check's last probe succeeded."""
+        return all(check.healthy for check in self.checks.values() if check.critical)
+
+    def snapshot(self) -> Dict:
+        """
+        Cached status of all checks.
+
+        Returns:
+            Dict with overall "status" ("ok", "degraded" when only
+            non-critical checks fail, "unavailable" otherwise), "service"
+            and per-check "checks"
+        """
+        if not self.is_ready():
+            status = "unavailable"
+        elif all(check.healthy for check in self.checks.values()):
+            status = "ok"
+        else:
+            status = "degraded"
+        return {
+            "status": status,
+            "service": self.service,
+            "checks": {name: check.to_dict() for name, check in self.checks.items()}
+        }
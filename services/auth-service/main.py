@@ -2,17 +2,18 @@
 FastAPI Auth Service - Main application.
 Handles user authentication, registration, and profile management.
 """
-from fastapi import FastAPI, Depends, HTTPException, status, Request
+from fastapi import FastAPI, Depends, HTTPException, status, Request, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from typing import Optional
 import os
-import time
+import asyncio
 from dotenv import load_dotenv
 from pathlib import Path
 import uuid
 import json
+import httpx
 
 # Get the directory where THIS file is located
 current_dir = Path(__file__).parent
@@ -37,8 +38,21 @@ if env_path.exists():
                     print(f"  (malformed line: {line[:50]})")
 
 # Import local modules
-from database import get_db, init_db, check_db_connection
+from database import (
+    init_db,
+    DATABASE_ASYNC,
+    get_request_db,
+    run_db,
+    init_db_async,
+    ping_db,
+    ping_db_async,
+    warm_db_pool,
+    warm_db_pool_async
+)
 from models import User, UserProfile
+from health import HealthMonitor
+from warmup import StartupWarmup, retry_until_done
+from service_auth import require_service_token, service_headers
 from schemas import (
     UserRegisterRequest,
     UserLoginRequest,
@@ -108,6 +122,13 @@ if "@" in DATABASE_URL:
 else:
     print(f"Database URL: {DATABASE_URL}")
 
+# meal-planner-service caches profiles and is told when one changes
+MEAL_PLANNER_URL = os.getenv("MEAL_PLANNER_URL", "http://localhost:8001")
+
+# Database health, probed in the background and served from memory
+health_monitor = HealthMonitor("auth-service")
+health_monitor.add_check("database", ping_db_async if DATABASE_ASYNC else ping_db)
+
 # Initialize FastAPI app
 app = FastAPI(
     title="MacroMind Auth Service",
@@ -182,10 +203,109 @@ async def http_exception_handler(request: Request, exc: HTTPException):
     )
 
 
+# Database helpers; handlers run them with run_db so they work on sync and async sessions
+def find_user_by_email(db: Session, email: str) -> Optional[User]:
+    """Return the user with this email, if any."""
+    return db.query(User).filter(User.email == email).first()
+
+
+def find_user_by_id(db: Session, user_id: str) -> Optional[User]:
+    """Return the user with this ID, if any."""
+    return db.query(User).filter(User.id == user_id).first()
+
+
+def load_user_and_profile(db: Session, user_id: str):
+    """
+    Load the token's user and their profile.
+    
+    Raises:
+        HTTPException: If the user does not exist
+    """
+    user = get_user_from_token(db, user_id)
+    profile = db.query(UserProfile).filter(UserProfile.user_id == user.id).first()
+    return user, profile
+
+
+def find_user_and_profile(db: Session, user_id: str):
+    """Load a user and their profile; (None, None) if the user does not exist."""
+    user = find_user_by_id(db, user_id)
+    if not user:
+        return None, None
+    profile = db.query(UserProfile).filter(UserProfile.user_id == user.id).first()
+    return user, profile
+
+
+def build_user_response(user: User, profile: Optional[UserProfile]) -> UserResponse:
+    """Build the /api/auth/me response for a user and their profile, if any."""
+    profile_data = None
+    if profile:
+        profile_data = UserProfileResponse(
+            fitness_goal=profile.fitness_goal.value,
+            daily_calories=profile.daily_calories,
+            dietary_preference=profile.dietary_preference.value,
+            has_completed_onboarding=bool(profile.has_completed_onboarding),  # Ensure always boolean
+            current_weight=profile.current_weight,
+            goal_weight=profile.goal_weight,
+            height=profile.height,
+            age_range=profile.age_range,
+            main_goal=profile.main_goal,
+            seriousness_score=profile.seriousness_score,
+            disliked_foods=profile.disliked_foods,
+            meals_per_day=profile.meals_per_day,
+            snacking_frequency=profile.snacking_frequency,
+            activity_level=profile.activity_level,
+            preferred_workout_location=profile.preferred_workout_location,
+            enjoyed_movement_types=profile.enjoyed_movement_types,
+            current_mental_state=profile.current_mental_state,
+            biggest_struggle=profile.biggest_struggle,
+            sleep_quality=profile.sleep_quality,
+            motivation_text=profile.motivation_text,
+            fear_text=profile.fear_text,
+            plan_strictness=profile.plan_strictness,
+            reminder_frequency=profile.reminder_frequency,
+            motivation_tone=profile.motivation_tone,
+            commitment_ready=profile.commitment_ready,
+            commitment_score=profile.commitment_score
+        )
+
+    return UserResponse(
+        id=str(user.id),
+        email=user.email,
+        profile=profile_data,
+        created_at=user.created_at
+    )
+
+
+def save_new_user(db: Session, user: User, profile: UserProfile):
+    """Insert a new user with their profile in one transaction; rolls back on failure."""
+    try:
+        db.add(user)
+        db.flush()  # Flush to get the user ID
+        print(f"[REGISTER] User record flushed, ID: {user.id}")
+        db.add(profile)
+        
+        # Commit transaction
+        print(f"[REGISTER] Committing database transaction...")
+        db.commit()
+        print(f"[REGISTER] Database transaction committed successfully")
+        
+        db.refresh(user)
+    except Exception:
+        db.rollback()
+        print(f"[REGISTER] Transaction rolled back")
+        raise
+
+
+def commit_and_refresh(db: Session, instance):
+    """Commit pending changes and reload `instance` from the database."""
+    db.commit()
+    db.refresh(instance)
+
+
 # Dependency to check if user has completed onboarding
 async def require_onboarding_complete(
     user_id: str = Depends(get_current_user_id),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_request_db)
 ):
     """
     Dependency to enforce onboarding completion for protected routes.
@@ -193,8 +313,7 @@ async def require_onboarding_complete(
     Raises:
         HTTPException: If user has not completed onboarding
     """
-    user = get_user_from_token(db, user_id)
-    profile = db.query(UserProfile).filter(UserProfile.user_id == user.id).first()
+    user, profile = await run_db(db, load_user_and_profile, user_id)
     
     if not profile or not profile.has_completed_onboarding:
         raise HTTPException(
@@ -208,41 +327,55 @@ async def require_onboarding_complete(
     return user_id
 
 
+# Startup phases run in parallel; /health/ready stays 503 until the database is ready
+startup_warmup = StartupWarmup()
+
+
+async def prepare_database():
+    """
+    Startup phase: wait until the database answers, create missing tables
+    and open pooled connections.
+    """
+    if DATABASE_ASYNC:
+        await ping_db_async()
+    else:
+        await asyncio.to_thread(ping_db)
+    print("Database connection successful")
+    try:
+        if DATABASE_ASYNC:
+            await init_db_async()
+        else:
+            await asyncio.to_thread(init_db)
+        print("Database tables initialized/verified")
+    except Exception as e:
+        print(f"Warning: Database initialization had issues: {e}")
+        print(f"Full error: {type(e).__name__}: {str(e)}")
+        # Continue anyway - tables might already exist
+    if DATABASE_ASYNC:
+        await warm_db_pool_async()
+    else:
+        await asyncio.to_thread(warm_db_pool)
+
+
 # Startup event
 @app.on_event("startup")
 async def startup_event():
-    """Initialize database on startup."""
+    """
+    Warm up dependencies in parallel in the background; background health
+    probes start once the database is ready.
+    """
     print("Starting Auth Service...")
-    print("Checking database connection...")
-    
-    # Always try to initialize database tables
-    # This ensures tables exist even if connection check fails initially
-    max_attempts = 10
-    attempt = 0
-    db_connected = False
-    
-    while attempt < max_attempts and not db_connected:
-        attempt += 1
-        print(f"Database connection attempt {attempt}/{max_attempts}...")
-        
-        if check_db_connection(max_retries=3, retry_delay=1):
-            db_connected = True
-            print("Database connection successful")
-            try:
-                init_db()
-                print("Database tables initialized/verified")
-            except Exception as e:
-                print(f"Warning: Database initialization had issues: {e}")
-                print(f"Full error: {type(e).__name__}: {str(e)}")
-                # Continue anyway - tables might already exist
-        else:
-            print(f"Database connection attempt {attempt} failed")
-            if attempt < max_attempts:
-                print(f"Waiting 2 seconds before retry...")
-                time.sleep(2)
-            else:
-                print("ERROR: Could not connect to database after all attempts")
-                print("Service will start but database operations will fail")
+    startup_warmup.start(
+        {"database": retry_until_done("database", prepare_database)},
+        on_ready=health_monitor.start
+    )
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the warm-up if it is still running and the background health probes."""
+    await startup_warmup.stop()
+    await health_monitor.stop()
 
 
 # Health check endpoint
@@ -251,23 +384,31 @@ async def health_check():
     """
     Health check endpoint for load balancers and monitoring.
     Returns 200 OK if service is running, regardless of database status.
+    The database status comes from the last background probe.
     """
-    try:
-        # Quick database connectivity check (non-blocking)
-        db_status = check_db_connection(max_retries=1, retry_delay=1)
-        return {
-            "status": "ok",
-            "service": "auth-service",
-            "database": "connected" if db_status else "disconnected"
-        }
-    except Exception as e:
-        # Even if database check fails, return 200 OK
-        # This allows the service to be marked healthy while database issues are resolved
-        return {
-            "status": "ok",
-            "service": "auth-service",
-            "database": "disconnected"
-        }
+    return {
+        "status": "ok",
+        "service": "auth-service",
+        "database": "connected" if health_monitor.is_up("database") else "disconnected",
+        "checks": health_monitor.snapshot()["checks"]
+    }
+
+
+@app.get("/health/live", tags=["Health"])
+async def health_live():
+    """Liveness probe: the process is up and serving requests."""
+    return {"status": "ok"}
+
+
+@app.get("/health/ready", tags=["Health"])
+async def health_ready():
+    """Readiness probe: 503 until startup warm-up finished and the last database probe succeeded."""
+    snapshot = health_monitor.snapshot()
+    snapshot["startup"] = startup_warmup.report()
+    if not startup_warmup.complete:
+        snapshot["status"] = "starting"
+    ready = startup_warmup.complete and health_monitor.is_ready()
+    return JSONResponse(snapshot, status_code=200 if ready else 503)
 
 
 # Auth endpoints
@@ -286,7 +427,7 @@ async def health_check():
 async def register_user(
     request: Request,
     user_data: UserRegisterRequest,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_request_db)
 ):
     """
     Register a new user with email and password.
@@ -313,7 +454,7 @@ async def register_user(
     
     try:
         # Check if email already exists
-        existing_user = db.query(User).filter(User.email == user_data.email).first()
+        existing_user = await run_db(db, find_user_by_email, user_data.email)
         if existing_user:
             print(f"[REGISTER] Registration failed: Email {user_data.email} already exists")
             raise HTTPException(
@@ -337,9 +478,6 @@ async def register_user(
         )
         
         print(f"[REGISTER] Creating user record with ID: {new_user.id}")
-        db.add(new_user)
-        db.flush()  # Flush to get the user ID
-        print(f"[REGISTER] User record flushed, ID: {new_user.id}")
         
         # Create user profile with default values
         # CRITICAL: Explicitly set fitness_goal and dietary_preference to prevent NOT NULL constraint errors
@@ -363,14 +501,7 @@ async def register_user(
         )
         
         print(f"[REGISTER] User profile created with default values")
-        db.add(new_profile)
-        
-        # Commit transaction
-        print(f"[REGISTER] Committing database transaction...")
-        db.commit()
-        print(f"[REGISTER] Database transaction committed successfully")
-        
-        db.refresh(new_user)
+        await run_db(db, save_new_user, new_user, new_profile)
         print(f"[REGISTER] User refreshed from database")
         
         # Create tokens for automatic login
@@ -394,12 +525,10 @@ async def register_user(
         
     except HTTPException:
         # Re-raise HTTP exceptions (already properly formatted)
-        db.rollback()
-        print(f"[REGISTER] HTTPException raised, transaction rolled back")
+        print(f"[REGISTER] HTTPException raised")
         raise
     except IntegrityError as e:
         # Handle database constraint violations (e.g., unique email)
-        db.rollback()
         error_msg = str(e.orig) if hasattr(e, 'orig') else str(e)
         print(f"[REGISTER] Database integrity error: {error_msg}")
         print(f"[REGISTER] Full exception stack trace:")
@@ -424,7 +553,6 @@ async def register_user(
             )
     except Exception as e:
         # Handle any other unexpected errors
-        db.rollback()
         error_msg = str(e)
         error_type = type(e).__name__
         print(f"[REGISTER] Unexpected error during registration: {error_type}: {error_msg}")
@@ -452,7 +580,7 @@ async def register_user(
 )
 async def login_user(
     login_data: UserLoginRequest,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_request_db)
 ):
     """
     Login with email and password.
@@ -463,7 +591,7 @@ async def login_user(
     - Refresh token expires in 7 days
     """
     # Find user by email
-    user = db.query(User).filter(User.email == login_data.email).first()
+    user = await run_db(db, find_user_by_email, login_data.email)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -505,7 +633,7 @@ async def login_user(
 )
 async def refresh_access_token(
     token_data: RefreshTokenRequest,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_request_db)
 ):
     """
     Refresh access token using refresh token.
@@ -527,7 +655,7 @@ async def refresh_access_token(
         )
     
     # Verify user still exists
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await run_db(db, find_user_by_id, user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -551,6 +679,24 @@ async def refresh_access_token(
     )
 
 
+async def notify_profile_changed(user_id: str):
+    """
+    Drop the user's cached profile in meal-planner-service so the next plan
+    uses the new goals. Best effort: the cache expires on its own anyway.
+    
+    Args:
+        user_id: User whose profile changed
+    """
+    try:
+        async with httpx.AsyncClient(timeout=2.0) as client:
+            await client.delete(
+                f"{MEAL_PLANNER_URL}/api/meal-planner/internal/profile-cache/{user_id}",
+                headers=service_headers()
+            )
+    except Exception as e:
+        print(f"Could not invalidate cached profile for user {user_id}: {e}")
+
+
 @app.get(
     "/api/auth/me",
     response_model=UserResponse,
@@ -562,7 +708,7 @@ async def refresh_access_token(
 )
 async def get_current_user_profile(
     user_id: str = Depends(get_current_user_id),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_request_db)
 ):
     """
     Get current user profile.
@@ -570,48 +716,43 @@ async def get_current_user_profile(
     - Requires valid JWT access token
     - Returns user information and profile data
     """
-    user = get_user_from_token(db, user_id)
-    
     # Load profile if exists
-    profile = db.query(UserProfile).filter(UserProfile.user_id == user.id).first()
+    user, profile = await run_db(db, load_user_and_profile, user_id)
     
-    profile_data = None
-    if profile:
-        profile_data = UserProfileResponse(
-            fitness_goal=profile.fitness_goal.value,
-            daily_calories=profile.daily_calories,
-            dietary_preference=profile.dietary_preference.value,
-            has_completed_onboarding=bool(profile.has_completed_onboarding),  # Ensure always boolean
-            current_weight=profile.current_weight,
-            goal_weight=profile.goal_weight,
-            height=profile.height,
-            age_range=profile.age_range,
-            main_goal=profile.main_goal,
-            seriousness_score=profile.seriousness_score,
-            disliked_foods=profile.disliked_foods,
-            meals_per_day=profile.meals_per_day,
-            snacking_frequency=profile.snacking_frequency,
-            activity_level=profile.activity_level,
-            preferred_workout_location=profile.preferred_workout_location,
-            enjoyed_movement_types=profile.enjoyed_movement_types,
-            current_mental_state=profile.current_mental_state,
-            biggest_struggle=profile.biggest_struggle,
-            sleep_quality=profile.sleep_quality,
-            motivation_text=profile.motivation_text,
-            fear_text=profile.fear_text,
-            plan_strictness=profile.plan_strictness,
-            reminder_frequency=profile.reminder_frequency,
-            motivation_tone=profile.motivation_tone,
-            commitment_ready=profile.commitment_ready,
-            commitment_score=profile.commitment_score
-        )
+    return build_user_response(user, profile)
+
+
+@app.get(
+    "/api/auth/internal/users/{user_id}",
+    response_model=UserResponse,
+    tags=["Internal"],
+    dependencies=[Depends(require_service_token)],
+    responses={
+        200: {"description": "User profile retrieved successfully"},
+        401: {"model": ErrorResponse, "description": "Unauthorized - invalid service token"},
+        404: {"model": ErrorResponse, "description": "User not found"}
+    }
+)
+async def get_user_profile_for_service(
+    user_id: str,
+    db: Session = Depends(get_request_db)
+):
+    """
+    Get a user's profile for another service.
     
-    return UserResponse(
-        id=str(user.id),
-        email=user.email,
-        profile=profile_data,
-        created_at=user.created_at
-    )
+    - Requires the X-Service-Token header instead of a user's access token
+    - Returns the same data as /api/auth/me
+    """
+    try:
+        uuid.UUID(user_id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    
+    user, profile = await run_db(db, find_user_and_profile, user_id)
+    if not user:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    
+    return build_user_response(user, profile)
 
 
 @app.put(
@@ -626,8 +767,9 @@ async def get_current_user_profile(
 )
 async def update_user_profile(
     profile_data: UserProfileUpdateRequest,
+    background_tasks: BackgroundTasks,
     user_id: str = Depends(get_current_user_id),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_request_db)
 ):
     """
     Update user profile and fitness goals.
@@ -636,10 +778,8 @@ async def update_user_profile(
     - Updates fitness goal, dietary preference, and/or daily calories
     - Only provided fields are updated (partial update)
     """
-    user = get_user_from_token(db, user_id)
-    
     # Get or create profile
-    profile = db.query(UserProfile).filter(UserProfile.user_id == user.id).first()
+    user, profile = await run_db(db, load_user_and_profile, user_id)
     
     if not profile:
         raise HTTPException(
@@ -657,8 +797,8 @@ async def update_user_profile(
                 value = value.value
             setattr(profile, field, value)
     
-    db.commit()
-    db.refresh(profile)
+    await run_db(db, commit_and_refresh, profile)
+    background_tasks.add_task(notify_profile_changed, user_id)
     
     return MessageResponse(message="Profile updated successfully")
 
@@ -675,8 +815,9 @@ async def update_user_profile(
 )
 async def save_onboarding_data(
     onboarding_data: OnboardingDataRequest,
+    background_tasks: BackgroundTasks,
     user_id: str = Depends(get_current_user_id),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_request_db)
 ):
     """
     Save onboarding data and mark onboarding as complete.
@@ -686,10 +827,8 @@ async def save_onboarding_data(
     - Sets has_completed_onboarding to True
     - Returns updated user profile
     """
-    user = get_user_from_token(db, user_id)
-    
     # Get or create profile
-    profile = db.query(UserProfile).filter(UserProfile.user_id == user.id).first()
+    user, profile = await run_db(db, load_user_and_profile, user_id)
     
     if not profile:
         raise HTTPException(
@@ -710,8 +849,8 @@ async def save_onboarding_data(
     # Mark onboarding as complete
     profile.has_completed_onboarding = True
     
-    db.commit()
-    db.refresh(profile)
+    await run_db(db, commit_and_refresh, profile)
+    background_tasks.add_task(notify_profile_changed, user_id)
     
     # Return updated user profile
     profile_data = UserProfileResponse(
@@ -0,0 +1,53 @@
+"""
+Service-to-service authentication.
+
+Calls from one service to another's internal endpoints (meal-planner-service
+reading a profile from auth-service, auth-service dropping a cached profile
+in meal-planner-service) carry the shared INTERNAL_SERVICE_TOKEN in the
+X-Service-Token header. The token identifies the calling service, not a
+user: the user the call is about is part of the path, and no service signs
+user access tokens on a user's behalf. Internal endpoints reject every call
+while no token is configured.
+"""
+import hmac
+import os
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+from fastapi import Header, HTTPException, status
+
+load_dotenv()
+
+INTERNAL_SERVICE_TOKEN = os.getenv("INTERNAL_SERVICE_TOKEN", "")
+SERVICE_TOKEN_HEADER = "X-Service-Token"
+
+
+def service_headers() -> Dict[str, str]:
+    """
+    Headers that authenticate this service to another service's internal
+    endpoints.
+
+    Returns:
+        Header dict to pass with the request
+    """
+    return {SERVICE_TOKEN_HEADER: INTERNAL_SERVICE_TOKEN}
+
+
+def require_service_token(x_service_token: Optional[str] = Header(None)):
+    """
+    FastAPI dependency admitting only calls that carry the service token.
+
+    Args:
+        x_service_token: Value of the X-Service-Token header
+
+    Raises:
+        HTTPException: 401 if the token is missing or wrong, or if no token
+            is configured
+    """
+    if not INTERNAL_SERVICE_TOKEN or not x_service_token or not hmac.compare_digest(
+        x_service_token.encode("utf-8"), INTERNAL_SERVICE_TOKEN.encode("utf-8")
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid service token"
+        )
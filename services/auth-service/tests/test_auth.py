@@ -1,8 +1,18 @@
 """
 Tests for authentication endpoints.
 """
+import asyncio
+import uuid
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
 import pytest
 from fastapi import status
+from fastapi.testclient import TestClient
+
+from auth import create_access_token
+from main import app, notify_profile_changed
 
 
 class TestUserRegistration:
@@ -243,3 +253,62 @@ class TestLogout:
         
         assert response.status_code == status.HTTP_403_FORBIDDEN
 
+
+
+class TestInternalUserProfile:
+    """Tests for GET /api/auth/internal/users/{user_id}."""
+
+    user_id = str(uuid.uuid4())
+
+    @patch('service_auth.INTERNAL_SERVICE_TOKEN', 'service-secret')
+    @patch('main.find_user_and_profile')
+    def test_returns_profile_for_service(self, mock_find):
+        """Test a call with the service token gets the user's data."""
+        user = SimpleNamespace(id=self.user_id, email="test@example.com", created_at=datetime.now(timezone.utc))
+        mock_find.return_value = (user, None)
+
+        response = TestClient(app).get(
+            f"/api/auth/internal/users/{self.user_id}",
+            headers={"X-Service-Token": "service-secret"}
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["id"] == self.user_id
+        assert response.json()["profile"] is None
+
+    @patch('service_auth.INTERNAL_SERVICE_TOKEN', 'service-secret')
+    @patch('main.find_user_and_profile', return_value=(None, None))
+    def test_unknown_user_not_found(self, mock_find):
+        """Test an unknown or malformed user ID gives 404."""
+        client = TestClient(app)
+        headers = {"X-Service-Token": "service-secret"}
+
+        assert client.get(f"/api/auth/internal/users/{self.user_id}", headers=headers).status_code == 404
+        assert client.get("/api/auth/internal/users/not-a-uuid", headers=headers).status_code == 404
+
+    @patch('service_auth.INTERNAL_SERVICE_TOKEN', 'service-secret')
+    @patch('main.find_user_and_profile')
+    def test_rejects_user_tokens(self, mock_find):
+        """Test a user's access token or a wrong service token is refused."""
+        client = TestClient(app)
+        url = f"/api/auth/internal/users/{self.user_id}"
+        token = create_access_token({"sub": self.user_id})
+
+        assert client.get(url, headers={"Authorization": f"Bearer {token}"}).status_code == 401
+        assert client.get(url, headers={"X-Service-Token": "wrong"}).status_code == 401
+        mock_find.assert_not_called()
+
+
+class TestProfileChangeNotification:
+    """Tests for telling meal-planner-service about profile changes."""
+
+    @patch('service_auth.INTERNAL_SERVICE_TOKEN', 'service-secret')
+    @patch('httpx.AsyncClient.delete', new_callable=AsyncMock)
+    def test_uses_service_token(self, mock_delete):
+        """Test the invalidation call authenticates as the service, not as the user."""
+        asyncio.run(notify_profile_changed("user-1"))
+
+        url = mock_delete.call_args.args[0]
+        headers = mock_delete.call_args.kwargs["headers"]
+        assert url.endswith("/api/meal-planner/internal/profile-cache/user-1")
+        assert headers == {"X-Service-Token": "service-secret"}
@@ -0,0 +1,97 @@
+"""
+Check that the helper modules copied into several services are identical.
+
+Each service is built from its own directory (its Docker build context), so
+modules used by more than one service are kept as copies rather than as a
+shared package. A fix to one copy has to reach all of them; this check fails
+when they differ.
+
+Usage:
+    python services/check_shared_modules.py
+    python services/check_shared_modules.py --sync meal-planner-service
+"""
+import argparse
+import difflib
+import os
+import shutil
+import sys
+
+SERVICES_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Module -> services carrying a copy
+SHARED_MODULES = {
+    "circuit_breaker.py": ["meal-planner-service", "nutrition-ai-service"],
+    "health.py": ["auth-service", "meal-planner-service", "nutrition-ai-service"],
+    "idempotency.py": ["meal-planner-service", "nutrition-ai-service"],
+    "llm_scheduler.py": ["meal-planner-service", "nutrition-ai-service"],
+    "metrics.py": ["meal-planner-service", "nutrition-ai-service"],
+    "service_auth.py": ["auth-service", "meal-planner-service"],
+    "singleflight.py": ["meal-planner-service", "nutrition-ai-service"],
+    "warmup.py": ["auth-service", "meal-planner-service", "nutrition-ai-service"],
+}
+
+
+def read(service: str, module: str) -> str:
+    with open(os.path.join(SERVICES_DIR, service, module), encoding="utf-8") as f:
+        return f.read()
+
+
+def check() -> bool:
+    """
+    Compare every copy of each shared module with the first one listed.
+
+    Returns:
+        True if all copies are identical
+    """
+    in_sync = True
+    for module, services in SHARED_MODULES.items():
+        reference = read(services[0], module)
+        for service in services[1:]:
+            copy = read(service, module)
+            if copy == reference:
+                continue
+            in_sync = False
+            print(f"FAIL: {service}/{module} differs from {services[0]}/{module}")
+            sys.stdout.writelines(difflib.unified_diff(
+                reference.splitlines(keepends=True),
+                copy.splitlines(keepends=True),
+                fromfile=f"{services[0]}/{module}",
+                tofile=f"{service}/{module}"
+            ))
+    return in_sync
+
+
+def sync(source: str):
+    """
+    Copy the shared modules of `source` over the other services' copies.
+
+    Args:
+        source: Service whose copies were edited
+    """
+    for module, services in SHARED_MODULES.items():
+        if source not in services:
+            continue
+        for service in services:
+            if service != source:
+                shutil.copyfile(
+                    os.path.join(SERVICES_DIR, source, module),
+                    os.path.join(SERVICES_DIR, service, module)
+                )
+                print(f"Copied {source}/{module} to {service}/{module}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sync", metavar="SERVICE", help="Copy this service's shared modules to the others first")
+    args = parser.parse_args()
+
+    if args.sync:
+        sync(args.sync)
+    if not check():
+        print("Shared modules are out of sync; edit one copy and run with --sync <service>")
+        sys.exit(1)
+    print(f"{len(SHARED_MODULES)} shared modules in sync")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Benchmark: concurrent week-plan reads on one worker, sync vs async sessions.
+
+Runs --concurrency overlapping GET /week-style reads (crud.get_week_meals via
+run_db) on a single event loop, as one uvicorn worker would. The sync path
+uses SessionLocal, so each query blocks the loop; the async path uses an
+asyncpg AsyncSession (DATABASE_ASYNC=true). Requires asyncpg. Runs against
+DATABASE_URL and deletes everything it wrote.
+
+Usage:
+    DATABASE_URL=postgresql://... python benchmarks/bench_async_db.py --requests 2000 --concurrency 50
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import uuid
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.ext.asyncio import async_sessionmaker  # noqa: E402
+
+from database import SessionLocal, init_db, create_async_db_engine, run_db  # noqa: E402
+from models import Meal, MealPlan  # noqa: E402
+from crud import bulk_create_meal_plan, get_week_meals  # noqa: E402
+from meal_generator import get_weekly_slots, get_fallback_meal  # noqa: E402
+
+
+def seed(user_id, week_start):
+    meals = []
+    for day, meal_type in get_weekly_slots():
+        meal = dict(get_fallback_meal(meal_type, "maintain"))
+        meal["day"] = day
+        meal["meal_type"] = meal_type
+        meals.append(meal)
+
+    db = SessionLocal()
+    try:
+        bulk_create_meal_plan(db, user_id, week_start, meals)
+        db.commit()
+    finally:
+        db.close()
+
+
+async def run(label, session_factory, requests, concurrency, user_id, week_start, report=True):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one_request():
+        async with semaphore:
+            start = time.perf_counter()
+            db = session_factory()
+            try:
+                week = await run_db(db, get_week_meals, user_id, week_start)
+                assert week is not None
+            finally:
+                close = db.close()
+                if asyncio.iscoroutine(close):
+                    await close
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one_request() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+
+    if not report:
+        return
+
+    latencies.sort()
+    print(
+        f"{label:<6} requests={requests} concurrency={concurrency} "
+        f"p50={latencies[len(latencies) // 2]:.2f}ms "
+        f"p95={latencies[int(len(latencies) * 0.95) - 1]:.2f}ms "
+        f"throughput={requests / elapsed:.1f} req/s per worker"
+    )
+
+
+def cleanup(user_id):
+    db = SessionLocal()
+    try:
+        db.query(Meal).filter(Meal.user_id == user_id).delete()
+        db.query(MealPlan).filter(MealPlan.user_id == user_id).delete()
+        db.commit()
+    finally:
+        db.close()
+
+
+async def bench(args, user_id, week_start):
+    async_engine = create_async_db_engine()
+    async_session = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    try:
+        for label, factory in [("sync", SessionLocal), ("async", async_session)]:
+            await run(label, factory, args.warmup, args.concurrency, user_id, week_start, report=False)
+            await run(label, factory, args.requests, args.concurrency, user_id, week_start)
+    finally:
+        await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000, help="Reads per path")
+    parser.add_argument("--concurrency", type=int, default=50, help="Reads in flight at once")
+    parser.add_argument("--warmup", type=int, default=100, help="Untimed reads per path")
+    args = parser.parse_args()
+
+    init_db()
+    user_id = str(uuid.uuid4())
+    week_start = date.today() - timedelta(days=date.today().weekday())
+    seed(user_id, week_start)
+
+    try:
+        asyncio.run(bench(args, user_id, week_start))
+    finally:
+        cleanup(user_id)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark: persisting a generated weekly plan (1 meal_plans row + 21 meals rows).
+
+Compares the previous ORM path (db.add per Meal object) with
+crud.bulk_create_meal_plan (RETURNING insert + one multi-row INSERT).
+Runs against DATABASE_URL and deletes everything it wrote.
+
+Usage:
+    DATABASE_URL=postgresql://... python benchmarks/bench_bulk_insert.py --plans 200
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import SessionLocal, init_db  # noqa: E402
+from models import Meal, MealPlan, MealType, DayOfWeek  # noqa: E402
+from crud import bulk_create_meal_plan  # noqa: E402
+from meal_generator import get_weekly_slots, get_fallback_meal  # noqa: E402
+
+
+def sample_week():
+    meals = []
+    for day, meal_type in get_weekly_slots():
+        meal = dict(get_fallback_meal(meal_type, "maintain"))
+        meal["day"] = day
+        meal["meal_type"] = meal_type
+        meals.append(meal)
+    return meals
+
+
+def orm_create_meal_plan(db, user_id, week_start, meals_data):
+    """The per-object ORM path generate_weekly_internal used before."""
+    meal_plan = MealPlan(id=uuid.uuid4(), user_id=uuid.UUID(user_id), week_start=week_start)
+    db.add(meal_plan)
+    db.flush()
+    for m in meals_data:
+        db.add(Meal(
+            id=uuid.uuid4(),
+            meal_plan_id=meal_plan.id,
+            user_id=uuid.UUID(user_id),
+            day=DayOfWeek[m["day"].upper()],
+            meal_type=MealType[m["meal_type"].upper()],
+            name=m["name"],
+            calories=m["calories"],
+            protein=m["protein"],
+            carbs=m["carbs"],
+            fats=m["fats"],
+            ingredients=m["ingredients"]
+        ))
+
+
+def run(label, create, plans, user_id, meals_data, report=True):
+    timings = []
+    for _ in range(plans):
+        db = SessionLocal()
+        try:
+            start = time.perf_counter()
+            create(db, user_id, date.today(), meals_data)
+            db.commit()
+            timings.append((time.perf_counter() - start) * 1000)
+        finally:
+            db.close()
+
+    if not report:
+        return
+
+    timings.sort()
+    print(
+        f"{label:<6} plans={plans} "
+        f"mean={statistics.mean(timings):.2f}ms "
+        f"p50={timings[len(timings) // 2]:.2f}ms "
+        f"p95={timings[int(len(timings) * 0.95) - 1]:.2f}ms "
+        f"throughput={1000 / statistics.mean(timings):.1f} plans/s"
+    )
+
+
+def cleanup(user_id):
+    db = SessionLocal()
+    try:
+        db.query(Meal).filter(Meal.user_id == user_id).delete()
+        db.query(MealPlan).filter(MealPlan.user_id == user_id).delete()
+        db.commit()
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--plans", type=int, default=200, help="Plans written per path")
+    parser.add_argument("--warmup", type=int, default=10, help="Untimed plans per path")
+    args = parser.parse_args()
+
+    init_db()
+    meals_data = sample_week()
+    user_id = str(uuid.uuid4())
+
+    try:
+        for label, create in [("orm", orm_create_meal_plan), ("bulk", bulk_create_meal_plan)]:
+            run(label, create, args.warmup, user_id, meals_data, report=False)
+            run(label, create, args.plans, user_id, meals_data)
+    finally:
+        cleanup(user_id)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,411 @@
+"""
+Database read/write helpers for meal plans.
+"""
+from sqlalchemy import insert, select, update, func, and_
+from sqlalchemy.orm import Session
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+import uuid
+
+from models import Meal, MealPlan, MealType, DayOfWeek, GenerationJob, JobStatus
+
+
+def build_meal_rows(meal_plan_id: uuid.UUID, user_id: uuid.UUID, meals_data: List[Dict]) -> List[Dict]:
+    """
+    Convert generated meal dictionaries into rows for the meals table.
+
+    Args:
+        meal_plan_id: ID of the owning meal plan
+        user_id: Owner of the meals
+        meals_data: Generated meals with day and meal_type included
+
+    Returns:
+        List of column dictionaries, each with a new meal id
+    """
+    return [
+        {
+            "id": uuid.uuid4(),
+            "meal_plan_id": meal_plan_id,
+            "user_id": user_id,
+            "day": DayOfWeek[m["day"].upper()],
+            "meal_type": MealType[m["meal_type"].upper()],
+            "name": m["name"],
+            "calories": m["calories"],
+            "protein": m["protein"],
+            "carbs": m["carbs"],
+            "fats": m["fats"],
+            "ingredients": m["ingredients"]
+        }
+        for m in meals_data
+    ]
+
+
+def create_meal_plan(db: Session, user_id: str, week_start: date) -> Tuple[uuid.UUID, datetime]:
+    """
+    Insert an empty meal plan row in the caller's transaction.
+
+    Args:
+        db: Database session
+        user_id: Owner of the plan
+        week_start: Monday of the plan's week
+
+    Returns:
+        Tuple of (plan id, server-generated generated_at)
+    """
+    plan_id = uuid.uuid4()
+    generated_at = db.execute(
+        insert(MealPlan)
+        .values(id=plan_id, user_id=uuid.UUID(str(user_id)), week_start=week_start)
+        .returning(MealPlan.generated_at)
+    ).scalar_one()
+    return plan_id, generated_at
+
+
+def insert_plan_meals(
+    db: Session,
+    meal_plan_id: uuid.UUID,
+    user_id: str,
+    meals_data: List[Dict]
+) -> List[Dict]:
+    """
+    Insert meals into an existing plan with a single executemany.
+    Runs in the caller's transaction.
+
+    Args:
+        db: Database session
+        meal_plan_id: ID of the owning meal plan
+        user_id: Owner of the meals
+        meals_data: Generated meals with day and meal_type included
+
+    Returns:
+        Inserted meal rows
+    """
+    rows = build_meal_rows(meal_plan_id, uuid.UUID(str(user_id)), meals_data)
+    if rows:
+        db.execute(insert(Meal), rows)
+    return rows
+
+
+def bulk_create_meal_plan(
+    db: Session,
+    user_id: str,
+    week_start: date,
+    meals_data: List[Dict]
+) -> Tuple[uuid.UUID, datetime, List[Dict]]:
+    """
+    Insert a meal plan and all of its meals in two statements.
+
+    Bypasses the ORM unit of work: the plan row is inserted with RETURNING
+    for its server-generated timestamp, then every meal goes out in a single
+    executemany that SQLAlchemy batches into multi-row INSERTs. Both run in
+    the caller's transaction; the caller commits or rolls back.
+
+    Args:
+        db: Database session
+        user_id: Owner of the plan
+        week_start: Monday of the plan's week
+        meals_data: Generated meals with day and meal_type included
+
+    Returns:
+        Tuple of (plan id, generated_at, inserted meal rows)
+    """
+    plan_id, generated_at = create_meal_plan(db, user_id, week_start)
+    rows = insert_plan_meals(db, plan_id, user_id, meals_data)
+    return plan_id, generated_at, rows
+
+
+def latest_plan_id(user_id: str, week_start: date):
+    """
+    Scalar subquery selecting the user's most recent plan for a week.
+    Served by idx_meal_plans_user_week.
+
+    Args:
+        user_id: Owner of the plan
+        week_start: Monday of the week
+
+    Returns:
+        Scalar subquery yielding the plan id
+    """
+    return (
+        select(MealPlan.id)
+        .where(
+            MealPlan.user_id == uuid.UUID(str(user_id)),
+            MealPlan.week_start == week_start
+        )
+        .order_by(MealPlan.generated_at.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+
+
+def get_week_meals(
+    db: Session,
+    user_id: str,
+    week_start: date
+) -> Optional[Tuple[uuid.UUID, date, datetime, List[Meal]]]:
+    """
+    Load a user's plan for a week together with its meals in one query.
+
+    Args:
+        db: Database session
+        user_id: Owner of the plan
+        week_start: Monday of the week
+
+    Returns:
+        Tuple of (plan id, week_start, generated_at, meals ordered by day and
+        meal type), or None if the user has no plan for that week
+    """
+    rows = db.execute(
+        select(MealPlan.id, MealPlan.week_start, MealPlan.generated_at, Meal)
+        .outerjoin(Meal, Meal.meal_plan_id == MealPlan.id)
+        .where(MealPlan.id == latest_plan_id(user_id, week_start))
+        .order_by(Meal.day, Meal.meal_type)
+    ).all()
+
+    if not rows:
+        return None
+
+    plan_id, plan_week_start, generated_at, _ = rows[0]
+    return plan_id, plan_week_start, generated_at, [row.Meal for row in rows if row.Meal is not None]
+
+
+def get_day_meals(
+    db: Session,
+    user_id: str,
+    week_start: date,
+    day: DayOfWeek
+) -> Optional[Tuple[List[Meal], Dict]]:
+    """
+    Load one day's meals of a user's plan with daily totals in one query.
+    Totals are computed by the database with window sums over the day's rows.
+
+    Args:
+        db: Database session
+        user_id: Owner of the plan
+        week_start: Monday of the week
+        day: Day of the week to load
+
+    Returns:
+        Tuple of (meals ordered by meal type, daily totals), or None if the
+        user has no plan for that week. Meals is empty if the day has none.
+    """
+    rows = db.execute(
+        select(
+            Meal,
+            func.coalesce(func.sum(Meal.calories).over(), 0).label("total_calories"),
+            func.coalesce(func.sum(Meal.protein).over(), 0).label("total_protein"),
+            func.coalesce(func.sum(Meal.carbs).over(), 0).label("total_carbs"),
+            func.coalesce(func.sum(Meal.fats).over(), 0).label("total_fats")
+        )
+        .select_from(MealPlan)
+        .outerjoin(Meal, and_(Meal.meal_plan_id == MealPlan.id, Meal.day == day))
+        .where(MealPlan.id == latest_plan_id(user_id, week_start))
+        .order_by(Meal.meal_type)
+    ).all()
+
+    if not rows:
+        return None
+
+    first = rows[0]
+    totals = {
+        "calories": first.total_calories,
+        "protein": first.total_protein,
+        "carbs": first.total_carbs,
+        "fats": first.total_fats
+    }
+    return [row.Meal for row in rows if row.Meal is not None], totals
+
+
+def get_meal(db: Session, meal_id: str) -> Optional[Meal]:
+    """
+    Load a single meal by id.
+
+    Args:
+        db: Database session
+        meal_id: Meal id
+
+    Returns:
+        Meal or None
+    """
+    return db.query(Meal).filter(Meal.id == meal_id).first()
+
+
+def replace_meal(db: Session, meal: Meal, meal_data: Dict) -> Meal:
+    """
+    Overwrite a meal in place with another meal's name, macros and
+    ingredients, and commit.
+
+    Args:
+        db: Database session the meal was loaded in
+        meal: Meal to replace
+        meal_data: Replacement meal data
+
+    Returns:
+        The refreshed meal
+    """
+    meal.name = meal_data["name"]
+    meal.calories = meal_data["calories"]
+    meal.protein = meal_data["protein"]
+    meal.carbs = meal_data["carbs"]
+    meal.fats = meal_data["fats"]
+    meal.ingredients = meal_data["ingredients"]
+
+    db.commit()
+    db.refresh(meal)
+    return meal
+
+
+def get_meal_history(db: Session, user_id: str, limit: int = 300) -> Dict[str, List[Dict]]:
+    """
+    Load a user's most recently planned meals, grouped by meal type.
+    Served by idx_meals_user_id.
+
+    Args:
+        db: Database session
+        user_id: Owner of the meals
+        limit: Maximum meals to load
+
+    Returns:
+        Dictionary mapping meal type to meal dictionaries, newest first
+    """
+    rows = db.execute(
+        select(Meal.meal_type, Meal.name, Meal.calories, Meal.protein, Meal.carbs, Meal.fats, Meal.ingredients)
+        .where(Meal.user_id == uuid.UUID(str(user_id)))
+        .order_by(Meal.created_at.desc())
+        .limit(limit)
+    ).all()
+
+    history: Dict[str, List[Dict]] = {}
+    for row in rows:
+        history.setdefault(row.meal_type.value, []).append({
+            "name": row.name,
+            "calories": row.calories,
+            "protein": row.protein,
+            "carbs": row.carbs,
+            "fats": row.fats,
+            "ingredients": row.ingredients
+        })
+    return history
+
+
+def create_generation_job(db: Session, user_id: str, week_start: date, total_slots: int) -> GenerationJob:
+    """
+    Record a new queued plan-generation job.
+
+    Args:
+        db: Database session
+        user_id: Owner of the job
+        week_start: Monday of the week to generate
+        total_slots: Number of meal slots the job will generate
+
+    Returns:
+        The committed GenerationJob
+    """
+    job = GenerationJob(
+        id=uuid.uuid4(),
+        user_id=uuid.UUID(str(user_id)),
+        week_start=week_start,
+        status=JobStatus.QUEUED,
+        total_slots=total_slots,
+        completed_slots=0,
+        progress=[]
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def get_generation_job(db: Session, job_id: str) -> Optional[GenerationJob]:
+    """
+    Load a plan-generation job by id.
+
+    Args:
+        db: Database session
+        job_id: Job id (invalid UUIDs simply find nothing)
+
+    Returns:
+        GenerationJob or None
+    """
+    try:
+        job_uuid = uuid.UUID(str(job_id))
+    except ValueError:
+        return None
+    return db.get(GenerationJob, job_uuid)
+
+
+def update_generation_job(db: Session, job_id: uuid.UUID, **values):
+    """
+    Update columns of a plan-generation job and commit immediately,
+    so progress is visible to pollers on other replicas.
+
+    Args:
+        db: Database session
+        job_id: Job id
+        **values: Column values to set
+    """
+    db.execute(update(GenerationJob).where(GenerationJob.id == job_id).values(**values))
+    db.commit()
+
+
+def claim_generation_job(db: Session, job_id: uuid.UUID, started_at: datetime) -> bool:
+    """
+    Move a queued job to running, unless another worker got to it first.
+    A job can be queued more than once after a restart, so the status
+    check and update happen in one statement.
+
+    Args:
+        db: Database session
+        job_id: Job id
+        started_at: Time the worker picked the job up
+
+    Returns:
+        True if this worker now owns the job
+    """
+    result = db.execute(
+        update(GenerationJob)
+        .where(and_(GenerationJob.id == job_id, GenerationJob.status == JobStatus.QUEUED))
+        .values(status=JobStatus.RUNNING, started_at=started_at)
+    )
+    db.commit()
+    return result.rowcount == 1
+
+
+def fail_stale_generation_jobs(db: Session, started_before: datetime, error: str) -> int:
+    """
+    Mark running jobs that started before a cutoff as failed. Their worker
+    is assumed gone: a job runs far shorter than the cutoff allows.
+
+    Args:
+        db: Database session
+        started_before: Jobs started before this time are stale
+        error: Error recorded on the failed jobs
+
+    Returns:
+        Number of jobs marked failed
+    """
+    result = db.execute(
+        update(GenerationJob)
+        .where(and_(GenerationJob.status == JobStatus.RUNNING, GenerationJob.started_at < started_before))
+        .values(status=JobStatus.FAILED, error=error, finished_at=func.now())
+    )
+    db.commit()
+    return result.rowcount
+
+
+def list_queued_generation_jobs(db: Session, created_before: datetime) -> List[uuid.UUID]:
+    """
+    List ids of jobs still waiting for a worker, oldest first.
+
+    Args:
+        db: Database session
+        created_before: Only jobs created before this time
+
+    Returns:
+        Job ids
+    """
+    return list(db.execute(
+        select(GenerationJob.id)
+        .where(and_(GenerationJob.status == JobStatus.QUEUED, GenerationJob.created_at < created_before))
+        .order_by(GenerationJob.created_at)
+    ).scalars())
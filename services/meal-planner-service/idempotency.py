@@ -0,0 +1,165 @@
+"""
+Idempotency keys and a per-user in-flight lock for plan generation.
+
+Clients retry after a token refresh and users double-click "Generate", so a
+plan request often arrives more than once. Each user has at most one
+generation running: a duplicate request (same request fingerprint) attaches
+to it and receives the same result, and a different request gets
+GenerationInProgressError. When the request carries an Idempotency-Key, the
+finished result is kept for IDEMPOTENCY_TTL_SECONDS and replayed to later
+requests with the same key instead of generating again. State is in-process,
+so duplicates are only recognised on the replica that ran the original.
+"""
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from metrics import counter, gauge
+
+load_dotenv()
+
+# How long a finished result is replayed for its Idempotency-Key
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", str(24 * 60 * 60)))
+IDEMPOTENCY_MAX_KEYS = int(os.getenv("IDEMPOTENCY_MAX_KEYS", "10000"))
+# Longest Idempotency-Key accepted
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+generation_requests = counter(
+    "plan_generation_requests_total",
+    "Plan generation requests by outcome (started, attached, replayed, conflict)"
+)
+generations_running = gauge("plan_generations_running", "Plan generations currently in flight")
+
+
+class GenerationInProgressError(Exception):
+    """Raised when the user already has a different generation running."""
+    pass
+
+
+class IdempotencyKeyReusedError(Exception):
+    """Raised when an Idempotency-Key is reused for a different request."""
+    pass
+
+
+class _Running:
+    """A user's in-flight generation."""
+
+    def __init__(self, fingerprint: Hashable, task: asyncio.Task):
+        self.fingerprint = fingerprint
+        self.task = task
+        # Idempotency-Keys of every request sharing this generation
+        self.keys = set()
+        # Requests currently waiting on the generation
+        self.waiters = 0
+
+
+class IdempotentGenerations:
+    """Per-user single generation with replay of finished results by key."""
+
+    def __init__(self, ttl: int = IDEMPOTENCY_TTL_SECONDS, max_keys: int = IDEMPOTENCY_MAX_KEYS):
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self._running: Dict[str, _Running] = {}
+        # (user_id, key) -> (fingerprint, result, expires_at)
+        self._results: "OrderedDict[Tuple[str, str], Tuple[Hashable, Any, float]]" = OrderedDict()
+        generations_running.set_function(lambda: len(self._running))
+
+    def _stored(self, user_id: str, key: str) -> Optional[Tuple[Hashable, Any, float]]:
+        entry = self._results.get((user_id, key))
+        if entry is None:
+            return None
+        if entry[2] <= time.monotonic():
+            del self._results[(user_id, key)]
+            return None
+        return entry
+
+    def _store(self, user_id: str, key: str, fingerprint: Hashable, result: Any):
+        self._results[(user_id, key)] = (fingerprint, result, time.monotonic() + self.ttl)
+        self._results.move_to_end((user_id, key))
+        while len(self._results) > self.max_keys:
+            self._results.popitem(last=False)
+
+    def _finish(self, user_id: str, running: _Running):
+        if self._running.get(user_id) is running:
+            del self._running[user_id]
+        task = running.task
+        if not task.cancelled() and task.exception() is None:
+            for key in running.keys:
+                self._store(user_id, key, running.fingerprint, task.result())
+
+    async def run(
+        self,
+        user_id: str,
+        key: Optional[str],
+        fingerprint: Hashable,
+        generate: Callable[[], Awaitable[Any]]
+    ) -> Tuple[Any, str]:
+        """
+        Run a generation for a user unless a duplicate is running or finished.
+
+        The generation runs as its own task, so it completes (and its result
+        is stored under `key`) even if the request that started it goes
+        away. It is only cancelled once every request waiting on it has
+        been cancelled and none of them sent an Idempotency-Key, i.e. when
+        nobody could ever collect the result.
+
+        Args:
+            user_id: User the generation belongs to
+            key: Idempotency-Key sent by the client, if any
+            fingerprint: Identifies the request parameters; requests with the
+                same fingerprint are duplicates
+            generate: Zero-argument coroutine function doing the work
+
+        Returns:
+            Tuple of (result, outcome) where outcome is "started", "attached"
+            or "replayed"
+
+        Raises:
+            IdempotencyKeyReusedError: If `key` was used for a different request
+            GenerationInProgressError: If a different generation is running
+        """
+        if key:
+            stored = self._stored(user_id, key)
+            if stored is not None:
+                if stored[0] != fingerprint:
+                    generation_requests.inc(outcome="conflict")
+                    raise IdempotencyKeyReusedError("Idempotency-Key was already used for a different request")
+                generation_requests.inc(outcome="replayed")
+                return stored[1], "replayed"
+
+        running = self._running.get(user_id)
+        if running is not None:
+            if running.fingerprint != fingerprint:
+                generation_requests.inc(outcome="conflict")
+                raise GenerationInProgressError("A meal plan is already being generated")
+            if key:
+                running.keys.add(key)
+            generation_requests.inc(outcome="attached")
+            return await self._wait(running), "attached"
+
+        running = _Running(fingerprint, asyncio.ensure_future(generate()))
+        if key:
+            running.keys.add(key)
+        self._running[user_id] = running
+        running.task.add_done_callback(lambda _: self._finish(user_id, running))
+        generation_requests.inc(outcome="started")
+        return await self._wait(running), "started"
+
+    async def _wait(self, running: _Running) -> Any:
+        running.waiters += 1
+        try:
+            return await asyncio.shield(running.task)
+        except asyncio.CancelledError:
+            if running.waiters == 1 and not running.keys and not running.task.done():
+                running.task.cancel()
+            raise
+        finally:
+            running.waiters -= 1
+
+    def clear(self):
+        """Forget stored results (running generations are left alone)."""
+        self._results.clear()
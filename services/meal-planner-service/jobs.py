@@ -0,0 +1,138 @@
+"""
+Background job queue for weekly plan generation.
+
+POST /api/meal-planner/jobs records a job and enqueues its id here; a fixed
+pool of asyncio workers in this process runs the jobs. Job status and
+per-slot progress live in the generation_jobs table, so any replica can
+answer progress polls. Jobs a restart left behind are recovered on start
+and then every MEAL_JOB_STALE_SECONDS (see `recover`).
+"""
+import asyncio
+import os
+import time
+from typing import Awaitable, Callable, Optional
+
+from dotenv import load_dotenv
+
+from metrics import counter, gauge, summary
+
+load_dotenv()
+
+MEAL_JOB_WORKERS = int(os.getenv("MEAL_JOB_WORKERS", "4"))
+MEAL_JOB_MAX_QUEUED = int(os.getenv("MEAL_JOB_MAX_QUEUED", "100"))
+# A job running or queued for longer than this is taken to have lost its worker
+MEAL_JOB_STALE_SECONDS = float(os.getenv("MEAL_JOB_STALE_SECONDS", "600"))
+
+jobs_total = counter("meal_plan_jobs_total", "Plan generation jobs by final status")
+job_queue_depth = gauge("meal_plan_job_queue_depth", "Plan generation jobs waiting for a worker")
+job_workers_busy = gauge("meal_plan_job_workers_busy", "Workers currently running a job")
+job_wait_seconds = summary("meal_plan_job_wait_seconds", "Time jobs spend queued before a worker picks them up")
+job_run_seconds = summary("meal_plan_job_run_seconds", "Time workers spend running a job")
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue is at capacity."""
+    pass
+
+
+class PlanJobQueue:
+    """Bounded in-process queue served by a fixed pool of asyncio workers."""
+
+    def __init__(
+        self,
+        run_job: Callable[[str], Awaitable[None]],
+        workers: int = MEAL_JOB_WORKERS,
+        max_queued: int = MEAL_JOB_MAX_QUEUED,
+        recover: Optional[Callable[[bool], Awaitable[None]]] = None,
+        recover_interval: float = MEAL_JOB_STALE_SECONDS
+    ):
+        """
+        Args:
+            run_job: Runs one job by id
+            workers: Number of concurrent workers
+            max_queued: Jobs that may wait for a worker
+            recover: Called once the workers run and then every
+                recover_interval seconds to fail or re-enqueue jobs left
+                behind; its argument is True for the call on start
+            recover_interval: Seconds between recover calls
+        """
+        self.run_job = run_job
+        self.workers = workers
+        self.max_queued = max_queued
+        self.recover = recover
+        self.recover_interval = recover_interval
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks = []
+        job_queue_depth.set_function(self.depth)
+
+    def depth(self) -> int:
+        """Number of jobs waiting for a worker."""
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def start(self):
+        """Start the worker pool (called on application startup)."""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queued)
+        self._tasks = [
+            asyncio.create_task(self._worker(i))
+            for i in range(self.workers)
+        ]
+        if self.recover is not None:
+            self._tasks.append(asyncio.create_task(self._recover_periodically()))
+        print(f"Started {self.workers} plan generation workers")
+
+    async def stop(self):
+        """Cancel the workers (called on application shutdown)."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def enqueue(self, job_id: str):
+        """
+        Queue a job for the worker pool.
+
+        Args:
+            job_id: Id of a job already recorded in generation_jobs
+
+        Raises:
+            QueueFullError: If max_queued jobs are already waiting
+        """
+        if self._queue is None:
+            raise RuntimeError("Job queue is not started")
+        try:
+            self._queue.put_nowait((job_id, time.monotonic()))
+        except asyncio.QueueFull:
+            raise QueueFullError(f"{self.max_queued} plan generation jobs already queued")
+
+    async def _worker(self, worker_id: int):
+        while True:
+            job_id, enqueued_at = await self._queue.get()
+            started = time.monotonic()
+            job_wait_seconds.observe(started - enqueued_at)
+            job_workers_busy.inc()
+            try:
+                await self.run_job(job_id)
+                jobs_total.inc(status="completed")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                jobs_total.inc(status="crashed")
+                print(f"Plan generation worker {worker_id} failed on job {job_id}: {e}")
+            finally:
+                job_workers_busy.dec()
+                job_run_seconds.observe(time.monotonic() - started)
+                self._queue.task_done()
+
+    async def _recover_periodically(self):
+        on_start = True
+        while True:
+            try:
+                await self.recover(on_start)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Could not recover plan generation jobs: {e}")
+            on_start = False
+            await asyncio.sleep(self.recover_interval)
@@ -2,34 +2,89 @@
 FastAPI Meal Planner Service - Main application.
 Handles AI-powered meal plan generation and management.
 """
-from fastapi import FastAPI, Depends, HTTPException, status, Header
+from fastapi import FastAPI, Depends, HTTPException, status, Header, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from typing import Optional
 import os
+import json
+import asyncio
 from dotenv import load_dotenv
 import uuid
-from datetime import date, timedelta
+from datetime import date, datetime, timedelta, timezone
 from jose import jwt, JWTError
 
-from database import get_db, init_db, check_db_connection
-from models import Meal, MealPlan, MealType, DayOfWeek
+from database import (
+    SessionLocal,
+    AsyncSessionLocal,
+    init_db,
+    DATABASE_ASYNC,
+    get_request_db,
+    run_db,
+    commit_db,
+    rollback_db,
+    close_db,
+    init_db_async,
+    ping_db,
+    ping_db_async,
+    warm_db_pool,
+    warm_db_pool_async
+)
+from crud import (
+    bulk_create_meal_plan,
+    create_meal_plan,
+    insert_plan_meals,
+    get_week_meals,
+    get_day_meals,
+    get_meal_history,
+    get_meal,
+    replace_meal,
+    create_generation_job,
+    get_generation_job,
+    update_generation_job,
+    claim_generation_job,
+    fail_stale_generation_jobs,
+    list_queued_generation_jobs
+)
+from models import Meal, MealPlan, MealType, DayOfWeek, GenerationJob, JobStatus
 from schemas import (
     GenerateWeeklyMealPlanRequest,
     MealPlanResponse,
     MealResponse,
     DailyMealsResponse,
-    ErrorResponse,
-    UserProfileData,
-    FitnessGoalEnum,
-    DietaryPreferenceEnum
+    JobAcceptedResponse,
+    JobResponse,
+    ErrorResponse
 )
+from metrics import render_metrics
+from health import HealthMonitor, http_probe, HEALTH_LLM_CHECK_INTERVAL_SECONDS
+from warmup import StartupWarmup, retry_until_done
+from circuit_breaker import get_breaker_states
+from llm_scheduler import BATCH, INTERACTIVE, llm_priority
+from meal_cache import meal_cache
 from meal_generator import (
-    generate_weekly_meals,
-    generate_meal_with_ai,
+    generate_weekly_meals_async,
+    generate_meal_with_ai_async,
     get_meal_calorie_target,
-    get_default_calories_for_goal
+    get_default_calories_for_goal,
+    get_weekly_slots,
+    generate_swap_candidate_async,
+    warm_up as warm_up_openai,
+    MEAL_TYPES,
+    MEAL_GENERATION_MODE
+)
+from jobs import PlanJobQueue, QueueFullError, MEAL_JOB_STALE_SECONDS
+from idempotency import (
+    IdempotentGenerations,
+    GenerationInProgressError,
+    IdempotencyKeyReusedError,
+    IDEMPOTENCY_KEY_MAX_LENGTH
 )
+from swap_pool import SwapPool, SWAP_POOL_ENABLED
+from swap_index import find_nearest_swap, MEAL_SWAP_STRATEGY
+from profile_client import profile_client
+from service_auth import require_service_token
 
 load_dotenv()
 
@@ -44,33 +99,113 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Idempotent-Replayed"],
 )
 
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "dev-secret-key")
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 
+swap_pool = SwapPool(generate_swap_candidate_async)
+generations = IdempotentGenerations()
+
+health_monitor = HealthMonitor("meal-planner-service")
+health_monitor.add_check("database", ping_db_async if DATABASE_ASYNC else ping_db)
+if os.getenv("OPENAI_API_KEY"):
+    # Not critical: generation falls back to predefined meals without OpenAI
+    health_monitor.add_check(
+        "openai",
+        http_probe(
+            os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1").rstrip("/") + "/models",
+            headers={"Authorization": f"Bearer {os.getenv('OPENAI_API_KEY')}"}
+        ),
+        critical=False,
+        interval=HEALTH_LLM_CHECK_INTERVAL_SECONDS
+    )
+
 # -------------------- STARTUP --------------------
 
+# Startup phases run in parallel; /health/ready stays 503 until the database is ready
+startup_warmup = StartupWarmup()
+
+async def prepare_database():
+    """Wait until the database answers, create missing tables and open pooled connections."""
+    if DATABASE_ASYNC:
+        await ping_db_async()
+        await init_db_async()
+        await warm_db_pool_async()
+    else:
+        await asyncio.to_thread(ping_db)
+        await asyncio.to_thread(init_db)
+        await asyncio.to_thread(warm_db_pool)
+    print("✓ Database ready")
+
+async def start_background_work():
+    # Both need the database, so they start once its warm-up phase succeeded
+    await job_queue.start()
+    await health_monitor.start()
+
 @app.on_event("startup")
 async def startup_event():
     print("Starting Meal Planner Service...")
-    if check_db_connection():
-        init_db()
-        print("✓ Database ready")
-    else:
-        print("✗ Database connection failed")
+    # In the background: /health/live answers while dependencies warm up.
+    # Meals fall back to predefined ones without OpenAI, so it is optional.
+    startup_warmup.start(
+        {
+            "database": retry_until_done("database", prepare_database),
+            "openai": warm_up_openai
+        },
+        optional=("openai",),
+        on_ready=start_background_work
+    )
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await startup_warmup.stop()
+    await health_monitor.stop()
+    await job_queue.stop()
+    await swap_pool.stop()
+    await profile_client.aclose()
 
 # -------------------- HEALTH --------------------
 
+# Served from the monitor's cached probes; none of these touch the database
+
 @app.get("/health")
 async def health():
-    db_ok = check_db_connection()
+    db_ok = health_monitor.is_up("database")
     return {
         "status": "healthy" if db_ok else "unhealthy",
         "service": "meal-planner-service",
-        "database": "connected" if db_ok else "disconnected"
+        "database": "connected" if db_ok else "disconnected",
+        "checks": health_monitor.snapshot()["checks"],
+        "circuit_breakers": get_breaker_states()
     }
 
+@app.get("/health/live")
+async def health_live():
+    return {"status": "ok"}
+
+@app.get("/health/ready")
+async def health_ready():
+    snapshot = health_monitor.snapshot()
+    snapshot["startup"] = startup_warmup.report()
+    if not startup_warmup.complete:
+        snapshot["status"] = "starting"
+    ready = startup_warmup.complete and health_monitor.is_ready()
+    return JSONResponse(snapshot, status_code=200 if ready else 503)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return render_metrics()
+
+@app.get("/api/meal-planner/cache/stats")
+async def cache_stats():
+    return meal_cache.get_stats()
+
+@app.get("/api/meal-planner/swap-pool/stats")
+async def swap_pool_stats():
+    return swap_pool.get_stats()
+
 # -------------------- AUTH --------------------
 
 def get_user_id_from_token(authorization: Optional[str] = Header(None)):
@@ -97,202 +232,534 @@ def get_monday(input_date: Optional[date] = None):
 def day_name(input_date: date):
     return input_date.strftime("%A").lower()
 
+def format_sse(event: str, data) -> str:
+    """Format one Server-Sent Events message with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
 async def get_user_profile(user_id: str):
-    return UserProfileData(
-        fitness_goal=FitnessGoalEnum.MAINTAIN,
-        daily_calories=2200,
-        dietary_preference=DietaryPreferenceEnum.NONE
-    )
+    return await profile_client.get(user_id)
+
+@app.delete(
+    "/api/meal-planner/internal/profile-cache/{user_id}",
+    status_code=204,
+    dependencies=[Depends(require_service_token)]
+)
+async def invalidate_profile_cache(user_id: str):
+    # Called by auth-service after the user's profile changes
+    profile_client.invalidate(user_id)
+    return Response(status_code=204)
 
 # -------------------- FRONTEND COMPATIBLE ROUTES --------------------
 
 @app.post("/api/meal-planner/generate", response_model=MealPlanResponse)
 async def frontend_generate_weekly(
     request: GenerateWeeklyMealPlanRequest,
+    response: Response,
     user_id: str = Depends(get_user_id_from_token),
-    db: Session = Depends(get_db)
+    idempotency_key: Optional[str] = Header(None, max_length=IDEMPOTENCY_KEY_MAX_LENGTH)
 ):
-    return await generate_weekly_internal(request, user_id, db)
+    return await generate_weekly_internal(request, user_id, response, idempotency_key)
+
+@app.post("/api/meal-planner/generate/stream")
+async def frontend_generate_weekly_stream(
+    request: GenerateWeeklyMealPlanRequest,
+    user_id: str = Depends(get_user_id_from_token)
+):
+    return await stream_weekly_internal(request, user_id)
 
 @app.get("/api/meal-planner/weekly", response_model=MealPlanResponse)
 async def frontend_get_weekly(
     user_id: str = Depends(get_user_id_from_token),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_request_db)
 ):
     return await get_weekly_internal(None, user_id, db)
 
 @app.get("/api/meal-planner/today", response_model=DailyMealsResponse)
 async def frontend_today(
     user_id: str = Depends(get_user_id_from_token),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_request_db)
 ):
     return await get_today_internal(user_id, db)
 
 @app.put("/api/meal-planner/{meal_id}/swap", response_model=MealResponse)
 async def frontend_swap(
     meal_id: str,
+    strategy: Optional[str] = Query(None, pattern="^(pool|nearest)$"),
     user_id: str = Depends(get_user_id_from_token),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_request_db)
 ):
-    return await swap_internal(meal_id, user_id, db)
+    return await swap_internal(meal_id, user_id, db, strategy)
 
-# -------------------- INTERNAL LOGIC --------------------
+@app.post(
+    "/api/meal-planner/jobs",
+    response_model=JobAcceptedResponse,
+    status_code=status.HTTP_202_ACCEPTED
+)
+async def frontend_enqueue_generation(
+    request: GenerateWeeklyMealPlanRequest,
+    user_id: str = Depends(get_user_id_from_token),
+    db: Session = Depends(get_request_db)
+):
+    return await enqueue_generation_internal(request, user_id, db)
 
-async def generate_weekly_internal(request, user_id, db):
-    try:
-        week_start = get_monday(request.week_start)
-        profile = await get_user_profile(user_id)
+@app.get("/api/meal-planner/jobs/{job_id}", response_model=JobResponse)
+async def frontend_get_job(
+    job_id: str,
+    user_id: str = Depends(get_user_id_from_token),
+    db: Session = Depends(get_request_db)
+):
+    return await get_job_internal(job_id, user_id, db)
+
+# -------------------- INTERNAL LOGIC --------------------
 
-        meals_data = generate_weekly_meals(
+def warm_swap_pool(profile):
+    # Users usually swap right after a plan is shown
+    if not SWAP_POOL_ENABLED:
+        return
+    for meal_type in MEAL_TYPES:
+        swap_pool.warm(
+            meal_type,
             profile.fitness_goal.value,
             profile.dietary_preference.value,
-            profile.daily_calories
+            get_meal_calorie_target(meal_type, profile.daily_calories)
         )
 
-        meal_plan = MealPlan(
-            id=uuid.uuid4(),
-            user_id=uuid.UUID(user_id),
-            week_start=week_start
-        )
+async def load_meal_history(user_id, db):
+    # Only the week composer draws on previous meals
+    if MEAL_GENERATION_MODE != "compose":
+        return None
+    return await run_db(db, get_meal_history, user_id)
 
-        db.add(meal_plan)
-        db.flush()
-
-        meals = []
-        for m in meals_data:
-            meal = Meal(
-                id=uuid.uuid4(),
-                meal_plan_id=meal_plan.id,
-                user_id=uuid.UUID(user_id),
-                day=DayOfWeek[m["day"].upper()],
-                meal_type=MealType[m["meal_type"].upper()],
-                name=m["name"],
-                calories=m["calories"],
-                protein=m["protein"],
-                carbs=m["carbs"],
-                fats=m["fats"],
-                ingredients=m["ingredients"]
-            )
-            db.add(meal)
-            meals.append(MealResponse(**m, id=str(meal.id)))
+async def create_weekly_plan(user_id, week_start, db, on_meal=None):
+    profile = await get_user_profile(user_id)
+    warm_swap_pool(profile)
+    history = await load_meal_history(user_id, db)
 
-        db.commit()
+    meals_data = await generate_weekly_meals_async(
+        profile.fitness_goal.value,
+        profile.dietary_preference.value,
+        profile.daily_calories,
+        on_meal=on_meal,
+        history=history
+    )
 
-        return MealPlanResponse(
-            plan_id=str(meal_plan.id),
-            week_start=str(week_start),
-            meals=meals,
-            generated_at=meal_plan.generated_at
-        )
+    plan_id, generated_at, rows = await run_db(db, bulk_create_meal_plan, user_id, week_start, meals_data)
+    await commit_db(db)
+
+    meals = [
+        MealResponse(**m, id=str(row["id"]))
+        for m, row in zip(meals_data, rows)
+    ]
+
+    return MealPlanResponse(
+        plan_id=str(plan_id),
+        week_start=str(week_start),
+        meals=meals,
+        generated_at=generated_at
+    )
+
+# Streams, workers and shared generations open their own sessions; request
+# sessions close before a StreamingResponse body, a queued job or a
+# generation other requests are attached to has finished. Query them with run_db.
+job_session_factory = AsyncSessionLocal if DATABASE_ASYNC else SessionLocal
+
+async def generate_weekly_internal(request, user_id, response=None, idempotency_key=None):
+    """
+    Generate a weekly plan, at most one at a time per user. A duplicate
+    request for the same week attaches to the running generation, and a
+    repeated Idempotency-Key gets the stored plan back; both are marked with
+    an "Idempotent-Replayed: true" header.
+    """
+    week_start = get_monday(request.week_start)
+
+    async def generate():
+        db = job_session_factory()
+        try:
+            return await create_weekly_plan(user_id, week_start, db)
+        finally:
+            # Closing rolls back whatever was not committed
+            await close_db(db)
+
+    try:
+        plan, outcome = await generations.run(user_id, idempotency_key, str(week_start), generate)
+    except IdempotencyKeyReusedError as e:
+        raise HTTPException(status.HTTP_422_UNPROCESSABLE_ENTITY, str(e))
+    except GenerationInProgressError as e:
+        raise HTTPException(status.HTTP_409_CONFLICT, str(e))
+    except Exception as e:
+        raise HTTPException(500, str(e))
+
+    if outcome != "started" and response is not None:
+        response.headers["Idempotent-Replayed"] = "true"
+    return plan
+
+async def stream_weekly_internal(request, user_id):
+    """
+    Generate a weekly plan and stream each meal as an SSE "meal" event as
+    soon as it is saved. The plan row is committed up front and finished
+    meals are committed as they arrive, so a dropped connection keeps the
+    completed slots. Meals that finish while the previous ones are being
+    written go out in the next single insert. Generation keeps running after
+    a disconnect and persists the remaining slots.
+
+    Events: "plan" (plan_id, week_start, generated_at), one "meal" per slot
+    (MealResponse), then "done" (plan_id, meals) or "error" (message).
+    """
+    week_start = get_monday(request.week_start)
+    db = job_session_factory()
+    try:
+        profile = await get_user_profile(user_id)
+        warm_swap_pool(profile)
+        history = await load_meal_history(user_id, db)
+        plan_id, generated_at = await run_db(db, create_meal_plan, user_id, week_start)
+        await commit_db(db)
     except Exception as e:
-        db.rollback()
+        await close_db(db)
         raise HTTPException(500, str(e))
 
+    # Finished meals waiting to be saved, then saved meals waiting to be sent;
+    # None marks the end of each
+    pending = asyncio.Queue()
+    events = asyncio.Queue()
+
+    def on_meal(meal_data):
+        pending.put_nowait(meal_data)
+
+    def on_done(task):
+        if not task.cancelled() and task.exception():
+            print(f"Streamed generation for plan {plan_id} failed: {task.exception()}")
+        pending.put_nowait(None)
+
+    generation = asyncio.create_task(generate_weekly_meals_async(
+        profile.fitness_goal.value,
+        profile.dietary_preference.value,
+        profile.daily_calories,
+        on_meal=on_meal,
+        history=history
+    ))
+    generation.add_done_callback(on_done)
+
+    async def persist_meals():
+        # Returns why saving stopped early, if it did
+        try:
+            finished = False
+            while not finished:
+                batch = [await pending.get()]
+                while not pending.empty():
+                    batch.append(pending.get_nowait())
+                finished = batch[-1] is None
+                meals_data = [meal for meal in batch if meal is not None]
+                if not meals_data:
+                    continue
+                rows = await run_db(db, insert_plan_meals, plan_id, user_id, meals_data)
+                await commit_db(db)
+                for meal_data, row in zip(meals_data, rows):
+                    events.put_nowait(MealResponse(**meal_data, id=str(row["id"])))
+        except Exception as e:
+            print(f"Could not save streamed meals for plan {plan_id}: {e}")
+            generation.cancel()
+            return str(e)
+        finally:
+            await close_db(db)
+            events.put_nowait(None)
+
+    persister = asyncio.create_task(persist_meals())
+
+    async def event_stream():
+        yield format_sse("plan", {
+            "plan_id": str(plan_id),
+            "week_start": str(week_start),
+            "generated_at": generated_at
+        })
+
+        sent = 0
+        while True:
+            meal = await events.get()
+            if meal is None:
+                break
+            sent += 1
+            yield format_sse("meal", meal.model_dump())
+
+        await asyncio.wait([persister])
+        if persister.result():
+            error = persister.result()
+        elif generation.cancelled() or generation.exception():
+            error = "cancelled" if generation.cancelled() else str(generation.exception())
+        else:
+            yield format_sse("done", {"plan_id": str(plan_id), "meals": sent})
+            return
+        yield format_sse("error", {"plan_id": str(plan_id), "message": error, "meals": sent})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# -------------------- BACKGROUND JOBS --------------------
+
+async def run_generation_job(job_id):
+    db = job_session_factory()
+    progress_writer = None
+    try:
+        job = await run_db(db, get_generation_job, job_id)
+        if not job:
+            print(f"Generation job {job_id} not found")
+            return
+
+        job_uuid = job.id
+        user_id = str(job.user_id)
+        week_start = job.week_start
+        # A recovered job may be queued twice; only one worker may run it
+        if not await run_db(db, claim_generation_job, job_uuid, datetime.now(timezone.utc)):
+            print(f"Generation job {job_id} is no longer queued, skipping")
+            return
+
+        progress = []
+        progress_changed = asyncio.Event()
+
+        def on_meal(meal_data):
+            progress.append({
+                "day": meal_data["day"],
+                "meal_type": meal_data["meal_type"],
+                "name": meal_data["name"],
+                "generation_ms": meal_data.get("generation_ms")
+            })
+            progress_changed.set()
+
+        async def write_progress():
+            # Own session: the generation uses db meanwhile. Slots finishing
+            # during a write are reported together by the next one.
+            progress_db = job_session_factory()
+            try:
+                while True:
+                    await progress_changed.wait()
+                    progress_changed.clear()
+                    try:
+                        await run_db(
+                            progress_db, update_generation_job, job_uuid,
+                            progress=list(progress),
+                            completed_slots=len(progress)
+                        )
+                    except Exception as e:
+                        await rollback_db(progress_db)
+                        print(f"Could not save progress of generation job {job_id}: {e}")
+            finally:
+                await close_db(progress_db)
+
+        async def stop_progress_writer():
+            # The final update carries all progress; no write may land after it
+            progress_writer.cancel()
+            await asyncio.gather(progress_writer, return_exceptions=True)
+
+        progress_writer = asyncio.create_task(write_progress())
+
+        try:
+            # Queued jobs are background work: interactive calls and plans
+            # generated for a waiting client go first
+            with llm_priority(BATCH):
+                plan = await create_weekly_plan(user_id, week_start, db, on_meal=on_meal)
+        except Exception as e:
+            await rollback_db(db)
+            print(f"Generation job {job_id} failed: {e}")
+            await stop_progress_writer()
+            await run_db(
+                db, update_generation_job, job_uuid,
+                status=JobStatus.FAILED,
+                error=str(e),
+                progress=list(progress),
+                completed_slots=len(progress),
+                finished_at=datetime.now(timezone.utc)
+            )
+            return
+
+        await stop_progress_writer()
+        await run_db(
+            db, update_generation_job, job_uuid,
+            status=JobStatus.SUCCEEDED,
+            meal_plan_id=uuid.UUID(plan.plan_id),
+            progress=list(progress),
+            completed_slots=len(progress),
+            finished_at=datetime.now(timezone.utc)
+        )
+    finally:
+        if progress_writer:
+            progress_writer.cancel()
+        await close_db(db)
+
+async def recover_generation_jobs(on_start):
+    """
+    Fail jobs whose worker is gone and queue jobs nobody is serving. On
+    start every queued job is taken, since this replica's queue was lost;
+    later sweeps only take jobs queued longer than MEAL_JOB_STALE_SECONDS.
+    Running jobs are failed once they are that old, as another replica may
+    still be running younger ones.
+    """
+    now = datetime.now(timezone.utc)
+    stale_before = now - timedelta(seconds=MEAL_JOB_STALE_SECONDS)
+    db = job_session_factory()
+    try:
+        failed = await run_db(
+            db, fail_stale_generation_jobs, stale_before,
+            "Plan generation was interrupted, please try again"
+        )
+        queued = await run_db(db, list_queued_generation_jobs, now if on_start else stale_before)
+    finally:
+        await close_db(db)
+
+    requeued = 0
+    for job_id in queued:
+        try:
+            job_queue.enqueue(str(job_id))
+        except QueueFullError:
+            # The rest stay queued for the next sweep
+            break
+        requeued += 1
+    if failed or requeued:
+        print(f"Recovered generation jobs: {failed} failed, {requeued} queued again")
+
+job_queue = PlanJobQueue(run_generation_job, recover=recover_generation_jobs)
+
+def job_to_response(job: GenerationJob) -> JobResponse:
+    return JobResponse(
+        job_id=str(job.id),
+        status=job.status.value,
+        week_start=str(job.week_start),
+        total_slots=job.total_slots,
+        completed_slots=job.completed_slots,
+        progress=job.progress or [],
+        plan_id=str(job.meal_plan_id) if job.meal_plan_id else None,
+        error=job.error,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at
+    )
+
+async def enqueue_generation_internal(request, user_id, db):
+    week_start = get_monday(request.week_start)
+    job = await run_db(db, create_generation_job, user_id, week_start, len(get_weekly_slots()))
+
+    try:
+        job_queue.enqueue(str(job.id))
+    except QueueFullError as e:
+        await run_db(
+            db, update_generation_job, job.id,
+            status=JobStatus.FAILED,
+            error=str(e),
+            finished_at=datetime.now(timezone.utc)
+        )
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many plans are being generated, try again shortly",
+            headers={"Retry-After": "30"}
+        )
+
+    return JobAcceptedResponse(
+        job_id=str(job.id),
+        status=job.status.value,
+        status_url=f"/api/meal-planner/jobs/{job.id}"
+    )
+
+async def get_job_internal(job_id, user_id, db):
+    job = await run_db(db, get_generation_job, job_id)
+    if not job or str(job.user_id) != str(user_id):
+        raise HTTPException(404, "Job not found")
+    return job_to_response(job)
+
+def meal_to_response(m: Meal) -> MealResponse:
+    return MealResponse(
+        id=str(m.id),
+        day=m.day.value,
+        meal_type=m.meal_type.value,
+        name=m.name,
+        calories=m.calories,
+        protein=m.protein,
+        carbs=m.carbs,
+        fats=m.fats,
+        ingredients=m.ingredients
+    )
+
 async def get_weekly_internal(week_start, user_id, db):
     monday = get_monday(week_start)
-    plan = db.query(MealPlan).filter(
-        MealPlan.user_id == user_id,
-        MealPlan.week_start == monday
-    ).first()
+    week = await run_db(db, get_week_meals, user_id, monday)
 
-    if not plan:
+    if not week:
         raise HTTPException(404, "No meal plan")
 
-    meals = db.query(Meal).filter(Meal.meal_plan_id == plan.id).all()
+    plan_id, plan_week_start, generated_at, meals = week
     return MealPlanResponse(
-        plan_id=str(plan.id),
-        week_start=str(plan.week_start),
-        meals=[MealResponse(
-            id=str(m.id),
-            day=m.day.value,
-            meal_type=m.meal_type.value,
-            name=m.name,
-            calories=m.calories,
-            protein=m.protein,
-            carbs=m.carbs,
-            fats=m.fats,
-            ingredients=m.ingredients
-        ) for m in meals],
-        generated_at=plan.generated_at
+        plan_id=str(plan_id),
+        week_start=str(plan_week_start),
+        meals=[meal_to_response(m) for m in meals],
+        generated_at=generated_at
     )
 
 async def get_today_internal(user_id, db):
     today = date.today()
     monday = get_monday(today)
-    plan = db.query(MealPlan).filter(
-        MealPlan.user_id == user_id,
-        MealPlan.week_start == monday
-    ).first()
+    day = await run_db(db, get_day_meals, user_id, monday, DayOfWeek[day_name(today).upper()])
 
-    if not plan:
+    if not day:
         raise HTTPException(404, "No meal plan")
 
-    meals = db.query(Meal).filter(
-        Meal.meal_plan_id == plan.id,
-        Meal.day == DayOfWeek[day_name(today).upper()]
-    ).all()
-
+    meals, daily_totals = day
     if not meals:
         raise HTTPException(404, "No meals today")
 
     return DailyMealsResponse(
         date=str(today),
         day=day_name(today),
-        meals=[MealResponse(
-            id=str(m.id),
-            day=m.day.value,
-            meal_type=m.meal_type.value,
-            name=m.name,
-            calories=m.calories,
-            protein=m.protein,
-            carbs=m.carbs,
-            fats=m.fats,
-            ingredients=m.ingredients
-        ) for m in meals],
-        daily_totals={
-            "calories": sum(m.calories for m in meals),
-            "protein": sum(m.protein for m in meals),
-            "carbs": sum(m.carbs for m in meals),
-            "fats": sum(m.fats for m in meals)
-        }
+        meals=[meal_to_response(m) for m in meals],
+        daily_totals=daily_totals
     )
 
-async def swap_internal(meal_id, user_id, db):
-    meal = db.query(Meal).filter(Meal.id == meal_id).first()
+async def swap_internal(meal_id, user_id, db, strategy=None):
+    meal = await run_db(db, get_meal, meal_id)
     if not meal:
         raise HTTPException(404, "Meal not found")
 
     profile = await get_user_profile(user_id)
     target = get_meal_calorie_target(meal.meal_type.value, profile.daily_calories)
 
-    new_meal = generate_meal_with_ai(
-        meal.meal_type.value,
-        profile.fitness_goal.value,
-        profile.dietary_preference.value,
-        target
-    )
+    new_meal = None
+    if (strategy or MEAL_SWAP_STRATEGY) == "nearest":
+        history = await run_db(db, get_meal_history, user_id)
+        # Closest known meal by macros keeps the day's totals where they were
+        new_meal = find_nearest_swap(
+            meal.meal_type.value,
+            profile.dietary_preference.value,
+            {
+                "name": meal.name,
+                "calories": meal.calories,
+                "protein": meal.protein,
+                "carbs": meal.carbs,
+                "fats": meal.fats
+            },
+            history=history.get(meal.meal_type.value)
+        )
 
-    meal.name = new_meal["name"]
-    meal.calories = new_meal["calories"]
-    meal.protein = new_meal["protein"]
-    meal.carbs = new_meal["carbs"]
-    meal.fats = new_meal["fats"]
-    meal.ingredients = new_meal["ingredients"]
+    if not new_meal and SWAP_POOL_ENABLED:
+        new_meal = swap_pool.take(
+            meal.meal_type.value,
+            profile.fitness_goal.value,
+            profile.dietary_preference.value,
+            target,
+            exclude_names={meal.name}
+        )
 
-    db.commit()
-    db.refresh(meal)
+    if not new_meal:
+        # The user is waiting on this one: it goes ahead of plan generation
+        with llm_priority(INTERACTIVE):
+            new_meal = await generate_meal_with_ai_async(
+                meal.meal_type.value,
+                profile.fitness_goal.value,
+                profile.dietary_preference.value,
+                target
+            )
 
-    return MealResponse(
-        id=str(meal.id),
-        day=meal.day.value,
-        meal_type=meal.meal_type.value,
-        name=meal.name,
-        calories=meal.calories,
-        protein=meal.protein,
-        carbs=meal.carbs,
-        fats=meal.fats,
-        ingredients=meal.ingredients
-    )
+    meal = await run_db(db, replace_meal, meal, new_meal)
+
+    return meal_to_response(meal)
 
 @app.get("/")
 async def root():
@@ -0,0 +1,448 @@
+"""
+Two-tier cache for AI-generated meals.
+
+Meals are keyed by the normalized prompt inputs (meal_type, fitness_goal,
+dietary_preference and target_calories rounded to a bucket). Each key holds a
+small pool of variants so consecutive slots get different meals. The local
+tier is an in-process LRU; an optional Redis backend is shared across pods.
+Async callers use get_async/add_async, which reach the backend from a worker
+thread so a slow Redis never stalls the event loop.
+"""
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from metrics import counter, gauge
+from portion_scaler import scale_meal
+
+try:
+    import redis
+except ImportError:  # Optional dependency, only needed for the shared tier
+    redis = None
+
+load_dotenv()
+
+MEAL_CACHE_ENABLED = os.getenv("MEAL_CACHE_ENABLED", "true").lower() == "true"
+MEAL_CACHE_MAX_KEYS = int(os.getenv("MEAL_CACHE_MAX_KEYS", "1024"))
+MEAL_CACHE_TTL_SECONDS = int(os.getenv("MEAL_CACHE_TTL_SECONDS", str(24 * 60 * 60)))
+MEAL_CACHE_BUCKET_WIDTH = int(os.getenv("MEAL_CACHE_BUCKET_WIDTH", "100"))
+# A key only serves hits once it holds this many different meals
+MEAL_CACHE_VARIANTS = int(os.getenv("MEAL_CACHE_VARIANTS", "3"))
+# How a variant is picked on a hit: round_robin, random or first
+MEAL_CACHE_VARIETY = os.getenv("MEAL_CACHE_VARIETY", "round_robin")
+MEAL_CACHE_REDIS_URL = os.getenv("MEAL_CACHE_REDIS_URL")
+# On a miss, rescale portions of cached meals from other calorie buckets
+MEAL_PORTION_SCALING = os.getenv("MEAL_PORTION_SCALING", "true").lower() == "true"
+
+cache_hits = counter("meal_cache_hits_total", "Meal cache hits by tier")
+cache_misses = counter("meal_cache_misses_total", "Meal cache misses")
+cache_evictions = counter("meal_cache_evictions_total", "Meal cache keys evicted by reason")
+cache_keys = gauge("meal_cache_keys", "Keys held in the local meal cache")
+
+
+def get_calorie_bucket(target_calories: int, bucket_width: int = MEAL_CACHE_BUCKET_WIDTH) -> int:
+    """
+    Round a calorie target to the nearest bucket.
+
+    Args:
+        target_calories: Target calories for the meal
+        bucket_width: Width of each bucket in calories
+
+    Returns:
+        Bucket midpoint in calories
+    """
+    return int(round(target_calories / bucket_width) * bucket_width)
+
+
+def make_cache_key(
+    meal_type: str,
+    fitness_goal: str,
+    dietary_preference: str,
+    target_calories: int,
+    bucket_width: int = MEAL_CACHE_BUCKET_WIDTH
+) -> str:
+    """
+    Build the cache key from normalized prompt inputs.
+
+    Args:
+        meal_type: Type of meal (breakfast, lunch, dinner)
+        fitness_goal: User's fitness goal
+        dietary_preference: User's dietary preference
+        target_calories: Target calories for the meal
+        bucket_width: Width of each calorie bucket
+
+    Returns:
+        Cache key string
+    """
+    return ":".join([
+        "meal",
+        meal_type.strip().lower(),
+        fitness_goal.strip().lower(),
+        (dietary_preference or "none").strip().lower(),
+        str(get_calorie_bucket(target_calories, bucket_width))
+    ])
+
+
+def copy_meal(meal_data: Dict) -> Dict:
+    """Copy a meal so callers can mutate it without touching the cache."""
+    meal = dict(meal_data)
+    meal["ingredients"] = list(meal_data.get("ingredients", []))
+    return meal
+
+
+class RedisMealCacheBackend:
+    """Shared cache tier storing each key's variant pool as a Redis list."""
+
+    def __init__(self, url: str):
+        self.client = redis.Redis.from_url(url, socket_timeout=0.2, socket_connect_timeout=0.2)
+
+    def get_pool(self, key: str) -> List[Dict]:
+        return [json.loads(item) for item in self.client.lrange(key, 0, -1)]
+
+    def add(self, key: str, meal_data: Dict, ttl_seconds: int, max_variants: int):
+        pipe = self.client.pipeline()
+        pipe.lpush(key, json.dumps(meal_data))
+        pipe.ltrim(key, 0, max_variants - 1)
+        pipe.expire(key, ttl_seconds)
+        pipe.execute()
+
+    def clear(self):
+        for key in self.client.scan_iter("meal:*"):
+            self.client.delete(key)
+
+
+class MealCache:
+    """
+    In-process LRU of meal variant pools with an optional shared backend.
+    Thread-safe, so the backend can be reached from worker threads.
+    """
+
+    def __init__(
+        self,
+        max_keys: int = MEAL_CACHE_MAX_KEYS,
+        ttl_seconds: int = MEAL_CACHE_TTL_SECONDS,
+        bucket_width: int = MEAL_CACHE_BUCKET_WIDTH,
+        variants: int = MEAL_CACHE_VARIANTS,
+        variety: str = MEAL_CACHE_VARIETY,
+        backend=None,
+        portion_scaling: bool = MEAL_PORTION_SCALING
+    ):
+        self.max_keys = max_keys
+        self.ttl_seconds = ttl_seconds
+        self.bucket_width = bucket_width
+        self.variants = max(1, variants)
+        self.variety = variety
+        self.backend = backend
+        self.portion_scaling = portion_scaling
+        # key -> {"meals": [(expires_at, meal)], "cursor": int}
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        # key -> {"cursor": int} for scaled hits, whose key has no pool of its own
+        self._scaled_cursors: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        cache_keys.set_function(lambda: len(self._entries))
+
+    def key(self, meal_type: str, fitness_goal: str, dietary_preference: str, target_calories: int) -> str:
+        return make_cache_key(meal_type, fitness_goal, dietary_preference, target_calories, self.bucket_width)
+
+    def _live_meals(self, key: str, now: float) -> List[Dict]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return []
+
+        live = [(expires_at, meal) for expires_at, meal in entry["meals"] if expires_at > now]
+        if len(live) != len(entry["meals"]):
+            entry["meals"] = live
+        if not live:
+            del self._entries[key]
+            cache_evictions.inc(reason="ttl")
+        return [meal for _, meal in live]
+
+    def _pick(self, meals: List[Dict], entry: Dict) -> Dict:
+        if self.variety == "random":
+            return random.choice(meals)
+        if self.variety == "first":
+            return meals[0]
+
+        meal = meals[entry["cursor"] % len(meals)]
+        entry["cursor"] += 1
+        return meal
+
+    def _store(self, key: str, meal_data: Dict, now: float):
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = {"meals": [], "cursor": 0}
+            self._entries[key] = entry
+
+        names = {meal["name"] for _, meal in entry["meals"]}
+        if meal_data["name"] not in names:
+            entry["meals"].append((now + self.ttl_seconds, copy_meal(meal_data)))
+            entry["meals"] = entry["meals"][-self.variants:]
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_keys:
+            self._entries.popitem(last=False)
+            cache_evictions.inc(reason="size")
+
+    def get(
+        self,
+        meal_type: str,
+        fitness_goal: str,
+        dietary_preference: str,
+        target_calories: int
+    ) -> Optional[Dict]:
+        """
+        Look up a cached meal for the given prompt inputs.
+        A key only counts as a hit once its variant pool is full.
+
+        Args:
+            meal_type: Type of meal (breakfast, lunch, dinner)
+            fitness_goal: User's fitness goal
+            dietary_preference: User's dietary preference
+            target_calories: Target calories for the meal
+
+        Returns:
+            Copy of a cached meal, or None on a miss
+        """
+        key = self.key(meal_type, fitness_goal, dietary_preference, target_calories)
+        now = time.time()
+
+        meal = self._get_local(key, now)
+        if meal is None and self.backend is not None:
+            meal = self._get_shared(key, self._fetch_shared(key), now)
+        if meal is None:
+            meal = self._get_scaled_or_miss(meal_type, fitness_goal, dietary_preference, target_calories)
+        return meal
+
+    async def get_async(
+        self,
+        meal_type: str,
+        fitness_goal: str,
+        dietary_preference: str,
+        target_calories: int
+    ) -> Optional[Dict]:
+        """
+        Like get, but the shared backend is queried from a worker thread so
+        the event loop keeps running during the round-trip.
+
+        Args:
+            meal_type: Type of meal (breakfast, lunch, dinner)
+            fitness_goal: User's fitness goal
+            dietary_preference: User's dietary preference
+            target_calories: Target calories for the meal
+
+        Returns:
+            Copy of a cached meal, or None on a miss
+        """
+        key = self.key(meal_type, fitness_goal, dietary_preference, target_calories)
+        now = time.time()
+
+        meal = self._get_local(key, now)
+        if meal is None and self.backend is not None:
+            meal = self._get_shared(key, await asyncio.to_thread(self._fetch_shared, key), now)
+        if meal is None:
+            meal = self._get_scaled_or_miss(meal_type, fitness_goal, dietary_preference, target_calories)
+        return meal
+
+    def _get_local(self, key: str, now: float) -> Optional[Dict]:
+        with self._lock:
+            meals = self._live_meals(key, now)
+            if len(meals) < self.variants:
+                return None
+            self._entries.move_to_end(key)
+            cache_hits.inc(tier="local")
+            return copy_meal(self._pick(meals, self._entries[key]))
+
+    def _fetch_shared(self, key: str) -> List[Dict]:
+        try:
+            return self.backend.get_pool(key)
+        except Exception as e:
+            print(f"Shared meal cache unavailable: {e}")
+            return []
+
+    def _get_shared(self, key: str, shared: List[Dict], now: float) -> Optional[Dict]:
+        if len(shared) < self.variants:
+            return None
+        with self._lock:
+            for meal in shared:
+                self._store(key, meal, now)
+            meals = self._live_meals(key, now)
+            cache_hits.inc(tier="shared")
+            return copy_meal(self._pick(meals, self._entries[key]))
+
+    def _get_scaled_or_miss(
+        self,
+        meal_type: str,
+        fitness_goal: str,
+        dietary_preference: str,
+        target_calories: int
+    ) -> Optional[Dict]:
+        if self.portion_scaling:
+            scaled = self._get_scaled(meal_type, fitness_goal, dietary_preference, target_calories)
+            if scaled:
+                cache_hits.inc(tier="scaled")
+                return scaled
+
+        cache_misses.inc()
+        return None
+
+    def _get_scaled(
+        self,
+        meal_type: str,
+        fitness_goal: str,
+        dietary_preference: str,
+        target_calories: int
+    ) -> Optional[Dict]:
+        # Same variety rule as a regular hit: enough different meals must be scalable
+        scaled = [
+            meal for meal in (
+                scale_meal(candidate, target_calories)
+                for candidate in self.candidates(meal_type, fitness_goal, dietary_preference)
+            )
+            if meal is not None
+        ]
+        if len(scaled) < self.variants:
+            return None
+
+        # Stable order, so round_robin and first behave as they do on a pool
+        scaled.sort(key=lambda meal: meal["name"])
+        key = self.key(meal_type, fitness_goal, dietary_preference, target_calories)
+        with self._lock:
+            entry = self._scaled_cursors.setdefault(key, {"cursor": 0})
+            self._scaled_cursors.move_to_end(key)
+            while len(self._scaled_cursors) > self.max_keys:
+                self._scaled_cursors.popitem(last=False)
+            return self._pick(scaled, entry)
+
+    def add(
+        self,
+        meal_type: str,
+        fitness_goal: str,
+        dietary_preference: str,
+        target_calories: int,
+        meal_data: Dict
+    ):
+        """
+        Add a freshly generated meal to the variant pool for its key.
+
+        Args:
+            meal_type: Type of meal (breakfast, lunch, dinner)
+            fitness_goal: User's fitness goal
+            dietary_preference: User's dietary preference
+            target_calories: Target calories the meal was generated for
+            meal_data: Generated meal data
+        """
+        key, meal = self._add_local(meal_type, fitness_goal, dietary_preference, target_calories, meal_data)
+        if self.backend is not None:
+            self._write_shared(key, meal)
+
+    async def add_async(
+        self,
+        meal_type: str,
+        fitness_goal: str,
+        dietary_preference: str,
+        target_calories: int,
+        meal_data: Dict
+    ):
+        """
+        Like add, but the shared backend is written from a worker thread.
+
+        Args:
+            meal_type: Type of meal (breakfast, lunch, dinner)
+            fitness_goal: User's fitness goal
+            dietary_preference: User's dietary preference
+            target_calories: Target calories the meal was generated for
+            meal_data: Generated meal data
+        """
+        key, meal = self._add_local(meal_type, fitness_goal, dietary_preference, target_calories, meal_data)
+        if self.backend is not None:
+            await asyncio.to_thread(self._write_shared, key, meal)
+
+    def _add_local(
+        self,
+        meal_type: str,
+        fitness_goal: str,
+        dietary_preference: str,
+        target_calories: int,
+        meal_data: Dict
+    ):
+        key = self.key(meal_type, fitness_goal, dietary_preference, target_calories)
+        meal = {k: meal_data[k] for k in ("name", "calories", "protein", "carbs", "fats", "ingredients")}
+
+        with self._lock:
+            self._store(key, meal, time.time())
+        return key, meal
+
+    def _write_shared(self, key: str, meal: Dict):
+        try:
+            self.backend.add(key, meal, self.ttl_seconds, self.variants)
+        except Exception as e:
+            print(f"Failed to write shared meal cache: {e}")
+
+    def candidates(self, meal_type: str, fitness_goal: str, dietary_preference: str) -> List[Dict]:
+        """
+        List live local-tier meals for a meal type, goal and preference
+        across all calorie buckets. Does not count as a hit or miss.
+
+        Args:
+            meal_type: Type of meal (breakfast, lunch, dinner)
+            fitness_goal: User's fitness goal
+            dietary_preference: User's dietary preference
+
+        Returns:
+            Copies of the cached meals
+        """
+        prefix = make_cache_key(meal_type, fitness_goal, dietary_preference, 0).rsplit(":", 1)[0] + ":"
+        now = time.time()
+
+        with self._lock:
+            keys = [key for key in self._entries if key.startswith(prefix)]
+            return [copy_meal(meal) for key in keys for meal in self._live_meals(key, now)]
+
+    def clear(self):
+        """Drop every cached meal from the local tier."""
+        with self._lock:
+            self._entries.clear()
+            self._scaled_cursors.clear()
+
+    def get_stats(self) -> Dict:
+        """
+        Get cache counters for tuning bucket width and variant count.
+
+        Returns:
+            Dictionary with hits, misses, hit rate and current size
+        """
+        hits = cache_hits.get(tier="local") + cache_hits.get(tier="shared") + cache_hits.get(tier="scaled")
+        misses = cache_misses.get()
+        total = hits + misses
+        return {
+            "enabled": MEAL_CACHE_ENABLED,
+            "keys": len(self._entries),
+            "hits": int(hits),
+            "misses": int(misses),
+            "hit_rate": round(hits / total, 3) if total else 0.0,
+            "scaled_hits": int(cache_hits.get(tier="scaled")),
+            "bucket_width": self.bucket_width,
+            "variants": self.variants,
+            "variety": self.variety,
+            "shared_backend": self.backend is not None
+        }
+
+
+def create_backend():
+    """Create the shared backend if configured and the redis package is installed."""
+    if not MEAL_CACHE_REDIS_URL:
+        return None
+    if redis is None:
+        print("MEAL_CACHE_REDIS_URL is set but redis is not installed, using local cache only")
+        return None
+    return RedisMealCacheBackend(MEAL_CACHE_REDIS_URL)
+
+
+meal_cache = MealCache(backend=create_backend())
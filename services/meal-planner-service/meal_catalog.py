@@ -0,0 +1,402 @@
+"""
+Offline pre-generated meal catalog with indexed lookup.
+
+The catalog is a gzip-compressed JSON file of meal rows built ahead of time by
+the CLI in this module. At runtime it is loaded once and indexed by
+(meal_type, fitness_goal, dietary_preference) with meals sorted by calories,
+so a slot can be filled with a binary search instead of an LLM call.
+
+Usage:
+    python meal_catalog.py build --per-bucket 5
+    python meal_catalog.py refresh --per-bucket 2 --max-age-days 30
+    python meal_catalog.py stats
+"""
+import argparse
+import gzip
+import json
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+
+from meal_cache import copy_meal
+
+load_dotenv()
+
+MEAL_CATALOG_PATH = os.getenv(
+    "MEAL_CATALOG_PATH",
+    str(Path(__file__).parent / "data" / "meal_catalog.json.gz")
+)
+# Accept catalog meals within this fraction of the slot's calorie target
+MEAL_CATALOG_TOLERANCE = float(os.getenv("MEAL_CATALOG_TOLERANCE", "0.1"))
+
+CATALOG_VERSION = 1
+# Column order of each meal row in the catalog file
+CATALOG_FIELDS = [
+    "name", "meal_type", "fitness_goal", "dietary_preference",
+    "calories", "protein", "carbs", "fats", "ingredients", "created_at"
+]
+
+MEAL_TYPES = ["breakfast", "lunch", "dinner"]
+FITNESS_GOALS = ["cut", "bulk", "maintain"]
+DIETARY_PREFERENCES = ["none", "halal", "vegan", "vegetarian"]
+
+# Meals tagged with any of these preferences satisfy the requested preference
+COMPATIBLE_PREFERENCES = {
+    "none": ["none", "halal", "vegetarian", "vegan"],
+    "halal": ["halal", "vegetarian", "vegan"],
+    "vegetarian": ["vegetarian", "vegan"],
+    "vegan": ["vegan"]
+}
+
+# Calorie targets the build CLI generates meals for, per meal type
+CATALOG_CALORIE_BUCKETS = {
+    "breakfast": list(range(300, 901, 100)),
+    "lunch": list(range(400, 1201, 100)),
+    "dinner": list(range(400, 1401, 100))
+}
+
+
+class MealCatalog:
+    """In-memory catalog of meals indexed for constant-time slot lookups."""
+
+    def __init__(self, meals: Optional[Iterable[Dict]] = None):
+        self.meals: List[Dict] = []
+        # (meal_type, fitness_goal, dietary_preference) -> (sorted calories, meals)
+        self._index: Dict[Tuple[str, str, str], Tuple[List[int], List[Dict]]] = {}
+        for meal in meals or []:
+            self.meals.append(meal)
+        self.build_index()
+
+    def __len__(self) -> int:
+        return len(self.meals)
+
+    def build_index(self):
+        """Rebuild the lookup index from the current meal list."""
+        groups: Dict[Tuple[str, str, str], List[Dict]] = {}
+        for meal in self.meals:
+            key = (meal["meal_type"], meal["fitness_goal"], meal["dietary_preference"])
+            groups.setdefault(key, []).append(meal)
+
+        self._index = {}
+        for key, meals in groups.items():
+            meals.sort(key=lambda m: m["calories"])
+            self._index[key] = ([m["calories"] for m in meals], meals)
+
+    def add_meals(self, meals: Iterable[Dict]):
+        """Add meals, skipping names already present for the same key."""
+        seen = {
+            (m["meal_type"], m["fitness_goal"], m["dietary_preference"], m["name"].lower())
+            for m in self.meals
+        }
+        for meal in meals:
+            key = (meal["meal_type"], meal["fitness_goal"], meal["dietary_preference"], meal["name"].lower())
+            if key not in seen:
+                seen.add(key)
+                self.meals.append(meal)
+        self.build_index()
+
+    def find(
+        self,
+        meal_type: str,
+        fitness_goal: str,
+        dietary_preference: str,
+        target_calories: int,
+        tolerance: float = MEAL_CATALOG_TOLERANCE,
+        exclude_names: Optional[Set[str]] = None
+    ) -> Optional[Dict]:
+        """
+        Find the catalog meal closest to a calorie target.
+
+        Args:
+            meal_type: Type of meal (breakfast, lunch, dinner)
+            fitness_goal: User's fitness goal
+            dietary_preference: User's dietary preference
+            target_calories: Target calories for the meal
+            tolerance: Accepted deviation as a fraction of target_calories
+            exclude_names: Meal names already used, to keep variety
+
+        Returns:
+            Copy of the closest matching meal, or None if nothing is in range
+        """
+        margin = int(target_calories * tolerance)
+        best = None
+        best_distance = None
+
+        for preference in COMPATIBLE_PREFERENCES.get(dietary_preference, [dietary_preference]):
+            entry = self._index.get((meal_type, fitness_goal, preference))
+            if entry is None:
+                continue
+
+            calories, meals = entry
+            lo = bisect_left(calories, target_calories - margin)
+            hi = bisect_right(calories, target_calories + margin)
+            for meal in meals[lo:hi]:
+                if exclude_names and meal["name"] in exclude_names:
+                    continue
+                distance = abs(meal["calories"] - target_calories)
+                if best_distance is None or distance < best_distance:
+                    best, best_distance = meal, distance
+
+        if best is None:
+            return None
+
+        meal = copy_meal(best)
+        return {k: meal[k] for k in ("name", "calories", "protein", "carbs", "fats", "ingredients")}
+
+    def candidates(
+        self,
+        meal_type: str,
+        fitness_goal: str,
+        dietary_preference: str,
+        target_calories: int,
+        tolerance: float = MEAL_CATALOG_TOLERANCE
+    ) -> List[Dict]:
+        """
+        List every catalog meal within the calorie tolerance of a target.
+
+        Args:
+            meal_type: Type of meal (breakfast, lunch, dinner)
+            fitness_goal: User's fitness goal
+            dietary_preference: User's dietary preference
+            target_calories: Target calories for the meal
+            tolerance: Accepted deviation as a fraction of target_calories
+
+        Returns:
+            Copies of the matching meals
+        """
+        margin = int(target_calories * tolerance)
+        found = []
+
+        for preference in COMPATIBLE_PREFERENCES.get(dietary_preference, [dietary_preference]):
+            entry = self._index.get((meal_type, fitness_goal, preference))
+            if entry is None:
+                continue
+
+            calories, meals = entry
+            lo = bisect_left(calories, target_calories - margin)
+            hi = bisect_right(calories, target_calories + margin)
+            for meal in meals[lo:hi]:
+                meal = copy_meal(meal)
+                found.append({k: meal[k] for k in ("name", "calories", "protein", "carbs", "fats", "ingredients")})
+
+        return found
+
+    def get_stats(self) -> Dict:
+        """
+        Get meal counts per index key.
+
+        Returns:
+            Dictionary with total meals and counts per meal_type/goal/preference
+        """
+        return {
+            "meals": len(self.meals),
+            "keys": {
+                "/".join(key): len(entry[1])
+                for key, entry in sorted(self._index.items())
+            }
+        }
+
+    def save(self, path: str = MEAL_CATALOG_PATH):
+        """
+        Write the catalog as gzip-compressed JSON rows.
+
+        Args:
+            path: Destination file path
+        """
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        payload = {
+            "version": CATALOG_VERSION,
+            "fields": CATALOG_FIELDS,
+            "rows": [[meal.get(field) for field in CATALOG_FIELDS] for meal in self.meals]
+        }
+        tmp_path = f"{path}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(payload, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str = MEAL_CATALOG_PATH) -> "MealCatalog":
+        """
+        Load a catalog file. A missing file gives an empty catalog.
+
+        Args:
+            path: Catalog file path
+
+        Returns:
+            Indexed MealCatalog
+        """
+        if not os.path.exists(path):
+            print(f"Meal catalog not found at {path}, starting empty")
+            return cls()
+
+        start = time.perf_counter()
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            payload = json.load(f)
+
+        fields = payload.get("fields", CATALOG_FIELDS)
+        catalog = cls(dict(zip(fields, row)) for row in payload.get("rows", []))
+        print(f"Loaded {len(catalog)} catalog meals in {(time.perf_counter() - start) * 1000:.1f} ms")
+        return catalog
+
+
+_catalog: Optional[MealCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog() -> MealCatalog:
+    """
+    Get the process-wide catalog, loading it on first use.
+
+    Returns:
+        Shared MealCatalog instance
+    """
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = MealCatalog.load()
+    return _catalog
+
+
+def set_catalog(catalog: Optional[MealCatalog]):
+    """Replace the process-wide catalog (None reloads it on next use)."""
+    global _catalog
+    _catalog = catalog
+
+
+# -------------------- OFFLINE BUILD CLI --------------------
+
+def generate_catalog_meal(
+    meal_type: str,
+    fitness_goal: str,
+    dietary_preference: str,
+    target_calories: int
+) -> Optional[Dict]:
+    """
+    Generate one catalog meal with OpenAI. Unlike generate_meal_with_ai_async
+    this never returns a fallback meal, so failures are simply skipped.
+
+    Args:
+        meal_type: Type of meal (breakfast, lunch, dinner)
+        fitness_goal: Fitness goal the meal is for
+        dietary_preference: Dietary preference the meal satisfies
+        target_calories: Target calories for the meal
+
+    Returns:
+        Catalog meal row or None if generation failed
+    """
+    from llm_scheduler import BATCH, estimate_tokens
+    from meal_generator import (
+        client,
+        create_chat_request,
+        create_meal_prompt,
+        openai_scheduler,
+        parse_ai_meal_response
+    )
+
+    try:
+        prompt = create_meal_prompt(meal_type, fitness_goal, dietary_preference, target_calories)
+        openai_scheduler.acquire(BATCH, tokens=estimate_tokens(prompt, 500))
+        response = client.chat.completions.create(
+            **create_chat_request(prompt, temperature=1.0, max_tokens=500)
+        )
+        meal_data = parse_ai_meal_response(response.choices[0].message.content)
+    except Exception as e:
+        print(f"Failed to generate catalog meal: {e}")
+        return None
+
+    if not meal_data:
+        return None
+
+    return {
+        "name": str(meal_data["name"]),
+        "meal_type": meal_type,
+        "fitness_goal": fitness_goal,
+        "dietary_preference": dietary_preference,
+        "calories": int(meal_data["calories"]),
+        "protein": float(meal_data["protein"]),
+        "carbs": float(meal_data["carbs"]),
+        "fats": float(meal_data["fats"]),
+        "ingredients": [str(i) for i in meal_data["ingredients"]],
+        "created_at": int(time.time())
+    }
+
+
+def build_catalog_meals(per_bucket: int, concurrency: int) -> List[Dict]:
+    """
+    Generate meals for every meal type, goal, preference and calorie bucket.
+
+    Args:
+        per_bucket: Meals to generate per combination
+        concurrency: Parallel OpenAI requests
+
+    Returns:
+        List of generated catalog meal rows
+    """
+    jobs = [
+        (meal_type, goal, preference, calories)
+        for meal_type in MEAL_TYPES
+        for goal in FITNESS_GOALS
+        for preference in DIETARY_PREFERENCES
+        for calories in CATALOG_CALORIE_BUCKETS[meal_type]
+        for _ in range(per_bucket)
+    ]
+    print(f"Generating {len(jobs)} catalog meals with concurrency {concurrency}...")
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(lambda job: generate_catalog_meal(*job), jobs))
+
+    meals = [meal for meal in results if meal]
+    print(f"Generated {len(meals)}/{len(jobs)} catalog meals")
+    return meals
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Build and maintain the offline meal catalog")
+    parser.add_argument("--path", default=MEAL_CATALOG_PATH, help="Catalog file path")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build = subparsers.add_parser("build", help="Generate a new catalog from scratch")
+    build.add_argument("--per-bucket", type=int, default=5)
+    build.add_argument("--concurrency", type=int, default=8)
+
+    refresh = subparsers.add_parser("refresh", help="Add new meals and drop old ones")
+    refresh.add_argument("--per-bucket", type=int, default=2)
+    refresh.add_argument("--concurrency", type=int, default=8)
+    refresh.add_argument("--max-age-days", type=int, default=None)
+
+    subparsers.add_parser("stats", help="Print catalog statistics")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "stats":
+        print(json.dumps(MealCatalog.load(args.path).get_stats(), indent=2))
+        return
+
+    from meal_generator import client
+    if not client:
+        raise SystemExit("OPENAI_API_KEY is required to build the meal catalog")
+
+    if args.command == "build":
+        catalog = MealCatalog()
+    else:
+        catalog = MealCatalog.load(args.path)
+        if args.max_age_days is not None:
+            cutoff = time.time() - args.max_age_days * 24 * 60 * 60
+            kept = [m for m in catalog.meals if (m.get("created_at") or 0) >= cutoff]
+            print(f"Dropping {len(catalog) - len(kept)} meals older than {args.max_age_days} days")
+            catalog = MealCatalog(kept)
+
+    catalog.add_meals(build_catalog_meals(args.per_bucket, args.concurrency))
+    catalog.save(args.path)
+    print(f"Saved {len(catalog)} meals to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
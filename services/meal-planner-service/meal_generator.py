@@ -1,18 +1,69 @@
 """
 AI-powered meal generation using OpenAI API.
 """
-from openai import OpenAI, OpenAIError
+from openai import OpenAI, AsyncOpenAI, OpenAIError
+import asyncio
 import os
 import json
-from typing import Dict, List, Optional
+import time
+from typing import Callable, Dict, List, Optional, Tuple
 from dotenv import load_dotenv
 
+from circuit_breaker import get_breaker
+from llm_scheduler import BATCH, LLMSchedulerError, estimate_tokens, get_scheduler, llm_priority
+from meal_cache import meal_cache, copy_meal, make_cache_key, MEAL_CACHE_ENABLED, MEAL_PORTION_SCALING
+from meal_catalog import get_catalog
+from meal_synthesizer import synthesize_meal
+from portion_scaler import scale_meal
+from singleflight import SingleFlight
+
 load_dotenv()
 
 # Initialize OpenAI client
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 client = OpenAI(api_key=OPENAI_API_KEY) if OPENAI_API_KEY else None
 
+# Async client used by the request handlers so generation never blocks the event loop
+async_client = AsyncOpenAI(api_key=OPENAI_API_KEY) if OPENAI_API_KEY else None
+
+# Upper bound for a single OpenAI call on the async path, in seconds
+OPENAI_TIMEOUT_SECONDS = float(os.getenv("OPENAI_TIMEOUT_SECONDS", "20"))
+
+# Catalog meals this far from a slot's target are rescaled to fit when nothing closer exists
+MEAL_CATALOG_SCALE_TOLERANCE = float(os.getenv("MEAL_CATALOG_SCALE_TOLERANCE", "0.35"))
+
+# Concurrent requests for the same prompt share one OpenAI call
+MEAL_SINGLE_FLIGHT_ENABLED = os.getenv("MEAL_SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+
+# Maximum number of meal slots generated in parallel for a weekly plan
+MEAL_GENERATION_CONCURRENCY = int(os.getenv("MEAL_GENERATION_CONCURRENCY", "7"))
+
+# How weekly plans are generated: "parallel" (one call per slot), "batch" (one call per week)
+# "catalog" (pre-generated catalog first, LLM only for slots the catalog cannot fill)
+# "local" (local macro synthesizer only, no LLM calls) or "compose" (assemble the week
+# from catalog, cache and history meals, falling back to "catalog")
+MEAL_GENERATION_MODE = os.getenv("MEAL_GENERATION_MODE", "parallel")
+
+meal_flights = SingleFlight("meal_generation")
+
+# Shared by every OpenAI call in this process; while open, callers fall back at once
+openai_breaker = get_breaker("openai")
+# Rate limits and priority order for every OpenAI call in this process
+openai_scheduler = get_scheduler("openai")
+
+
+async def warm_up():
+    """
+    Open the async client's connection to OpenAI during startup warm-up, so
+    the first generated plan does not pay for the TLS handshake. Listing
+    models uses no tokens.
+    """
+    if async_client is not None:
+        await async_client.models.list()
+
+DAYS_OF_WEEK = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+MEAL_TYPES = ["breakfast", "lunch", "dinner"]
+
 # Fallback meals for when AI is unavailable
 FALLBACK_MEALS = {
     "breakfast": {
@@ -239,6 +290,55 @@ Do not include any markdown formatting, explanations, or additional text. Return
     return prompt
 
 
+def strip_markdown_fences(response_text: str) -> str:
+    """
+    Remove markdown code fences the model sometimes wraps JSON in.
+    
+    Args:
+        response_text: Raw response from OpenAI
+    
+    Returns:
+        Response text without surrounding code fences
+    """
+    cleaned = response_text.strip()
+    if cleaned.startswith("```json"):
+        cleaned = cleaned[7:]  # Remove ```json
+    if cleaned.startswith("```"):
+        cleaned = cleaned[3:]  # Remove ```
+    if cleaned.endswith("```"):
+        cleaned = cleaned[:-3]  # Remove trailing ```
+    
+    return cleaned.strip()
+
+
+def validate_meal_data(meal_data) -> bool:
+    """
+    Check that parsed meal data has every required field with usable types.
+    
+    Args:
+        meal_data: Parsed meal object from an AI response
+    
+    Returns:
+        True if the meal can be used, False otherwise
+    """
+    if not isinstance(meal_data, dict):
+        print(f"Meal is not a JSON object: {meal_data}")
+        return False
+    
+    # Validate required fields
+    required_fields = ["name", "calories", "protein", "carbs", "fats", "ingredients"]
+    if not all(field in meal_data for field in required_fields):
+        print(f"Missing required fields in AI response: {meal_data}")
+        return False
+    
+    # Validate types
+    if not isinstance(meal_data["ingredients"], list):
+        print(f"Ingredients is not a list: {meal_data['ingredients']}")
+        return False
+    
+    return True
+
+
 def parse_ai_meal_response(response_text: str) -> Optional[Dict]:
     """
     Parse OpenAI response and extract meal data.
@@ -251,28 +351,12 @@ def parse_ai_meal_response(response_text: str) -> Optional[Dict]:
     """
     try:
         # Clean up the response - remove markdown code blocks if present
-        cleaned = response_text.strip()
-        if cleaned.startswith("```json"):
-            cleaned = cleaned[7:]  # Remove ```json
-        if cleaned.startswith("```"):
-            cleaned = cleaned[3:]  # Remove ```
-        if cleaned.endswith("```"):
-            cleaned = cleaned[:-3]  # Remove trailing ```
-        
-        cleaned = cleaned.strip()
+        cleaned = strip_markdown_fences(response_text)
         
         # Parse JSON
         meal_data = json.loads(cleaned)
         
-        # Validate required fields
-        required_fields = ["name", "calories", "protein", "carbs", "fats", "ingredients"]
-        if not all(field in meal_data for field in required_fields):
-            print(f"Missing required fields in AI response: {meal_data}")
-            return None
-        
-        # Validate types
-        if not isinstance(meal_data["ingredients"], list):
-            print(f"Ingredients is not a list: {meal_data['ingredients']}")
+        if not validate_meal_data(meal_data):
             return None
         
         return meal_data
@@ -286,69 +370,517 @@ def parse_ai_meal_response(response_text: str) -> Optional[Dict]:
         return None
 
 
-def generate_meal_with_ai(
+def create_weekly_meals_prompt(
+    fitness_goal: str,
+    dietary_preference: str,
+    daily_calories: int
+) -> str:
+    """
+    Create a single prompt asking OpenAI for all 21 meals of a week.
+    
+    Args:
+        fitness_goal: User's fitness goal (cut, bulk, maintain)
+        dietary_preference: User's dietary preference
+        daily_calories: User's daily calorie target
+    
+    Returns:
+        Formatted prompt string
+    """
+    dietary_constraint = ""
+    if dietary_preference != "none":
+        dietary_constraint = f"Every meal must be {dietary_preference}. "
+    
+    goal_description = {
+        "cut": "designed for weight loss with high protein and lower carbs",
+        "bulk": "designed for muscle gain with high protein and higher calories",
+        "maintain": "designed for weight maintenance with balanced macros"
+    }
+    
+    targets = ", ".join(
+        f"{meal_type} ~{get_meal_calorie_target(meal_type, daily_calories)} calories"
+        for meal_type in MEAL_TYPES
+    )
+    
+    prompt = f"""Generate a 7-day meal plan {goal_description.get(fitness_goal, '')}.
+
+Requirements:
+- One breakfast, lunch and dinner for each day from monday to sunday (21 meals)
+- Target calories per meal: {targets}
+- {dietary_constraint}Must include realistic portions and ingredients
+- Do not repeat the same meal within the week
+- Provide macros (protein, carbs, fats in grams)
+- List 3-6 specific ingredients with measurements
+
+Return ONLY a valid JSON object in this exact format:
+{{
+    "meals": [
+        {{
+            "day": "monday",
+            "meal_type": "breakfast",
+            "name": "Meal Name",
+            "calories": {get_meal_calorie_target("breakfast", daily_calories)},
+            "protein": 25.5,
+            "carbs": 45.0,
+            "fats": 12.0,
+            "ingredients": [
+                "1 cup ingredient 1",
+                "200g ingredient 2"
+            ]
+        }}
+    ]
+}}
+
+Do not include any markdown formatting, explanations, or additional text. Return only the JSON object."""
+    
+    return prompt
+
+
+def parse_ai_weekly_response(response_text: str) -> Dict[Tuple[str, str], Dict]:
+    """
+    Parse a batched weekly OpenAI response into per-slot meal data.
+    Each slot is validated like parse_ai_meal_response; invalid or
+    missing slots are left out so they can be regenerated individually.
+    
+    Args:
+        response_text: Raw response from OpenAI
+    
+    Returns:
+        Dictionary mapping (day, meal_type) to parsed meal data
+    """
+    try:
+        weekly_data = json.loads(strip_markdown_fences(response_text))
+    except json.JSONDecodeError as e:
+        print(f"Failed to parse JSON from weekly AI response: {e}")
+        return {}
+    
+    meals = weekly_data.get("meals") if isinstance(weekly_data, dict) else weekly_data
+    if not isinstance(meals, list):
+        print("Weekly AI response has no meals list")
+        return {}
+    
+    valid_slots = set(get_weekly_slots())
+    parsed = {}
+    
+    for meal_data in meals:
+        if not validate_meal_data(meal_data):
+            continue
+        
+        slot = (
+            str(meal_data.get("day", "")).strip().lower(),
+            str(meal_data.get("meal_type", "")).strip().lower()
+        )
+        if slot not in valid_slots or slot in parsed:
+            print(f"Ignoring unexpected or duplicate slot in weekly AI response: {slot}")
+            continue
+        
+        meal_data["day"], meal_data["meal_type"] = slot
+        parsed[slot] = meal_data
+    
+    return parsed
+
+
+def create_chat_request(prompt: str, temperature: float, max_tokens: int) -> Dict:
+    """
+    Build the keyword arguments for an OpenAI chat completion request.
+    Shared by the sync and async clients so both send identical requests.
+    
+    Args:
+        prompt: User prompt to send
+        temperature: Sampling temperature
+        max_tokens: Maximum tokens in the completion
+    
+    Returns:
+        Keyword arguments for chat.completions.create
+    """
+    return {
+        "model": "gpt-4o-mini",
+        "messages": [
+            {
+                "role": "system",
+                "content": "You are a professional nutritionist creating meal plans. Return only valid JSON without markdown formatting."
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ],
+        "temperature": temperature,
+        "max_tokens": max_tokens
+    }
+
+
+async def get_cached_meal_async(
     meal_type: str,
     fitness_goal: str,
     dietary_preference: str,
     target_calories: int
+) -> Optional[Dict]:
+    """
+    Look up a previously generated meal for the same prompt inputs. A
+    shared-cache round-trip does not block the event loop.
+    
+    Args:
+        meal_type: Type of meal (breakfast, lunch, dinner)
+        fitness_goal: User's fitness goal
+        dietary_preference: User's dietary preference
+        target_calories: Target calories for the meal
+    
+    Returns:
+        Cached meal data or None on a miss or when caching is disabled
+    """
+    if not MEAL_CACHE_ENABLED:
+        return None
+    
+    cached = await meal_cache.get_async(meal_type, fitness_goal, dietary_preference, target_calories)
+    if cached:
+        print(f"Serving {meal_type} from meal cache")
+    return cached
+
+
+def make_flight_key(
+    meal_type: str,
+    fitness_goal: str,
+    dietary_preference: str,
+    target_calories: int,
+    slot: Optional[str] = None
+) -> str:
+    """
+    Build the single-flight key for a meal request: the meal cache key of
+    the prompt inputs plus the slot, if any.
+    
+    Args:
+        meal_type: Type of meal (breakfast, lunch, dinner)
+        fitness_goal: User's fitness goal
+        dietary_preference: User's dietary preference
+        target_calories: Target calories for the meal
+        slot: Distinguishes requests with the same prompt that must still get
+            different meals, e.g. the day of a weekly plan slot
+    
+    Returns:
+        Single-flight key string
+    """
+    key = make_cache_key(meal_type, fitness_goal, dietary_preference, target_calories)
+    return f"{key}:{slot}" if slot else key
+
+
+def get_fallback_meal(meal_type: str, fitness_goal: str) -> Dict:
+    """
+    Get a predefined fallback meal when AI is unavailable.
+    
+    Args:
+        meal_type: Type of meal
+        fitness_goal: User's fitness goal
+    
+    Returns:
+        Fallback meal data
+    """
+    return FALLBACK_MEALS.get(meal_type, {}).get(fitness_goal, FALLBACK_MEALS["breakfast"]["maintain"])
+
+
+def is_fallback_meal(meal_type: str, meal_data: Dict) -> bool:
+    """
+    Check whether a meal is one of the predefined fallback meals.
+    
+    Args:
+        meal_type: Type of meal
+        meal_data: Meal data to check
+    
+    Returns:
+        True if meal_data is a fallback meal for meal_type
+    """
+    return meal_data["name"] in {m["name"] for m in FALLBACK_MEALS.get(meal_type, {}).values()}
+
+
+def get_weekly_slots() -> List[Tuple[str, str]]:
+    """
+    Get the (day, meal_type) slots of a weekly plan in display order.
+    
+    Returns:
+        List of 21 (day, meal_type) tuples, Monday breakfast first
+    """
+    return [(day, meal_type) for day in DAYS_OF_WEEK for meal_type in MEAL_TYPES]
+
+
+def fill_slots_from_catalog(
+    slots: List[Tuple[str, str]],
+    fitness_goal: str,
+    dietary_preference: str,
+    daily_calories: int
+) -> Dict[Tuple[str, str], Dict]:
+    """
+    Fill as many slots as possible from the pre-generated meal catalog.
+    A meal is used at most once per call to keep the week varied. Slots
+    without a close match reuse a meal from a neighbouring calorie range
+    with rescaled portions.
+    
+    Args:
+        slots: (day, meal_type) slots to fill
+        fitness_goal: User's fitness goal
+        dietary_preference: User's dietary preference
+        daily_calories: User's daily calorie target
+    
+    Returns:
+        Dictionary mapping each filled slot to its meal data
+    """
+    catalog = get_catalog()
+    used_names = set()
+    filled = {}
+    
+    for day, meal_type in slots:
+        start = time.perf_counter()
+        target_calories = get_meal_calorie_target(meal_type, daily_calories)
+        meal_data = catalog.find(
+            meal_type,
+            fitness_goal,
+            dietary_preference,
+            target_calories,
+            exclude_names=used_names
+        )
+        if not meal_data and MEAL_PORTION_SCALING:
+            # Reuse a meal from a neighbouring calorie range with rescaled portions
+            nearby = catalog.find(
+                meal_type,
+                fitness_goal,
+                dietary_preference,
+                target_calories,
+                tolerance=MEAL_CATALOG_SCALE_TOLERANCE,
+                exclude_names=used_names
+            )
+            meal_data = scale_meal(nearby, target_calories) if nearby else None
+        if meal_data:
+            used_names.add(meal_data["name"])
+            meal_data["day"] = day
+            meal_data["meal_type"] = meal_type
+            meal_data["generation_ms"] = round((time.perf_counter() - start) * 1000, 3)
+            filled[(day, meal_type)] = meal_data
+    
+    return filled
+
+
+def gather_compose_candidates(
+    fitness_goal: str,
+    dietary_preference: str,
+    daily_calories: int,
+    history: Optional[Dict[str, List[Dict]]] = None
+) -> Dict[str, List[Dict]]:
+    """
+    Collect candidate meals for the week composer from the meal catalog,
+    the meal cache and the user's meal history.
+    
+    Args:
+        fitness_goal: User's fitness goal
+        dietary_preference: User's dietary preference
+        daily_calories: User's daily calorie target
+        history: The user's previous meals per meal type
+    
+    Returns:
+        Dictionary mapping meal type to candidate meals
+    """
+    from week_composer import MEAL_COMPOSER_CALORIE_TOLERANCE
+    
+    catalog = get_catalog()
+    candidates = {}
+    for meal_type in MEAL_TYPES:
+        target_calories = get_meal_calorie_target(meal_type, daily_calories)
+        candidates[meal_type] = (
+            catalog.candidates(
+                meal_type, fitness_goal, dietary_preference, target_calories,
+                tolerance=MEAL_COMPOSER_CALORIE_TOLERANCE
+            )
+            + meal_cache.candidates(meal_type, fitness_goal, dietary_preference)
+            + list((history or {}).get(meal_type, []))
+        )
+    return candidates
+
+
+def compose_weekly_meals(
+    fitness_goal: str,
+    dietary_preference: str,
+    daily_calories: int,
+    history: Optional[Dict[str, List[Dict]]] = None
+) -> Optional[List[Dict]]:
+    """
+    Build the week by composing existing meals, without any LLM calls.
+    
+    Args:
+        fitness_goal: User's fitness goal
+        dietary_preference: User's dietary preference
+        daily_calories: User's daily calorie target
+        history: The user's previous meals per meal type
+    
+    Returns:
+        List of 21 meal dictionaries ordered like get_weekly_slots(), or
+        None if the candidate pool is too small
+    """
+    from week_composer import compose_week
+    
+    start = time.perf_counter()
+    candidates = gather_compose_candidates(fitness_goal, dietary_preference, daily_calories, history)
+    weekly_meals = compose_week(candidates, fitness_goal, daily_calories)
+    if weekly_meals is None:
+        return None
+    
+    generation_ms = round((time.perf_counter() - start) * 1000 / len(weekly_meals), 3)
+    for meal_data in weekly_meals:
+        meal_data["generation_ms"] = generation_ms
+    return weekly_meals
+
+
+def generate_weekly_meals_local(
+    fitness_goal: str,
+    dietary_preference: str,
+    daily_calories: int
+) -> List[Dict]:
+    """
+    Build the week with the local macro synthesizer, without any LLM calls.
+    Each day gets a different variant so meals do not repeat every day.
+    
+    Args:
+        fitness_goal: User's fitness goal
+        dietary_preference: User's dietary preference
+        daily_calories: User's daily calorie target
+    
+    Returns:
+        List of 21 meal dictionaries ordered like get_weekly_slots()
+    """
+    weekly_meals = []
+    for day, meal_type in get_weekly_slots():
+        start = time.perf_counter()
+        meal_data = synthesize_meal(
+            meal_type,
+            fitness_goal,
+            dietary_preference,
+            get_meal_calorie_target(meal_type, daily_calories),
+            variant=DAYS_OF_WEEK.index(day)
+        ) or dict(get_fallback_meal(meal_type, fitness_goal))
+        meal_data["day"] = day
+        meal_data["meal_type"] = meal_type
+        meal_data["generation_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        weekly_meals.append(meal_data)
+    return weekly_meals
+
+
+# -------------------- ASYNC GENERATION --------------------
+
+async def generate_meal_with_ai_async(
+    meal_type: str,
+    fitness_goal: str,
+    dietary_preference: str,
+    target_calories: int,
+    timeout: Optional[float] = None,
+    use_cache: bool = True,
+    slot: Optional[str] = None
 ) -> Dict:
     """
-    Generate a meal using OpenAI API.
-    Falls back to predefined meals if AI is unavailable.
+    Generate a meal using the async OpenAI client.
+    Falls back to predefined meals if AI is unavailable. Concurrent calls
+    with the same prompt inputs and slot share one OpenAI call, which is
+    bounded by a timeout and is cancelled once every caller sharing it has
+    been cancelled.
     
     Args:
         meal_type: Type of meal (breakfast, lunch, dinner)
         fitness_goal: User's fitness goal
         dietary_preference: User's dietary preference
         target_calories: Target calories for the meal
+        timeout: Seconds before falling back (defaults to OPENAI_TIMEOUT_SECONDS)
+        use_cache: Serve from the meal cache when possible; new meals are
+            added to the cache either way. Callers that skip the cache want a
+            fresh meal, so their calls are never shared either.
+        slot: Keeps otherwise identical requests apart (see make_flight_key)
     
     Returns:
         Dictionary containing meal data
     """
-    # Check if OpenAI client is available
-    if not client:
-        print("OpenAI client not available, using fallback meal")
+    if use_cache:
+        cached = await get_cached_meal_async(meal_type, fitness_goal, dietary_preference, target_calories)
+        if cached:
+            return cached
+    
+    if not use_cache or not MEAL_SINGLE_FLIGHT_ENABLED:
+        return await request_meal_with_ai_async(
+            meal_type, fitness_goal, dietary_preference, target_calories, timeout
+        )
+    
+    key = make_flight_key(meal_type, fitness_goal, dietary_preference, target_calories, slot)
+    meal_data = await meal_flights.do_async(
+        key,
+        lambda: request_meal_with_ai_async(
+            meal_type, fitness_goal, dietary_preference, target_calories, timeout
+        )
+    )
+    return copy_meal(meal_data)
+
+
+async def request_meal_with_ai_async(
+    meal_type: str,
+    fitness_goal: str,
+    dietary_preference: str,
+    target_calories: int,
+    timeout: Optional[float] = None
+) -> Dict:
+    """
+    Make the OpenAI call behind generate_meal_with_ai_async, without the
+    cache lookup or coalescing.
+    
+    Args:
+        meal_type: Type of meal (breakfast, lunch, dinner)
+        fitness_goal: User's fitness goal
+        dietary_preference: User's dietary preference
+        target_calories: Target calories for the meal
+        timeout: Seconds before falling back (defaults to OPENAI_TIMEOUT_SECONDS)
+    
+    Returns:
+        Dictionary containing meal data
+    """
+    if not async_client:
+        print("OpenAI async client not available, using fallback meal")
+        return get_fallback_meal(meal_type, fitness_goal)
+    
+    if not openai_breaker.allow():
+        print("OpenAI circuit open, using fallback meal")
         return get_fallback_meal(meal_type, fitness_goal)
     
+    if timeout is None:
+        timeout = OPENAI_TIMEOUT_SECONDS
+    
     try:
-        # Create prompt
         prompt = create_meal_prompt(
             meal_type,
             fitness_goal,
             dietary_preference,
             target_calories
         )
+        await openai_scheduler.acquire_async(tokens=estimate_tokens(prompt, 500))
         
-        # Call OpenAI API
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a professional nutritionist creating meal plans. Return only valid JSON without markdown formatting."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            temperature=0.8,  # Some creativity
-            max_tokens=500
-        )
-        
-        # Extract response
-        response_text = response.choices[0].message.content
+        with openai_breaker.track():
+            response = await asyncio.wait_for(
+                async_client.chat.completions.create(
+                    **create_chat_request(prompt, temperature=0.8, max_tokens=500)
+                ),
+                timeout=timeout
+            )
         
-        # Parse response
-        meal_data = parse_ai_meal_response(response_text)
+        meal_data = parse_ai_meal_response(response.choices[0].message.content)
         
         if meal_data:
             print(f"Successfully generated {meal_type} with AI")
+            if MEAL_CACHE_ENABLED:
+                await meal_cache.add_async(meal_type, fitness_goal, dietary_preference, target_calories, meal_data)
             return meal_data
         else:
             print(f"Failed to parse AI response, using fallback")
             return get_fallback_meal(meal_type, fitness_goal)
     
+    except asyncio.TimeoutError:
+        print(f"OpenAI call timed out after {timeout}s, using fallback")
+        return get_fallback_meal(meal_type, fitness_goal)
+    
+    except LLMSchedulerError as e:
+        openai_breaker.release()
+        print(f"No OpenAI slot ({e}), using fallback meal")
+        return get_fallback_meal(meal_type, fitness_goal)
+    
     except OpenAIError as e:
         print(f"OpenAI API error: {e}")
         return get_fallback_meal(meal_type, fitness_goal)
@@ -358,62 +890,338 @@ def generate_meal_with_ai(
         return get_fallback_meal(meal_type, fitness_goal)
 
 
-def get_fallback_meal(meal_type: str, fitness_goal: str) -> Dict:
+async def generate_swap_candidate_async(
+    meal_type: str,
+    fitness_goal: str,
+    dietary_preference: str,
+    target_calories: int
+) -> Optional[Dict]:
     """
-    Get a predefined fallback meal when AI is unavailable.
+    Generate a fresh alternative meal for the swap pool. Bypasses the meal
+    cache so candidates differ from the meals plans were built from.
     
     Args:
-        meal_type: Type of meal
+        meal_type: Type of meal (breakfast, lunch, dinner)
         fitness_goal: User's fitness goal
+        dietary_preference: User's dietary preference
+        target_calories: Target calories for the meal
     
     Returns:
-        Fallback meal data
+        Meal data, or None if only a fallback meal was available
     """
-    return FALLBACK_MEALS.get(meal_type, {}).get(fitness_goal, FALLBACK_MEALS["breakfast"]["maintain"])
+    # Pool refills run in the background, behind swaps and plan generation
+    with llm_priority(BATCH):
+        meal_data = await generate_meal_with_ai_async(
+            meal_type, fitness_goal, dietary_preference, target_calories, use_cache=False
+        )
+    if is_fallback_meal(meal_type, meal_data):
+        return None
+    return meal_data
+
+
+async def generate_slot_meal_async(
+    day: str,
+    meal_type: str,
+    fitness_goal: str,
+    dietary_preference: str,
+    daily_calories: int
+) -> Dict:
+    """
+    Generate the meal for a single slot of the weekly plan.
+    Never raises: any error falls back to a predefined meal.
+    
+    Args:
+        day: Day of the week
+        meal_type: Type of meal (breakfast, lunch, dinner)
+        fitness_goal: User's fitness goal
+        dietary_preference: User's dietary preference
+        daily_calories: User's daily calorie target
+    
+    Returns:
+        Meal dictionary with day, meal_type and generation_ms included
+    """
+    start = time.perf_counter()
+    target_calories = get_meal_calorie_target(meal_type, daily_calories)
+    
+    try:
+        meal_data = await generate_meal_with_ai_async(
+            meal_type,
+            fitness_goal,
+            dietary_preference,
+            target_calories,
+            slot=day
+        )
+    except Exception as e:
+        print(f"Error generating {day} {meal_type}, using fallback: {e}")
+        meal_data = get_fallback_meal(meal_type, fitness_goal)
+    
+    # Copy so fallback meals shared between slots are never mutated
+    meal_data = dict(meal_data)
+    meal_data["day"] = day
+    meal_data["meal_type"] = meal_type
+    meal_data["generation_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    
+    print(f"Generated {day} {meal_type}: {meal_data['name']} ({meal_data['generation_ms']} ms)")
+    return meal_data
+
+
+async def generate_slot_meals_async(
+    slots: List[Tuple[str, str]],
+    fitness_goal: str,
+    dietary_preference: str,
+    daily_calories: int,
+    concurrency: int,
+    on_meal: Optional[Callable[[Dict], None]] = None
+) -> List[Dict]:
+    """
+    Generate meals for the given slots concurrently, bounded by a semaphore.
+    
+    Args:
+        slots: (day, meal_type) slots to generate
+        fitness_goal: User's fitness goal
+        dietary_preference: User's dietary preference
+        daily_calories: User's daily calorie target
+        concurrency: Maximum slots generated at once
+        on_meal: Called with each meal as soon as its slot finishes
+    
+    Returns:
+        List of meal dictionaries in the same order as slots
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    
+    async def generate(slot: Tuple[str, str]) -> Dict:
+        day, meal_type = slot
+        async with semaphore:
+            meal_data = await generate_slot_meal_async(
+                day, meal_type, fitness_goal, dietary_preference, daily_calories
+            )
+        if on_meal:
+            on_meal(meal_data)
+        return meal_data
+    
+    # gather() preserves slot order and cancels pending slots if the caller is cancelled
+    return list(await asyncio.gather(*(generate(slot) for slot in slots)))
+
+
+async def generate_weekly_meals_batched_async(
+    fitness_goal: str,
+    dietary_preference: str,
+    daily_calories: int,
+    concurrency: int,
+    on_meal: Optional[Callable[[Dict], None]] = None
+) -> List[Dict]:
+    """
+    Generate all 21 meals of a week with a single OpenAI request.
+    Slots that are missing or fail to parse are regenerated one by one.
+    
+    Args:
+        fitness_goal: User's fitness goal
+        dietary_preference: User's dietary preference
+        daily_calories: User's daily calorie target
+        concurrency: Maximum slots regenerated at once
+        on_meal: Called with each meal as soon as its slot finishes
+    
+    Returns:
+        List of 21 meal dictionaries ordered like get_weekly_slots()
+    """
+    slots = get_weekly_slots()
+    parsed = {}
+    
+    if async_client and openai_breaker.allow():
+        start = time.perf_counter()
+        try:
+            prompt = create_weekly_meals_prompt(fitness_goal, dietary_preference, daily_calories)
+            await openai_scheduler.acquire_async(tokens=estimate_tokens(prompt, 8000))
+            # The whole week is one long completion, so allow a multiple of the per-meal
+            # timeout and do not count it towards the slow-call rate
+            with openai_breaker.track(measure_latency=False):
+                response = await asyncio.wait_for(
+                    async_client.chat.completions.create(
+                        **create_chat_request(prompt, temperature=0.8, max_tokens=8000)
+                    ),
+                    timeout=OPENAI_TIMEOUT_SECONDS * 3
+                )
+            parsed = parse_ai_weekly_response(response.choices[0].message.content)
+        except asyncio.TimeoutError:
+            print("Batched generation timed out")
+        except LLMSchedulerError as e:
+            openai_breaker.release()
+            print(f"No OpenAI slot for batched generation: {e}")
+        except OpenAIError as e:
+            print(f"OpenAI API error in batched generation: {e}")
+        except Exception as e:
+            print(f"Unexpected error in batched generation: {e}")
+        
+        batch_ms = round((time.perf_counter() - start) * 1000, 1)
+        print(f"Batched generation returned {len(parsed)}/{len(slots)} meals in {batch_ms} ms")
+        
+        for meal_data in parsed.values():
+            meal_data["generation_ms"] = batch_ms
+        if MEAL_CACHE_ENABLED:
+            await asyncio.gather(*(
+                meal_cache.add_async(
+                    meal_type,
+                    fitness_goal,
+                    dietary_preference,
+                    get_meal_calorie_target(meal_type, daily_calories),
+                    meal_data
+                )
+                for (day, meal_type), meal_data in parsed.items()
+            ))
+        
+        if on_meal:
+            for slot in slots:
+                if slot in parsed:
+                    on_meal(parsed[slot])
+    
+    missing = [slot for slot in slots if slot not in parsed]
+    if missing:
+        print(f"Regenerating {len(missing)} slots individually")
+        regenerated = await generate_slot_meals_async(
+            missing, fitness_goal, dietary_preference, daily_calories, concurrency, on_meal
+        )
+        parsed.update(zip(missing, regenerated))
+    
+    return [parsed[slot] for slot in slots]
 
 
-def generate_weekly_meals(
+async def generate_weekly_meals_catalog_first_async(
     fitness_goal: str,
     dietary_preference: str,
-    daily_calories: Optional[int] = None
+    daily_calories: int,
+    concurrency: int,
+    on_meal: Optional[Callable[[Dict], None]] = None
+) -> List[Dict]:
+    """
+    Build the week from the meal catalog and call the LLM only on misses.
+    
+    Args:
+        fitness_goal: User's fitness goal
+        dietary_preference: User's dietary preference
+        daily_calories: User's daily calorie target
+        concurrency: Maximum missing slots generated at once
+        on_meal: Called with each meal as soon as its slot finishes
+    
+    Returns:
+        List of 21 meal dictionaries ordered like get_weekly_slots()
+    """
+    slots = get_weekly_slots()
+    meals = fill_slots_from_catalog(slots, fitness_goal, dietary_preference, daily_calories)
+    
+    if on_meal:
+        for slot in slots:
+            if slot in meals:
+                on_meal(meals[slot])
+    
+    missing = [slot for slot in slots if slot not in meals]
+    print(f"Catalog filled {len(meals)}/{len(slots)} slots")
+    if missing:
+        regenerated = await generate_slot_meals_async(
+            missing, fitness_goal, dietary_preference, daily_calories, concurrency, on_meal
+        )
+        meals.update(zip(missing, regenerated))
+    
+    return [meals[slot] for slot in slots]
+
+
+async def generate_weekly_meals_async(
+    fitness_goal: str,
+    dietary_preference: str,
+    daily_calories: Optional[int] = None,
+    concurrency: Optional[int] = None,
+    mode: Optional[str] = None,
+    on_meal: Optional[Callable[[Dict], None]] = None,
+    history: Optional[Dict[str, List[Dict]]] = None
 ) -> List[Dict]:
     """
     Generate meals for an entire week (7 days × 3 meals = 21 meals).
     
+    In "parallel" mode slots are generated concurrently, so wall-clock
+    time is roughly that of the slowest single generation. In "batch"
+    mode the whole week is requested in one call and only slots that
+    fail to parse are regenerated individually. In "catalog" mode slots
+    are filled from the pre-generated meal catalog and the LLM is only
+    called for slots the catalog cannot fill. In "local" mode every slot
+    is built by the local macro synthesizer without network calls. In
+    "compose" mode the week is assembled from existing meals (catalog,
+    cache and history) by the week composer, falling back to "catalog"
+    mode when the pool is too small.
+    
+    on_meal is called with each meal as soon as its slot finishes, which
+    lets callers report progress or stream meals before the week is done.
+    
     Args:
         fitness_goal: User's fitness goal
         dietary_preference: User's dietary preference
         daily_calories: User's daily calorie target
+        concurrency: Maximum slots generated at once
+            (defaults to MEAL_GENERATION_CONCURRENCY)
+        mode: "parallel", "batch", "catalog", "local" or "compose"
+            (defaults to MEAL_GENERATION_MODE)
+        on_meal: Called with each meal as soon as its slot finishes
+        history: The user's previous meals per meal type, used by "compose"
     
     Returns:
-        List of 21 meal dictionaries with day and meal_type included
+        List of 21 meal dictionaries ordered Monday breakfast to Sunday dinner
     """
     if daily_calories is None:
         daily_calories = get_default_calories_for_goal(fitness_goal)
     
-    days = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
-    meal_types = ["breakfast", "lunch", "dinner"]
+    if concurrency is None:
+        concurrency = MEAL_GENERATION_CONCURRENCY
     
-    weekly_meals = []
+    if mode is None:
+        mode = MEAL_GENERATION_MODE
     
-    for day in days:
-        for meal_type in meal_types:
-            target_calories = get_meal_calorie_target(meal_type, daily_calories)
-            
-            meal_data = generate_meal_with_ai(
-                meal_type,
+    start = time.perf_counter()
+    
+    if mode == "compose":
+        weekly_meals = compose_weekly_meals(fitness_goal, dietary_preference, daily_calories, history)
+        if weekly_meals is None:
+            print("Not enough meals to compose a week, using catalog mode")
+            weekly_meals = await generate_weekly_meals_catalog_first_async(
                 fitness_goal,
                 dietary_preference,
-                target_calories
+                daily_calories,
+                concurrency,
+                on_meal
             )
-            
-            # Add day and meal_type to the meal data
-            meal_data["day"] = day
-            meal_data["meal_type"] = meal_type
-            
-            weekly_meals.append(meal_data)
-            
-            print(f"Generated {day} {meal_type}: {meal_data['name']}")
+        elif on_meal:
+            for meal_data in weekly_meals:
+                on_meal(meal_data)
+    elif mode == "batch":
+        weekly_meals = await generate_weekly_meals_batched_async(
+            fitness_goal,
+            dietary_preference,
+            daily_calories,
+            concurrency,
+            on_meal
+        )
+    elif mode == "catalog":
+        weekly_meals = await generate_weekly_meals_catalog_first_async(
+            fitness_goal,
+            dietary_preference,
+            daily_calories,
+            concurrency,
+            on_meal
+        )
+    elif mode == "local":
+        # CPU-only and a few milliseconds for the whole week
+        weekly_meals = generate_weekly_meals_local(fitness_goal, dietary_preference, daily_calories)
+        if on_meal:
+            for meal_data in weekly_meals:
+                on_meal(meal_data)
+    else:
+        weekly_meals = await generate_slot_meals_async(
+            get_weekly_slots(),
+            fitness_goal,
+            dietary_preference,
+            daily_calories,
+            concurrency,
+            on_meal
+        )
+    
+    elapsed_ms = round((time.perf_counter() - start) * 1000, 1)
+    print(f"Generated {len(weekly_meals)} meals in {elapsed_ms} ms (mode={mode}, concurrency={concurrency}, async)")
     
     return weekly_meals
-
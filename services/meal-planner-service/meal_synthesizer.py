@@ -0,0 +1,253 @@
+"""
+Deterministic local meal synthesizer.
+
+Builds a meal for a calorie target without an LLM: one protein, one carb and
+one fat source from a bundled food-composition table, plus a fixed side, with
+portions solved so the meal hits the fitness goal's protein/carbs/fats split.
+Each (protein, carb, fat) combination is a 3x3 linear system whose inverse is
+precomputed once per meal type and dietary preference, so solving a slot is a
+few hundred small matrix-vector products.
+"""
+import hashlib
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from meal_catalog import COMPATIBLE_PREFERENCES
+
+# Share of calories from protein, carbs and fats per fitness goal
+MACRO_SPLITS = {
+    "cut": (0.40, 0.30, 0.30),
+    "bulk": (0.30, 0.45, 0.25),
+    "maintain": (0.30, 0.40, 0.30)
+}
+
+# Combinations within this relative error of the best are equally good picks
+VARIANT_TOLERANCE = 0.05
+
+# Grams portions are rounded to
+PORTION_STEP = 5
+
+# name, role, protein/carbs/fats per 100 g, min/max grams, diets, meal types
+#
+# Diets list the most restrictive preference each food satisfies (see
+# meal_catalog.COMPATIBLE_PREFERENCES); macros are per 100 g as eaten.
+FOODS = [
+    # Proteins
+    ("grilled chicken breast", "protein", 31.0, 0.0, 3.6, 80, 300, "halal", ("lunch", "dinner")),
+    ("roast turkey breast", "protein", 29.0, 0.0, 1.7, 80, 300, "halal", ("breakfast", "lunch", "dinner")),
+    ("baked salmon", "protein", 25.0, 0.0, 13.0, 80, 250, "halal", ("lunch", "dinner")),
+    ("tuna in water", "protein", 26.0, 0.0, 1.0, 80, 250, "halal", ("lunch", "dinner")),
+    ("lean ground beef", "protein", 26.0, 0.0, 6.0, 80, 300, "halal", ("lunch", "dinner")),
+    ("pork tenderloin", "protein", 26.0, 0.0, 3.5, 80, 300, "none", ("lunch", "dinner")),
+    ("scrambled eggs", "protein", 13.0, 1.1, 11.0, 100, 250, "vegetarian", ("breakfast",)),
+    ("egg whites", "protein", 11.0, 0.7, 0.2, 100, 350, "vegetarian", ("breakfast",)),
+    ("non-fat Greek yogurt", "protein", 10.0, 3.6, 0.4, 150, 450, "vegetarian", ("breakfast",)),
+    ("low-fat cottage cheese", "protein", 11.0, 3.4, 2.3, 100, 350, "vegetarian", ("breakfast", "lunch")),
+    ("firm tofu", "protein", 17.0, 2.8, 8.7, 100, 350, "vegan", ("breakfast", "lunch", "dinner")),
+    ("tempeh", "protein", 20.0, 7.6, 11.0, 80, 250, "vegan", ("lunch", "dinner")),
+    ("seitan", "protein", 25.0, 6.0, 1.9, 80, 250, "vegan", ("lunch", "dinner")),
+    ("cooked lentils", "protein", 9.0, 20.0, 0.4, 100, 400, "vegan", ("lunch", "dinner")),
+    # Carbs
+    ("cooked brown rice", "carb", 2.6, 23.0, 0.9, 50, 400, "vegan", ("lunch", "dinner")),
+    ("cooked white rice", "carb", 2.7, 28.0, 0.3, 50, 400, "vegan", ("lunch", "dinner")),
+    ("cooked quinoa", "carb", 4.4, 21.0, 1.9, 50, 400, "vegan", ("lunch", "dinner")),
+    ("baked sweet potato", "carb", 2.0, 21.0, 0.2, 50, 450, "vegan", ("lunch", "dinner")),
+    ("cooked whole wheat pasta", "carb", 5.8, 30.0, 0.9, 50, 350, "vegan", ("lunch", "dinner")),
+    ("boiled potatoes", "carb", 2.5, 20.0, 0.1, 50, 450, "vegan", ("lunch", "dinner")),
+    ("rolled oats", "carb", 13.0, 68.0, 6.5, 30, 150, "vegan", ("breakfast",)),
+    ("whole grain bread", "carb", 13.0, 41.0, 3.4, 30, 180, "vegan", ("breakfast", "lunch")),
+    ("banana", "carb", 1.1, 23.0, 0.3, 50, 300, "vegan", ("breakfast",)),
+    # Fats
+    ("olive oil", "fat", 0.0, 0.0, 100.0, 0, 40, "vegan", ("lunch", "dinner")),
+    ("avocado", "fat", 2.0, 9.0, 15.0, 0, 250, "vegan", ("breakfast", "lunch", "dinner")),
+    ("almonds", "fat", 21.0, 22.0, 49.0, 0, 80, "vegan", ("breakfast", "lunch")),
+    ("peanut butter", "fat", 25.0, 20.0, 50.0, 0, 80, "vegan", ("breakfast",)),
+    ("chia seeds", "fat", 17.0, 42.0, 31.0, 0, 60, "vegan", ("breakfast",)),
+    ("cheddar cheese", "fat", 25.0, 1.3, 33.0, 0, 80, "vegetarian", ("breakfast", "lunch", "dinner")),
+]
+
+# Fixed side per meal type: name, protein/carbs/fats per 100 g, grams
+SIDES = {
+    "breakfast": ("mixed berries", 0.7, 14.0, 0.3, 80),
+    "lunch": ("mixed greens", 2.0, 4.0, 0.3, 75),
+    "dinner": ("steamed broccoli", 2.8, 7.0, 0.4, 100)
+}
+
+Combination = Tuple[tuple, tuple, tuple, Tuple[Tuple[float, ...], ...]]
+
+
+def macro_calories(protein: float, carbs: float, fats: float) -> float:
+    """Calories from macros using 4/4/9 kcal per gram."""
+    return protein * 4 + carbs * 4 + fats * 9
+
+
+def food_allowed(food: tuple, dietary_preference: str) -> bool:
+    """Check whether a food satisfies a dietary preference."""
+    return food[7] in COMPATIBLE_PREFERENCES.get(dietary_preference, [dietary_preference])
+
+
+def invert_3x3(m: List[List[float]]) -> Optional[Tuple[Tuple[float, ...], ...]]:
+    """Invert a 3x3 matrix, returning None when it is (nearly) singular."""
+    (a, b, c), (d, e, f), (g, h, i) = m
+    det = a * (e * i - f * h) - b * (d * i - f * g) + c * (d * h - e * g)
+    if abs(det) < 1e-9:
+        return None
+    return (
+        ((e * i - f * h) / det, (c * h - b * i) / det, (b * f - c * e) / det),
+        ((f * g - d * i) / det, (a * i - c * g) / det, (c * d - a * f) / det),
+        ((d * h - e * g) / det, (b * g - a * h) / det, (a * e - b * d) / det)
+    )
+
+
+@lru_cache(maxsize=None)
+def get_combinations(meal_type: str, dietary_preference: str) -> Tuple[Combination, ...]:
+    """
+    Build every (protein, carb, fat) food combination for a meal type and
+    preference together with the inverse of its per-gram macro matrix.
+
+    Args:
+        meal_type: Type of meal (breakfast, lunch, dinner)
+        dietary_preference: User's dietary preference
+
+    Returns:
+        Tuple of (protein food, carb food, fat food, inverse matrix)
+    """
+    by_role = {"protein": [], "carb": [], "fat": []}
+    for food in FOODS:
+        if meal_type in food[8] and food_allowed(food, dietary_preference):
+            by_role[food[1]].append(food)
+
+    combinations = []
+    for protein in by_role["protein"]:
+        for carb in by_role["carb"]:
+            for fat in by_role["fat"]:
+                # Rows are macros, columns are foods, entries are grams per gram
+                matrix = [[food[2 + row] / 100 for food in (protein, carb, fat)] for row in range(3)]
+                inverse = invert_3x3(matrix)
+                if inverse is not None:
+                    combinations.append((protein, carb, fat, inverse))
+    return tuple(combinations)
+
+
+def get_macro_targets(fitness_goal: str, target_calories: int) -> Tuple[float, float, float]:
+    """
+    Split a calorie target into protein, carbs and fats grams.
+
+    Args:
+        fitness_goal: User's fitness goal
+        target_calories: Target calories for the meal
+
+    Returns:
+        Tuple of (protein, carbs, fats) in grams
+    """
+    protein_share, carbs_share, fats_share = MACRO_SPLITS.get(fitness_goal, MACRO_SPLITS["maintain"])
+    return (
+        target_calories * protein_share / 4,
+        target_calories * carbs_share / 4,
+        target_calories * fats_share / 9
+    )
+
+
+def solve_portions(
+    combination: Combination,
+    targets: Tuple[float, float, float]
+) -> Tuple[Tuple[float, float, float], float]:
+    """
+    Solve portions of one combination for macro targets, clamped to each
+    food's portion bounds.
+
+    Args:
+        combination: (protein, carb, fat, inverse matrix) from get_combinations
+        targets: Protein, carbs and fats grams left after the side
+
+    Returns:
+        Tuple of (grams per food, relative error against the targets)
+    """
+    foods, inverse = combination[:3], combination[3]
+    grams = tuple(
+        min(max(sum(inverse[row][col] * targets[col] for col in range(3)), food[5]), food[6])
+        for row, food in enumerate(foods)
+    )
+
+    error = 0.0
+    for macro in range(3):
+        achieved = sum(food[2 + macro] / 100 * g for food, g in zip(foods, grams))
+        if targets[macro] > 0:
+            error += abs(achieved - targets[macro]) / targets[macro]
+    return grams, error
+
+
+def pick_variant(candidates: List, seed: str) -> int:
+    """Deterministically pick an index from a seed string."""
+    digest = hashlib.md5(seed.encode("utf-8")).digest()
+    return int.from_bytes(digest[:4], "big") % len(candidates)
+
+
+def synthesize_meal(
+    meal_type: str,
+    fitness_goal: str,
+    dietary_preference: str,
+    target_calories: int,
+    variant: int = 0
+) -> Optional[Dict]:
+    """
+    Build a meal for a calorie target from the food table.
+
+    The same inputs always give the same meal; change `variant` to get a
+    different combination of similar macro accuracy.
+
+    Args:
+        meal_type: Type of meal (breakfast, lunch, dinner)
+        fitness_goal: User's fitness goal
+        dietary_preference: User's dietary preference
+        target_calories: Target calories for the meal
+        variant: Selects among equally good combinations
+
+    Returns:
+        Meal data in the same shape as generate_meal_with_ai_async, or None if no
+        foods satisfy the meal type and preference
+    """
+    combinations = get_combinations(meal_type, dietary_preference)
+    if not combinations:
+        return None
+
+    side_name, side_protein, side_carbs, side_fats, side_grams = SIDES.get(meal_type, SIDES["lunch"])
+    side_macros = (side_protein * side_grams / 100, side_carbs * side_grams / 100, side_fats * side_grams / 100)
+    targets = tuple(
+        max(target - side, 0.0)
+        for target, side in zip(get_macro_targets(fitness_goal, target_calories), side_macros)
+    )
+
+    solved = [(solve_portions(combination, targets), combination) for combination in combinations]
+    best_error = min(error for (_, error), _ in solved)
+    candidates = [
+        (grams, combination)
+        for (grams, error), combination in solved
+        if error <= best_error + VARIANT_TOLERANCE
+    ]
+    grams, combination = candidates[pick_variant(
+        candidates, f"{meal_type}:{fitness_goal}:{dietary_preference}:{target_calories}:{variant}"
+    )]
+
+    portions = [
+        (food, int(round(g / PORTION_STEP) * PORTION_STEP))
+        for food, g in zip(combination[:3], grams)
+    ]
+    portions = [(food, g) for food, g in portions if g > 0]
+
+    protein = side_macros[0] + sum(food[2] * g / 100 for food, g in portions)
+    carbs = side_macros[1] + sum(food[3] * g / 100 for food, g in portions)
+    fats = side_macros[2] + sum(food[4] * g / 100 for food, g in portions)
+
+    extras = [food[0] for food, _ in portions[1:]] + [side_name]
+    name = f"{portions[0][0][0].capitalize()} with "
+    name += f"{', '.join(extras[:-1])} and {extras[-1]}" if len(extras) > 1 else extras[0]
+
+    return {
+        "name": name,
+        "calories": int(round(macro_calories(protein, carbs, fats))),
+        "protein": round(protein, 1),
+        "carbs": round(carbs, 1),
+        "fats": round(fats, 1),
+        "ingredients": [f"{g}g {food[0]}" for food, g in portions] + [f"{side_grams}g {side_name}"]
+    }
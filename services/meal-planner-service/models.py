@@ -1,7 +1,7 @@
 """
 SQLAlchemy database models for meal planner service.
 """
-from sqlalchemy import Column, String, DateTime, Integer, Float, ForeignKey, Date, Enum as SQLEnum, JSON
+from sqlalchemy import Column, String, Text, DateTime, Integer, Float, ForeignKey, Date, Enum as SQLEnum, JSON, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -28,12 +28,24 @@ class DayOfWeek(str, enum.Enum):
     SUNDAY = "sunday"
 
 
+class JobStatus(str, enum.Enum):
+    """Lifecycle of a background plan-generation job."""
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
 class MealPlan(Base):
     """
     Meal plan model representing a weekly meal plan for a user.
     Container for a week's worth of meals.
     """
     __tablename__ = "meal_plans"
+    __table_args__ = (
+        # Latest plan for a user's week in one index scan
+        Index("idx_meal_plans_user_week", "user_id", "week_start", "generated_at"),
+    )
 
     id = Column(
         UUID(as_uuid=True),
@@ -63,6 +75,10 @@ class Meal(Base):
     Contains meal details, macros, and ingredients.
     """
     __tablename__ = "meals"
+    __table_args__ = (
+        # A plan's meals for a day, already in display order
+        Index("idx_meals_plan_day_type", "meal_plan_id", "day", "meal_type"),
+    )
 
     id = Column(
         UUID(as_uuid=True),
@@ -105,3 +121,40 @@ class Meal(Base):
     def __repr__(self):
         return f"<Meal(id={self.id}, name={self.name}, day={self.day}, type={self.meal_type})>"
 
+
+class GenerationJob(Base):
+    """
+    Background weekly plan generation job.
+    Stored in the database so any replica can answer progress polls.
+    """
+    __tablename__ = "generation_jobs"
+
+    id = Column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4,
+        unique=True,
+        nullable=False
+    )
+    user_id = Column(
+        UUID(as_uuid=True),
+        nullable=False,
+        index=True
+    )
+    week_start = Column(Date, nullable=False)
+    status = Column(
+        SQLEnum(JobStatus, name="generation_job_status_enum"),
+        nullable=False,
+        default=JobStatus.QUEUED
+    )
+    total_slots = Column(Integer, nullable=False, default=21)
+    completed_slots = Column(Integer, nullable=False, default=0)
+    progress = Column(JSON, nullable=False, default=list)  # Completed slot summaries
+    meal_plan_id = Column(UUID(as_uuid=True), nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    def __repr__(self):
+        return f"<GenerationJob(id={self.id}, user_id={self.user_id}, status={self.status})>"
@@ -0,0 +1,230 @@
+"""
+Portion scaling for reusing meals across calorie targets.
+
+Many meals differ only in portion size, so an existing meal can serve a new
+calorie target by multiplying every ingredient quantity and macro by the
+same factor. Ingredient lines such as "6 oz salmon", "1 1/2 cups rice",
+"2 tbsp almond butter", "200g chicken breast", "2-3 cloves garlic" or
+"1 (15 oz) can beans" are parsed, scaled and rounded to measures a person
+would actually use.
+"""
+import re
+from fractions import Fraction
+from typing import Dict, List, Optional, Tuple
+
+# Factors outside this range change a meal too much to still be the same meal
+MIN_SCALE = 0.6
+MAX_SCALE = 1.6
+
+UNICODE_FRACTIONS = {
+    "½": "1/2", "⅓": "1/3", "⅔": "2/3", "¼": "1/4", "¾": "3/4", "⅛": "1/8"
+}
+
+# Canonical unit -> (spellings, rounding step, plural form)
+UNITS = {
+    "g": (("g", "gram", "grams"), 5, "g"),
+    "kg": (("kg", "kilogram", "kilograms"), 0.05, "kg"),
+    "ml": (("ml", "milliliter", "milliliters", "millilitre", "millilitres"), 5, "ml"),
+    "l": (("l", "liter", "liters", "litre", "litres"), 0.05, "l"),
+    "oz": (("oz", "ounce", "ounces"), 0.5, "oz"),
+    "lb": (("lb", "lbs", "pound", "pounds"), 0.25, "lb"),
+    "cup": (("cup", "cups"), 0.25, "cups"),
+    "tbsp": (("tbsp", "tablespoon", "tablespoons", "tbs"), 0.5, "tbsp"),
+    "tsp": (("tsp", "teaspoon", "teaspoons"), 0.25, "tsp"),
+    "slice": (("slice", "slices"), 1, "slices"),
+    "scoop": (("scoop", "scoops"), 0.5, "scoops"),
+    "piece": (("piece", "pieces"), 1, "pieces"),
+    "can": (("can", "cans"), 0.5, "cans"),
+}
+UNIT_LOOKUP = {spelling: unit for unit, (spellings, _, _) in UNITS.items() for spelling in spellings}
+# Units written directly after the number ("200g"), all others get a space
+COMPACT_UNITS = {"g", "kg", "ml", "l"}
+# Bare counts ("2 eggs") stay whole; fractional counts ("1/2 avocado") round to halves
+COUNT_STEP = 0.5
+
+# Count words that come before the item they count ("3 cloves garlic")
+COUNT_NOUNS = {"clove", "slice", "sprig", "stalk", "piece", "strip", "head", "bunch", "fillet"}
+
+AMOUNT = r"\d+\s+\d+/\d+|\d+/\d+|\d+(?:\.\d+)?"
+# Amount, optional upper end of a range ("2-3", "2 to 3") and optional
+# package size ("1 (15 oz) can") ahead of the unit
+QUANTITY_PATTERN = re.compile(
+    rf"^\s*(?P<amount>{AMOUNT})"
+    rf"(?:\s*(?:-|–|to)\s*(?P<upper>{AMOUNT}))?"
+    r"\s*(?P<size>\([^)]*\))?\s*(?P<rest>.*)$"
+)
+
+
+def parse_amount(text: str) -> float:
+    """Parse "2", "0.5", "1/2" or "1 1/2" into a number."""
+    return float(sum(Fraction(part) for part in text.split()))
+
+
+def parse_quantity(ingredient: str) -> Optional[Dict]:
+    """
+    Split an ingredient line into its quantity parts.
+
+    Args:
+        ingredient: Ingredient line, e.g. "2-3 cloves garlic"
+
+    Returns:
+        Dictionary with amount, upper (end of a range or None), size
+        (parenthesised package size or None), unit (canonical unit or None
+        for a bare count) and description, or None if the line does not
+        start with a quantity
+    """
+    for symbol, fraction in UNICODE_FRACTIONS.items():
+        ingredient = ingredient.replace(symbol, f" {fraction}")
+
+    match = QUANTITY_PATTERN.match(ingredient)
+    if not match:
+        return None
+
+    rest = match.group("rest")
+    word, _, description = rest.partition(" ")
+    unit = UNIT_LOOKUP.get(word.lower().rstrip("."))
+    return {
+        "amount": parse_amount(match.group("amount")),
+        "upper": parse_amount(match.group("upper")) if match.group("upper") else None,
+        "size": match.group("size"),
+        "unit": unit,
+        "description": rest if unit is None else description
+    }
+
+
+def parse_ingredient(ingredient: str) -> Optional[Tuple[float, Optional[str], str]]:
+    """
+    Split an ingredient line into amount, unit and description.
+
+    Args:
+        ingredient: Ingredient line, e.g. "1 1/2 cups cooked brown rice"
+
+    Returns:
+        Tuple of (amount, canonical unit or None for a bare count,
+        description), or None if the line does not start with a quantity.
+        A range gives its lower end.
+    """
+    quantity = parse_quantity(ingredient)
+    if quantity is None:
+        return None
+    return quantity["amount"], quantity["unit"], quantity["description"]
+
+
+def singular(noun: str) -> str:
+    """Singular form of a plural noun: "tomatoes" -> "tomato", "berries" -> "berry"."""
+    if noun.endswith("ies"):
+        return noun[:-3] + "y"
+    if noun.endswith(("oes", "ches", "shes", "xes")):
+        return noun[:-2]
+    if noun.endswith("s") and not noun.endswith("ss"):
+        return noun[:-1]
+    return noun
+
+
+def singularize(description: str) -> str:
+    """
+    Make the counted item of a bare-count description singular:
+    "large eggs" -> "large egg", "cloves garlic" -> "clove garlic",
+    "cherry tomatoes, halved" -> "cherry tomato, halved".
+    """
+    head, sep, tail = description.partition(",")
+    words = head.rstrip().split(" ")
+    # "cloves garlic" counts its first word, "large eggs" its last
+    index = 0 if singular(words[0].lower()) in COUNT_NOUNS else len(words) - 1
+    words[index] = singular(words[index])
+    return " ".join(words) + head[len(head.rstrip()):] + sep + tail
+
+
+def round_amount(amount: float, step: float) -> float:
+    """Round to the nearest step, never below one step."""
+    return max(round(amount / step) * step, step)
+
+
+def format_amount(amount: float, step: float) -> str:
+    """Format a rounded amount: fractions for quarter/half steps, decimals for metric."""
+    if step >= 1:
+        return str(int(round(amount)))
+    if step < 0.25:
+        return f"{amount:.2f}".rstrip("0").rstrip(".")
+
+    whole = int(amount)
+    fraction = Fraction(amount - whole).limit_denominator(8)
+    if fraction == 0:
+        return str(whole)
+    if whole == 0:
+        return f"{fraction.numerator}/{fraction.denominator}"
+    return f"{whole} {fraction.numerator}/{fraction.denominator}"
+
+
+def scale_ingredient(ingredient: str, factor: float) -> str:
+    """
+    Scale the quantity of one ingredient line.
+
+    Args:
+        ingredient: Ingredient line, e.g. "6 oz salmon"
+        factor: Multiplier for the quantity
+
+    Returns:
+        Scaled ingredient line; lines without a quantity ("salt to taste")
+        are returned unchanged
+    """
+    quantity = parse_quantity(ingredient)
+    if quantity is None:
+        return ingredient
+
+    amounts: List[float] = [quantity["amount"]]
+    if quantity["upper"] is not None:
+        amounts.append(quantity["upper"])
+
+    unit = quantity["unit"]
+    if unit is None:
+        step = 1 if all(amount.is_integer() for amount in amounts) else COUNT_STEP
+    else:
+        _, step, plural = UNITS[unit]
+
+    scaled = [round_amount(amount * factor, step) for amount in amounts]
+    if len(scaled) == 2 and scaled[0] == scaled[1]:
+        # Both ends rounded to the same measure
+        scaled = scaled[:1]
+    text = "-".join(format_amount(amount, step) for amount in scaled)
+    size = f" {quantity['size']}" if quantity["size"] else ""
+    description = quantity["description"]
+
+    if unit is None:
+        if max(amounts) > 1 and max(scaled) <= 1:
+            description = singularize(description)
+        return f"{text}{size} {description}".strip()
+
+    if unit in COMPACT_UNITS and not size:
+        return f"{text}{unit} {description}".strip()
+    label = plural if max(scaled) > 1 else unit
+    return f"{text}{size} {label} {description}".strip()
+
+
+def scale_meal(meal_data: Dict, target_calories: int) -> Optional[Dict]:
+    """
+    Rescale a meal's portions and macros to a new calorie target.
+
+    Args:
+        meal_data: Meal with name, calories, macros and ingredients
+        target_calories: Calories the scaled meal should have
+
+    Returns:
+        New meal dictionary, or None if the required factor is outside
+        MIN_SCALE..MAX_SCALE
+    """
+    if not meal_data.get("calories"):
+        return None
+
+    factor = target_calories / meal_data["calories"]
+    if not MIN_SCALE <= factor <= MAX_SCALE:
+        return None
+
+    return {
+        "name": meal_data["name"],
+        "calories": int(round(meal_data["calories"] * factor)),
+        "protein": round(meal_data["protein"] * factor, 1),
+        "carbs": round(meal_data["carbs"] * factor, 1),
+        "fats": round(meal_data["fats"] * factor, 1),
+        "ingredients": [scale_ingredient(i, factor) for i in meal_data["ingredients"]]
+    }
@@ -0,0 +1,189 @@
+"""
+User profile lookup against auth-service with an in-process TTL cache.
+
+Plans and swaps need the user's fitness goal, calorie target and dietary
+preference, which live in auth-service. Profiles change rarely, so they are
+cached per user for PROFILE_CACHE_TTL_SECONDS and fetched over one pooled
+HTTP connection when missing. Users without a profile (or lookups that fail)
+are cached for the shorter PROFILE_NEGATIVE_TTL_SECONDS and get the default
+profile. Concurrent misses for the same user share one request, and an
+expired profile is still served if auth-service cannot be reached.
+auth-service invalidates the entry when the profile changes. Both calls
+authenticate with the service token (see service_auth), so background jobs
+without a user's request token can read profiles too.
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import httpx
+from dotenv import load_dotenv
+
+from metrics import counter
+from schemas import DietaryPreferenceEnum, FitnessGoalEnum, UserProfileData
+from service_auth import service_headers
+from singleflight import SingleFlight
+
+load_dotenv()
+
+AUTH_SERVICE_URL = os.getenv("AUTH_SERVICE_URL", "http://localhost:8000")
+PROFILE_CACHE_TTL_SECONDS = float(os.getenv("PROFILE_CACHE_TTL_SECONDS", "300"))
+# How long "no profile" and failed lookups are remembered
+PROFILE_NEGATIVE_TTL_SECONDS = float(os.getenv("PROFILE_NEGATIVE_TTL_SECONDS", "30"))
+PROFILE_CACHE_MAX_ENTRIES = int(os.getenv("PROFILE_CACHE_MAX_ENTRIES", "10000"))
+PROFILE_FETCH_TIMEOUT_SECONDS = float(os.getenv("PROFILE_FETCH_TIMEOUT_SECONDS", "2"))
+
+DEFAULT_PROFILE = UserProfileData(
+    fitness_goal=FitnessGoalEnum.MAINTAIN,
+    daily_calories=2200,
+    dietary_preference=DietaryPreferenceEnum.NONE
+)
+
+profile_lookups = counter(
+    "profile_lookups_total",
+    "Profile lookups by result (hit, negative_hit, fetched, missing, error, stale)"
+)
+
+
+def parse_profile(data: Optional[Dict]) -> Optional[UserProfileData]:
+    """
+    Convert the profile returned by auth-service into UserProfileData.
+
+    Args:
+        data: "profile" object of the response, or None
+
+    Returns:
+        Profile, or None if the user has no usable profile yet
+    """
+    from meal_generator import get_default_calories_for_goal
+
+    if not data or not data.get("fitness_goal") or not data.get("dietary_preference"):
+        return None
+    try:
+        fitness_goal = FitnessGoalEnum(data["fitness_goal"])
+        dietary_preference = DietaryPreferenceEnum(data["dietary_preference"])
+    except ValueError:
+        return None
+
+    return UserProfileData(
+        fitness_goal=fitness_goal,
+        daily_calories=data.get("daily_calories") or get_default_calories_for_goal(fitness_goal.value),
+        dietary_preference=dietary_preference
+    )
+
+
+class ProfileClient:
+    """Cached auth-service profile lookups. Safe to share across requests."""
+
+    def __init__(
+        self,
+        base_url: str = AUTH_SERVICE_URL,
+        ttl: float = PROFILE_CACHE_TTL_SECONDS,
+        negative_ttl: float = PROFILE_NEGATIVE_TTL_SECONDS,
+        max_entries: int = PROFILE_CACHE_MAX_ENTRIES,
+        timeout: float = PROFILE_FETCH_TIMEOUT_SECONDS,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop = None
+        # user_id -> (expires_at, profile or None); expired entries are kept to serve on errors
+        self._entries: "OrderedDict[str, Tuple[float, Optional[UserProfileData]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._flights = SingleFlight("profile_lookup")
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # Created lazily so the pool belongs to the running event loop
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            self._client_loop = loop
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+                transport=self.transport
+            )
+        return self._client
+
+    def _store(self, user_id: str, profile: Optional[UserProfileData], ttl: float):
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + ttl, profile)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def get(self, user_id: str) -> UserProfileData:
+        """
+        Get a user's profile, from the cache when fresh.
+
+        Args:
+            user_id: User ID from the access token
+
+        Returns:
+            The user's profile, or DEFAULT_PROFILE if they have none or
+            auth-service is unavailable
+        """
+        with self._lock:
+            entry = self._entries.get(user_id)
+        if entry and entry[0] > time.monotonic():
+            profile_lookups.inc(result="hit" if entry[1] else "negative_hit")
+            return entry[1] or DEFAULT_PROFILE
+
+        profile = await self._flights.do_async(user_id, lambda: self._fetch(user_id))
+        return profile or DEFAULT_PROFILE
+
+    async def _fetch(self, user_id: str) -> Optional[UserProfileData]:
+        try:
+            response = await self._get_client().get(
+                f"/api/auth/internal/users/{user_id}",
+                headers=service_headers()
+            )
+            if response.status_code == 200:
+                profile = parse_profile(response.json().get("profile"))
+            elif response.status_code == 404:
+                # Unknown user: nothing to wait for
+                profile = None
+            else:
+                raise RuntimeError(f"auth-service returned {response.status_code}")
+        except Exception as e:
+            print(f"Failed to fetch profile for user {user_id}: {e}")
+            with self._lock:
+                stale = self._entries.get(user_id)
+            if stale and stale[1]:
+                profile_lookups.inc(result="stale")
+                self._store(user_id, stale[1], self.negative_ttl)
+                return stale[1]
+            profile_lookups.inc(result="error")
+            self._store(user_id, None, self.negative_ttl)
+            return None
+
+        profile_lookups.inc(result="fetched" if profile else "missing")
+        self._store(user_id, profile, self.ttl if profile else self.negative_ttl)
+        return profile
+
+    def invalidate(self, user_id: str):
+        """Forget a user's cached profile so the next lookup fetches it again."""
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        """Forget all cached profiles."""
+        with self._lock:
+            self._entries.clear()
+
+    async def aclose(self):
+        """Close the pooled HTTP connections."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+profile_client = ProfileClient()
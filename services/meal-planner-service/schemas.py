@@ -185,3 +185,53 @@ class GeneratedMealData(BaseModel):
     fats: float
     ingredients: List[str]
 
+
+
+class JobSlotProgress(BaseModel):
+    """Schema for one completed slot of a generation job."""
+    day: str
+    meal_type: str
+    name: str
+    generation_ms: Optional[float] = None
+
+
+class JobAcceptedResponse(BaseModel):
+    """Schema for an accepted plan generation job."""
+    job_id: str
+    status: str
+    status_url: str
+
+
+class JobResponse(BaseModel):
+    """Schema for plan generation job status and progress."""
+    job_id: str
+    status: str
+    week_start: str
+    total_slots: int
+    completed_slots: int
+    progress: List[JobSlotProgress]
+    plan_id: Optional[str] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "job_id": "123e4567-e89b-12d3-a456-426614174000",
+                "status": "running",
+                "week_start": "2025-11-24",
+                "total_slots": 21,
+                "completed_slots": 2,
+                "progress": [
+                    {"day": "monday", "meal_type": "breakfast", "name": "Oatmeal with Berries", "generation_ms": 812.4},
+                    {"day": "monday", "meal_type": "lunch", "name": "Chicken Rice Bowl", "generation_ms": 954.1}
+                ],
+                "plan_id": None,
+                "error": None,
+                "created_at": "2025-11-26T10:00:00Z",
+                "started_at": "2025-11-26T10:00:01Z",
+                "finished_at": None
+            }
+        }
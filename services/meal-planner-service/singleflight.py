@@ -0,0 +1,165 @@
+"""
+Single-flight coalescing of identical upstream calls.
+
+While a call for a key is in flight, further callers with the same key wait
+for it and receive its result instead of issuing their own call. Keys are
+built from the normalized prompt or prompt inputs, so concurrent requests
+that would send the same prompt share one LLM round trip. Nothing is kept
+after the call finishes; reuse across time is a cache's job.
+"""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+from metrics import counter, gauge
+
+T = TypeVar("T")
+
+flight_calls = counter(
+    "singleflight_calls_total",
+    "Calls through a single-flight group by role (leader made the upstream call, follower shared it)"
+)
+flight_ratio = gauge(
+    "singleflight_coalescing_ratio",
+    "Share of calls through a single-flight group that were served by another caller's call"
+)
+
+
+class _Call:
+    """One in-flight synchronous call and its outcome."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class _AsyncCall:
+    """One in-flight async call and the number of callers awaiting it."""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Group of coalesced calls, safe to use from worker threads (`do`) and
+    from the event loop (`do_async`).
+
+    Threads and coroutines are tracked separately: a sync call is never
+    joined by a coroutine or the other way round.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._async_calls: Dict[str, _AsyncCall] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    def _record(self, leader: bool):
+        with self._lock:
+            if leader:
+                self.leaders += 1
+            else:
+                self.followers += 1
+            ratio = self.followers / (self.leaders + self.followers)
+        flight_calls.inc(group=self.name, role="leader" if leader else "follower")
+        flight_ratio.set(round(ratio, 4), group=self.name)
+
+    def do(self, key: str, function: Callable[[], T]) -> T:
+        """
+        Run `function` unless a call for `key` is already in flight, in which
+        case wait for that call and return its result.
+
+        Args:
+            key: Normalized key identifying identical calls
+            function: Zero-argument callable making the upstream call
+
+        Returns:
+            The result of the (possibly shared) call; an exception raised by
+            the leader is raised in every caller
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+        self._record(leader)
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = function()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    async def do_async(self, key: str, function: Callable[[], Awaitable[T]]) -> T:
+        """
+        Async variant of `do`. The shared call runs as its own task, so one
+        caller being cancelled does not cancel it for the others; it is only
+        cancelled once every caller waiting on it has been.
+
+        Args:
+            key: Normalized key identifying identical calls
+            function: Zero-argument coroutine function making the upstream call
+
+        Returns:
+            The result of the (possibly shared) call
+        """
+        call = self._async_calls.get(key)
+        leader = call is None
+        if leader:
+            call = _AsyncCall(asyncio.ensure_future(function()))
+            self._async_calls[key] = call
+            call.task.add_done_callback(lambda _: self._async_calls.pop(key, None))
+        self._record(leader)
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    def in_flight(self) -> int:
+        """Number of distinct calls currently in flight."""
+        return len(self._calls) + len(self._async_calls)
+
+    def get_stats(self) -> Dict:
+        """
+        Get coalescing statistics.
+
+        Returns:
+            Dictionary with leader and follower counts, the coalescing ratio
+            and calls in flight
+        """
+        total = self.leaders + self.followers
+        return {
+            "leaders": self.leaders,
+            "followers": self.followers,
+            "coalescing_ratio": round(self.followers / total, 3) if total else 0.0,
+            "in_flight": self.in_flight()
+        }
+
+    def reset(self):
+        """Reset counters (calls in flight are left alone)."""
+        with self._lock:
+            self.leaders = 0
+            self.followers = 0
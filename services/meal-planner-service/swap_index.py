@@ -0,0 +1,225 @@
+"""
+Nearest-neighbour swap engine over known meals.
+
+Meals are grouped by (meal_type, dietary_preference) and stored in flat
+typed arrays sorted by calories. A lookup bisects to the query's calories
+and scans outward in both directions, stopping once the calorie difference
+alone exceeds the k-th best distance, so only the neighbourhood of the
+query is visited. Distances compare calories and the calorie share of each
+macro, so a swap keeps the day's totals close to what they were.
+"""
+import os
+import random
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+
+from meal_cache import copy_meal
+from meal_catalog import COMPATIBLE_PREFERENCES, MealCatalog, get_catalog
+from metrics import counter, summary
+
+load_dotenv()
+
+# How swaps are served by default: "pool" (pre-warmed swap pool, then the LLM)
+# or "nearest" (closest known meal by macros, then "pool")
+MEAL_SWAP_STRATEGY = os.getenv("MEAL_SWAP_STRATEGY", "pool")
+# Swaps pick randomly among this many nearest meals so repeated swaps do not
+# bounce between the same two meals
+MEAL_SWAP_NEIGHBORS = int(os.getenv("MEAL_SWAP_NEIGHBORS", "5"))
+
+lookups = counter("swap_index_lookups_total", "Nearest-meal swap lookups by result")
+lookup_seconds = summary("swap_index_lookup_seconds", "Time spent in nearest-meal swap lookups")
+
+MEAL_FIELDS = ("name", "calories", "protein", "carbs", "fats", "ingredients")
+
+
+def macro_distance(
+    calories_a: float, protein_a: float, carbs_a: float, fats_a: float,
+    calories_b: float, protein_b: float, carbs_b: float, fats_b: float,
+    scale: float
+) -> float:
+    """Squared distance between two macro profiles, relative to `scale` calories."""
+    return (
+        ((calories_a - calories_b) / scale) ** 2
+        + ((protein_a - protein_b) * 4 / scale) ** 2
+        + ((carbs_a - carbs_b) * 4 / scale) ** 2
+        + ((fats_a - fats_b) * 9 / scale) ** 2
+    )
+
+
+class MacroGroup:
+    """Meals of one (meal_type, dietary_preference) in calorie order, as flat arrays."""
+
+    def __init__(self, meals: List[Dict]):
+        meals = sorted(meals, key=lambda m: m["calories"])
+        self.meals = meals
+        self.names = [m["name"] for m in meals]
+        self.calories = array("d", (m["calories"] for m in meals))
+        self.protein = array("d", (m["protein"] for m in meals))
+        self.carbs = array("d", (m["carbs"] for m in meals))
+        self.fats = array("d", (m["fats"] for m in meals))
+
+    def __len__(self) -> int:
+        return len(self.meals)
+
+    def nearest(
+        self,
+        query: Tuple[float, float, float, float],
+        k: int,
+        exclude_names: Set[str],
+        best: List[Tuple[float, int, "MacroGroup"]]
+    ):
+        """Merge this group's k nearest meals into `best` (sorted, at most k long)."""
+        calories, protein, carbs, fats = query
+        scale = max(calories, 1.0)
+        start = bisect_left(self.calories, calories)
+        lo, hi = start - 1, start
+
+        while lo >= 0 or hi < len(self.calories):
+            # Visit whichever side is closer in calories
+            if hi >= len(self.calories) or (lo >= 0 and calories - self.calories[lo] <= self.calories[hi] - calories):
+                index, lo = lo, lo - 1
+            else:
+                index, hi = hi, hi + 1
+
+            calorie_term = ((self.calories[index] - calories) / scale) ** 2
+            if len(best) >= k and calorie_term >= best[-1][0]:
+                break
+            if self.names[index] in exclude_names:
+                continue
+
+            distance = macro_distance(
+                self.calories[index], self.protein[index], self.carbs[index], self.fats[index],
+                calories, protein, carbs, fats, scale
+            )
+            if len(best) < k or distance < best[-1][0]:
+                best.append((distance, index, self))
+                best.sort(key=lambda item: item[0])
+                del best[k:]
+
+
+class SwapIndex:
+    """Array-backed k-NN index of known meals by macro profile."""
+
+    def __init__(self, meals: Iterable[Dict] = ()):
+        groups: Dict[Tuple[str, str], List[Dict]] = {}
+        for meal in meals:
+            key = (meal["meal_type"], meal.get("dietary_preference") or "none")
+            groups.setdefault(key, []).append({k: meal[k] for k in MEAL_FIELDS})
+        self.groups = {key: MacroGroup(group) for key, group in groups.items()}
+
+    def __len__(self) -> int:
+        return sum(len(group) for group in self.groups.values())
+
+    @classmethod
+    def from_catalog(cls, catalog: MealCatalog) -> "SwapIndex":
+        """Index every catalog meal under its meal type and dietary preference."""
+        return cls(catalog.meals)
+
+    def nearest(
+        self,
+        meal_type: str,
+        dietary_preference: str,
+        query: Tuple[float, float, float, float],
+        k: int = MEAL_SWAP_NEIGHBORS,
+        exclude_names: Optional[Set[str]] = None,
+        extra: Optional["MacroGroup"] = None
+    ) -> List[Dict]:
+        """
+        Find the k meals closest to a macro profile.
+
+        Args:
+            meal_type: Type of meal (breakfast, lunch, dinner)
+            dietary_preference: Preference every result must satisfy
+            query: (calories, protein, carbs, fats) to match
+            k: Number of neighbours to return
+            exclude_names: Meal names never to return
+            extra: Additional group searched alongside the index, e.g. the
+                user's own meal history
+
+        Returns:
+            Copies of up to k meals, nearest first
+        """
+        exclude_names = exclude_names or set()
+        best: List[Tuple[float, int, MacroGroup]] = []
+
+        groups = [
+            self.groups.get((meal_type, preference))
+            for preference in COMPATIBLE_PREFERENCES.get(dietary_preference, [dietary_preference])
+        ]
+        for group in groups + [extra]:
+            if group is not None:
+                group.nearest(query, k, exclude_names, best)
+
+        results = []
+        seen = set()
+        for _, index, group in best:
+            if group.names[index] not in seen:
+                seen.add(group.names[index])
+                results.append(copy_meal(group.meals[index]))
+        return results
+
+
+_index: Optional[SwapIndex] = None
+_index_catalog: Optional[MealCatalog] = None
+_index_lock = threading.Lock()
+
+
+def get_swap_index() -> SwapIndex:
+    """
+    Get the process-wide index over the meal catalog, rebuilding it when
+    the catalog has been replaced.
+
+    Returns:
+        Shared SwapIndex instance
+    """
+    global _index, _index_catalog
+    catalog = get_catalog()
+    if _index is None or _index_catalog is not catalog:
+        with _index_lock:
+            if _index is None or _index_catalog is not catalog:
+                start = time.perf_counter()
+                _index = SwapIndex.from_catalog(catalog)
+                _index_catalog = catalog
+                print(f"Built swap index over {len(_index)} meals in {(time.perf_counter() - start) * 1000:.1f} ms")
+    return _index
+
+
+def find_nearest_swap(
+    meal_type: str,
+    dietary_preference: str,
+    current: Dict,
+    history: Optional[List[Dict]] = None,
+    k: int = MEAL_SWAP_NEIGHBORS
+) -> Optional[Dict]:
+    """
+    Pick a swap for a meal among its nearest neighbours by macro profile.
+
+    Args:
+        meal_type: Type of meal being swapped
+        dietary_preference: User's dietary preference
+        current: The meal being replaced (name and macros)
+        history: The user's previous meals of this meal type
+        k: Number of nearest meals to pick from
+
+    Returns:
+        Copy of the chosen meal, or None if no other meal is known
+    """
+    start = time.perf_counter()
+    extra = MacroGroup(history) if history else None
+    neighbours = get_swap_index().nearest(
+        meal_type,
+        dietary_preference,
+        (current["calories"], current["protein"], current["carbs"], current["fats"]),
+        k=k,
+        exclude_names={current["name"]},
+        extra=extra
+    )
+    lookup_seconds.observe(time.perf_counter() - start)
+    lookups.inc(result="hit" if neighbours else "miss")
+
+    return random.choice(neighbours) if neighbours else None
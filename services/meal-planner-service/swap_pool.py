@@ -0,0 +1,214 @@
+"""
+Pre-warmed pool of swap candidates.
+
+Keeps a few freshly generated alternative meals per (meal_type, fitness_goal,
+dietary_preference, calorie bucket) so PUT /api/meal-planner/{meal_id}/swap
+can answer from memory. Taking a candidate schedules a background refill;
+only a cold or drained key falls back to a synchronous LLM call.
+"""
+import asyncio
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+from dotenv import load_dotenv
+
+from meal_cache import copy_meal, make_cache_key
+from metrics import counter, gauge, summary
+
+load_dotenv()
+
+SWAP_POOL_ENABLED = os.getenv("SWAP_POOL_ENABLED", "true").lower() == "true"
+# Candidates kept ready per key
+SWAP_POOL_SIZE = int(os.getenv("SWAP_POOL_SIZE", "3"))
+SWAP_POOL_MAX_KEYS = int(os.getenv("SWAP_POOL_MAX_KEYS", "256"))
+# Background LLM calls allowed at once for refills
+SWAP_POOL_REFILL_CONCURRENCY = int(os.getenv("SWAP_POOL_REFILL_CONCURRENCY", "2"))
+
+pool_hits = counter("swap_pool_hits_total", "Swaps served from the pre-warmed pool")
+pool_misses = counter("swap_pool_misses_total", "Swaps that had to generate synchronously")
+pool_refills = counter("swap_pool_refills_total", "Background swap candidate refills by result")
+pool_candidates = gauge("swap_pool_candidates", "Swap candidates ready in the pool")
+pool_refill_lag = summary(
+    "swap_pool_refill_lag_seconds",
+    "Time from a refill being requested until its candidate is ready"
+)
+
+
+class SwapPool:
+    """Per-key pools of ready swap candidates, refilled in the background."""
+
+    def __init__(
+        self,
+        generate: Callable[[str, str, str, int], Awaitable[Optional[Dict]]],
+        size: int = SWAP_POOL_SIZE,
+        max_keys: int = SWAP_POOL_MAX_KEYS,
+        refill_concurrency: int = SWAP_POOL_REFILL_CONCURRENCY
+    ):
+        self.generate = generate
+        self.size = size
+        self.max_keys = max_keys
+        self.refill_concurrency = refill_concurrency
+        self._pools: "OrderedDict[str, deque]" = OrderedDict()
+        self._pending: Dict[str, int] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.hits = 0
+        self.misses = 0
+        pool_candidates.set_function(self.candidate_count)
+
+    def candidate_count(self) -> int:
+        """Total candidates ready across all keys."""
+        return sum(len(pool) for pool in self._pools.values())
+
+    def take(
+        self,
+        meal_type: str,
+        fitness_goal: str,
+        dietary_preference: str,
+        target_calories: int,
+        exclude_names: Optional[Set[str]] = None
+    ) -> Optional[Dict]:
+        """
+        Take a ready candidate and schedule a refill for its key.
+
+        Args:
+            meal_type: Type of meal (breakfast, lunch, dinner)
+            fitness_goal: User's fitness goal
+            dietary_preference: User's dietary preference
+            target_calories: Target calories for the meal
+            exclude_names: Meal names the swap must not return
+
+        Returns:
+            Copy of a candidate meal, or None if the key has none ready
+        """
+        key = make_cache_key(meal_type, fitness_goal, dietary_preference, target_calories)
+        pool = self._pools.get(key)
+        candidate = None
+
+        if pool:
+            self._pools.move_to_end(key)
+            for meal in list(pool):
+                if not exclude_names or meal["name"] not in exclude_names:
+                    pool.remove(meal)
+                    candidate = meal
+                    break
+
+        if candidate:
+            self.hits += 1
+            pool_hits.inc()
+        else:
+            self.misses += 1
+            pool_misses.inc()
+
+        self.warm(meal_type, fitness_goal, dietary_preference, target_calories)
+        return copy_meal(candidate) if candidate else None
+
+    def warm(
+        self,
+        meal_type: str,
+        fitness_goal: str,
+        dietary_preference: str,
+        target_calories: int
+    ):
+        """
+        Schedule background generation until the key holds `size` candidates.
+        Must be called from a running event loop.
+
+        Args:
+            meal_type: Type of meal (breakfast, lunch, dinner)
+            fitness_goal: User's fitness goal
+            dietary_preference: User's dietary preference
+            target_calories: Target calories for the meal
+        """
+        key = make_cache_key(meal_type, fitness_goal, dietary_preference, target_calories)
+        if key not in self._pools:
+            self._pools[key] = deque()
+            while len(self._pools) > self.max_keys:
+                evicted, _ = self._pools.popitem(last=False)
+                self._pending.pop(evicted, None)
+
+        missing = self.size - len(self._pools[key]) - self._pending.get(key, 0)
+        if missing <= 0:
+            return
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.refill_concurrency)
+
+        requested_at = time.monotonic()
+        self._pending[key] = self._pending.get(key, 0) + missing
+        for _ in range(missing):
+            task = asyncio.create_task(self._refill(
+                key, meal_type, fitness_goal, dietary_preference, target_calories, requested_at
+            ))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _refill(
+        self,
+        key: str,
+        meal_type: str,
+        fitness_goal: str,
+        dietary_preference: str,
+        target_calories: int,
+        requested_at: float
+    ):
+        meal_data = None
+        try:
+            async with self._semaphore:
+                meal_data = await self.generate(
+                    meal_type, fitness_goal, dietary_preference, target_calories
+                )
+        except Exception as e:
+            print(f"Swap pool refill failed for {key}: {e}")
+        finally:
+            if key in self._pending:
+                self._pending[key] = max(self._pending[key] - 1, 0)
+
+        pool = self._pools.get(key)
+        if not meal_data or pool is None:
+            pool_refills.inc(result="failed")
+            return
+
+        if all(m["name"] != meal_data["name"] for m in pool):
+            pool.append(copy_meal(meal_data))
+        pool_refills.inc(result="ok")
+        pool_refill_lag.observe(time.monotonic() - requested_at)
+
+    async def stop(self):
+        """Cancel in-flight refills (called on application shutdown)."""
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def clear(self):
+        """Drop all candidates and reset hit counters."""
+        self._pools.clear()
+        self._pending.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def get_stats(self) -> Dict:
+        """
+        Get pool statistics.
+
+        Returns:
+            Dictionary with hits, misses, hit rate, keys, ready candidates
+            and refills in flight
+        """
+        total = self.hits + self.misses
+        return {
+            "enabled": SWAP_POOL_ENABLED,
+            "size": self.size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            "keys": len(self._pools),
+            "candidates": self.candidate_count(),
+            "pending_refills": sum(self._pending.values()),
+            "refill_lag_seconds_avg": (
+                round(pool_refill_lag.get_sum() / pool_refill_lag.get_count(), 3)
+                if pool_refill_lag.get_count() else None
+            )
+        }
@@ -11,6 +11,8 @@ import uuid
 
 from main import app
 from database import Base, get_db
+from meal_cache import meal_cache
+from meal_generator import openai_breaker, openai_scheduler
 from models import Meal, MealPlan
 from schemas import UserProfileData, FitnessGoalEnum, DietaryPreferenceEnum
 
@@ -26,6 +28,27 @@ engine = create_engine(
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
+@pytest.fixture(autouse=True)
+def clear_meal_cache():
+    """
+    Start every test with an empty meal cache.
+    """
+    meal_cache.clear()
+    yield
+    meal_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_circuit_breaker():
+    """
+    Start every test with a closed OpenAI circuit and full rate limit buckets.
+    """
+    openai_breaker.reset()
+    openai_scheduler.reset()
+    yield
+    openai_breaker.reset()
+
+
 @pytest.fixture(scope="function")
 def db_session():
     """
@@ -0,0 +1,173 @@
+"""
+Tests for the provider circuit breaker.
+"""
+import asyncio
+import time
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+from circuit_breaker import CircuitBreaker, CLOSED, HALF_OPEN, OPEN
+from meal_generator import (
+    generate_meal_with_ai_async,
+    openai_breaker,
+    FALLBACK_MEALS
+)
+
+
+def make_breaker(**overrides):
+    settings = dict(
+        window_seconds=60, min_calls=4, failure_rate=0.5, slow_call_seconds=1.0,
+        slow_call_rate=0.5, open_seconds=60, half_open_probes=1, enabled=True
+    )
+    settings.update(overrides)
+    return CircuitBreaker("test", **settings)
+
+
+class TestCircuitBreaker:
+    """Tests for breaker state transitions."""
+
+    def test_opens_on_failure_rate(self):
+        """Test the circuit opens once the failure rate reaches the threshold."""
+        breaker = make_breaker()
+        for success in (True, False, True):
+            breaker.record(success, 0.1)
+        assert breaker.state == CLOSED
+
+        breaker.record(False, 0.1)
+
+        assert breaker.state == OPEN
+        assert breaker.allow() is False
+
+    def test_min_calls_before_judging(self):
+        """Test a few early failures do not open the circuit."""
+        breaker = make_breaker()
+        for _ in range(3):
+            breaker.record(False, 0.1)
+
+        assert breaker.state == CLOSED
+
+    def test_opens_on_slow_calls(self):
+        """Test successful but slow calls open the circuit."""
+        breaker = make_breaker()
+        for duration in (2.0, 0.1, 2.0, 0.1):
+            breaker.record(True, duration)
+
+        assert breaker.state == OPEN
+
+    def test_unmeasured_latency_is_ignored(self):
+        """Test calls recorded without latency never count as slow."""
+        breaker = make_breaker()
+        for _ in range(4):
+            breaker.record(True, 5.0, measure_latency=False)
+
+        assert breaker.state == CLOSED
+
+    def test_half_open_probe_closes_on_success(self):
+        """Test one probe is let through after the open period and closes the circuit."""
+        breaker = make_breaker(open_seconds=0.05)
+        for _ in range(4):
+            breaker.record(False, 0.1)
+        time.sleep(0.06)
+
+        assert breaker.allow() is True
+        assert breaker.state == HALF_OPEN
+        assert breaker.allow() is False
+
+        breaker.record(True, 0.1)
+
+        assert breaker.state == CLOSED
+        assert breaker.get_state()["calls"] == 0
+
+    def test_half_open_probe_failure_reopens(self):
+        """Test a failed probe opens the circuit again."""
+        breaker = make_breaker(open_seconds=0.05)
+        for _ in range(4):
+            breaker.record(False, 0.1)
+        time.sleep(0.06)
+
+        assert breaker.allow() is True
+        breaker.record(False, 0.1)
+
+        assert breaker.state == OPEN
+        assert breaker.allow() is False
+
+    def test_cancelled_probe_releases_slot(self):
+        """Test a probe that ends without an outcome frees the slot."""
+        breaker = make_breaker(open_seconds=0.05)
+        for _ in range(4):
+            breaker.record(False, 0.1)
+        time.sleep(0.06)
+        assert breaker.allow() is True
+
+        with pytest.raises(KeyboardInterrupt):
+            with breaker.track():
+                raise KeyboardInterrupt
+
+        assert breaker.state == HALF_OPEN
+        assert breaker.allow() is True
+
+    def test_track_records_exceptions_as_failures(self):
+        """Test exceptions inside track() count as failures."""
+        breaker = make_breaker(min_calls=1)
+
+        with pytest.raises(RuntimeError):
+            with breaker.track():
+                raise RuntimeError("provider down")
+
+        assert breaker.state == OPEN
+
+    def test_state_reports_retry_time(self):
+        """Test the health state includes when the next probe is allowed."""
+        breaker = make_breaker(min_calls=1)
+        breaker.record(False, 0.1)
+
+        state = breaker.get_state()
+
+        assert state["state"] == OPEN
+        assert state["failure_rate"] == 1.0
+        assert 0 < state["retry_in_seconds"] <= 60
+
+    def test_disabled_breaker_always_allows(self):
+        """Test a disabled breaker never opens."""
+        breaker = make_breaker(enabled=False, min_calls=1)
+        breaker.record(False, 0.1)
+
+        assert breaker.allow() is True
+
+
+class TestMealGenerationCircuit:
+    """Tests for meal generation behind the OpenAI breaker."""
+
+    @patch('meal_generator.MEAL_CACHE_ENABLED', False)
+    @patch('meal_generator.async_client')
+    def test_open_circuit_skips_openai(self, mock_client):
+        """Test an open circuit falls back without calling OpenAI."""
+        mock_client.chat.completions.create = AsyncMock(side_effect=Exception("API Error"))
+        for _ in range(openai_breaker.min_calls):
+            asyncio.run(generate_meal_with_ai_async("dinner", "bulk", "none", 800))
+        assert openai_breaker.state == OPEN
+        calls = mock_client.chat.completions.create.call_count
+
+        result = asyncio.run(generate_meal_with_ai_async("dinner", "bulk", "none", 800))
+
+        assert result == FALLBACK_MEALS["dinner"]["bulk"]
+        assert mock_client.chat.completions.create.call_count == calls
+
+    @patch('meal_generator.MEAL_CACHE_ENABLED', False)
+    @patch('meal_generator.async_client')
+    def test_async_timeouts_open_circuit(self, mock_client):
+        """Test timeouts count as failures on the async path."""
+        async def slow_create(**kwargs):
+            await asyncio.sleep(1)
+
+        mock_client.chat.completions.create = AsyncMock(side_effect=slow_create)
+
+        async def run():
+            for _ in range(openai_breaker.min_calls + 2):
+                await generate_meal_with_ai_async("lunch", "cut", "none", 600, timeout=0.01)
+
+        asyncio.run(run())
+
+        assert openai_breaker.state == OPEN
+        assert mock_client.chat.completions.create.call_count == openai_breaker.min_calls
@@ -0,0 +1,72 @@
+"""
+Tests for meal plan persistence helpers.
+"""
+import pytest
+import uuid
+from datetime import datetime, timezone
+from unittest.mock import MagicMock
+
+from crud import build_meal_rows, claim_generation_job, replace_meal
+from models import Meal, MealType, DayOfWeek
+
+
+class TestBuildMealRows:
+    """Tests for converting generated meals into table rows."""
+
+    def test_build_meal_rows(self, sample_weekly_meals):
+        """Test every generated meal becomes one row with enum columns."""
+        plan_id = uuid.uuid4()
+        user_id = uuid.uuid4()
+
+        rows = build_meal_rows(plan_id, user_id, sample_weekly_meals)
+
+        assert len(rows) == 21
+        assert rows[0]["day"] == DayOfWeek.MONDAY
+        assert rows[0]["meal_type"] == MealType.BREAKFAST
+        assert rows[-1]["day"] == DayOfWeek.SUNDAY
+        assert all(row["meal_plan_id"] == plan_id for row in rows)
+        assert len({row["id"] for row in rows}) == 21
+
+    def test_build_meal_rows_ignores_extra_keys(self, sample_meal_data):
+        """Test generation metadata such as generation_ms is not written."""
+        meal = dict(sample_meal_data, day="friday", meal_type="dinner", generation_ms=12.5)
+
+        rows = build_meal_rows(uuid.uuid4(), uuid.uuid4(), [meal])
+
+        assert "generation_ms" not in rows[0]
+        assert rows[0]["ingredients"] == sample_meal_data["ingredients"]
+
+
+class TestReplaceMeal:
+    """Tests for swapping a stored meal's contents."""
+
+    def test_replace_meal_overwrites_and_commits(self, sample_meal_data):
+        """Test the meal keeps its slot and takes the new meal's contents."""
+        db = MagicMock()
+        meal = Meal(
+            id=uuid.uuid4(), day=DayOfWeek.MONDAY, meal_type=MealType.LUNCH,
+            name="Old", calories=1, protein=1, carbs=1, fats=1, ingredients=[]
+        )
+
+        result = replace_meal(db, meal, sample_meal_data)
+
+        assert result is meal
+        assert meal.name == sample_meal_data["name"]
+        assert meal.calories == sample_meal_data["calories"]
+        assert meal.ingredients == sample_meal_data["ingredients"]
+        assert meal.day == DayOfWeek.MONDAY
+        db.commit.assert_called_once()
+        db.refresh.assert_called_once_with(meal)
+
+
+class TestClaimGenerationJob:
+    """Tests for taking a queued job exactly once."""
+
+    @pytest.mark.parametrize("rowcount,claimed", [(1, True), (0, False)])
+    def test_claim_reports_whether_row_changed(self, rowcount, claimed):
+        """Test the claim succeeds only when the queued row was updated."""
+        db = MagicMock()
+        db.execute.return_value.rowcount = rowcount
+
+        assert claim_generation_job(db, uuid.uuid4(), datetime.now(timezone.utc)) is claimed
+        db.commit.assert_called_once()
@@ -0,0 +1,35 @@
+"""
+Tests for running ORM helpers on sync and async sessions.
+"""
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import run_db
+
+
+def count_rows(db, table, limit=10):
+    return (db, table, limit)
+
+
+class TestRunDb:
+    """Tests for run_db dispatch."""
+
+    def test_sync_session_runs_inline(self):
+        """Test a sync Session is passed straight to the function."""
+        db = MagicMock()
+
+        result = asyncio.run(run_db(db, count_rows, "meals", limit=5))
+
+        assert result == (db, "meals", 5)
+
+    def test_async_session_uses_run_sync(self):
+        """Test an AsyncSession runs the function through run_sync."""
+        db = MagicMock(spec=AsyncSession)
+        db.run_sync = AsyncMock(return_value="rows")
+
+        result = asyncio.run(run_db(db, count_rows, "meals", limit=5))
+
+        assert result == "rows"
+        db.run_sync.assert_awaited_once_with(count_rows, "meals", limit=5)
@@ -0,0 +1,161 @@
+"""
+Tests for the background health monitor and the health endpoints.
+"""
+import asyncio
+import time
+from unittest.mock import AsyncMock, patch
+
+from fastapi.testclient import TestClient
+
+from health import HealthMonitor
+from main import app, health_monitor, startup_warmup
+
+
+def ok():
+    pass
+
+
+def broken():
+    raise ConnectionError("connection refused")
+
+
+class TestHealthMonitor:
+    """Tests for probing and cached status."""
+
+    def test_not_ready_before_first_probe(self):
+        """Critical checks count as down until they have been probed."""
+        monitor = HealthMonitor("test")
+        monitor.add_check("database", ok)
+
+        assert not monitor.is_ready()
+        assert monitor.snapshot()["checks"]["database"]["status"] == "unknown"
+
+    def test_probe_records_status_and_latency(self):
+        """A successful probe marks the check up with its latency."""
+        monitor = HealthMonitor("test")
+        monitor.add_check("database", ok)
+
+        asyncio.run(monitor.run_all())
+
+        check = monitor.snapshot()["checks"]["database"]
+        assert monitor.is_ready()
+        assert check["status"] == "up"
+        assert check["latency_ms"] is not None
+        assert check["checked_at"] is not None
+
+    def test_failing_check_records_error(self):
+        """A raising probe marks the check down and counts failures."""
+        monitor = HealthMonitor("test")
+        monitor.add_check("database", broken)
+
+        asyncio.run(monitor.run_all())
+        asyncio.run(monitor.run_all())
+
+        check = monitor.snapshot()["checks"]["database"]
+        assert not monitor.is_ready()
+        assert check["status"] == "down"
+        assert "connection refused" in check["error"]
+        assert check["consecutive_failures"] == 2
+
+    def test_slow_check_times_out(self):
+        """A probe slower than its timeout counts as failed."""
+        async def hang():
+            await asyncio.sleep(5)
+
+        monitor = HealthMonitor("test")
+        monitor.add_check("database", hang, timeout=0.05)
+
+        start = time.monotonic()
+        asyncio.run(monitor.run_all())
+
+        assert time.monotonic() - start < 1
+        assert "timed out" in monitor.snapshot()["checks"]["database"]["error"]
+
+    def test_non_critical_failure_degrades(self):
+        """A failing non-critical check leaves the service ready but degraded."""
+        monitor = HealthMonitor("test")
+        monitor.add_check("database", ok)
+        monitor.add_check("openai", broken, critical=False)
+
+        asyncio.run(monitor.run_all())
+
+        assert monitor.is_ready()
+        assert monitor.snapshot()["status"] == "degraded"
+
+    def test_background_probes_refresh(self):
+        """Started monitors keep probing on their interval until stopped."""
+        calls = []
+        monitor = HealthMonitor("test")
+        monitor.add_check("database", lambda: calls.append(1), interval=0.01)
+
+        async def run():
+            await monitor.start()
+            await asyncio.sleep(0.1)
+            await monitor.stop()
+
+        asyncio.run(run())
+
+        assert len(calls) > 2
+
+
+class TestHealthEndpoints:
+    """Tests for the health endpoints served from cached probes."""
+
+    def setup_method(self):
+        self.monitor = HealthMonitor("meal-planner-service")
+        self.monitor.add_check("database", ok)
+
+    def test_live_always_ok(self):
+        """/health/live answers without any probe."""
+        response = TestClient(app).get("/health/live")
+
+        assert response.status_code == 200
+
+    def test_ready_reflects_cached_probe(self):
+        """/health/ready is 503 until the database probe succeeds, without probing itself."""
+        with patch.object(health_monitor, "checks", self.monitor.checks), \
+                patch.object(startup_warmup, "complete", True):
+            assert TestClient(app).get("/health/ready").status_code == 503
+            asyncio.run(self.monitor.run_all())
+            response = TestClient(app).get("/health/ready")
+
+        assert response.status_code == 200
+        assert response.json()["checks"]["database"]["status"] == "up"
+
+    def test_health_does_not_query_database(self):
+        """/health reports the cached database status."""
+        asyncio.run(self.monitor.run_all())
+        with patch.object(health_monitor, "checks", self.monitor.checks), \
+                patch("database.SessionLocal", side_effect=AssertionError("queried")):
+            response = TestClient(app).get("/health")
+
+        assert response.json()["database"] == "connected"
+
+    def test_not_ready_during_warmup(self):
+        """/health/ready stays 503 while startup warm-up is running."""
+        asyncio.run(self.monitor.run_all())
+        with patch.object(health_monitor, "checks", self.monitor.checks), \
+                patch.object(startup_warmup, "complete", False):
+            response = TestClient(app).get("/health/ready")
+
+        assert response.status_code == 503
+        assert response.json()["status"] == "starting"
+
+    def test_live_during_slow_startup(self):
+        """Startup does not wait for the warm-up: liveness answers, readiness reports starting."""
+        async def slow_database():
+            await asyncio.sleep(10)
+
+        with patch("main.prepare_database", slow_database), \
+                patch("main.warm_up_openai", ok), \
+                patch("main.job_queue", new_callable=AsyncMock) as mock_jobs:
+            start = time.monotonic()
+            with TestClient(app) as client:
+                live = client.get("/health/live")
+                ready = client.get("/health/ready")
+
+        assert time.monotonic() - start < 5
+        assert live.status_code == 200
+        assert ready.status_code == 503
+        assert ready.json()["status"] == "starting"
+        mock_jobs.start.assert_not_called()
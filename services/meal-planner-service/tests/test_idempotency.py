@@ -0,0 +1,182 @@
+"""
+Tests for idempotent plan generation and the per-user generation lock.
+"""
+import asyncio
+import uuid
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from idempotency import (
+    IdempotentGenerations,
+    GenerationInProgressError,
+    IdempotencyKeyReusedError
+)
+from main import app, generations, get_user_id_from_token
+from schemas import MealPlanResponse
+
+
+def counting_generation(calls, result="plan", delay=0.01):
+    async def generate():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return result
+    return generate
+
+
+class TestIdempotentGenerations:
+    """Tests for the generation registry."""
+
+    def test_duplicate_attaches_to_running_generation(self):
+        """Test concurrent duplicates share one generation."""
+        registry = IdempotentGenerations()
+        calls = []
+
+        async def run():
+            return await asyncio.gather(
+                registry.run("user", None, "2025-11-24", counting_generation(calls)),
+                registry.run("user", None, "2025-11-24", counting_generation(calls))
+            )
+
+        results = asyncio.run(run())
+
+        assert len(calls) == 1
+        assert results == [("plan", "started"), ("plan", "attached")]
+
+    def test_different_request_while_running_conflicts(self):
+        """Test a generation for another week is refused while one runs."""
+        registry = IdempotentGenerations()
+
+        async def run():
+            first = asyncio.create_task(registry.run("user", None, "2025-11-24", counting_generation([])))
+            await asyncio.sleep(0)
+            with pytest.raises(GenerationInProgressError):
+                await registry.run("user", None, "2025-12-01", counting_generation([]))
+            await first
+
+        asyncio.run(run())
+
+    def test_users_do_not_block_each_other(self):
+        """Test the lock is per user."""
+        registry = IdempotentGenerations()
+        calls = []
+
+        async def run():
+            return await asyncio.gather(
+                registry.run("alice", None, "2025-11-24", counting_generation(calls)),
+                registry.run("bob", None, "2025-11-24", counting_generation(calls))
+            )
+
+        asyncio.run(run())
+
+        assert len(calls) == 2
+
+    def test_finished_result_replayed_by_key(self):
+        """Test a repeated Idempotency-Key returns the stored result."""
+        registry = IdempotentGenerations()
+        calls = []
+
+        async def run():
+            await registry.run("user", "key-1", "2025-11-24", counting_generation(calls))
+            return await registry.run("user", "key-1", "2025-11-24", counting_generation(calls))
+
+        assert asyncio.run(run()) == ("plan", "replayed")
+        assert len(calls) == 1
+
+    def test_attached_key_is_stored_too(self):
+        """Test a duplicate's own key replays the shared result later."""
+        registry = IdempotentGenerations()
+        calls = []
+
+        async def run():
+            await asyncio.gather(
+                registry.run("user", "click-1", "2025-11-24", counting_generation(calls)),
+                registry.run("user", "click-2", "2025-11-24", counting_generation(calls))
+            )
+            return await registry.run("user", "click-2", "2025-11-24", counting_generation(calls))
+
+        assert asyncio.run(run()) == ("plan", "replayed")
+        assert len(calls) == 1
+
+    def test_key_reused_for_different_request(self):
+        """Test reusing a key with other parameters is rejected."""
+        registry = IdempotentGenerations()
+
+        async def run():
+            await registry.run("user", "key-1", "2025-11-24", counting_generation([]))
+            await registry.run("user", "key-1", "2025-12-01", counting_generation([]))
+
+        with pytest.raises(IdempotencyKeyReusedError):
+            asyncio.run(run())
+
+    def test_failed_generation_is_not_stored(self):
+        """Test a retry after a failure generates again."""
+        registry = IdempotentGenerations()
+        calls = []
+
+        async def failing():
+            calls.append(1)
+            raise RuntimeError("boom")
+
+        async def run():
+            with pytest.raises(RuntimeError):
+                await registry.run("user", "key-1", "2025-11-24", failing)
+            return await registry.run("user", "key-1", "2025-11-24", counting_generation(calls))
+
+        assert asyncio.run(run()) == ("plan", "started")
+        assert len(calls) == 2
+
+    def test_expired_result_is_not_replayed(self):
+        """Test results are only replayed within the TTL."""
+        registry = IdempotentGenerations(ttl=0)
+        calls = []
+
+        async def run():
+            await registry.run("user", "key-1", "2025-11-24", counting_generation(calls))
+            return await registry.run("user", "key-1", "2025-11-24", counting_generation(calls))
+
+        assert asyncio.run(run())[1] == "started"
+        assert len(calls) == 2
+
+
+class TestGenerateEndpointIdempotency:
+    """Tests for Idempotency-Key handling on POST /api/meal-planner/generate."""
+
+    def post(self, mock_user_id, headers=None):
+        app.dependency_overrides[get_user_id_from_token] = lambda: mock_user_id
+        try:
+            # No context manager: startup (database, job workers) is not needed
+            return TestClient(app).post("/api/meal-planner/generate", json={}, headers=headers or {})
+        finally:
+            app.dependency_overrides.pop(get_user_id_from_token, None)
+
+    @patch('main.job_session_factory')
+    @patch('main.create_weekly_plan')
+    def test_repeated_key_replays_plan(self, mock_create, mock_session, mock_user_id):
+        """Test a retried request with the same key does not generate again."""
+        generations.clear()
+        mock_session.return_value = MagicMock()
+        plan = MealPlanResponse(
+            plan_id=str(uuid.uuid4()),
+            week_start="2025-11-24",
+            meals=[],
+            generated_at=datetime(2025, 11, 24)
+        )
+
+        async def create(*args, **kwargs):
+            return plan
+
+        mock_create.side_effect = create
+        headers = {"Idempotency-Key": str(uuid.uuid4())}
+
+        first = self.post(mock_user_id, headers)
+        second = self.post(mock_user_id, headers)
+
+        assert first.status_code == 200
+        assert second.status_code == 200
+        assert second.json()["plan_id"] == plan.plan_id
+        assert "Idempotent-Replayed" not in first.headers
+        assert second.headers["Idempotent-Replayed"] == "true"
+        assert mock_create.call_count == 1
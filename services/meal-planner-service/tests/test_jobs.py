@@ -0,0 +1,242 @@
+"""
+Tests for the background plan generation job queue.
+"""
+import asyncio
+import uuid
+from datetime import date, timedelta
+from unittest.mock import AsyncMock, MagicMock, Mock, patch
+
+import pytest
+
+import main
+from jobs import PlanJobQueue, QueueFullError
+from llm_scheduler import BATCH, PLAN, current_priority
+from models import JobStatus
+
+
+class TestPlanJobQueue:
+    """Tests for the in-process worker pool."""
+
+    def test_workers_run_enqueued_jobs(self):
+        """Test every enqueued job id is passed to run_job."""
+        ran = []
+
+        async def run_job(job_id):
+            ran.append(job_id)
+
+        async def scenario():
+            queue = PlanJobQueue(run_job, workers=2, max_queued=10)
+            await queue.start()
+            for i in range(5):
+                queue.enqueue(f"job-{i}")
+            await queue._queue.join()
+            await queue.stop()
+
+        asyncio.run(scenario())
+
+        assert sorted(ran) == [f"job-{i}" for i in range(5)]
+
+    def test_enqueue_rejects_when_full(self):
+        """Test enqueue raises once max_queued jobs are waiting."""
+        async def run_job(job_id):
+            await asyncio.sleep(10)
+
+        async def scenario():
+            queue = PlanJobQueue(run_job, workers=1, max_queued=1)
+            await queue.start()
+            queue.enqueue("running")
+            await asyncio.sleep(0)  # let the worker take the first job
+            queue.enqueue("waiting")
+            with pytest.raises(QueueFullError):
+                queue.enqueue("rejected")
+            assert queue.depth() == 1
+            await queue.stop()
+
+        asyncio.run(scenario())
+
+    def test_failing_job_does_not_stop_worker(self):
+        """Test a worker keeps serving jobs after one raises."""
+        ran = []
+
+        async def run_job(job_id):
+            if job_id == "bad":
+                raise RuntimeError("boom")
+            ran.append(job_id)
+
+        async def scenario():
+            queue = PlanJobQueue(run_job, workers=1, max_queued=10)
+            await queue.start()
+            queue.enqueue("bad")
+            queue.enqueue("good")
+            await queue._queue.join()
+            await queue.stop()
+
+        asyncio.run(scenario())
+
+        assert ran == ["good"]
+
+    def test_enqueue_before_start_fails(self):
+        """Test jobs cannot be queued before the workers start."""
+        async def run_job(job_id):
+            pass
+
+        with pytest.raises(RuntimeError):
+            PlanJobQueue(run_job).enqueue("job")
+
+
+class TestRunGenerationJob:
+    """Tests for running one plan-generation job."""
+
+    @patch('main.claim_generation_job', return_value=True)
+    @patch('main.create_weekly_plan')
+    @patch('main.update_generation_job')
+    @patch('main.get_generation_job')
+    @patch('main.job_session_factory')
+    def test_progress_written_outside_generation(
+        self, mock_session, mock_get_job, mock_update, mock_create, mock_claim, sample_weekly_meals
+    ):
+        """Test slots finishing together share one progress write and the final update has them all."""
+        job_id = uuid.uuid4()
+        mock_session.side_effect = lambda: MagicMock()
+        mock_get_job.return_value = Mock(id=job_id, user_id=uuid.uuid4(), week_start=date(2025, 11, 24))
+        plan_id = str(uuid.uuid4())
+
+        async def create(user_id, week_start, db, on_meal=None):
+            for meal in sample_weekly_meals[:7]:
+                on_meal(meal)
+            await asyncio.sleep(0.01)
+            for meal in sample_weekly_meals[7:]:
+                on_meal(meal)
+            return Mock(plan_id=plan_id)
+
+        mock_create.side_effect = create
+
+        asyncio.run(main.run_generation_job(str(job_id)))
+
+        writes = [call.kwargs for call in mock_update.call_args_list]
+        assert mock_claim.call_args.args[1] == job_id
+        assert [w["completed_slots"] for w in writes[:-1]] == [7]
+        assert writes[-1]["status"] == JobStatus.SUCCEEDED
+        assert writes[-1]["completed_slots"] == 21
+        assert writes[-1]["meal_plan_id"] == uuid.UUID(plan_id)
+
+    @patch('main.claim_generation_job', return_value=True)
+    @patch('main.create_weekly_plan')
+    @patch('main.update_generation_job')
+    @patch('main.get_generation_job')
+    @patch('main.job_session_factory')
+    def test_generation_runs_at_batch_priority(
+        self, mock_session, mock_get_job, mock_update, mock_create, mock_claim
+    ):
+        """Test a queued job's LLM calls are scheduled as batch work."""
+        mock_session.return_value = MagicMock()
+        mock_get_job.return_value = Mock(id=uuid.uuid4(), user_id=uuid.uuid4(), week_start=date(2025, 11, 24))
+        priorities = []
+
+        async def create(user_id, week_start, db, on_meal=None):
+            priorities.append(current_priority())
+            return Mock(plan_id=str(uuid.uuid4()))
+
+        mock_create.side_effect = create
+
+        asyncio.run(main.run_generation_job("job"))
+
+        assert priorities == [BATCH]
+        assert current_priority() == PLAN
+
+    @patch('main.claim_generation_job', return_value=True)
+    @patch('main.create_weekly_plan')
+    @patch('main.update_generation_job')
+    @patch('main.get_generation_job')
+    @patch('main.job_session_factory')
+    def test_failure_recorded_with_progress(
+        self, mock_session, mock_get_job, mock_update, mock_create, mock_claim, sample_weekly_meals
+    ):
+        """Test a failed generation marks the job failed and keeps the finished slots."""
+        session = MagicMock()
+        mock_session.return_value = session
+        mock_get_job.return_value = Mock(id=uuid.uuid4(), user_id=uuid.uuid4(), week_start=date(2025, 11, 24))
+
+        async def create(user_id, week_start, db, on_meal=None):
+            on_meal(sample_weekly_meals[0])
+            raise RuntimeError("OpenAI unavailable")
+
+        mock_create.side_effect = create
+
+        asyncio.run(main.run_generation_job("job"))
+
+        final = mock_update.call_args.kwargs
+        assert final["status"] == JobStatus.FAILED
+        assert final["error"] == "OpenAI unavailable"
+        assert final["completed_slots"] == 1
+        session.rollback.assert_called_once()
+
+    @patch('main.claim_generation_job', return_value=False)
+    @patch('main.create_weekly_plan')
+    @patch('main.get_generation_job')
+    @patch('main.job_session_factory')
+    def test_job_claimed_elsewhere_is_skipped(self, mock_session, mock_get_job, mock_create, mock_claim):
+        """Test a job queued twice after a restart only runs once."""
+        mock_session.return_value = MagicMock()
+        mock_get_job.return_value = Mock(id=uuid.uuid4(), user_id=uuid.uuid4(), week_start=date(2025, 11, 24))
+
+        asyncio.run(main.run_generation_job("job"))
+
+        mock_create.assert_not_called()
+
+
+class TestJobRecovery:
+    """Tests for recovering jobs a restart left behind."""
+
+    def test_recover_runs_on_start_and_periodically(self):
+        """Test recover is called once the workers start and then every interval."""
+        calls = []
+
+        async def run_job(job_id):
+            pass
+
+        async def recover(on_start):
+            calls.append(on_start)
+            if on_start:
+                raise RuntimeError("database down")
+
+        async def scenario():
+            queue = PlanJobQueue(run_job, workers=1, recover=recover, recover_interval=0.01)
+            await queue.start()
+            await asyncio.sleep(0.035)
+            await queue.stop()
+
+        asyncio.run(scenario())
+
+        assert calls[0] is True
+        assert len(calls) >= 3 and not any(calls[1:])
+
+    @patch('main.list_queued_generation_jobs')
+    @patch('main.fail_stale_generation_jobs', return_value=2)
+    @patch('main.job_session_factory')
+    def test_start_fails_stale_and_requeues_queued(self, mock_session, mock_fail, mock_list):
+        """Test stale running jobs are failed and every queued job is queued again on start."""
+        mock_session.return_value = MagicMock()
+        queued = [uuid.uuid4(), uuid.uuid4(), uuid.uuid4()]
+        mock_list.return_value = queued
+        job_queue = PlanJobQueue(AsyncMock(), max_queued=2)
+        job_queue._queue = asyncio.Queue(maxsize=2)
+
+        with patch('main.job_queue', job_queue):
+            asyncio.run(main.recover_generation_jobs(True))
+
+        started_before = mock_fail.call_args.args[1]
+        created_before = mock_list.call_args.args[1]
+        assert created_before - started_before == timedelta(seconds=main.MEAL_JOB_STALE_SECONDS)
+        assert [job_queue._queue.get_nowait()[0] for _ in range(2)] == [str(queued[0]), str(queued[1])]
+
+    @patch('main.list_queued_generation_jobs', return_value=[])
+    @patch('main.fail_stale_generation_jobs', return_value=0)
+    @patch('main.job_session_factory')
+    def test_later_sweeps_only_take_old_queued_jobs(self, mock_session, mock_fail, mock_list):
+        """Test periodic sweeps leave recently queued jobs to the replica that queued them."""
+        mock_session.return_value = MagicMock()
+
+        asyncio.run(main.recover_generation_jobs(False))
+
+        assert mock_list.call_args.args[1] == mock_fail.call_args.args[1]
@@ -0,0 +1,225 @@
+"""
+Tests for the priority-aware LLM scheduler.
+"""
+import asyncio
+import threading
+import time
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from llm_scheduler import (
+    BATCH,
+    INTERACTIVE,
+    PLAN,
+    LLMDeadlineExceededError,
+    LLMQueueFullError,
+    LLMScheduler,
+    TokenBucket,
+    current_priority,
+    llm_priority,
+    queue_wait
+)
+from meal_generator import (
+    generate_meal_with_ai_async,
+    generate_swap_candidate_async,
+    openai_breaker,
+    openai_scheduler,
+    FALLBACK_MEALS
+)
+from metrics import render_metrics
+
+
+def drain(scheduler):
+    """Empty both buckets so every request has to queue."""
+    scheduler.requests.tokens = 0
+    scheduler.tokens.tokens = 0
+
+
+class TestTokenBucket:
+    """Tests for bucket refill and reserves."""
+
+    def test_wait_time_covers_missing_tokens(self):
+        """Test the wait is the time needed to refill the shortfall."""
+        bucket = TokenBucket(60)
+        bucket.tokens = 0
+
+        assert bucket.wait_time(1, 0.0) == pytest.approx(1.0)
+
+    def test_reserve_is_kept_back(self):
+        """Test a reserve share cannot be taken."""
+        bucket = TokenBucket(100)
+        bucket.tokens = 20
+
+        assert bucket.wait_time(10, 0.0) == 0.0
+        assert bucket.wait_time(10, 0.25) > 0
+
+    def test_oversized_request_waits_for_full_bucket(self):
+        """Test a request larger than the bucket is still granted eventually."""
+        bucket = TokenBucket(100)
+
+        assert bucket.wait_time(1000, 0.0) == 0.0
+
+
+class TestLLMScheduler:
+    """Tests for slot granting, priorities, queue bounds and deadlines."""
+
+    def test_grants_immediately_with_capacity(self):
+        """Test requests go straight through while the buckets have room."""
+        scheduler = LLMScheduler("test", 60, 10000)
+
+        scheduler.acquire(PLAN, tokens=500)
+
+        assert scheduler.tokens.tokens == pytest.approx(9500, abs=1)
+        assert scheduler.queued(PLAN) == 0
+
+    @patch.dict('llm_scheduler.RESERVES', {INTERACTIVE: 0.0, PLAN: 0.0, BATCH: 0.0})
+    def test_higher_priority_served_first(self):
+        """Test an interactive request overtakes queued batch and plan requests."""
+        scheduler = LLMScheduler("test", 600, 1000000)
+        drain(scheduler)
+        order = []
+
+        def request(priority):
+            scheduler.acquire(priority, deadline=5)
+            order.append(priority)
+
+        threads = [threading.Thread(target=request, args=(priority,)) for priority in (BATCH, PLAN)]
+        for thread in threads:
+            thread.start()
+        while scheduler.queued(BATCH) + scheduler.queued(PLAN) < 2:
+            time.sleep(0.001)
+        threads.append(threading.Thread(target=request, args=(INTERACTIVE,)))
+        threads[-1].start()
+        for thread in threads:
+            thread.join()
+
+        assert order == [INTERACTIVE, PLAN, BATCH]
+
+    def test_batch_leaves_reserve_for_interactive(self):
+        """Test batch work cannot use the last share of the bucket."""
+        scheduler = LLMScheduler("test", 4, 1000000)
+        scheduler.acquire(BATCH)
+        scheduler.acquire(BATCH)
+        scheduler.acquire(BATCH)
+
+        with pytest.raises(LLMDeadlineExceededError):
+            scheduler.acquire(BATCH, deadline=0.01)
+        scheduler.acquire(INTERACTIVE, deadline=0.01)
+
+    def test_deadline_exceeded(self):
+        """Test a request that cannot be served in time is rejected and leaves the queue."""
+        scheduler = LLMScheduler("test", 1, 1000)
+        drain(scheduler)
+
+        with pytest.raises(LLMDeadlineExceededError):
+            scheduler.acquire(PLAN, deadline=0.01)
+        assert scheduler.queued(PLAN) == 0
+
+    def test_queue_full_rejected(self):
+        """Test requests beyond the queue bound are rejected at once."""
+        scheduler = LLMScheduler("test", 1, 1000, max_queued=1)
+        drain(scheduler)
+        errors = []
+
+        def request():
+            try:
+                scheduler.acquire(BATCH, deadline=0.2)
+            except LLMDeadlineExceededError as e:
+                errors.append(e)
+
+        waiter = threading.Thread(target=request)
+        waiter.start()
+        while scheduler.queued(BATCH) < 1:
+            time.sleep(0.001)
+
+        with pytest.raises(LLMQueueFullError):
+            scheduler.acquire(BATCH)
+        waiter.join()
+        assert len(errors) == 1
+
+    def test_async_waiter_granted_after_refill(self):
+        """Test an async request is woken once the bucket refills."""
+        scheduler = LLMScheduler("test", 600, 1000000)
+        drain(scheduler)
+
+        async def run():
+            start = time.monotonic()
+            await scheduler.acquire_async(INTERACTIVE, deadline=1)
+            return time.monotonic() - start
+
+        waited = asyncio.run(run())
+
+        assert 0.05 <= waited < 0.5
+
+    def test_cancelled_async_waiter_leaves_queue(self):
+        """Test cancelling a waiting caller frees its queue place."""
+        scheduler = LLMScheduler("test", 1, 1000)
+        drain(scheduler)
+
+        async def run():
+            task = asyncio.create_task(scheduler.acquire_async(PLAN, deadline=5))
+            await asyncio.sleep(0.01)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(run())
+
+        assert scheduler.queued(PLAN) == 0
+
+    def test_priority_context(self):
+        """Test llm_priority sets the default priority inside the block."""
+        assert current_priority() == PLAN
+        with llm_priority(INTERACTIVE):
+            assert current_priority() == INTERACTIVE
+        assert current_priority() == PLAN
+
+    def test_wait_time_metric(self):
+        """Test queue wait time is exported per provider and priority."""
+        scheduler = LLMScheduler("metrics-test", 60, 1000)
+        scheduler.acquire(INTERACTIVE)
+
+        assert queue_wait.get_count(provider="metrics-test", priority="interactive") == 1
+        assert 'llm_queue_wait_seconds_count{priority="interactive",provider="metrics-test"}' in render_metrics()
+
+
+class TestMealGenerationScheduling:
+    """Tests for meal generation going through the OpenAI scheduler."""
+
+    @patch('meal_generator.MEAL_CACHE_ENABLED', False)
+    @patch('meal_generator.async_client')
+    def test_no_slot_falls_back_without_calling_openai(self, mock_client):
+        """Test a request that gets no slot uses the fallback meal."""
+        mock_client.chat.completions.create = AsyncMock()
+        drain(openai_scheduler)
+
+        with patch('llm_scheduler.LLM_DEADLINES', {INTERACTIVE: 0.01, PLAN: 0.01, BATCH: 0.01}):
+            result = asyncio.run(generate_meal_with_ai_async("dinner", "bulk", "none", 800))
+
+        assert result == FALLBACK_MEALS["dinner"]["bulk"]
+        mock_client.chat.completions.create.assert_not_called()
+        assert openai_breaker.get_state()["calls"] == 0
+
+    @patch('meal_generator.MEAL_CACHE_ENABLED', False)
+    @patch('meal_generator.async_client')
+    def test_swap_candidates_run_at_batch_priority(self, mock_client):
+        """Test swap pool refills are scheduled as background work."""
+        priorities = []
+        original = openai_scheduler.acquire_async
+
+        async def record(priority=None, **kwargs):
+            priorities.append(current_priority() if priority is None else priority)
+            return await original(priority, **kwargs)
+
+        mock_client.chat.completions.create = AsyncMock(side_effect=Exception("API Error"))
+
+        async def run():
+            with llm_priority(INTERACTIVE):
+                await generate_swap_candidate_async("lunch", "cut", "none", 600)
+            await generate_meal_with_ai_async("lunch", "cut", "none", 600, use_cache=False)
+
+        with patch.object(openai_scheduler, 'acquire_async', side_effect=record):
+            asyncio.run(run())
+
+        assert priorities == [BATCH, PLAN]
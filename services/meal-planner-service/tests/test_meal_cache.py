@@ -0,0 +1,244 @@
+"""
+Tests for the generated-meal cache.
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+
+from meal_cache import MealCache, make_cache_key, get_calorie_bucket
+from meal_generator import generate_meal_with_ai_async
+
+
+def make_meal(name, calories=500):
+    return {
+        "name": name,
+        "calories": calories,
+        "protein": 30.0,
+        "carbs": 50.0,
+        "fats": 15.0,
+        "ingredients": ["ingredient 1", "ingredient 2"]
+    }
+
+
+class TestCacheKey:
+    """Tests for cache key normalization."""
+
+    def test_calorie_bucket_rounds_to_width(self):
+        """Test calorie targets are rounded to the bucket width."""
+        assert get_calorie_bucket(549, 100) == 500
+        assert get_calorie_bucket(551, 100) == 600
+
+    def test_cache_key_normalizes_inputs(self):
+        """Test keys ignore case, whitespace and nearby calorie targets."""
+        key_a = make_cache_key("Lunch", " cut", "VEGAN", 690, 100)
+        key_b = make_cache_key("lunch", "cut", "vegan", 710, 100)
+
+        assert key_a == key_b == "meal:lunch:cut:vegan:700"
+
+
+class TestMealCache:
+    """Tests for the local cache tier."""
+
+    def test_miss_until_variant_pool_is_full(self):
+        """Test a key only hits once it holds enough variants."""
+        cache = MealCache(variants=2)
+        cache.add("lunch", "cut", "none", 700, make_meal("A"))
+
+        assert cache.get("lunch", "cut", "none", 700) is None
+
+        cache.add("lunch", "cut", "none", 700, make_meal("B"))
+
+        assert cache.get("lunch", "cut", "none", 700)["name"] in {"A", "B"}
+
+    def test_round_robin_returns_different_meals(self):
+        """Test the round-robin variety policy rotates through variants."""
+        cache = MealCache(variants=3, variety="round_robin")
+        for name in ["A", "B", "C"]:
+            cache.add("dinner", "bulk", "none", 900, make_meal(name))
+
+        names = [cache.get("dinner", "bulk", "none", 900)["name"] for _ in range(4)]
+
+        assert names == ["A", "B", "C", "A"]
+
+    def test_returned_meals_are_copies(self):
+        """Test callers cannot mutate cached meals."""
+        cache = MealCache(variants=1)
+        cache.add("lunch", "cut", "none", 700, make_meal("A"))
+
+        meal = cache.get("lunch", "cut", "none", 700)
+        meal["day"] = "monday"
+        meal["ingredients"].append("extra")
+
+        again = cache.get("lunch", "cut", "none", 700)
+        assert "day" not in again
+        assert len(again["ingredients"]) == 2
+
+    def test_ttl_expiry(self):
+        """Test expired meals are not served."""
+        cache = MealCache(variants=1, ttl_seconds=60)
+        with patch('meal_cache.time.time', return_value=1000.0):
+            cache.add("lunch", "cut", "none", 700, make_meal("A"))
+
+        with patch('meal_cache.time.time', return_value=1059.0):
+            assert cache.get("lunch", "cut", "none", 700) is not None
+        with patch('meal_cache.time.time', return_value=1061.0):
+            assert cache.get("lunch", "cut", "none", 700) is None
+
+    def test_size_eviction_drops_least_recently_used(self):
+        """Test the cache evicts the least recently used key when full."""
+        cache = MealCache(variants=1, max_keys=2)
+        cache.add("breakfast", "cut", "none", 400, make_meal("A"))
+        cache.add("lunch", "cut", "none", 700, make_meal("B"))
+        cache.get("breakfast", "cut", "none", 400)
+        cache.add("dinner", "cut", "none", 800, make_meal("C"))
+
+        assert cache.get("lunch", "cut", "none", 700) is None
+        assert cache.get("breakfast", "cut", "none", 400)["name"] == "A"
+
+    def test_shared_backend_hit_populates_local_tier(self):
+        """Test a shared-tier hit is served and copied into the local tier."""
+        backend = Mock()
+        backend.get_pool.return_value = [make_meal("Shared")]
+        cache = MealCache(variants=1, backend=backend)
+
+        assert cache.get("lunch", "cut", "none", 700)["name"] == "Shared"
+
+        backend.get_pool.side_effect = Exception("down")
+        assert cache.get("lunch", "cut", "none", 700)["name"] == "Shared"
+
+    def test_stats_report_hit_rate(self):
+        """Test stats expose hits and misses."""
+        cache = MealCache(variants=1)
+        before = cache.get_stats()
+        cache.get("lunch", "cut", "none", 700)
+        cache.add("lunch", "cut", "none", 700, make_meal("A"))
+        cache.get("lunch", "cut", "none", 700)
+        after = cache.get_stats()
+
+        assert after["hits"] == before["hits"] + 1
+        assert after["misses"] == before["misses"] + 1
+
+
+class TestAsyncSharedBackend:
+    """Tests for reaching the shared backend without blocking the event loop."""
+
+    def test_slow_backend_does_not_block_loop(self):
+        """Test the event loop keeps running while the shared tier answers."""
+        backend = Mock()
+        backend_threads = []
+
+        def slow_get_pool(key):
+            time.sleep(0.05)
+            backend_threads.append(threading.current_thread())
+            return [make_meal("Shared")]
+
+        backend.get_pool.side_effect = slow_get_pool
+        cache = MealCache(variants=1, backend=backend)
+        ticks = []
+
+        async def tick():
+            for _ in range(5):
+                ticks.append(time.perf_counter())
+                await asyncio.sleep(0.005)
+
+        async def run():
+            meal, _ = await asyncio.gather(cache.get_async("lunch", "cut", "none", 700), tick())
+            return meal
+
+        assert asyncio.run(run())["name"] == "Shared"
+        assert len(ticks) == 5 and ticks[-1] - ticks[0] < 0.05
+        assert backend_threads[0] is not threading.main_thread()
+
+    def test_add_async_writes_shared_tier(self):
+        """Test add_async stores locally and writes the shared tier."""
+        backend = Mock()
+        backend.get_pool.return_value = []
+        cache = MealCache(variants=1, backend=backend)
+
+        asyncio.run(cache.add_async("lunch", "cut", "none", 700, make_meal("A")))
+
+        assert cache.get("lunch", "cut", "none", 700)["name"] == "A"
+        backend.add.assert_called_once()
+        assert backend.add.call_args.args[0] == "meal:lunch:cut:none:700"
+
+
+class TestScaledCacheHits:
+    """Tests for serving misses with portion-scaled meals from other buckets."""
+
+    def test_miss_served_by_scaling_other_buckets(self):
+        """Test a cold bucket is served by rescaling meals from a nearby bucket."""
+        cache = MealCache(variants=2, bucket_width=100, portion_scaling=True)
+        cache.add("lunch", "cut", "none", 500, make_meal("A", 500))
+        cache.add("lunch", "cut", "none", 500, make_meal("B", 500))
+
+        meal = cache.get("lunch", "cut", "none", 650)
+
+        assert meal["name"] in {"A", "B"}
+        assert meal["calories"] == 650
+        assert meal["protein"] == 39.0
+
+    def test_scaled_hits_follow_round_robin(self):
+        """Test scaled hits rotate through the scalable meals like a regular pool."""
+        cache = MealCache(variants=2, bucket_width=100, variety="round_robin", portion_scaling=True)
+        cache.add("lunch", "cut", "none", 500, make_meal("A", 500))
+        cache.add("lunch", "cut", "none", 500, make_meal("B", 500))
+
+        names = [cache.get("lunch", "cut", "none", 650)["name"] for _ in range(4)]
+
+        assert names == ["A", "B", "A", "B"]
+
+    def test_scaled_hits_follow_first(self):
+        """Test variety "first" always serves the same scaled meal."""
+        cache = MealCache(variants=2, bucket_width=100, variety="first", portion_scaling=True)
+        cache.add("lunch", "cut", "none", 500, make_meal("B", 500))
+        cache.add("lunch", "cut", "none", 500, make_meal("A", 500))
+
+        names = {cache.get("lunch", "cut", "none", 650)["name"] for _ in range(5)}
+
+        assert names == {"A"}
+
+    def test_no_scaled_hit_without_enough_variants(self):
+        """Test scaling follows the same variant rule as regular hits."""
+        cache = MealCache(variants=2, bucket_width=100, portion_scaling=True)
+        cache.add("lunch", "cut", "none", 500, make_meal("A", 500))
+
+        assert cache.get("lunch", "cut", "none", 650) is None
+
+    def test_no_scaled_hit_beyond_scale_range(self):
+        """Test meals are not stretched to far-off calorie targets."""
+        cache = MealCache(variants=1, bucket_width=100, portion_scaling=True)
+        cache.add("lunch", "cut", "none", 400, make_meal("A", 400))
+
+        assert cache.get("lunch", "cut", "none", 1000) is None
+
+    def test_scaling_can_be_disabled(self):
+        """Test portion_scaling=False keeps other buckets as misses."""
+        cache = MealCache(variants=1, bucket_width=100, portion_scaling=False)
+        cache.add("lunch", "cut", "none", 500, make_meal("A", 500))
+
+        assert cache.get("lunch", "cut", "none", 650) is None
+
+
+class TestMealGeneratorCaching:
+    """Tests for cache use in generate_meal_with_ai_async."""
+
+    @patch('meal_generator.meal_cache', MealCache(variants=1))
+    @patch('meal_generator.async_client')
+    def test_second_call_is_served_from_cache(self, mock_client):
+        """Test an identical generation does not call OpenAI again."""
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = (
+            '{"name": "Cached Meal", "calories": 700, "protein": 40.0, '
+            '"carbs": 60.0, "fats": 20.0, "ingredients": ["a", "b"]}'
+        )
+        mock_client.chat.completions.create = AsyncMock(return_value=mock_response)
+
+        first = asyncio.run(generate_meal_with_ai_async("lunch", "maintain", "none", 700))
+        second = asyncio.run(generate_meal_with_ai_async("lunch", "maintain", "none", 720))
+
+        assert first["name"] == second["name"] == "Cached Meal"
+        assert mock_client.chat.completions.create.call_count == 1
@@ -0,0 +1,132 @@
+"""
+Tests for the offline meal catalog.
+"""
+import asyncio
+import pytest
+from unittest.mock import patch
+
+from meal_catalog import MealCatalog, set_catalog
+from meal_generator import generate_weekly_meals_async, get_weekly_slots
+
+
+def catalog_meal(name, meal_type="lunch", fitness_goal="maintain", dietary_preference="none", calories=700):
+    return {
+        "name": name,
+        "meal_type": meal_type,
+        "fitness_goal": fitness_goal,
+        "dietary_preference": dietary_preference,
+        "calories": calories,
+        "protein": 40.0,
+        "carbs": 70.0,
+        "fats": 20.0,
+        "ingredients": ["ingredient 1", "ingredient 2"],
+        "created_at": 0
+    }
+
+
+@pytest.fixture
+def use_catalog():
+    """Install a catalog for the duration of a test."""
+    def install(catalog):
+        set_catalog(catalog)
+        return catalog
+    yield install
+    set_catalog(None)
+
+
+class TestMealCatalogLookup:
+    """Tests for indexed catalog lookups."""
+
+    def test_find_closest_calories_within_tolerance(self):
+        """Test the meal closest to the target is returned."""
+        catalog = MealCatalog([
+            catalog_meal("Low", calories=600),
+            catalog_meal("Close", calories=690),
+            catalog_meal("High", calories=760)
+        ])
+
+        meal = catalog.find("lunch", "maintain", "none", 700, tolerance=0.1)
+
+        assert meal["name"] == "Close"
+        assert "meal_type" not in meal
+
+    def test_find_outside_tolerance_misses(self):
+        """Test meals outside the calorie tolerance are not used."""
+        catalog = MealCatalog([catalog_meal("Far", calories=1000)])
+
+        assert catalog.find("lunch", "maintain", "none", 700, tolerance=0.1) is None
+
+    def test_find_respects_dietary_compatibility(self):
+        """Test vegan meals satisfy vegetarian requests but not the reverse."""
+        catalog = MealCatalog([
+            catalog_meal("Vegan Bowl", dietary_preference="vegan"),
+            catalog_meal("Cheese Plate", dietary_preference="vegetarian", calories=705)
+        ])
+
+        assert catalog.find("lunch", "maintain", "vegetarian", 705)["name"] == "Cheese Plate"
+        assert catalog.find("lunch", "maintain", "vegan", 705)["name"] == "Vegan Bowl"
+        assert catalog.find("lunch", "maintain", "halal", 700)["name"] == "Vegan Bowl"
+
+    def test_find_excludes_used_names(self):
+        """Test already used meals are skipped for variety."""
+        catalog = MealCatalog([catalog_meal("A", calories=700), catalog_meal("B", calories=720)])
+
+        assert catalog.find("lunch", "maintain", "none", 700, exclude_names={"A"})["name"] == "B"
+
+    def test_add_meals_skips_duplicates(self):
+        """Test refreshing does not add duplicate meal names."""
+        catalog = MealCatalog([catalog_meal("A")])
+        catalog.add_meals([catalog_meal("a"), catalog_meal("B")])
+
+        assert len(catalog) == 2
+
+
+class TestMealCatalogStorage:
+    """Tests for the on-disk catalog format."""
+
+    def test_save_and_load_round_trip(self, tmp_path):
+        """Test a saved catalog loads back with the same meals."""
+        path = str(tmp_path / "catalog.json.gz")
+        MealCatalog([catalog_meal("A"), catalog_meal("B", meal_type="dinner")]).save(path)
+
+        loaded = MealCatalog.load(path)
+
+        assert len(loaded) == 2
+        assert loaded.find("dinner", "maintain", "none", 700)["name"] == "B"
+
+    def test_load_missing_file_is_empty(self, tmp_path):
+        """Test a missing catalog file yields an empty catalog."""
+        assert len(MealCatalog.load(str(tmp_path / "missing.json.gz"))) == 0
+
+
+class TestCatalogFirstGeneration:
+    """Tests for catalog-first weekly generation."""
+
+    @patch('meal_generator.generate_meal_with_ai_async')
+    def test_catalog_first_only_generates_misses(self, mock_generate, use_catalog, sample_meal_data):
+        """Test the LLM is only called for slots the catalog cannot fill."""
+        use_catalog(MealCatalog(
+            [catalog_meal(f"Lunch {i}", calories=700 + i) for i in range(7)]
+            + [catalog_meal(f"Dinner {i}", meal_type="dinner", calories=800) for i in range(7)]
+        ))
+        mock_generate.return_value = sample_meal_data
+
+        meals = asyncio.run(generate_weekly_meals_async("maintain", "none", 2000, concurrency=1, mode="catalog"))
+
+        assert mock_generate.call_count == 7
+        assert [(m["day"], m["meal_type"]) for m in meals] == get_weekly_slots()
+        assert len({m["name"] for m in meals if m["meal_type"] == "lunch"}) == 7
+        assert meals[0]["name"] == sample_meal_data["name"]
+
+    @patch('meal_generator.generate_meal_with_ai_async')
+    def test_catalog_first_rescales_nearby_meals(self, mock_generate, use_catalog, sample_meal_data):
+        """Test catalog meals outside the tolerance are rescaled instead of generated."""
+        use_catalog(MealCatalog([catalog_meal(f"Lunch {i}", calories=560) for i in range(7)]))
+        mock_generate.return_value = sample_meal_data
+
+        meals = asyncio.run(generate_weekly_meals_async("maintain", "none", 2000, concurrency=1, mode="catalog"))
+        lunches = [m for m in meals if m["meal_type"] == "lunch"]
+
+        assert mock_generate.call_count == 14
+        assert all(m["calories"] == 700 for m in lunches)
+        assert all(m["name"].startswith("Lunch") for m in lunches)
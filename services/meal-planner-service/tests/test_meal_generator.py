@@ -2,14 +2,22 @@
 Tests for meal generator functions.
 """
 import pytest
-from unittest.mock import Mock, patch
+import asyncio
+import json
+from unittest.mock import AsyncMock, Mock, patch
 from meal_generator import (
     get_meal_calorie_target,
     get_default_calories_for_goal,
     create_meal_prompt,
     parse_ai_meal_response,
     get_fallback_meal,
-    generate_meal_with_ai
+    get_weekly_slots,
+    create_weekly_meals_prompt,
+    parse_ai_weekly_response,
+    generate_meal_with_ai_async,
+    generate_weekly_meals_async,
+    generate_swap_candidate_async,
+    FALLBACK_MEALS
 )
 
 
@@ -161,48 +169,187 @@ class TestFallbackMeals:
         assert 500 <= meal["calories"] <= 700  # Moderate calories
 
 
-class TestMealGeneration:
-    """Tests for meal generation with AI."""
+class TestWeeklyMealGeneration:
+    """Tests for weekly meal generation."""
 
-    @patch('meal_generator.client')
-    def test_generate_meal_with_ai_success(self, mock_client):
-        """Test successful AI meal generation."""
-        # Mock OpenAI response
+    def test_get_weekly_slots_order(self):
+        """Test slots run Monday breakfast to Sunday dinner."""
+        slots = get_weekly_slots()
+        
+        assert len(slots) == 21
+        assert slots[0] == ("monday", "breakfast")
+        assert slots[-1] == ("sunday", "dinner")
+
+    @patch('meal_generator.async_client', None)
+    def test_generate_weekly_meals_fallback_keeps_slots(self):
+        """Test fallback meals are copied per slot and keep their own day."""
+        meals = asyncio.run(generate_weekly_meals_async("cut", "none", 1800, concurrency=7))
+        
+        assert [(m["day"], m["meal_type"]) for m in meals] == get_weekly_slots()
+        assert all("generation_ms" in m for m in meals)
+        assert "day" not in FALLBACK_MEALS["breakfast"]["cut"]
+
+    @patch('meal_generator.generate_meal_with_ai_async')
+    def test_generate_weekly_meals_slot_error_uses_fallback(self, mock_generate):
+        """Test a failing slot falls back without failing the week."""
+        mock_generate.side_effect = RuntimeError("boom")
+        
+        meals = asyncio.run(generate_weekly_meals_async("bulk", "none", 2800, concurrency=1))
+        
+        assert len(meals) == 21
+        assert meals[0]["name"] == FALLBACK_MEALS["breakfast"]["bulk"]["name"]
+
+
+class TestBatchedWeeklyGeneration:
+    """Tests for single-call batched week generation."""
+
+    @staticmethod
+    def _weekly_response(skip=()):
+        meals = [
+            {
+                "day": day,
+                "meal_type": meal_type,
+                "name": f"{day} {meal_type}",
+                "calories": 500,
+                "protein": 30.0,
+                "carbs": 50.0,
+                "fats": 15.0,
+                "ingredients": ["ingredient 1", "ingredient 2"]
+            }
+            for day, meal_type in get_weekly_slots()
+            if (day, meal_type) not in skip
+        ]
+        return json.dumps({"meals": meals})
+
+    def test_create_weekly_meals_prompt(self):
+        """Test weekly prompt includes per-meal targets and constraints."""
+        prompt = create_weekly_meals_prompt("cut", "vegan", 2000)
+        
+        assert "21 meals" in prompt
+        assert "500" in prompt and "700" in prompt and "800" in prompt
+        assert "vegan" in prompt.lower()
+
+    def test_parse_weekly_response_drops_invalid_slots(self):
+        """Test invalid and duplicate slots are left out of the parsed week."""
+        data = json.loads(self._weekly_response())
+        data["meals"][0].pop("ingredients")
+        data["meals"].append(dict(data["meals"][1]))
+        data["meals"].append(dict(data["meals"][1], day="someday"))
+        
+        parsed = parse_ai_weekly_response("```json\n" + json.dumps(data) + "\n```")
+        
+        assert len(parsed) == 20
+        assert ("monday", "breakfast") not in parsed
+
+    def test_parse_weekly_response_invalid_json(self):
+        """Test unparseable weekly response yields no slots."""
+        assert parse_ai_weekly_response("not json") == {}
+
+    @patch('meal_generator.generate_meal_with_ai_async')
+    @patch('meal_generator.async_client')
+    def test_batch_mode_regenerates_only_failed_slots(self, mock_client, mock_generate, sample_meal_data):
+        """Test batch mode makes one call and regenerates missing slots."""
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = self._weekly_response(
+            skip={("friday", "lunch"), ("sunday", "dinner")}
+        )
+        mock_client.chat.completions.create = AsyncMock(return_value=mock_response)
+        mock_generate.return_value = sample_meal_data
+        
+        meals = asyncio.run(generate_weekly_meals_async("maintain", "none", 2000, mode="batch"))
+        
+        assert mock_client.chat.completions.create.call_count == 1
+        assert mock_generate.call_count == 2
+        assert [(m["day"], m["meal_type"]) for m in meals] == get_weekly_slots()
+        assert meals[13]["name"] == sample_meal_data["name"]
+        assert meals[0]["name"] == "monday breakfast"
+
+
+class TestAsyncMealGeneration:
+    """Tests for the async OpenAI generation path."""
+
+    @patch('meal_generator.async_client')
+    def test_generate_meal_async_success(self, mock_client):
+        """Test successful async AI meal generation."""
         mock_response = Mock()
         mock_response.choices = [Mock()]
-        mock_response.choices[0].message.content = '''{
-            "name": "AI Generated Meal",
+        mock_response.choices[0].message.content = json.dumps({
+            "name": "Async Meal",
             "calories": 450,
             "protein": 30.0,
             "carbs": 50.0,
             "fats": 15.0,
-            "ingredients": ["ingredient 1", "ingredient 2"]
-        }'''
-        mock_client.chat.completions.create.return_value = mock_response
+            "ingredients": ["ingredient 1"]
+        })
+        mock_client.chat.completions.create = AsyncMock(return_value=mock_response)
         
-        result = generate_meal_with_ai("breakfast", "maintain", "none", 450)
+        result = asyncio.run(generate_meal_with_ai_async("breakfast", "maintain", "none", 450))
         
-        assert result["name"] == "AI Generated Meal"
-        assert result["calories"] == 450
+        assert result["name"] == "Async Meal"
 
-    @patch('meal_generator.client', None)
-    def test_generate_meal_without_client(self):
-        """Test meal generation falls back when client not available."""
-        result = generate_meal_with_ai("breakfast", "cut", "none", 350)
+    @patch('meal_generator.async_client')
+    def test_generate_meal_async_timeout_falls_back(self, mock_client):
+        """Test a slow async call is cut off and falls back."""
+        async def slow_create(**kwargs):
+            await asyncio.sleep(1)
         
-        # Should return fallback meal
-        assert result is not None
-        assert "name" in result
-        assert "calories" in result
-
-    @patch('meal_generator.client')
-    def test_generate_meal_ai_error(self, mock_client):
-        """Test meal generation falls back on AI error."""
-        mock_client.chat.completions.create.side_effect = Exception("API Error")
+        mock_client.chat.completions.create = slow_create
         
-        result = generate_meal_with_ai("lunch", "bulk", "vegan", 700)
+        result = asyncio.run(
+            generate_meal_with_ai_async("dinner", "cut", "none", 500, timeout=0.01)
+        )
         
-        # Should return fallback meal
-        assert result is not None
-        assert "name" in result
+        assert result == FALLBACK_MEALS["dinner"]["cut"]
+
+    @patch('meal_generator.MEAL_CACHE_ENABLED', False)
+    @patch('meal_generator.async_client')
+    def test_concurrent_identical_requests_share_one_call(self, mock_client, sample_meal_data):
+        """Test identical concurrent requests coalesce while other slots do not."""
+        async def slow_create(**kwargs):
+            await asyncio.sleep(0.01)
+            response = Mock()
+            response.choices = [Mock()]
+            response.choices[0].message.content = json.dumps(sample_meal_data)
+            return response
 
+        mock_client.chat.completions.create = AsyncMock(side_effect=slow_create)
+
+        async def run():
+            return await asyncio.gather(
+                generate_meal_with_ai_async("lunch", "maintain", "none", 700),
+                generate_meal_with_ai_async("lunch", "maintain", "none", 700),
+                generate_meal_with_ai_async("lunch", "maintain", "none", 700, slot="monday"),
+                generate_meal_with_ai_async("lunch", "maintain", "none", 700, use_cache=False)
+            )
+
+        results = asyncio.run(run())
+
+        assert mock_client.chat.completions.create.call_count == 3
+        assert all(r["name"] == sample_meal_data["name"] for r in results)
+        assert results[0] is not results[1]
+
+    @patch('meal_generator.async_client', None)
+    def test_swap_candidate_never_returns_fallback(self):
+        """Test swap candidates are None when only a fallback is available."""
+        assert asyncio.run(generate_swap_candidate_async("lunch", "maintain", "none", 700)) is None
+
+    @patch('meal_generator.generate_meal_with_ai_async')
+    def test_generate_weekly_meals_async_concurrent(self, mock_generate, sample_meal_data):
+        """Test async weekly generation overlaps slots and keeps order."""
+        state = {"active": 0, "peak": 0}
+        
+        async def slow_generate(meal_type, fitness_goal, dietary_preference, target_calories, slot=None):
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+            await asyncio.sleep(0.01)
+            state["active"] -= 1
+            return dict(sample_meal_data, name=meal_type)
+        
+        mock_generate.side_effect = slow_generate
+        
+        meals = asyncio.run(generate_weekly_meals_async("maintain", "none", 2000, concurrency=5))
+        
+        assert state["peak"] == 5
+        assert [(m["day"], m["meal_type"]) for m in meals] == get_weekly_slots()
+        assert meals[1]["name"] == "lunch"
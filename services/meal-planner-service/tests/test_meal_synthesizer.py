@@ -0,0 +1,73 @@
+"""
+Tests for the local macro-target meal synthesizer.
+"""
+import asyncio
+import pytest
+
+from meal_synthesizer import FOODS, get_macro_targets, synthesize_meal
+from meal_generator import generate_weekly_meals_async, get_weekly_slots
+
+
+def food_diet(ingredient):
+    """Diet tag of the food an ingredient line refers to (None for sides)."""
+    name = ingredient.split("g ", 1)[1]
+    return next((food[7] for food in FOODS if food[0] == name), None)
+
+
+class TestSynthesizeMeal:
+    """Tests for single meal synthesis."""
+
+    @pytest.mark.parametrize("meal_type,fitness_goal,target", [
+        ("breakfast", "cut", 450),
+        ("lunch", "maintain", 770),
+        ("dinner", "bulk", 1120)
+    ])
+    def test_hits_calories_and_macro_split(self, meal_type, fitness_goal, target):
+        """Test synthesized meals land close to the calorie and macro targets."""
+        meal = synthesize_meal(meal_type, fitness_goal, "none", target)
+        protein, carbs, fats = get_macro_targets(fitness_goal, target)
+
+        assert abs(meal["calories"] - target) <= target * 0.05
+        assert meal["protein"] == pytest.approx(protein, rel=0.1)
+        assert meal["carbs"] == pytest.approx(carbs, rel=0.1)
+        assert meal["fats"] == pytest.approx(fats, rel=0.15)
+
+    def test_calories_match_macros(self):
+        """Test calories are computed from the reported macros."""
+        meal = synthesize_meal("lunch", "maintain", "none", 770)
+
+        assert meal["calories"] == round(meal["protein"] * 4 + meal["carbs"] * 4 + meal["fats"] * 9)
+
+    def test_is_deterministic(self):
+        """Test the same inputs always produce the same meal."""
+        assert synthesize_meal("dinner", "cut", "halal", 720) == synthesize_meal("dinner", "cut", "halal", 720)
+
+    @pytest.mark.parametrize("preference,allowed", [
+        ("vegan", {"vegan"}),
+        ("vegetarian", {"vegan", "vegetarian"}),
+        ("halal", {"vegan", "vegetarian", "halal"})
+    ])
+    def test_respects_dietary_preference(self, preference, allowed):
+        """Test only foods compatible with the preference are used."""
+        for meal_type in ("breakfast", "lunch", "dinner"):
+            for variant in range(7):
+                meal = synthesize_meal(meal_type, "maintain", preference, 700, variant=variant)
+                diets = {food_diet(i) for i in meal["ingredients"]} - {None}
+                assert diets <= allowed
+
+    def test_variants_add_variety(self):
+        """Test different variants give different meals for the same target."""
+        names = {synthesize_meal("lunch", "maintain", "none", 770, variant=v)["name"] for v in range(7)}
+
+        assert len(names) > 1
+
+
+class TestLocalWeeklyGeneration:
+    """Tests for MEAL_GENERATION_MODE=local."""
+
+    def test_local_mode_builds_week_without_llm(self):
+        """Test local mode fills every slot with synthesized meals."""
+        meals = asyncio.run(generate_weekly_meals_async("cut", "vegan", 1800, mode="local"))
+
+        assert [(m["day"], m["meal_type"]) for m in meals] == get_weekly_slots()
+        assert all(m["ingredients"] for m in meals)
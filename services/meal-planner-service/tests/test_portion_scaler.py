@@ -0,0 +1,99 @@
+"""
+Tests for ingredient parsing and portion scaling.
+"""
+import pytest
+
+from portion_scaler import parse_ingredient, scale_ingredient, scale_meal
+
+
+class TestParseIngredient:
+    """Tests for splitting ingredient lines."""
+
+    @pytest.mark.parametrize("line,expected", [
+        ("6 oz salmon", (6.0, "oz", "salmon")),
+        ("1 cup rolled oats", (1.0, "cup", "rolled oats")),
+        ("1/2 cup mixed berries", (0.5, "cup", "mixed berries")),
+        ("1 1/2 cups cooked rice", (1.5, "cup", "cooked rice")),
+        ("2 tbsp almonds", (2.0, "tbsp", "almonds")),
+        ("200g chicken breast", (200.0, "g", "chicken breast")),
+        ("2 large eggs", (2.0, None, "large eggs")),
+        ("½ avocado", (0.5, None, "avocado")),
+        ("2-3 cloves garlic", (2.0, None, "cloves garlic")),
+        ("1 (15 oz) can black beans", (1.0, "can", "black beans"))
+    ])
+    def test_parses_quantities(self, line, expected):
+        """Test amounts, units and descriptions are extracted."""
+        assert parse_ingredient(line) == expected
+
+    def test_line_without_quantity(self):
+        """Test lines without a leading quantity are not parsed."""
+        assert parse_ingredient("salt and pepper to taste") is None
+
+
+class TestScaleIngredient:
+    """Tests for rescaling single ingredient lines."""
+
+    @pytest.mark.parametrize("line,factor,expected", [
+        ("6 oz salmon", 1.5, "9 oz salmon"),
+        ("1 cup rolled oats", 1.25, "1 1/4 cups rolled oats"),
+        ("1 cup rolled oats", 0.75, "3/4 cup rolled oats"),
+        ("2 tbsp almonds", 1.5, "3 tbsp almonds"),
+        ("200g chicken breast", 1.3, "260g chicken breast"),
+        ("2 large eggs", 1.4, "3 large eggs"),
+        ("salt to taste", 2.0, "salt to taste")
+    ])
+    def test_rescales_to_practical_measures(self, line, factor, expected):
+        """Test scaled quantities are rounded to usable measures."""
+        assert scale_ingredient(line, factor) == expected
+
+    @pytest.mark.parametrize("line,factor,expected", [
+        ("2-3 cloves garlic", 1.3, "3-4 cloves garlic"),
+        ("1 to 2 tbsp olive oil", 1.5, "1 1/2-3 tbsp olive oil"),
+        ("200-250g rice", 1.2, "240-300g rice"),
+        ("1-2 cups spinach", 0.6, "1/2-1 1/4 cups spinach"),
+        ("2-3 cloves garlic", 0.4, "1 clove garlic")
+    ])
+    def test_scales_both_ends_of_ranges(self, line, factor, expected):
+        """Test both ends of a range are scaled and equal ends collapse."""
+        assert scale_ingredient(line, factor) == expected
+
+    @pytest.mark.parametrize("line,factor,expected", [
+        ("2 eggs", 0.7, "1 egg"),
+        ("2 large eggs, beaten", 0.7, "1 large egg, beaten"),
+        ("2 cherry tomatoes", 0.6, "1 cherry tomato"),
+        ("1 egg", 1.3, "1 egg")
+    ])
+    def test_singular_counts(self, line, factor, expected):
+        """Test a count scaled down to one names a single item."""
+        assert scale_ingredient(line, factor) == expected
+
+    @pytest.mark.parametrize("line,factor,expected", [
+        ("1 (15 oz) can beans", 1.3, "1 1/2 (15 oz) cans beans"),
+        ("1 (15 oz) can beans", 0.7, "1/2 (15 oz) can beans"),
+        ("2 (8 inch) tortillas", 1.5, "3 (8 inch) tortillas")
+    ])
+    def test_scales_sized_packages(self, line, factor, expected):
+        """Test counts before a package size are scaled and the size is kept."""
+        assert scale_ingredient(line, factor) == expected
+
+
+class TestScaleMeal:
+    """Tests for rescaling whole meals."""
+
+    def test_scales_macros_and_ingredients(self, sample_meal_data):
+        """Test macros and ingredient quantities scale with the calorie factor."""
+        meal = dict(sample_meal_data, ingredients=["1 cup oats", "200g yogurt"])
+
+        scaled = scale_meal(meal, 500)
+
+        assert scaled["calories"] == 500
+        assert scaled["protein"] == 25.0
+        assert scaled["carbs"] == 62.5
+        assert scaled["fats"] == 18.8
+        assert scaled["ingredients"] == ["1 1/4 cups oats", "250g yogurt"]
+        assert meal["ingredients"] == ["1 cup oats", "200g yogurt"]
+
+    def test_refuses_extreme_factors(self, sample_meal_data):
+        """Test meals are not rescaled beyond the supported range."""
+        assert scale_meal(sample_meal_data, 1200) is None
+        assert scale_meal(sample_meal_data, 100) is None
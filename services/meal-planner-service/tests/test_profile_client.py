@@ -0,0 +1,190 @@
+"""
+Tests for the cached auth-service profile client.
+"""
+import asyncio
+from unittest.mock import patch
+
+import httpx
+from fastapi.testclient import TestClient
+
+from main import app, profile_client
+from profile_client import DEFAULT_PROFILE, ProfileClient, parse_profile
+from schemas import DietaryPreferenceEnum, FitnessGoalEnum
+
+PROFILE = {"fitness_goal": "cut", "daily_calories": 1900, "dietary_preference": "vegan"}
+
+
+def make_client(handler, **kwargs):
+    """ProfileClient answering requests with `handler`, recording them in `calls`."""
+    calls = []
+
+    def respond(request):
+        calls.append(request)
+        return handler(request)
+
+    return ProfileClient(base_url="http://auth", transport=httpx.MockTransport(respond), **kwargs), calls
+
+
+def profile_response(request):
+    return httpx.Response(200, json={"id": "user-1", "profile": PROFILE})
+
+
+class TestProfileClient:
+    """Tests for profile fetching and caching."""
+
+    def test_fetches_and_caches_profile(self):
+        """Test the first lookup fetches the profile and the next one is cached."""
+        client, calls = make_client(profile_response)
+
+        async def run():
+            return await client.get("user-1"), await client.get("user-1")
+
+        first, second = asyncio.run(run())
+
+        assert first.fitness_goal == FitnessGoalEnum.CUT
+        assert first.daily_calories == 1900
+        assert first.dietary_preference == DietaryPreferenceEnum.VEGAN
+        assert second == first
+        assert len(calls) == 1
+
+    @patch('service_auth.INTERNAL_SERVICE_TOKEN', 'service-secret')
+    def test_request_carries_service_token(self):
+        """Test the lookup authenticates as the service, not as the user."""
+        client, calls = make_client(profile_response)
+
+        asyncio.run(client.get("user-1"))
+
+        assert calls[0].url.path == "/api/auth/internal/users/user-1"
+        assert calls[0].headers["X-Service-Token"] == "service-secret"
+        assert "Authorization" not in calls[0].headers
+
+    def test_rejected_service_token_is_not_a_missing_profile(self):
+        """Test a 401 from auth-service is reported as an error, not as a user without a profile."""
+        responses = [profile_response, lambda request: httpx.Response(401)]
+        client, calls = make_client(lambda request: responses[len(calls) - 1](request), ttl=0)
+
+        async def run():
+            await client.get("user-1")
+            return await client.get("user-1")
+
+        profile = asyncio.run(run())
+
+        assert profile.fitness_goal == FitnessGoalEnum.CUT
+
+    def test_missing_calories_use_goal_default(self):
+        """Test a profile without a calorie target gets the goal's default."""
+        client, _ = make_client(lambda request: httpx.Response(
+            200, json={"profile": {**PROFILE, "daily_calories": None}}
+        ))
+
+        profile = asyncio.run(client.get("user-1"))
+
+        assert profile.daily_calories == 1800
+
+    def test_missing_profile_is_negatively_cached(self):
+        """Test users without a profile get the default and are not refetched."""
+        client, calls = make_client(lambda request: httpx.Response(200, json={"profile": None}))
+
+        async def run():
+            return await client.get("user-1"), await client.get("user-1")
+
+        assert asyncio.run(run()) == (DEFAULT_PROFILE, DEFAULT_PROFILE)
+        assert len(calls) == 1
+
+    def test_auth_service_down_returns_default(self):
+        """Test a failed lookup falls back to the default profile."""
+        def refuse(request):
+            raise httpx.ConnectError("connection refused")
+
+        client, _ = make_client(refuse)
+
+        assert asyncio.run(client.get("user-1")) == DEFAULT_PROFILE
+
+    def test_expired_profile_served_when_fetch_fails(self):
+        """Test the last known profile is used while auth-service is failing."""
+        responses = [profile_response, lambda request: httpx.Response(503)]
+        client, calls = make_client(lambda request: responses[len(calls) - 1](request), ttl=0)
+
+        async def run():
+            await client.get("user-1")
+            return await client.get("user-1")
+
+        profile = asyncio.run(run())
+
+        assert len(calls) == 2
+        assert profile.fitness_goal == FitnessGoalEnum.CUT
+
+    def test_invalidate_refetches(self):
+        """Test an invalidated profile is fetched again."""
+        client, calls = make_client(profile_response)
+
+        async def run():
+            await client.get("user-1")
+            client.invalidate("user-1")
+            await client.get("user-1")
+
+        asyncio.run(run())
+
+        assert len(calls) == 2
+
+    def test_concurrent_misses_share_one_request(self):
+        """Test simultaneous lookups for one user make a single request."""
+        client, calls = make_client(profile_response)
+
+        async def run():
+            return await asyncio.gather(*(client.get("user-1") for _ in range(5)))
+
+        results = asyncio.run(run())
+
+        assert len(calls) == 1
+        assert all(result.fitness_goal == FitnessGoalEnum.CUT for result in results)
+
+    def test_cache_is_bounded(self):
+        """Test the least recently stored users are evicted."""
+        client, calls = make_client(profile_response, max_entries=2)
+
+        async def run():
+            for user_id in ("a", "b", "c", "a"):
+                await client.get(user_id)
+
+        asyncio.run(run())
+
+        assert len(calls) == 4
+
+
+class TestProfileCacheEndpoint:
+    """Tests for DELETE /api/meal-planner/internal/profile-cache/{user_id}."""
+
+    @patch('service_auth.INTERNAL_SERVICE_TOKEN', 'service-secret')
+    def test_invalidates_users_profile(self, mock_user_id):
+        """Test auth-service can drop a user's cached profile."""
+        profile_client._store(mock_user_id, parse_profile(PROFILE), 300)
+
+        response = TestClient(app).delete(
+            f"/api/meal-planner/internal/profile-cache/{mock_user_id}",
+            headers={"X-Service-Token": "service-secret"}
+        )
+
+        assert response.status_code == 204
+        assert mock_user_id not in profile_client._entries
+
+    @patch('service_auth.INTERNAL_SERVICE_TOKEN', 'service-secret')
+    def test_rejects_calls_without_service_token(self, mock_user_id):
+        """Test a user's access token or a wrong service token cannot drop profiles."""
+        profile_client._store(mock_user_id, parse_profile(PROFILE), 300)
+        client = TestClient(app)
+        url = f"/api/meal-planner/internal/profile-cache/{mock_user_id}"
+
+        assert client.delete(url).status_code == 401
+        assert client.delete(url, headers={"X-Service-Token": "wrong"}).status_code == 401
+        assert mock_user_id in profile_client._entries
+        profile_client.invalidate(mock_user_id)
+
+    def test_disabled_without_configured_token(self, mock_user_id):
+        """Test internal endpoints reject every call while no token is configured."""
+        response = TestClient(app).delete(
+            f"/api/meal-planner/internal/profile-cache/{mock_user_id}",
+            headers={"X-Service-Token": ""}
+        )
+
+        assert response.status_code == 401
@@ -0,0 +1,159 @@
+"""
+Tests for single-flight call coalescing.
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from metrics import render_metrics
+from singleflight import SingleFlight
+
+
+class TestSingleFlightSync:
+    """Tests for coalescing calls from worker threads."""
+
+    def test_concurrent_calls_share_one_call(self):
+        """Test threads with the same key get the leader's result."""
+        flights = SingleFlight("test_sync_share")
+        calls = []
+        release = threading.Event()
+
+        def upstream():
+            calls.append(1)
+            release.wait(1)
+            return {"name": "Shared"}
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(flights.do("key", upstream)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        while flights.leaders + flights.followers < 5:
+            time.sleep(0.001)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        assert len(calls) == 1
+        assert results == [{"name": "Shared"}] * 5
+        assert flights.get_stats()["coalescing_ratio"] == 0.8
+        assert flights.in_flight() == 0
+
+    def test_different_keys_do_not_share(self):
+        """Test each key makes its own call."""
+        flights = SingleFlight("test_sync_keys")
+
+        assert flights.do("a", lambda: 1) == 1
+        assert flights.do("b", lambda: 2) == 2
+        assert flights.get_stats()["followers"] == 0
+
+    def test_leader_error_reaches_followers(self):
+        """Test an exception in the shared call is raised in every caller."""
+        flights = SingleFlight("test_sync_error")
+        release = threading.Event()
+        errors = []
+
+        def upstream():
+            release.wait(1)
+            raise RuntimeError("upstream down")
+
+        def call():
+            try:
+                flights.do("key", upstream)
+            except RuntimeError as e:
+                errors.append(str(e))
+
+        threads = [threading.Thread(target=call) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        while flights.leaders + flights.followers < 3:
+            time.sleep(0.001)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        assert errors == ["upstream down"] * 3
+        assert flights.in_flight() == 0
+
+
+class TestSingleFlightAsync:
+    """Tests for coalescing calls on the event loop."""
+
+    def test_concurrent_coroutines_share_one_call(self):
+        """Test coroutines with the same key share one upstream call."""
+        flights = SingleFlight("test_async_share")
+        calls = []
+
+        async def upstream():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "meal"
+
+        async def run():
+            return await asyncio.gather(*[flights.do_async("key", upstream) for _ in range(4)])
+
+        assert asyncio.run(run()) == ["meal"] * 4
+        assert len(calls) == 1
+        assert flights.in_flight() == 0
+
+    def test_cancelled_caller_does_not_cancel_shared_call(self):
+        """Test the shared call keeps running while another caller waits."""
+        flights = SingleFlight("test_async_cancel")
+
+        async def upstream():
+            await asyncio.sleep(0.02)
+            return "meal"
+
+        async def run():
+            first = asyncio.create_task(flights.do_async("key", upstream))
+            second = asyncio.create_task(flights.do_async("key", upstream))
+            await asyncio.sleep(0)
+            first.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await first
+            return await second
+
+        assert asyncio.run(run()) == "meal"
+
+    def test_last_cancelled_caller_cancels_shared_call(self):
+        """Test the upstream call is cancelled once nobody waits for it."""
+        flights = SingleFlight("test_async_abandon")
+        state = {"cancelled": False}
+
+        async def upstream():
+            try:
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                state["cancelled"] = True
+                raise
+
+        async def run():
+            caller = asyncio.create_task(flights.do_async("key", upstream))
+            await asyncio.sleep(0)
+            caller.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await caller
+            await asyncio.sleep(0)
+
+        asyncio.run(run())
+
+        assert state["cancelled"] is True
+        assert flights.in_flight() == 0
+
+
+class TestSingleFlightMetrics:
+    """Tests for coalescing metrics."""
+
+    def test_ratio_rendered_per_group(self):
+        """Test the coalescing ratio and call counts are exported per group."""
+        flights = SingleFlight("test_metrics")
+        flights.do("key", lambda: None)
+
+        output = render_metrics()
+
+        assert 'singleflight_calls_total{group="test_metrics",role="leader"} 1' in output
+        assert 'singleflight_coalescing_ratio{group="test_metrics"} 0' in output
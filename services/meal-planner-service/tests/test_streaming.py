@@ -0,0 +1,156 @@
+"""
+Tests for the streamed weekly generation endpoint.
+"""
+import asyncio
+import json
+import uuid
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+from fastapi.testclient import TestClient
+
+from main import app, get_user_id_from_token
+
+
+def parse_sse(body):
+    events = []
+    for message in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in message.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+class TestStreamWeeklyGeneration:
+    """Tests for POST /api/meal-planner/generate/stream."""
+
+    def stream(self, mock_user_id):
+        app.dependency_overrides[get_user_id_from_token] = lambda: mock_user_id
+        try:
+            # No context manager: startup (database, job workers) is not needed
+            return TestClient(app).post("/api/meal-planner/generate/stream", json={})
+        finally:
+            app.dependency_overrides.pop(get_user_id_from_token, None)
+
+    @patch('main.warm_swap_pool')
+    @patch('main.job_session_factory')
+    @patch('main.insert_plan_meals')
+    @patch('main.create_meal_plan')
+    @patch('main.generate_weekly_meals_async')
+    def test_stream_emits_and_persists_each_meal(
+        self, mock_generate, mock_create_plan, mock_insert, mock_session, mock_warm,
+        mock_user_id, sample_weekly_meals
+    ):
+        """Test every meal is committed and emitted before the done event."""
+        plan_id = uuid.uuid4()
+        session = MagicMock()
+        mock_session.return_value = session
+        mock_create_plan.return_value = (plan_id, datetime(2025, 11, 24))
+        mock_insert.side_effect = lambda db, pid, uid, meals: [{"id": uuid.uuid4()} for _ in meals]
+
+        async def generate(*args, on_meal=None, **kwargs):
+            for meal in sample_weekly_meals:
+                on_meal(meal)
+            return sample_weekly_meals
+
+        mock_generate.side_effect = generate
+
+        response = self.stream(mock_user_id)
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = parse_sse(response.text)
+        assert events[0][0] == "plan"
+        assert events[0][1]["plan_id"] == str(plan_id)
+        assert [e for e, _ in events[1:-1]] == ["meal"] * 21
+        assert events[1][1]["day"] == "monday"
+        assert events[-1] == ("done", {"plan_id": str(plan_id), "meals": 21})
+        assert sum(len(call.args[3]) for call in mock_insert.call_args_list) == 21
+        assert session.commit.call_count == 1 + mock_insert.call_count
+        session.close.assert_called_once()
+
+    @patch('main.warm_swap_pool')
+    @patch('main.job_session_factory')
+    @patch('main.insert_plan_meals')
+    @patch('main.create_meal_plan')
+    @patch('main.generate_weekly_meals_async')
+    def test_stream_reports_error_after_partial_week(
+        self, mock_generate, mock_create_plan, mock_insert, mock_session, mock_warm,
+        mock_user_id, sample_weekly_meals
+    ):
+        """Test completed slots are still streamed when generation fails."""
+        mock_session.return_value = MagicMock()
+        mock_create_plan.return_value = (uuid.uuid4(), datetime(2025, 11, 24))
+        mock_insert.side_effect = lambda db, pid, uid, meals: [{"id": uuid.uuid4()} for _ in meals]
+
+        async def generate(*args, on_meal=None, **kwargs):
+            on_meal(sample_weekly_meals[0])
+            raise RuntimeError("OpenAI unavailable")
+
+        mock_generate.side_effect = generate
+
+        events = parse_sse(self.stream(mock_user_id).text)
+
+        assert [e for e, _ in events] == ["plan", "meal", "error"]
+        assert events[-1][1]["message"] == "OpenAI unavailable"
+        assert events[-1][1]["meals"] == 1
+
+    @patch('main.warm_swap_pool')
+    @patch('main.job_session_factory')
+    @patch('main.insert_plan_meals')
+    @patch('main.create_meal_plan')
+    @patch('main.generate_weekly_meals_async')
+    def test_meals_finished_together_share_one_insert(
+        self, mock_generate, mock_create_plan, mock_insert, mock_session, mock_warm,
+        mock_user_id, sample_weekly_meals
+    ):
+        """Test meals finishing while nothing is being written go out in one insert and commit."""
+        session = MagicMock()
+        mock_session.return_value = session
+        mock_create_plan.return_value = (uuid.uuid4(), datetime(2025, 11, 24))
+        mock_insert.side_effect = lambda db, pid, uid, meals: [{"id": uuid.uuid4()} for _ in meals]
+
+        async def generate(*args, on_meal=None, **kwargs):
+            for meal in sample_weekly_meals[:3]:
+                on_meal(meal)
+            await asyncio.sleep(0.01)
+            for meal in sample_weekly_meals[3:]:
+                on_meal(meal)
+            return sample_weekly_meals
+
+        mock_generate.side_effect = generate
+
+        events = parse_sse(self.stream(mock_user_id).text)
+
+        assert [len(call.args[3]) for call in mock_insert.call_args_list] == [3, 18]
+        assert session.commit.call_count == 3
+        assert events[-1][0] == "done"
+
+    @patch('main.warm_swap_pool')
+    @patch('main.job_session_factory')
+    @patch('main.insert_plan_meals')
+    @patch('main.create_meal_plan')
+    @patch('main.generate_weekly_meals_async')
+    def test_failed_insert_stops_generation(
+        self, mock_generate, mock_create_plan, mock_insert, mock_session, mock_warm,
+        mock_user_id, sample_weekly_meals
+    ):
+        """Test a meal that cannot be saved ends the stream with an error and cancels generation."""
+        mock_session.return_value = MagicMock()
+        mock_create_plan.return_value = (uuid.uuid4(), datetime(2025, 11, 24))
+        mock_insert.side_effect = RuntimeError("database went away")
+        cancelled = []
+
+        async def generate(*args, on_meal=None, **kwargs):
+            on_meal(sample_weekly_meals[0])
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        mock_generate.side_effect = generate
+
+        events = parse_sse(self.stream(mock_user_id).text)
+
+        assert [e for e, _ in events] == ["plan", "error"]
+        assert events[-1][1]["message"] == "database went away"
+        assert cancelled == [True]
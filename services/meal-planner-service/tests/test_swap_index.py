@@ -0,0 +1,111 @@
+"""
+Tests for the nearest-neighbour swap engine.
+"""
+import random
+
+from meal_catalog import MealCatalog, set_catalog
+from swap_index import SwapIndex, find_nearest_swap, macro_distance
+
+
+def indexed_meal(name, calories, protein, carbs, fats, meal_type="lunch", dietary_preference="none"):
+    return {
+        "name": name,
+        "meal_type": meal_type,
+        "fitness_goal": "maintain",
+        "dietary_preference": dietary_preference,
+        "calories": calories,
+        "protein": protein,
+        "carbs": carbs,
+        "fats": fats,
+        "ingredients": ["ingredient 1"],
+        "created_at": 0
+    }
+
+
+def brute_force(meals, query, k, exclude):
+    scored = [
+        (macro_distance(m["calories"], m["protein"], m["carbs"], m["fats"], *query, query[0]), m["name"])
+        for m in meals if m["name"] not in exclude
+    ]
+    return [name for _, name in sorted(scored)[:k]]
+
+
+class TestSwapIndex:
+    """Tests for k-NN lookups."""
+
+    def test_matches_brute_force(self):
+        """Test the pruned scan returns the same neighbours as a full scan."""
+        rng = random.Random(3)
+        meals = [
+            indexed_meal(
+                f"Meal {i}",
+                rng.randint(300, 1200),
+                rng.uniform(10, 80),
+                rng.uniform(10, 150),
+                rng.uniform(5, 50)
+            )
+            for i in range(500)
+        ]
+        index = SwapIndex(meals)
+
+        for _ in range(20):
+            query = (rng.randint(400, 1000), rng.uniform(20, 60), rng.uniform(30, 120), rng.uniform(10, 40))
+            found = [m["name"] for m in index.nearest("lunch", "none", query, k=5, exclude_names={"Meal 0"})]
+            assert found == brute_force(meals, query, 5, {"Meal 0"})
+
+    def test_prefers_similar_macros_over_similar_calories(self):
+        """Test macro profile matters, not only calories."""
+        index = SwapIndex([
+            indexed_meal("Same Calories Pasta", 600, 15.0, 110.0, 10.0),
+            indexed_meal("Chicken Bowl", 630, 50.0, 60.0, 18.0)
+        ])
+
+        result = index.nearest("lunch", "none", (600, 48.0, 58.0, 17.0), k=1)
+
+        assert result[0]["name"] == "Chicken Bowl"
+
+    def test_respects_dietary_preference(self):
+        """Test only compatible meals are returned."""
+        index = SwapIndex([
+            indexed_meal("Steak", 700, 50.0, 40.0, 30.0),
+            indexed_meal("Tofu Bowl", 650, 35.0, 70.0, 20.0, dietary_preference="vegan")
+        ])
+
+        result = index.nearest("lunch", "vegetarian", (700, 50.0, 40.0, 30.0), k=5)
+
+        assert [m["name"] for m in result] == ["Tofu Bowl"]
+
+    def test_respects_meal_type(self):
+        """Test meals of another meal type are never returned."""
+        index = SwapIndex([indexed_meal("Omelette", 500, 30.0, 10.0, 30.0, meal_type="breakfast")])
+
+        assert index.nearest("lunch", "none", (500, 30.0, 10.0, 30.0)) == []
+
+
+class TestFindNearestSwap:
+    """Tests for picking a swap from the catalog and history."""
+
+    def test_uses_history_and_excludes_current(self):
+        """Test history meals are candidates and the current meal is skipped."""
+        set_catalog(MealCatalog())
+        try:
+            current = {"name": "Current", "calories": 700, "protein": 40.0, "carbs": 70.0, "fats": 20.0}
+            history = [
+                dict(current, ingredients=["x"]),
+                {"name": "Old Favourite", "calories": 690, "protein": 41.0, "carbs": 69.0, "fats": 20.0, "ingredients": ["y"]}
+            ]
+
+            result = find_nearest_swap("lunch", "none", current, history=history, k=1)
+        finally:
+            set_catalog(None)
+
+        assert result["name"] == "Old Favourite"
+
+    def test_returns_none_without_known_meals(self):
+        """Test an empty catalog and history give no swap."""
+        set_catalog(MealCatalog())
+        try:
+            current = {"name": "Current", "calories": 700, "protein": 40.0, "carbs": 70.0, "fats": 20.0}
+            assert find_nearest_swap("lunch", "none", current) is None
+        finally:
+            set_catalog(None)
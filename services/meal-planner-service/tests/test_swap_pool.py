@@ -0,0 +1,112 @@
+"""
+Tests for the pre-warmed swap candidate pool.
+"""
+import asyncio
+
+from swap_pool import SwapPool
+
+
+def make_generator(names):
+    """Generator returning the given meal names in order, then None."""
+    remaining = list(names)
+    calls = []
+
+    async def generate(meal_type, fitness_goal, dietary_preference, target_calories):
+        calls.append((meal_type, fitness_goal, dietary_preference, target_calories))
+        if not remaining:
+            return None
+        return {
+            "name": remaining.pop(0),
+            "calories": target_calories,
+            "protein": 30.0,
+            "carbs": 40.0,
+            "fats": 10.0,
+            "ingredients": ["ingredient 1"]
+        }
+
+    return generate, calls
+
+
+async def drain(pool):
+    await asyncio.gather(*list(pool._tasks))
+
+
+class TestSwapPool:
+    """Tests for taking and refilling swap candidates."""
+
+    def test_cold_key_misses_and_warms(self):
+        """Test a cold key misses, then serves candidates once refilled."""
+        generate, calls = make_generator(["A", "B", "C"])
+
+        async def scenario():
+            pool = SwapPool(generate, size=3, refill_concurrency=2)
+            first = pool.take("lunch", "maintain", "none", 700)
+            await drain(pool)
+            second = pool.take("lunch", "maintain", "none", 700)
+            return pool, first, second
+
+        pool, first, second = asyncio.run(scenario())
+
+        assert first is None
+        assert second["name"] == "A"
+        assert pool.get_stats()["hits"] == 1
+        assert pool.get_stats()["misses"] == 1
+        assert [m["name"] for m in pool._pools["meal:lunch:maintain:none:700"]] == ["B", "C"]
+
+    def test_take_schedules_refill(self):
+        """Test taking a candidate tops its key back up to size."""
+        generate, calls = make_generator(["A", "B", "C"])
+
+        async def scenario():
+            pool = SwapPool(generate, size=2)
+            pool.warm("dinner", "cut", "vegan", 600)
+            await drain(pool)
+            pool.take("dinner", "cut", "vegan", 600)
+            await drain(pool)
+            return pool
+
+        pool = asyncio.run(scenario())
+
+        assert len(calls) == 3
+        assert pool.candidate_count() == 2
+
+    def test_take_skips_excluded_names(self):
+        """Test a swap never returns the meal being replaced."""
+        generate, _ = make_generator(["Current", "Other"])
+
+        async def scenario():
+            pool = SwapPool(generate, size=2, refill_concurrency=1)
+            pool.warm("lunch", "maintain", "none", 700)
+            await drain(pool)
+            return pool.take("lunch", "maintain", "none", 700, exclude_names={"Current"})
+
+        assert asyncio.run(scenario())["name"] == "Other"
+
+    def test_warm_does_not_overfill(self):
+        """Test repeated warms do not schedule more refills than the pool size."""
+        generate, calls = make_generator(["A", "B", "C", "D"])
+
+        async def scenario():
+            pool = SwapPool(generate, size=2)
+            pool.warm("breakfast", "bulk", "none", 500)
+            pool.warm("breakfast", "bulk", "none", 520)
+            await drain(pool)
+
+        asyncio.run(scenario())
+
+        assert len(calls) == 2
+
+    def test_failed_refill_adds_nothing(self):
+        """Test refills that only produce fallbacks leave the pool empty."""
+        generate, _ = make_generator([])
+
+        async def scenario():
+            pool = SwapPool(generate, size=2)
+            pool.warm("lunch", "maintain", "none", 700)
+            await drain(pool)
+            return pool
+
+        pool = asyncio.run(scenario())
+
+        assert pool.candidate_count() == 0
+        assert pool.get_stats()["pending_refills"] == 0
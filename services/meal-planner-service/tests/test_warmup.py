@@ -0,0 +1,112 @@
+"""
+Tests for the parallel startup warm-up.
+"""
+import asyncio
+import time
+
+from warmup import StartupWarmup, retry_until_done
+
+
+class TestStartupWarmup:
+    """Tests for running startup phases under a deadline."""
+
+    def test_phases_run_in_parallel(self):
+        """Phases overlap, so the warm-up takes as long as the slowest one."""
+        async def slow():
+            await asyncio.sleep(0.2)
+
+        warmup = StartupWarmup(deadline=5)
+
+        start = time.monotonic()
+        ok = asyncio.run(warmup.run({"database": slow, "openai": slow, "sync": lambda: time.sleep(0.2)}))
+
+        assert ok
+        assert time.monotonic() - start < 0.5
+        assert warmup.complete
+        assert {phase["status"] for phase in warmup.phases.values()} == {"ok"}
+        assert warmup.phases["database"]["duration_ms"] >= 150
+
+    def test_deadline_cancels_unfinished_phases(self):
+        """Phases still running at the deadline are cancelled and reported."""
+        async def hang():
+            await asyncio.sleep(10)
+
+        warmup = StartupWarmup(deadline=0.1)
+
+        start = time.monotonic()
+        ok = asyncio.run(warmup.run({"database": hang, "openai": lambda: None}))
+
+        assert not ok
+        assert time.monotonic() - start < 1
+        assert not warmup.complete
+        assert warmup.phases["database"]["status"] == "timed_out"
+        assert warmup.phases["openai"]["status"] == "ok"
+
+    def test_failed_phase_does_not_stop_others(self):
+        """A failing phase is recorded while the rest still finish."""
+        def broken():
+            raise ConnectionError("no route to host")
+
+        warmup = StartupWarmup(deadline=5)
+
+        ok = asyncio.run(warmup.run({"openai": broken, "database": lambda: None}))
+
+        assert not ok
+        assert not warmup.complete
+        assert warmup.report()["phases"]["openai"]["status"] == "failed"
+        assert warmup.report()["phases"]["database"]["status"] == "ok"
+
+    def test_optional_phase_failure_still_completes(self):
+        """A failing optional phase is reported without keeping the service unready."""
+        def broken():
+            raise ConnectionError("no route to host")
+
+        warmup = StartupWarmup(deadline=5)
+
+        ok = asyncio.run(warmup.run({"openai": broken, "database": lambda: None}, optional=("openai",)))
+
+        assert ok
+        assert warmup.complete
+        assert warmup.phases["openai"]["status"] == "failed"
+
+    def test_retry_until_done(self):
+        """Retried steps keep trying without blocking until they succeed."""
+        attempts = []
+
+        def flaky():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise ConnectionError("database is starting up")
+
+        warmup = StartupWarmup(deadline=5)
+
+        ok = asyncio.run(warmup.run({"database": retry_until_done("database", flaky, delay=0.01)}))
+
+        assert ok
+        assert len(attempts) == 3
+
+    def test_start_retries_until_ready(self):
+        """A background warm-up re-runs timed-out required phases, then calls on_ready."""
+        attempts = []
+        ready = []
+
+        async def database():
+            attempts.append(1)
+            if len(attempts) == 1:
+                await asyncio.sleep(10)
+
+        async def on_ready():
+            ready.append(True)
+
+        warmup = StartupWarmup(deadline=0.05, retry_delay=0.01)
+
+        async def run():
+            task = warmup.start({"database": database}, on_ready=on_ready)
+            assert not warmup.complete
+            await task
+
+        asyncio.run(run())
+
+        assert warmup.complete
+        assert warmup.attempts == 2
+        assert ready == [True]
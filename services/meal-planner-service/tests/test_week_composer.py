@@ -0,0 +1,141 @@
+"""
+Tests for the week composer.
+"""
+import asyncio
+import random
+from collections import Counter
+from unittest.mock import patch
+
+from meal_catalog import MealCatalog, set_catalog
+from meal_generator import generate_weekly_meals_async, get_meal_calorie_target, get_weekly_slots
+from meal_synthesizer import get_macro_targets
+from week_composer import WeekComposer, compose_week
+
+
+def candidate(name, calories, protein, carbs, fats):
+    return {
+        "name": name,
+        "calories": calories,
+        "protein": protein,
+        "carbs": carbs,
+        "fats": fats,
+        "ingredients": ["ingredient 1"]
+    }
+
+
+def random_pool(daily_calories=2200, per_type=25, seed=7):
+    """Candidates scattered around each slot's calorie target with mixed macro splits."""
+    rng = random.Random(seed)
+    pool = {}
+    for meal_type in ("breakfast", "lunch", "dinner"):
+        target = get_meal_calorie_target(meal_type, daily_calories)
+        meals = []
+        for i in range(per_type):
+            calories = int(target * rng.uniform(0.85, 1.15))
+            protein_share, fats_share = rng.uniform(0.15, 0.45), rng.uniform(0.15, 0.4)
+            carbs_share = 1 - protein_share - fats_share
+            meals.append(candidate(
+                f"{meal_type} {i}",
+                calories,
+                round(calories * protein_share / 4, 1),
+                round(calories * carbs_share / 4, 1),
+                round(calories * fats_share / 9, 1)
+            ))
+        pool[meal_type] = meals
+    return pool
+
+
+class TestComposeWeek:
+    """Tests for composing a week from a candidate pool."""
+
+    def test_fills_grid_in_slot_order(self):
+        """Test the composed week covers every slot Monday breakfast first."""
+        week = compose_week(random_pool(), "maintain", 2200)
+
+        assert [(m["day"], m["meal_type"]) for m in week] == get_weekly_slots()
+
+    def test_respects_repeat_limit(self):
+        """Test no meal appears more often than max_repeats."""
+        week = compose_week(random_pool(per_type=5), "maintain", 2200, max_repeats=2)
+
+        assert max(Counter(m["name"] for m in week).values()) <= 2
+
+    def test_no_meal_on_consecutive_days(self):
+        """Test repeats are spread out when the pool allows it."""
+        week = compose_week(random_pool(per_type=4), "maintain", 2200, max_repeats=2)
+
+        for meal_type in ("breakfast", "lunch", "dinner"):
+            names = [m["name"] for m in week if m["meal_type"] == meal_type]
+            assert all(a != b for a, b in zip(names, names[1:]))
+
+    def test_daily_totals_near_target(self):
+        """Test every day's calories stay close to the daily target."""
+        week = compose_week(random_pool(), "maintain", 2200)
+
+        for day in {m["day"] for m in week}:
+            total = sum(m["calories"] for m in week if m["day"] == day)
+            assert abs(total - 2200) <= 2200 * 0.05
+
+    def test_search_improves_weekly_macro_balance(self):
+        """Test local search beats the greedy start on weekly macros."""
+        composer = WeekComposer(random_pool(), "cut", 2200)
+        composer.initialize()
+        greedy_macros = composer.macro_cost(composer.week_macros)
+        greedy_score = composer.score()
+
+        composer.improve()
+
+        assert composer.score() < greedy_score
+        assert composer.macro_cost(composer.week_macros) < greedy_macros
+
+    def test_incremental_totals_match_full_recount(self):
+        """Test running totals stay consistent with the assignment after search."""
+        composer = WeekComposer(random_pool(), "bulk", 2800)
+        composer.initialize()
+        composer.improve()
+
+        week = composer.meals()
+        for index, macro in enumerate(("protein", "carbs", "fats")):
+            assert abs(composer.week_macros[index] - sum(m[macro] for m in week)) < 1e-6
+
+    def test_small_pool_returns_none(self):
+        """Test a pool that cannot fill the week within the repeat limit is rejected."""
+        pool = random_pool(per_type=3)
+
+        assert compose_week(pool, "maintain", 2200, max_repeats=2) is None
+
+    def test_far_off_candidates_are_ignored(self):
+        """Test candidates far from the slot target are not used."""
+        pool = random_pool()
+        pool["lunch"] = pool["lunch"][:3] + [candidate(f"huge {i}", 3000, 100, 300, 100) for i in range(10)]
+
+        assert compose_week(pool, "maintain", 2200) is None
+
+
+class TestComposeMode:
+    """Tests for MEAL_GENERATION_MODE=compose."""
+
+    @patch('meal_generator.generate_meal_with_ai_async')
+    def test_compose_mode_uses_history_without_llm(self, mock_generate):
+        """Test a sufficient history builds the week without generation calls."""
+        set_catalog(MealCatalog())
+        try:
+            meals = asyncio.run(generate_weekly_meals_async("maintain", "none", 2200, mode="compose", history=random_pool()))
+        finally:
+            set_catalog(None)
+
+        mock_generate.assert_not_called()
+        assert len(meals) == 21
+
+    @patch('meal_generator.generate_meal_with_ai_async')
+    def test_compose_mode_falls_back_when_pool_too_small(self, mock_generate, sample_meal_data):
+        """Test an empty pool falls back to generating the week."""
+        set_catalog(MealCatalog())
+        mock_generate.return_value = sample_meal_data
+        try:
+            meals = asyncio.run(generate_weekly_meals_async("maintain", "none", 2200, concurrency=1, mode="compose"))
+        finally:
+            set_catalog(None)
+
+        assert mock_generate.call_count == 21
+        assert len(meals) == 21
@@ -0,0 +1,178 @@
+"""
+Startup warm-up.
+
+Startup steps (waiting for the database, creating tables, opening pooled
+connections, connecting to the LLM providers) run concurrently on the event
+loop under one deadline instead of one after another with blocking sleeps.
+The warm-up runs in the background, so the server answers liveness probes
+meanwhile. The service reports not ready until every required phase has
+succeeded; failed or timed-out phases are retried, and the time each phase
+took is logged and shown on /health/ready.
+"""
+import asyncio
+import os
+import time
+from typing import Awaitable, Callable, Collection, Dict, Optional, Union
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Longest one warm-up attempt may take; unfinished phases are cancelled and
+# retried in the next attempt, and the service stays not ready meanwhile
+STARTUP_DEADLINE_SECONDS = float(os.getenv("STARTUP_DEADLINE_SECONDS", "30"))
+STARTUP_RETRY_DELAY_SECONDS = float(os.getenv("STARTUP_RETRY_DELAY_SECONDS", "2"))
+
+StepFn = Union[Callable[[], None], Callable[[], Awaitable[None]]]
+
+
+async def _call(fn: StepFn):
+    # Sync steps run in a worker thread so they cannot block the event loop
+    if asyncio.iscoroutinefunction(fn):
+        await fn()
+    else:
+        await asyncio.to_thread(fn)
+
+
+def retry_until_done(name: str, fn: StepFn, delay: float = STARTUP_RETRY_DELAY_SECONDS) -> Callable[[], Awaitable[None]]:
+    """
+    Wrap a step so it is retried every `delay` seconds until it succeeds.
+    The warm-up deadline bounds how long that can go on.
+
+    Args:
+        name: Step name for log messages
+        fn: Step (sync or async) that raises on failure
+        delay: Seconds between attempts
+
+    Returns:
+        Async step for StartupWarmup.run
+    """
+    async def step():
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                await _call(fn)
+                return
+            except Exception as e:
+                print(f"Startup {name} attempt {attempt} failed: {type(e).__name__}: {e}")
+            await asyncio.sleep(delay)
+
+    return step
+
+
+class StartupWarmup:
+    """Runs startup phases in parallel under a deadline and records how long each took."""
+
+    def __init__(self, deadline: float = STARTUP_DEADLINE_SECONDS, retry_delay: float = STARTUP_RETRY_DELAY_SECONDS):
+        self.deadline = deadline
+        self.retry_delay = retry_delay
+        # True once every required phase has succeeded; the service is not ready before
+        self.complete = False
+        self.attempts = 0
+        self.duration_ms = None
+        # phase -> {"status": "ok" | "failed" | "timed_out", "duration_ms": ...}
+        self.phases: Dict[str, Dict] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run_phase(self, name: str, fn: StepFn):
+        start = time.perf_counter()
+        try:
+            await _call(fn)
+            status = "ok"
+        except asyncio.CancelledError:
+            status = "timed_out"
+            raise
+        except Exception as e:
+            status = "failed"
+            print(f"Startup phase {name} failed: {type(e).__name__}: {e}")
+        finally:
+            self.phases[name] = {"status": status, "duration_ms": round((time.perf_counter() - start) * 1000, 1)}
+
+    async def run(self, phases: Dict[str, StepFn], optional: Collection[str] = ()) -> bool:
+        """
+        Run all phases concurrently and wait for them, at most `deadline`
+        seconds. Phases still running at the deadline are cancelled.
+
+        Args:
+            phases: Phase name -> step (sync or async) that raises on failure
+            optional: Phases whose failure is reported but does not keep the
+                service from being ready (e.g. provider warm-ups with a fallback)
+
+        Returns:
+            True if every required phase finished successfully in time; only
+            then is the warm-up complete
+        """
+        start = time.perf_counter()
+        self.attempts += 1
+        tasks = {name: asyncio.create_task(self._run_phase(name, fn)) for name, fn in phases.items()}
+        if tasks:
+            _, pending = await asyncio.wait(tasks.values(), timeout=self.deadline)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        self.duration_ms = round((time.perf_counter() - start) * 1000, 1)
+        for name in phases:
+            phase = self.phases[name]
+            print(f"Startup phase {name}: {phase['status']} in {phase['duration_ms']}ms")
+        ok = all(self.phases[name]["status"] == "ok" for name in phases if name not in optional)
+        if ok:
+            self.complete = True
+        print(f"Startup warm-up attempt {self.attempts} {'finished' if ok else 'not ready'} in {self.duration_ms}ms")
+        return ok
+
+    def start(
+        self,
+        phases: Dict[str, StepFn],
+        optional: Collection[str] = (),
+        on_ready: Optional[Callable[[], Awaitable[None]]] = None
+    ) -> asyncio.Task:
+        """
+        Run the warm-up as a background task, so the server answers requests
+        (liveness, 503 readiness) while it runs. Required phases that failed
+        or timed out are run again every `retry_delay` seconds until they all
+        succeed; optional phases run once.
+
+        Args:
+            phases: Phase name -> step (sync or async) that raises on failure
+            optional: Phases that do not block readiness
+            on_ready: Awaited once every required phase has succeeded, e.g.
+                to start work that needs the database
+
+        Returns:
+            The warm-up task
+        """
+        async def warm_up():
+            pending = phases
+            while not await self.run(pending, optional):
+                pending = {
+                    name: fn for name, fn in phases.items()
+                    if name not in optional and self.phases[name]["status"] != "ok"
+                }
+                print(f"Retrying startup phases {', '.join(pending)} in {self.retry_delay}s")
+                await asyncio.sleep(self.retry_delay)
+            if on_ready:
+                try:
+                    await on_ready()
+                except Exception as e:
+                    print(f"Startup on_ready failed: {type(e).__name__}: {e}")
+
+        self._task = asyncio.create_task(warm_up())
+        return self._task
+
+    async def stop(self):
+        """Cancel a warm-up that is still running."""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    def report(self) -> Dict:
+        """Warm-up state and per-phase timings for health responses."""
+        return {
+            "complete": self.complete,
+            "attempts": self.attempts,
+            "duration_ms": self.duration_ms,
+            "phases": dict(self.phases)
+        }
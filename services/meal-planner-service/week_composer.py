@@ -0,0 +1,291 @@
+"""
+Week composer: assign meals from a candidate pool to the 7x3 weekly grid.
+
+Instead of generating 21 independent meals, the composer picks an assignment
+from meals that already exist (cache, catalog, the user's history) that
+keeps each slot near its calorie target from get_meal_calorie_target, keeps
+daily totals near the daily target, balances weekly protein/carbs/fats
+against the fitness goal's split and repeats no meal more than
+MEAL_COMPOSER_MAX_REPEATS times. It starts from a greedy assignment and
+improves it by local search with constant-time score deltas per move.
+"""
+import os
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from meal_cache import copy_meal
+from meal_generator import DAYS_OF_WEEK, MEAL_TYPES, get_meal_calorie_target
+from meal_synthesizer import get_macro_targets
+
+load_dotenv()
+
+# How often one meal may appear in a week
+MEAL_COMPOSER_MAX_REPEATS = int(os.getenv("MEAL_COMPOSER_MAX_REPEATS", "2"))
+# Candidates further than this fraction from their slot's calorie target are ignored
+MEAL_COMPOSER_CALORIE_TOLERANCE = float(os.getenv("MEAL_COMPOSER_CALORIE_TOLERANCE", "0.2"))
+# Local search stops after this many passes without improvement
+MEAL_COMPOSER_MAX_PASSES = int(os.getenv("MEAL_COMPOSER_MAX_PASSES", "20"))
+
+# Score weights: slot calories, daily calories, weekly macro balance, same meal on consecutive days
+SLOT_WEIGHT = 1.0
+DAY_WEIGHT = 2.0
+MACRO_WEIGHT = 14.0
+ADJACENT_WEIGHT = 0.05
+
+
+class WeekComposer:
+    """
+    Local-search optimizer over one week's assignment.
+
+    The assignment maps each (meal type, day) to the index of a candidate of
+    that meal type. Running totals (weekly macros, daily calories, repeat
+    counts) are kept up to date so every move is scored in constant time.
+    """
+
+    def __init__(
+        self,
+        candidates: Dict[str, List[Dict]],
+        fitness_goal: str,
+        daily_calories: int,
+        max_repeats: int = MEAL_COMPOSER_MAX_REPEATS
+    ):
+        self.candidates = candidates
+        self.daily_calories = daily_calories
+        self.max_repeats = max_repeats
+        self.targets = {mt: get_meal_calorie_target(mt, daily_calories) for mt in MEAL_TYPES}
+        self.macro_targets = get_macro_targets(fitness_goal, daily_calories * 7)
+
+        # Per meal type: list of (calories, protein, carbs, fats) and slot cost
+        self.vectors = {
+            mt: [(m["calories"], m["protein"], m["carbs"], m["fats"]) for m in meals]
+            for mt, meals in candidates.items()
+        }
+        self.slot_costs = {
+            mt: [((v[0] - self.targets[mt]) / self.targets[mt]) ** 2 for v in vectors]
+            for mt, vectors in self.vectors.items()
+        }
+
+        self.assignment: Dict[str, List[int]] = {}
+        self.counts: Dict[str, Dict[int, int]] = {}
+        self.week_macros = [0.0, 0.0, 0.0]
+        self.day_calories = [0.0] * 7
+
+    # -------------------- SCORING --------------------
+
+    def macro_cost(self, macros) -> float:
+        return sum(((value - target) / target) ** 2 for value, target in zip(macros, self.macro_targets))
+
+    def day_cost(self, calories: float) -> float:
+        return ((calories - self.daily_calories) / self.daily_calories) ** 2
+
+    def adjacent(self, meal_type: str, day: int, index: int) -> int:
+        """Number of neighbouring days that would serve the same meal."""
+        days = self.assignment[meal_type]
+        return sum(
+            1 for neighbour in (day - 1, day + 1)
+            if 0 <= neighbour < 7 and days[neighbour] == index
+        )
+
+    def score(self) -> float:
+        """Full score of the current assignment (lower is better)."""
+        total = MACRO_WEIGHT * self.macro_cost(self.week_macros)
+        total += DAY_WEIGHT * sum(self.day_cost(c) for c in self.day_calories)
+        for mt, days in self.assignment.items():
+            total += SLOT_WEIGHT * sum(self.slot_costs[mt][i] for i in days)
+            total += ADJACENT_WEIGHT * sum(1 for d in range(6) if days[d] == days[d + 1])
+        return total
+
+    def swap_delta(self, meal_type: str, day_a: int, day_b: int) -> float:
+        """Score change of exchanging one meal type's meals between two days."""
+        days = self.assignment[meal_type]
+        a, b = days[day_a], days[day_b]
+        shift = self.vectors[meal_type][b][0] - self.vectors[meal_type][a][0]
+
+        before = self.day_cost(self.day_calories[day_a]) + self.day_cost(self.day_calories[day_b])
+        after = self.day_cost(self.day_calories[day_a] + shift) + self.day_cost(self.day_calories[day_b] - shift)
+
+        adjacent_before = self.adjacent(meal_type, day_a, a) + self.adjacent(meal_type, day_b, b)
+        days[day_a], days[day_b] = b, a
+        adjacent_after = self.adjacent(meal_type, day_a, b) + self.adjacent(meal_type, day_b, a)
+        days[day_a], days[day_b] = a, b
+
+        return DAY_WEIGHT * (after - before) + ADJACENT_WEIGHT * (adjacent_after - adjacent_before)
+
+    def best_replacement(self, meal_type: str, day: int) -> Optional[int]:
+        """
+        Find the candidate that most improves one slot.
+
+        Only the terms that change with the slot's meal are scored; the parts
+        of the weekly and daily totals contributed by other slots are
+        computed once per slot, not once per candidate.
+
+        Returns:
+            Index of the best candidate, or None if no replacement improves
+        """
+        days = self.assignment[meal_type]
+        old = days[day]
+        vectors = self.vectors[meal_type]
+        slot_costs = self.slot_costs[meal_type]
+        counts = self.counts[meal_type]
+        old_cal, old_p, old_c, old_f = vectors[old]
+
+        (target_p, target_c, target_f) = self.macro_targets
+        base_p = self.week_macros[0] - old_p
+        base_c = self.week_macros[1] - old_c
+        base_f = self.week_macros[2] - old_f
+        base_day = self.day_calories[day] - old_cal
+        daily = self.daily_calories
+        neighbours = [days[n] for n in (day - 1, day + 1) if 0 <= n < 7]
+
+        def cost(index):
+            cal, p, c, f = vectors[index]
+            return (
+                SLOT_WEIGHT * slot_costs[index]
+                + MACRO_WEIGHT * (
+                    ((base_p + p - target_p) / target_p) ** 2
+                    + ((base_c + c - target_c) / target_c) ** 2
+                    + ((base_f + f - target_f) / target_f) ** 2
+                )
+                + DAY_WEIGHT * ((base_day + cal - daily) / daily) ** 2
+                + ADJACENT_WEIGHT * neighbours.count(index)
+            )
+
+        best_index, best_cost = None, cost(old) - 1e-9
+        for index in range(len(vectors)):
+            if index == old or counts.get(index, 0) >= self.max_repeats:
+                continue
+            candidate_cost = cost(index)
+            if candidate_cost < best_cost:
+                best_index, best_cost = index, candidate_cost
+        return best_index
+
+    # -------------------- MOVES --------------------
+
+    def place(self, meal_type: str, day: int, index: int):
+        old = self.assignment[meal_type][day]
+        if old is not None:
+            vec = self.vectors[meal_type][old]
+            self.week_macros = [w - v for w, v in zip(self.week_macros, vec[1:])]
+            self.day_calories[day] -= vec[0]
+            self.counts[meal_type][old] -= 1
+
+        vec = self.vectors[meal_type][index]
+        self.week_macros = [w + v for w, v in zip(self.week_macros, vec[1:])]
+        self.day_calories[day] += vec[0]
+        self.counts[meal_type][index] = self.counts[meal_type].get(index, 0) + 1
+        self.assignment[meal_type][day] = index
+
+    def swap_days(self, meal_type: str, day_a: int, day_b: int):
+        days = self.assignment[meal_type]
+        a, b = days[day_a], days[day_b]
+        shift = self.vectors[meal_type][b][0] - self.vectors[meal_type][a][0]
+        self.day_calories[day_a] += shift
+        self.day_calories[day_b] -= shift
+        days[day_a], days[day_b] = b, a
+
+    # -------------------- SEARCH --------------------
+
+    def initialize(self):
+        """Greedy start: best calorie matches, each used up to max_repeats, spread across the week."""
+        for mt in MEAL_TYPES:
+            self.assignment[mt] = [None] * 7
+            self.counts[mt] = {}
+            ranked = sorted(range(len(self.vectors[mt])), key=lambda i: self.slot_costs[mt][i])
+            picks = [i for i in ranked for _ in range(self.max_repeats)][:7]
+            # Fill every other day first so repeats land apart
+            for day, index in zip([0, 2, 4, 6, 1, 3, 5], sorted(picks)):
+                self.place(mt, day, index)
+
+    def improve(self, max_passes: int = MEAL_COMPOSER_MAX_PASSES) -> int:
+        """
+        Apply improving moves until a pass finds none.
+
+        Args:
+            max_passes: Upper bound on passes over the grid
+
+        Returns:
+            Number of passes run
+        """
+        for passes in range(1, max_passes + 1):
+            improved = False
+            for mt in MEAL_TYPES:
+                for day in range(7):
+                    best_index = self.best_replacement(mt, day)
+                    if best_index is not None:
+                        self.place(mt, day, best_index)
+                        improved = True
+
+                for day_a in range(7):
+                    for day_b in range(day_a + 1, 7):
+                        if self.assignment[mt][day_a] != self.assignment[mt][day_b] \
+                                and self.swap_delta(mt, day_a, day_b) < -1e-9:
+                            self.swap_days(mt, day_a, day_b)
+                            improved = True
+
+            if not improved:
+                return passes
+        return max_passes
+
+    def meals(self) -> List[Dict]:
+        """The composed week as meal dicts ordered Monday breakfast to Sunday dinner."""
+        week = []
+        for day_index, day in enumerate(DAYS_OF_WEEK):
+            for mt in MEAL_TYPES:
+                meal = copy_meal(self.candidates[mt][self.assignment[mt][day_index]])
+                meal["day"] = day
+                meal["meal_type"] = mt
+                week.append(meal)
+        return week
+
+
+def dedupe_candidates(meals: List[Dict]) -> List[Dict]:
+    """Drop meals whose name was already seen (case-insensitive)."""
+    seen = set()
+    unique = []
+    for meal in meals:
+        name = meal["name"].strip().lower()
+        if name not in seen:
+            seen.add(name)
+            unique.append(meal)
+    return unique
+
+
+def compose_week(
+    candidates: Dict[str, List[Dict]],
+    fitness_goal: str,
+    daily_calories: int,
+    max_repeats: int = MEAL_COMPOSER_MAX_REPEATS,
+    calorie_tolerance: float = MEAL_COMPOSER_CALORIE_TOLERANCE
+) -> Optional[List[Dict]]:
+    """
+    Compose a week from candidate meals.
+
+    Args:
+        candidates: Candidate meals per meal type
+        fitness_goal: User's fitness goal (sets the weekly macro split)
+        daily_calories: User's daily calorie target
+        max_repeats: Maximum times one meal may appear in the week
+        calorie_tolerance: Ignore candidates further than this fraction
+            from their slot's calorie target
+
+    Returns:
+        List of 21 meal dictionaries with day and meal_type included, or
+        None if the pool cannot fill every slot within max_repeats
+    """
+    usable = {}
+    for mt in MEAL_TYPES:
+        target = get_meal_calorie_target(mt, daily_calories)
+        usable[mt] = [
+            m for m in dedupe_candidates(candidates.get(mt, []))
+            if abs(m["calories"] - target) <= target * calorie_tolerance
+        ]
+        if len(usable[mt]) * max_repeats < 7:
+            print(f"Week composer: only {len(usable[mt])} usable {mt} candidates")
+            return None
+
+    composer = WeekComposer(usable, fitness_goal, daily_calories, max_repeats)
+    composer.initialize()
+    passes = composer.improve()
+    print(f"Week composer: score {composer.score():.4f} after {passes} passes")
+    return composer.meals()
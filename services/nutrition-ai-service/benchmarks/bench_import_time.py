@@ -0,0 +1,89 @@
+"""
+Benchmark: time to import main.py, the cost every worker pays on fork/spawn.
+
+Runs `python -X importtime -c "import main"` in fresh interpreters, reports
+the median cumulative import time and the slowest modules main pulls in,
+and exits with status 1 when the median exceeds the budget or when a
+provider SDK that should load lazily (on first use) is imported.
+
+Usage:
+    python benchmarks/bench_import_time.py --runs 5 --budget-ms 2000
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded on first use (see ai_coach.get_model, macro_analyzer.get_client), never at import
+LAZY_MODULES = ("google.generativeai", "openai", "httpx")
+
+IMPORT_TIME_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "2000"))
+
+LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$")
+
+
+def import_profile():
+    """
+    Import main in a fresh interpreter.
+
+    Returns:
+        List of (module, cumulative microseconds, nesting depth) in import order
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=SERVICE_DIR,
+        env=dict(os.environ, PYTHONDONTWRITEBYTECODE="1"),
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    modules = []
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            _, cumulative, indent, name = match.groups()
+            modules.append((name, int(cumulative), len(indent) // 2))
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to time")
+    parser.add_argument("--budget-ms", type=float, default=IMPORT_TIME_BUDGET_MS, help="Allowed median import time")
+    parser.add_argument("--top", type=int, default=10, help="Slowest direct imports of main to list")
+    args = parser.parse_args()
+
+    # The first run also compiles bytecode and warms the OS file cache
+    import_profile()
+    runs = [import_profile() for _ in range(args.runs)]
+
+    totals = [next(cumulative for name, cumulative, _ in modules if name == "main") / 1000 for modules in runs]
+    median = statistics.median(totals)
+    print(f"import main  runs={args.runs} median={median:.0f}ms min={min(totals):.0f}ms budget={args.budget_ms:.0f}ms")
+
+    direct = sorted(
+        ((cumulative, name) for name, cumulative, depth in runs[-1] if depth == 1),
+        reverse=True
+    )
+    for cumulative, name in direct[:args.top]:
+        print(f"  {cumulative / 1000:8.1f}ms  {name}")
+
+    failed = False
+    imported = {name for name, _, _ in runs[-1]}
+    eager = [name for name in LAZY_MODULES if name in imported]
+    if eager:
+        print(f"FAIL: imported at startup, should load lazily: {', '.join(eager)}")
+        failed = True
+    if median > args.budget_ms:
+        print(f"FAIL: import time {median:.0f}ms is over the {args.budget_ms:.0f}ms budget")
+        failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""
+Circuit breaker for LLM provider calls.
+
+When a provider degrades, every call waits for its full timeout before
+falling back, and a weekly plan of 21 calls takes minutes. Each provider
+gets one breaker shared by every caller in the process. It watches the
+failure rate and the share of slow calls over a sliding window and, past
+either threshold, opens: callers skip the provider and use their fallback
+immediately. After CIRCUIT_OPEN_SECONDS it lets a few probe calls through
+(half-open); if they succeed the circuit closes, otherwise it opens again.
+"""
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict
+
+from dotenv import load_dotenv
+
+from metrics import counter, gauge
+
+load_dotenv()
+
+CIRCUIT_BREAKER_ENABLED = os.getenv("CIRCUIT_BREAKER_ENABLED", "true").lower() == "true"
+# Outcomes from the last CIRCUIT_WINDOW_SECONDS are considered
+CIRCUIT_WINDOW_SECONDS = float(os.getenv("CIRCUIT_WINDOW_SECONDS", "60"))
+# Rates are only judged once the window holds this many calls
+CIRCUIT_MIN_CALLS = int(os.getenv("CIRCUIT_MIN_CALLS", "5"))
+# Open when this share of calls fails...
+CIRCUIT_FAILURE_RATE = float(os.getenv("CIRCUIT_FAILURE_RATE", "0.5"))
+# ...or this share of calls takes longer than CIRCUIT_SLOW_CALL_SECONDS
+CIRCUIT_SLOW_CALL_SECONDS = float(os.getenv("CIRCUIT_SLOW_CALL_SECONDS", "10"))
+CIRCUIT_SLOW_CALL_RATE = float(os.getenv("CIRCUIT_SLOW_CALL_RATE", "0.8"))
+# How long the circuit stays open before probing
+CIRCUIT_OPEN_SECONDS = float(os.getenv("CIRCUIT_OPEN_SECONDS", "30"))
+# Probe calls allowed while half-open; this many successes close the circuit
+CIRCUIT_HALF_OPEN_PROBES = int(os.getenv("CIRCUIT_HALF_OPEN_PROBES", "1"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+breaker_state = gauge("circuit_breaker_state", "Circuit state per provider (0 closed, 1 half-open, 2 open)")
+breaker_transitions = counter("circuit_breaker_transitions_total", "Circuit state changes by provider and new state")
+breaker_rejections = counter("circuit_breaker_rejections_total", "Calls sent straight to fallback by an open circuit")
+
+
+class CircuitBreaker:
+    """Failure-rate and latency circuit breaker for one provider. Thread-safe."""
+
+    def __init__(
+        self,
+        provider: str,
+        window_seconds: float = CIRCUIT_WINDOW_SECONDS,
+        min_calls: int = CIRCUIT_MIN_CALLS,
+        failure_rate: float = CIRCUIT_FAILURE_RATE,
+        slow_call_seconds: float = CIRCUIT_SLOW_CALL_SECONDS,
+        slow_call_rate: float = CIRCUIT_SLOW_CALL_RATE,
+        open_seconds: float = CIRCUIT_OPEN_SECONDS,
+        half_open_probes: int = CIRCUIT_HALF_OPEN_PROBES,
+        enabled: bool = CIRCUIT_BREAKER_ENABLED
+    ):
+        self.provider = provider
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self.enabled = enabled
+
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.opened_at = 0.0
+        # (finished_at, failed, slow) per call in the window, with running counts
+        self._outcomes: deque = deque()
+        self._failures = 0
+        self._slow = 0
+        self._probes_in_flight = 0
+        self._probe_started_at = 0.0
+        self._probe_successes = 0
+        breaker_state.set(0, provider=provider)
+
+    # -------------------- STATE --------------------
+
+    def _transition(self, state: str, now: float):
+        self.state = state
+        if state == OPEN:
+            self.opened_at = now
+        if state != CLOSED:
+            self._probes_in_flight = 0
+            self._probe_successes = 0
+        if state == CLOSED:
+            self._outcomes.clear()
+            self._failures = 0
+            self._slow = 0
+        breaker_state.set(STATE_VALUES[state], provider=self.provider)
+        breaker_transitions.inc(provider=self.provider, state=state)
+        print(f"Circuit breaker for {self.provider} is now {state}")
+
+    def _prune(self, now: float):
+        while self._outcomes and self._outcomes[0][0] < now - self.window_seconds:
+            _, failed, slow = self._outcomes.popleft()
+            self._failures -= failed
+            self._slow -= slow
+
+    def allow(self) -> bool:
+        """
+        Check whether a call may go to the provider. A True answer while
+        half-open reserves a probe slot; report its outcome with `record`,
+        or `release` it if the call never completed.
+
+        Returns:
+            False if the caller should use its fallback right away
+        """
+        if not self.enabled:
+            return True
+
+        with self._lock:
+            now = time.monotonic()
+            if self.state == OPEN and now - self.opened_at >= self.open_seconds:
+                self._transition(HALF_OPEN, now)
+
+            if self.state == HALF_OPEN:
+                # A probe that never reported back is given up on after open_seconds
+                if self._probes_in_flight and now - self._probe_started_at >= self.open_seconds:
+                    self._probes_in_flight = 0
+                if self._probes_in_flight + self._probe_successes < self.half_open_probes:
+                    self._probes_in_flight += 1
+                    self._probe_started_at = now
+                    return True
+
+            if self.state == CLOSED:
+                return True
+
+        breaker_rejections.inc(provider=self.provider)
+        return False
+
+    def record(self, success: bool, duration: float, measure_latency: bool = True):
+        """
+        Report the outcome of a call that `allow` let through.
+
+        Args:
+            success: Whether the provider answered
+            duration: Seconds the call took
+            measure_latency: Count the call towards the slow-call rate
+        """
+        if not self.enabled:
+            return
+
+        slow = measure_latency and duration >= self.slow_call_seconds
+        with self._lock:
+            now = time.monotonic()
+            if self.state == HALF_OPEN:
+                self._probes_in_flight = max(self._probes_in_flight - 1, 0)
+                if not success or slow:
+                    self._transition(OPEN, now)
+                else:
+                    self._probe_successes += 1
+                    if self._probe_successes >= self.half_open_probes:
+                        self._transition(CLOSED, now)
+                return
+
+            if self.state == OPEN:
+                # A call started before the circuit opened
+                return
+
+            self._outcomes.append((now, not success, slow))
+            self._failures += not success
+            self._slow += slow
+            self._prune(now)
+
+            calls = len(self._outcomes)
+            if calls >= self.min_calls and (
+                self._failures / calls >= self.failure_rate
+                or self._slow / calls >= self.slow_call_rate
+            ):
+                self._transition(OPEN, now)
+
+    def release(self):
+        """Give back a probe slot for a call that ended without an outcome (e.g. cancelled)."""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probes_in_flight = max(self._probes_in_flight - 1, 0)
+
+    @contextmanager
+    def track(self, measure_latency: bool = True):
+        """
+        Time the provider call in the block and record its outcome: an
+        exception is a failure, cancellation releases the call without an
+        outcome.
+
+        Args:
+            measure_latency: Count the call towards the slow-call rate
+        """
+        start = time.monotonic()
+        try:
+            yield
+        except Exception:
+            self.record(False, time.monotonic() - start, measure_latency)
+            raise
+        except BaseException:
+            self.release()
+            raise
+        self.record(True, time.monotonic() - start, measure_latency)
+
+    def reset(self):
+        """Close the circuit and forget all outcomes."""
+        with self._lock:
+            self._transition(CLOSED, time.monotonic())
+
+    def get_state(self) -> Dict:
+        """
+        Get the breaker state for health checks.
+
+        Returns:
+            Dictionary with state, call count, failure and slow-call rates in
+            the window, and seconds until the next probe when open
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._prune(now)
+            calls = len(self._outcomes)
+            state = {
+                "state": self.state,
+                "calls": calls,
+                "failure_rate": round(self._failures / calls, 3) if calls else 0.0,
+                "slow_call_rate": round(self._slow / calls, 3) if calls else 0.0
+            }
+            if self.state == OPEN:
+                state["retry_in_seconds"] = round(max(self.open_seconds - (now - self.opened_at), 0.0), 1)
+            return state
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(provider: str) -> CircuitBreaker:
+    """
+    Get the process-wide breaker for a provider, creating it on first use.
+
+    Args:
+        provider: Provider name, e.g. "openai"
+
+    Returns:
+        Shared CircuitBreaker instance
+    """
+    with _breakers_lock:
+        breaker = _breakers.get(provider)
+        if breaker is None:
+            breaker = CircuitBreaker(provider)
+            _breakers[provider] = breaker
+        return breaker
+
+
+def get_breaker_states() -> Dict[str, Dict]:
+    """State of every provider's breaker, for /health."""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.provider: breaker.get_state() for breaker in breakers}
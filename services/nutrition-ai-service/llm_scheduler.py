@@ -0,0 +1,337 @@
+"""
+Priority-aware scheduler for LLM requests.
+
+Every LLM call in the process asks its provider's scheduler for a slot
+before going out. Slots are granted from per-provider token buckets for
+requests per minute and tokens per minute, highest priority first:
+interactive (chat, meal swaps, recipe analysis) before plan generation
+before background batch work (swap pool refills, queued jobs). Lower
+priorities also leave a share of each bucket untouched so a burst of plans
+cannot use up the headroom interactive calls need. Queues are bounded per priority and every request
+has a deadline; callers that are rejected or time out use their fallback,
+just as when the provider itself fails.
+"""
+import asyncio
+import heapq
+import itertools
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Optional
+
+from dotenv import load_dotenv
+
+from metrics import counter, gauge, summary
+
+load_dotenv()
+
+INTERACTIVE = 0
+PLAN = 1
+BATCH = 2
+PRIORITY_NAMES = {INTERACTIVE: "interactive", PLAN: "plan", BATCH: "batch"}
+
+# Share of each bucket a priority class may not dip into
+RESERVES = {INTERACTIVE: 0.0, PLAN: 0.1, BATCH: 0.25}
+
+# Requests waiting per priority class before new ones are rejected
+LLM_MAX_QUEUED = int(os.getenv("LLM_MAX_QUEUED", "256"))
+# Longest a request may wait for a slot, per priority class
+LLM_DEADLINES = {
+    INTERACTIVE: float(os.getenv("LLM_DEADLINE_INTERACTIVE_SECONDS", "10")),
+    PLAN: float(os.getenv("LLM_DEADLINE_PLAN_SECONDS", "60")),
+    BATCH: float(os.getenv("LLM_DEADLINE_BATCH_SECONDS", "300"))
+}
+# Provider limits, overridable as <PROVIDER>_REQUESTS_PER_MINUTE / <PROVIDER>_TOKENS_PER_MINUTE
+PROVIDER_LIMITS = {
+    "openai": (500, 200000),
+    "gemini": (60, 1000000)
+}
+
+queue_wait = summary("llm_queue_wait_seconds", "Time LLM requests wait for a scheduler slot")
+scheduled_requests = counter(
+    "llm_scheduled_requests_total",
+    "LLM requests by provider, priority and result (granted, rejected, expired)"
+)
+queue_depth = gauge("llm_queue_depth", "LLM requests waiting for a slot per provider and priority")
+
+_priority: ContextVar[int] = ContextVar("llm_priority", default=PLAN)
+
+
+class LLMSchedulerError(Exception):
+    """Raised when a request does not get a slot; callers use their fallback."""
+    pass
+
+
+class LLMQueueFullError(LLMSchedulerError):
+    """Raised when the request's priority queue is at capacity."""
+    pass
+
+
+class LLMDeadlineExceededError(LLMSchedulerError):
+    """Raised when a request waits longer than its deadline."""
+    pass
+
+
+def current_priority() -> int:
+    """Priority of LLM calls made from the current context (PLAN by default)."""
+    return _priority.get()
+
+
+@contextmanager
+def llm_priority(priority: int):
+    """
+    Run LLM calls in the block at the given priority. Tasks created inside
+    the block inherit it.
+
+    Args:
+        priority: INTERACTIVE, PLAN or BATCH
+    """
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def estimate_tokens(prompt: str, max_tokens: int) -> int:
+    """Upper estimate of a call's token usage: ~4 characters per prompt token plus the completion limit."""
+    return len(prompt) // 4 + max_tokens
+
+
+class TokenBucket:
+    """Bucket refilled continuously at `per_minute` units per minute."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, reserve: float) -> float:
+        """Seconds until `amount` can be taken while keeping `reserve` of capacity."""
+        # A request larger than the bucket waits for a full bucket, not forever
+        needed = min(amount, self.capacity * (1 - reserve)) + self.capacity * reserve
+        if self.tokens >= needed:
+            return 0.0
+        return (needed - self.tokens) / self.rate
+
+    def take(self, amount: float):
+        self.tokens -= min(amount, self.capacity)
+
+
+class _Waiter:
+    """A request waiting for a slot."""
+
+    def __init__(self, priority: int, tokens: int, wake: Callable[[], None]):
+        self.priority = priority
+        self.tokens = tokens
+        self.wake = wake
+        self.enqueued_at = time.monotonic()
+        self.granted = False
+        self.cancelled = False
+
+
+class LLMScheduler:
+    """Request and token rate limits for one provider, granted in priority order. Thread-safe."""
+
+    def __init__(
+        self,
+        provider: str,
+        requests_per_minute: float,
+        tokens_per_minute: float,
+        max_queued: int = LLM_MAX_QUEUED
+    ):
+        self.provider = provider
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_queued = max_queued
+        self._lock = threading.Lock()
+        self._heap = []
+        self._seq = itertools.count()
+        self._queued = {priority: 0 for priority in PRIORITY_NAMES}
+        self._timer: Optional[threading.Timer] = None
+        self._timer_at = math.inf
+
+    def queued(self, priority: int) -> int:
+        """Requests of a priority class waiting for a slot."""
+        return self._queued[priority]
+
+    # -------------------- QUEUE --------------------
+
+    def _set_depth(self, priority: int, delta: int):
+        self._queued[priority] += delta
+        queue_depth.set(self._queued[priority], provider=self.provider, priority=PRIORITY_NAMES[priority])
+
+    def _enqueue(self, priority: int, tokens: int, wake: Callable[[], None]) -> _Waiter:
+        with self._lock:
+            if self._queued[priority] >= self.max_queued:
+                scheduled_requests.inc(provider=self.provider, priority=PRIORITY_NAMES[priority], result="rejected")
+                raise LLMQueueFullError(f"{self.provider} {PRIORITY_NAMES[priority]} queue is full")
+            waiter = _Waiter(priority, tokens, wake)
+            heapq.heappush(self._heap, (priority, next(self._seq), waiter))
+            self._set_depth(priority, 1)
+            self._dispatch()
+        return waiter
+
+    def _dispatch(self):
+        """Grant slots to waiters in priority order while the buckets allow. Lock held."""
+        now = time.monotonic()
+        self.requests.refill(now)
+        self.tokens.refill(now)
+
+        while self._heap:
+            priority, _, waiter = self._heap[0]
+            if waiter.cancelled:
+                heapq.heappop(self._heap)
+                continue
+
+            reserve = RESERVES[priority]
+            wait = max(self.requests.wait_time(1, reserve), self.tokens.wait_time(waiter.tokens, reserve))
+            if wait > 0:
+                self._wake_at(now + wait)
+                return
+
+            heapq.heappop(self._heap)
+            self.requests.take(1)
+            self.tokens.take(waiter.tokens)
+            self._set_depth(priority, -1)
+            waiter.granted = True
+            waiter.wake()
+
+    def _wake_at(self, at: float):
+        """Run _dispatch again at `at` (bucket refill). Lock held."""
+        if self._timer is not None and self._timer_at <= at:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(max(at - time.monotonic(), 0.0), self._on_timer)
+        self._timer.daemon = True
+        self._timer_at = at
+        self._timer.start()
+
+    def _on_timer(self):
+        with self._lock:
+            self._timer = None
+            self._timer_at = math.inf
+            self._dispatch()
+
+    def _give_up(self, waiter: _Waiter) -> bool:
+        """Leave the queue unless the slot was granted meanwhile. Returns True if left."""
+        with self._lock:
+            if waiter.granted:
+                return False
+            waiter.cancelled = True
+            self._set_depth(waiter.priority, -1)
+            self._dispatch()
+            return True
+
+    def _granted(self, waiter: _Waiter):
+        name = PRIORITY_NAMES[waiter.priority]
+        queue_wait.observe(time.monotonic() - waiter.enqueued_at, provider=self.provider, priority=name)
+        scheduled_requests.inc(provider=self.provider, priority=name, result="granted")
+
+    def _expired(self, waiter: _Waiter, timeout: float):
+        name = PRIORITY_NAMES[waiter.priority]
+        queue_wait.observe(time.monotonic() - waiter.enqueued_at, provider=self.provider, priority=name)
+        scheduled_requests.inc(provider=self.provider, priority=name, result="expired")
+        raise LLMDeadlineExceededError(f"No {self.provider} slot within {timeout}s")
+
+    def reset(self):
+        """Refill both buckets. Waiting requests keep their place."""
+        with self._lock:
+            self.requests.tokens = self.requests.capacity
+            self.tokens.tokens = self.tokens.capacity
+            self._dispatch()
+
+    # -------------------- ACQUIRE --------------------
+
+    def acquire(self, priority: Optional[int] = None, tokens: int = 0, deadline: Optional[float] = None):
+        """
+        Block until the request may be sent.
+
+        Args:
+            priority: INTERACTIVE, PLAN or BATCH (defaults to current_priority())
+            tokens: Estimated tokens the call will use (see estimate_tokens)
+            deadline: Seconds to wait at most (defaults to the priority's deadline)
+
+        Raises:
+            LLMQueueFullError: If the priority's queue is full
+            LLMDeadlineExceededError: If no slot was granted within the deadline
+        """
+        priority = current_priority() if priority is None else priority
+        timeout = LLM_DEADLINES[priority] if deadline is None else deadline
+        event = threading.Event()
+        waiter = self._enqueue(priority, tokens, event.set)
+
+        if not event.wait(timeout) and self._give_up(waiter):
+            self._expired(waiter, timeout)
+        self._granted(waiter)
+
+    async def acquire_async(self, priority: Optional[int] = None, tokens: int = 0, deadline: Optional[float] = None):
+        """
+        Async variant of `acquire`; waits without blocking the event loop.
+        A cancelled caller leaves the queue.
+        """
+        priority = current_priority() if priority is None else priority
+        timeout = LLM_DEADLINES[priority] if deadline is None else deadline
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def resolve():
+            if not future.done():
+                future.set_result(None)
+
+        def wake():
+            try:
+                loop.call_soon_threadsafe(resolve)
+            except RuntimeError:
+                # Loop already closed: nobody is waiting any more
+                pass
+
+        waiter = self._enqueue(priority, tokens, wake)
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            if self._give_up(waiter):
+                self._expired(waiter, timeout)
+        except asyncio.CancelledError:
+            self._give_up(waiter)
+            raise
+        self._granted(waiter)
+
+
+_schedulers: Dict[str, LLMScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(provider: str) -> LLMScheduler:
+    """
+    Get the process-wide scheduler for a provider, creating it on first use
+    with limits from <PROVIDER>_REQUESTS_PER_MINUTE and
+    <PROVIDER>_TOKENS_PER_MINUTE.
+
+    Args:
+        provider: Provider name, e.g. "openai"
+
+    Returns:
+        Shared LLMScheduler instance
+    """
+    with _schedulers_lock:
+        scheduler = _schedulers.get(provider)
+        if scheduler is None:
+            default_rpm, default_tpm = PROVIDER_LIMITS.get(provider, PROVIDER_LIMITS["openai"])
+            prefix = provider.upper()
+            scheduler = LLMScheduler(
+                provider,
+                float(os.getenv(f"{prefix}_REQUESTS_PER_MINUTE", str(default_rpm))),
+                float(os.getenv(f"{prefix}_TOKENS_PER_MINUTE", str(default_tpm)))
+            )
+            _schedulers[provider] = scheduler
+        return scheduler
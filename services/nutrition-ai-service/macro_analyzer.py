@@ -2,21 +2,100 @@
 Recipe macro analysis using OpenAI API.
 Extracts nutritional information from recipe text.
 """
-from openai import OpenAI, OpenAIError
 import os
+import sys
 import json
+import asyncio
+import threading
 from typing import Dict, List, Optional
 from dotenv import load_dotenv
 
+from circuit_breaker import get_breaker
+from llm_scheduler import INTERACTIVE, LLMSchedulerError, estimate_tokens, get_scheduler
+
 load_dotenv()
 
-# Initialize OpenAI client
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# Seconds an async recipe analysis may take before falling back to the estimate
+OPENAI_RECIPE_TIMEOUT_SECONDS = float(os.getenv("OPENAI_RECIPE_TIMEOUT_SECONDS", "30"))
+
+# Not created yet; the openai package takes about a second to import, so the
+# client is built on first use instead of when the service is imported
+_NOT_LOADED = object()
+
+# OpenAI client, created by get_client(); None without OPENAI_API_KEY
+client = _NOT_LOADED
+# AsyncOpenAI client, created by get_async_client(); None without OPENAI_API_KEY
+async_client = _NOT_LOADED
+_client_lock = threading.Lock()
+
+# Shared by every OpenAI call in this process; while open, callers fall back at once
+openai_breaker = get_breaker("openai")
+# Rate limits and priority order for every OpenAI call in this process
+openai_scheduler = get_scheduler("openai")
+
+
+def get_client():
+    """
+    Get the shared OpenAI client, importing the SDK on first use.
+    
+    Returns:
+        OpenAI client, or None if OPENAI_API_KEY is not set
+    """
+    global client
+    if client is _NOT_LOADED:
+        with _client_lock:
+            if client is _NOT_LOADED:
+                if OPENAI_API_KEY:
+                    from openai import OpenAI
+                    client = OpenAI(api_key=OPENAI_API_KEY)
+                else:
+                    print("WARNING: OPENAI_API_KEY is not set - recipe analysis uses fallback estimates")
+                    client = None
+    return client
+
+
+def get_async_client():
+    """
+    Get the shared async OpenAI client, importing the SDK on first use.
+    
+    Returns:
+        AsyncOpenAI client, or None if OPENAI_API_KEY is not set
+    """
+    global async_client
+    if async_client is _NOT_LOADED:
+        with _client_lock:
+            if async_client is _NOT_LOADED:
+                if OPENAI_API_KEY:
+                    from openai import AsyncOpenAI
+                    async_client = AsyncOpenAI(api_key=OPENAI_API_KEY)
+                else:
+                    async_client = None
+    return async_client
+
+
+def is_openai_error(error: Exception) -> bool:
+    """
+    Whether an exception came from the OpenAI SDK, without importing it:
+    any call that could raise one has loaded the SDK already.
+    """
+    openai = sys.modules.get("openai")
+    return openai is not None and isinstance(error, openai.OpenAIError)
 
-if not OPENAI_API_KEY:
-    raise RuntimeError("OPENAI_API_KEY is not set")
 
-client = OpenAI(api_key=OPENAI_API_KEY)
+def warm_up():
+    """
+    Load the SDK and open the client's connection to OpenAI during startup
+    warm-up, so the first recipe analysis pays for neither. Listing models
+    uses no tokens.
+    
+    Raises:
+        RuntimeError: If OPENAI_API_KEY is not set
+    """
+    openai_client = get_client()
+    if not openai_client:
+        raise RuntimeError("OPENAI_API_KEY is not set")
+    openai_client.models.list()
 
 
 def create_recipe_analysis_prompt(recipe_text: str) -> str:
@@ -64,6 +143,28 @@ Be accurate with portion sizes and macro calculations. Do not include markdown f
     return prompt
 
 
+def create_recipe_analysis_messages(prompt: str) -> List[Dict]:
+    """
+    Wrap a recipe analysis prompt in chat messages for OpenAI.
+    
+    Args:
+        prompt: Prompt from create_recipe_analysis_prompt
+    
+    Returns:
+        Chat messages list
+    """
+    return [
+        {
+            "role": "system",
+            "content": "You are a professional nutritionist analyzing recipe macros. Return only valid JSON without markdown formatting."
+        },
+        {
+            "role": "user",
+            "content": prompt
+        }
+    ]
+
+
 def parse_recipe_analysis_response(response_text: str) -> Optional[Dict]:
     """
     Parse OpenAI response and extract recipe analysis data.
@@ -160,30 +261,28 @@ def analyze_recipe_macros(recipe_text: str) -> Dict:
         Dictionary containing recipe analysis with macros
     """
     # Check if OpenAI client is available
-    if not client:
+    openai_client = get_client()
+    if not openai_client:
         print("OpenAI client not available, using fallback analysis")
         return get_fallback_recipe_analysis(recipe_text)
     
+    if not openai_breaker.allow():
+        print("OpenAI circuit open, using fallback analysis")
+        return get_fallback_recipe_analysis(recipe_text)
+    
     try:
         # Create prompt
         prompt = create_recipe_analysis_prompt(recipe_text)
+        openai_scheduler.acquire(INTERACTIVE, tokens=estimate_tokens(prompt, 800))
         
         # Call OpenAI API
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a professional nutritionist analyzing recipe macros. Return only valid JSON without markdown formatting."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            temperature=0.3,  # Lower temperature for more consistent results
-            max_tokens=800
-        )
+        with openai_breaker.track():
+            response = openai_client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=create_recipe_analysis_messages(prompt),
+                temperature=0.3,  # Lower temperature for more consistent results
+                max_tokens=800
+            )
         
         # Extract response
         response_text = response.choices[0].message.content
@@ -198,12 +297,82 @@ def analyze_recipe_macros(recipe_text: str) -> Dict:
             print("Failed to parse AI response, using fallback")
             return get_fallback_recipe_analysis(recipe_text)
     
-    except OpenAIError as e:
-        print(f"OpenAI API error: {e}")
+    except LLMSchedulerError as e:
+        openai_breaker.release()
+        print(f"No OpenAI slot ({e}), using fallback analysis")
         return get_fallback_recipe_analysis(recipe_text)
     
     except Exception as e:
-        print(f"Unexpected error analyzing recipe: {e}")
+        if is_openai_error(e):
+            print(f"OpenAI API error: {e}")
+        else:
+            print(f"Unexpected error analyzing recipe: {e}")
+        return get_fallback_recipe_analysis(recipe_text)
+
+
+async def analyze_recipe_macros_async(recipe_text: str, timeout: Optional[float] = None) -> Dict:
+    """
+    Async variant of analyze_recipe_macros built on the async OpenAI client,
+    so waiting for a scheduler slot or for OpenAI holds no worker thread and
+    never blocks the event loop. The call is bounded by a timeout.
+    
+    Args:
+        recipe_text: Recipe text with ingredients
+        timeout: Seconds before falling back (defaults to OPENAI_RECIPE_TIMEOUT_SECONDS)
+    
+    Returns:
+        Dictionary containing recipe analysis with macros
+    """
+    openai_client = get_async_client()
+    if not openai_client:
+        print("OpenAI client not available, using fallback analysis")
+        return get_fallback_recipe_analysis(recipe_text)
+    
+    if not openai_breaker.allow():
+        print("OpenAI circuit open, using fallback analysis")
+        return get_fallback_recipe_analysis(recipe_text)
+    
+    if timeout is None:
+        timeout = OPENAI_RECIPE_TIMEOUT_SECONDS
+    
+    try:
+        prompt = create_recipe_analysis_prompt(recipe_text)
+        await openai_scheduler.acquire_async(INTERACTIVE, tokens=estimate_tokens(prompt, 800))
+        
+        with openai_breaker.track():
+            response = await asyncio.wait_for(
+                openai_client.chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=create_recipe_analysis_messages(prompt),
+                    temperature=0.3,
+                    max_tokens=800
+                ),
+                timeout
+            )
+        
+        recipe_data = parse_recipe_analysis_response(response.choices[0].message.content)
+        
+        if recipe_data:
+            print(f"Successfully analyzed recipe: {recipe_data['recipe_name']}")
+            return recipe_data
+        else:
+            print("Failed to parse AI response, using fallback")
+            return get_fallback_recipe_analysis(recipe_text)
+    
+    except LLMSchedulerError as e:
+        openai_breaker.release()
+        print(f"No OpenAI slot ({e}), using fallback analysis")
+        return get_fallback_recipe_analysis(recipe_text)
+    
+    except asyncio.TimeoutError:
+        print(f"OpenAI did not answer within {timeout}s, using fallback analysis")
+        return get_fallback_recipe_analysis(recipe_text)
+    
+    except Exception as e:
+        if is_openai_error(e):
+            print(f"OpenAI API error: {e}")
+        else:
+            print(f"Unexpected error analyzing recipe: {e}")
         return get_fallback_recipe_analysis(recipe_text)
 
 
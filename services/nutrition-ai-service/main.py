@@ -2,42 +2,41 @@
 FastAPI Nutrition AI Service - Main application.
 Handles AI nutrition coaching and recipe macro analysis.
 """
-from fastapi import FastAPI, Depends, HTTPException, status, Header, Request
+from fastapi import FastAPI, Depends, HTTPException, status, Header, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Awaitable
 import os
-import time
+import asyncio
+import json
 from dotenv import load_dotenv
 from pathlib import Path
 import uuid
 from jose import jwt, JWTError
-import httpx
-
-# Debugging: Print current working directory and files
-print(f"DEBUG: Current working directory: {os.getcwd()}")
-print(f"DEBUG: Files in current folder: {os.listdir('.')}")
 
 # Force Load .env: Use pathlib to find the .env file right next to main.py
 env_path = Path(__file__).parent / '.env'
-print(f"DEBUG: Loading .env from: {env_path}")
-print(f"DEBUG: .env file exists: {env_path.exists()}")
-if env_path.exists():
-    print(f"DEBUG: .env file absolute path: {env_path.absolute()}")
 load_dotenv(dotenv_path=env_path)
 
-# Debug: Check if GEMINI_API_KEY was loaded
-gemini_key = os.getenv("GEMINI_API_KEY")
-if gemini_key:
-    print(f"DEBUG: GEMINI_API_KEY loaded (length: {len(gemini_key)})")
-else:
-    print("DEBUG: GEMINI_API_KEY not found in environment")
-
 # Import local modules
-from database import get_db, init_db, check_db_connection
+from database import (
+    SessionLocal,
+    AsyncSessionLocal,
+    init_db,
+    DATABASE_ASYNC,
+    get_request_db,
+    run_db,
+    close_db,
+    init_db_async,
+    ping_db,
+    ping_db_async,
+    warm_db_pool,
+    warm_db_pool_async
+)
 from models import ChatMessage, MealPlan
 from schemas import (
     ChatRequest,
@@ -52,9 +51,24 @@ from schemas import (
     MealPlanRequest,
     WeeklyPlan
 )
-from ai_coach import chat_with_nutrition_coach, validate_ai_response_length
-from macro_analyzer import analyze_recipe_macros
-from meal_planner import generate_weekly_plan
+from ai_coach import (
+    chat_with_nutrition_coach_async,
+    stream_nutrition_coach,
+    validate_ai_response_length,
+    warm_up as warm_up_gemini
+)
+from macro_analyzer import analyze_recipe_macros_async, warm_up as warm_up_openai
+from meal_planner import generate_weekly_plan_async
+from metrics import render_metrics
+from health import HealthMonitor, http_probe, HEALTH_LLM_CHECK_INTERVAL_SECONDS
+from warmup import StartupWarmup, retry_until_done
+from circuit_breaker import get_breaker_states
+from idempotency import (
+    IdempotentGenerations,
+    GenerationInProgressError,
+    IdempotencyKeyReusedError,
+    IDEMPOTENCY_KEY_MAX_LENGTH
+)
 
 # Initialize rate limiter
 limiter = Limiter(key_func=get_remote_address)
@@ -108,6 +122,36 @@ JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 # Auth service URL for fetching user profile
 AUTH_SERVICE_URL = os.getenv("AUTH_SERVICE_URL", "http://localhost:8000")
 
+# How often a waiting chat or plan request checks whether its client went away
+DISCONNECT_POLL_SECONDS = float(os.getenv("DISCONNECT_POLL_SECONDS", "0.5"))
+# Non-standard "client closed request" status, logged for abandoned requests
+CLIENT_CLOSED_REQUEST = 499
+
+# Dependency health, probed in the background and served from memory
+health_monitor = HealthMonitor("nutrition-ai-service")
+health_monitor.add_check("database", ping_db_async if DATABASE_ASYNC else ping_db)
+# Providers are not critical: chat and recipe analysis have fallbacks
+if os.getenv("GEMINI_API_KEY"):
+    health_monitor.add_check(
+        "gemini",
+        http_probe(
+            "https://generativelanguage.googleapis.com/v1beta/models",
+            headers={"x-goog-api-key": os.getenv("GEMINI_API_KEY")}
+        ),
+        critical=False,
+        interval=HEALTH_LLM_CHECK_INTERVAL_SECONDS
+    )
+if os.getenv("OPENAI_API_KEY"):
+    health_monitor.add_check(
+        "openai",
+        http_probe(
+            os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1").rstrip("/") + "/models",
+            headers={"Authorization": f"Bearer {os.getenv('OPENAI_API_KEY')}"}
+        ),
+        critical=False,
+        interval=HEALTH_LLM_CHECK_INTERVAL_SECONDS
+    )
+
 
 async def get_user_profile_from_auth_service(user_id: str, access_token: str) -> Optional[Dict[str, Any]]:
     """
@@ -120,6 +164,8 @@ async def get_user_profile_from_auth_service(user_id: str, access_token: str) ->
     Returns:
         User profile dict or None if fetch fails
     """
+    import httpx
+    
     try:
         async with httpx.AsyncClient(timeout=5.0) as client:
             response = await client.get(
@@ -134,45 +180,150 @@ async def get_user_profile_from_auth_service(user_id: str, access_token: str) ->
     return None
 
 
+async def cancel_on_disconnect(request: Request, awaitable: Awaitable[Any]) -> Any:
+    """
+    Await `awaitable`, cancelling it if the client disconnects first, so an
+    abandoned request stops its Gemini call instead of paying for it.
+    
+    Args:
+        request: Request whose client is watched
+        awaitable: Coroutine doing the request's work
+    
+    Returns:
+        The awaitable's result
+    
+    Raises:
+        HTTPException: 499 if the client disconnected before the result was ready
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                print(f"Client disconnected, cancelling {request.url.path}")
+                raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail="Client closed request")
+    finally:
+        if not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+
+# Startup phases run in parallel; /health/ready stays 503 until the database is ready
+startup_warmup = StartupWarmup()
+
+
+async def prepare_database():
+    """
+    Startup phase: wait until the database answers, create missing tables
+    and open pooled connections.
+    """
+    if DATABASE_ASYNC:
+        await ping_db_async()
+    else:
+        await asyncio.to_thread(ping_db)
+    print("Database connection successful")
+    try:
+        if DATABASE_ASYNC:
+            await init_db_async()
+        else:
+            await asyncio.to_thread(init_db)
+        print("Database tables initialized/verified")
+    except Exception as e:
+        print(f"Warning: Database initialization had issues: {e}")
+        print(f"Full error: {type(e).__name__}: {str(e)}")
+        # Continue anyway - tables might already exist
+    if DATABASE_ASYNC:
+        await warm_db_pool_async()
+    else:
+        await asyncio.to_thread(warm_db_pool)
+
+
 # Startup event
 @app.on_event("startup")
 async def startup_event():
-    """Initialize database on startup."""
+    """
+    Warm up the database and both providers in parallel in the background;
+    background health probes start once the database is ready.
+    """
     print("Starting Nutrition AI Service...")
-    print("Checking database connection...")
-    
-    # Try to connect with retries
-    max_attempts = 10
-    attempt = 0
-    db_connected = False
-    
-    while attempt < max_attempts and not db_connected:
-        attempt += 1
-        print(f"Database connection attempt {attempt}/{max_attempts}...")
-        
-        if check_db_connection(max_retries=3, retry_delay=1):
-            db_connected = True
-            print("Database connection successful")
-            try:
-                init_db()
-                print("Database tables initialized/verified")
-            except Exception as e:
-                print(f"Warning: Database initialization had issues: {e}")
-                print(f"Full error: {type(e).__name__}: {str(e)}")
-                # Continue anyway - tables might already exist
-        else:
-            if attempt < max_attempts:
-                print(f"Waiting 2 seconds before retry...")
-                time.sleep(2)
-            else:
-                print("ERROR: Could not connect to database after all attempts")
-                print("Service will start but database operations will fail")
+    print(f"Loading .env from: {env_path} (exists: {env_path.exists()})")
     
     # Check Gemini configuration
     if os.getenv("GEMINI_API_KEY"):
         print("Gemini API key configured")
     else:
-        print("WARNING: GEMINI_API_KEY not set - using default key or fallback responses")
+        print("WARNING: GEMINI_API_KEY not set - coach chat and meal plans will answer 503")
+    
+    # Providers are optional: chat and recipe analysis have fallbacks
+    startup_warmup.start(
+        {
+            "database": retry_until_done("database", prepare_database),
+            "gemini": warm_up_gemini,
+            "openai": warm_up_openai
+        },
+        optional=("gemini", "openai"),
+        on_ready=health_monitor.start
+    )
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the warm-up if it is still running and the background health probes."""
+    await startup_warmup.stop()
+    await health_monitor.stop()
+
+
+# Database helpers; handlers run them with run_db so they work on sync and async sessions
+def save_chat_message(db: Session, user_id: str, message: str, response: str) -> ChatMessage:
+    """Store one coach exchange and return it with its timestamp."""
+    chat_message = ChatMessage(
+        id=uuid.uuid4(),
+        user_id=uuid.UUID(user_id),
+        message=message,
+        response=response
+    )
+    try:
+        db.add(chat_message)
+        db.commit()
+        db.refresh(chat_message)
+    except Exception:
+        db.rollback()
+        raise
+    return chat_message
+
+
+def get_chat_messages(db: Session, user_id: str, limit: int, offset: int):
+    """Return (total count, one page of messages newest first) for a user."""
+    # Get total count
+    total = db.query(ChatMessage).filter(
+        ChatMessage.user_id == user_id
+    ).count()
+    
+    # Get messages with pagination
+    messages = db.query(ChatMessage).filter(
+        ChatMessage.user_id == user_id
+    ).order_by(
+        ChatMessage.timestamp.desc()
+    ).limit(limit).offset(offset).all()
+    return total, messages
+
+
+def delete_chat_messages(db: Session, user_id: str) -> int:
+    """Delete all of a user's messages and return how many there were."""
+    deleted_count = db.query(ChatMessage).filter(
+        ChatMessage.user_id == user_id
+    ).delete()
+    db.commit()
+    return deleted_count
+
+
+def get_latest_meal_plan(db: Session, user_id: str) -> Optional[MealPlan]:
+    """Return the user's most recently updated meal plan, if any."""
+    return db.query(MealPlan).filter(
+        MealPlan.user_id == uuid.UUID(user_id)
+    ).order_by(MealPlan.updated_at.desc()).first()
 
 
 # Health check endpoint
@@ -180,29 +331,41 @@ async def startup_event():
 async def health_check():
     """
     Health check endpoint for load balancers and monitoring.
-    Returns 200 OK if service is running, with accurate database status.
+    Returns 200 OK if service is running, with the database status from the
+    last background probe.
     """
-    try:
-        # Quick database connectivity check (non-blocking)
-        db_status = check_db_connection(max_retries=1, retry_delay=1)
-        gemini_configured = os.getenv("GEMINI_API_KEY") is not None
-        
-        return {
-            "status": "ok",
-            "service": "nutrition-ai-service",
-            "database": "connected" if db_status else "disconnected",
-            "gemini": "configured" if gemini_configured else "not_configured"
-        }
-    except Exception as e:
-        # Even if database check fails, return 200 OK
-        # This allows the service to be marked healthy while database issues are resolved
-        return {
-            "status": "ok",
-            "service": "nutrition-ai-service",
-            "database": "disconnected",
-            "gemini": "configured" if os.getenv("GEMINI_API_KEY") else "not_configured",
-            "error": str(e)
-        }
+    snapshot = health_monitor.snapshot()
+    return {
+        "status": "ok",
+        "service": "nutrition-ai-service",
+        "database": "connected" if health_monitor.is_up("database") else "disconnected",
+        "gemini": "configured" if os.getenv("GEMINI_API_KEY") else "not_configured",
+        "checks": snapshot["checks"],
+        "circuit_breakers": get_breaker_states()
+    }
+
+
+@app.get("/health/live", tags=["Health"])
+async def health_live():
+    """Liveness probe: the process is up and serving requests."""
+    return {"status": "ok"}
+
+
+@app.get("/health/ready", tags=["Health"])
+async def health_ready():
+    """Readiness probe: 503 until startup warm-up finished and the last database probe succeeded."""
+    snapshot = health_monitor.snapshot()
+    snapshot["startup"] = startup_warmup.report()
+    if not startup_warmup.complete:
+        snapshot["status"] = "starting"
+    ready = startup_warmup.complete and health_monitor.is_ready()
+    return JSONResponse(snapshot, status_code=200 if ready else 503)
+
+
+@app.get("/metrics", response_class=PlainTextResponse, tags=["Health"])
+async def metrics():
+    """Prometheus metrics for this process."""
+    return render_metrics()
 
 
 # Helper function to extract user ID from JWT token
@@ -270,7 +433,7 @@ async def chat_with_ai_coach(
     request: Request,
     chat_request: ChatRequest,
     user_id: str = Depends(get_user_id_from_token),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_request_db)
 ):
     """
     Send a message to the AI nutrition coach and get a response.
@@ -304,31 +467,17 @@ async def chat_with_ai_coach(
             except Exception as e:
                 print(f"Could not fetch user profile (continuing without it): {e}")
         
-        # Get AI response with user profile context
-        # Note: chat_with_nutrition_coach is synchronous, so we run it in executor if needed
-        import asyncio
-        loop = asyncio.get_event_loop()
-        ai_response = await loop.run_in_executor(
-            None,
-            chat_with_nutrition_coach,
-            chat_request.message,
-            user_profile
+        # Get AI response with user profile context; stopped if the client goes away
+        ai_response = await cancel_on_disconnect(
+            request,
+            chat_with_nutrition_coach_async(chat_request.message, user_profile)
         )
         
         # Validate response length
         ai_response = validate_ai_response_length(ai_response, max_words=150)
         
         # Save to database
-        chat_message = ChatMessage(
-            id=uuid.uuid4(),
-            user_id=uuid.UUID(user_id),
-            message=chat_request.message,
-            response=ai_response
-        )
-        
-        db.add(chat_message)
-        db.commit()
-        db.refresh(chat_message)
+        chat_message = await run_db(db, save_chat_message, user_id, chat_request.message, ai_response)
         
         print(f"Chat message saved: {chat_message.id}")
         
@@ -339,24 +488,12 @@ async def chat_with_ai_coach(
             timestamp=chat_message.timestamp
         )
     
+    except HTTPException:
+        raise
     except RuntimeError as e:
-        # Handle Gemini API key errors specifically
-        db.rollback()
-        error_message = str(e)
-        print(f"RuntimeError in chat endpoint: {error_message}")
-        
-        if "API key" in error_message or "GEMINI_API_KEY" in error_message or "api_key" in error_message.lower():
-            raise HTTPException(
-                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                detail="Gemini API key is not configured or invalid. Please check your GEMINI_API_KEY environment variable."
-            )
-        else:
-            raise HTTPException(
-                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                detail=f"AI service unavailable: {error_message}"
-            )
+        print(f"RuntimeError in chat endpoint: {e}")
+        raise coach_unavailable(e)
     except Exception as e:
-        db.rollback()
         error_type = type(e).__name__
         error_message = str(e)
         print(f"Error in chat endpoint ({error_type}): {error_message}")
@@ -366,6 +503,119 @@ async def chat_with_ai_coach(
         )
 
 
+def coach_unavailable(e: RuntimeError) -> HTTPException:
+    """Map a RuntimeError from the coach to a 503, calling out Gemini API key problems."""
+    error_message = str(e)
+    if "API key" in error_message or "GEMINI_API_KEY" in error_message or "api_key" in error_message.lower():
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Gemini API key is not configured or invalid. Please check your GEMINI_API_KEY environment variable."
+        )
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=f"AI service unavailable: {error_message}"
+    )
+
+
+def format_sse(event: str, data) -> str:
+    """Format one Server-Sent Events message with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+# Streamed answers save with a session of their own: the request's session
+# may be closed before the StreamingResponse body has finished
+chat_session_factory = AsyncSessionLocal if DATABASE_ASYNC else SessionLocal
+
+
+@app.post(
+    "/api/ai/chat/stream",
+    tags=["AI Coach"],
+    responses={
+        200: {"description": "Server-Sent Events stream of the coach's answer", "content": {"text/event-stream": {}}},
+        401: {"model": ErrorResponse, "description": "Unauthorized"},
+        429: {"model": ErrorResponse, "description": "Rate limit exceeded"},
+        503: {"model": ErrorResponse, "description": "AI service unavailable"}
+    }
+)
+@limiter.limit("10/minute")
+async def stream_chat_with_ai_coach(
+    request: Request,
+    chat_request: ChatRequest,
+    user_id: str = Depends(get_user_id_from_token)
+):
+    """
+    Send a message to the AI nutrition coach and stream the answer as
+    Server-Sent Events while Gemini generates it.
+    
+    - The 150-word limit is applied while streaming: generation stops as
+      soon as the answer reaches it
+    - The exchange is saved once the answer is complete; an answer the
+      client disconnected from is not saved
+    - Same rate limit and fallback responses as `/api/ai/chat`
+    
+    Events: one "token" per piece of the answer (`text`), then "done"
+    (`message_id`, `user_message`, `ai_response`, `timestamp`) or "error"
+    (`message`).
+    """
+    print(f"AI Coach stream request from user {user_id}: {chat_request.message[:100]}")
+    
+    # Fetch user profile from auth-service for personalized context
+    authorization = request.headers.get("Authorization", "")
+    user_profile = None
+    if authorization:
+        try:
+            user_profile = await get_user_profile_from_auth_service(user_id, authorization.replace("Bearer ", ""))
+        except Exception as e:
+            print(f"Could not fetch user profile (continuing without it): {e}")
+    
+    pieces = stream_nutrition_coach(chat_request.message, user_profile, max_words=150)
+    try:
+        # Wait for the first piece here, so a missing API key is still a plain 503
+        first = await anext(pieces, "")
+    except RuntimeError as e:
+        print(f"RuntimeError in chat stream: {e}")
+        raise coach_unavailable(e)
+    
+    async def event_stream():
+        answer = [first]
+        try:
+            if first:
+                yield format_sse("token", {"text": first})
+            async for piece in pieces:
+                answer.append(piece)
+                yield format_sse("token", {"text": piece})
+        except Exception as e:
+            print(f"Error in chat stream ({type(e).__name__}): {e}")
+            yield format_sse("error", {"message": f"Failed to process chat message: {e}"})
+            return
+        finally:
+            await pieces.aclose()
+        
+        db = chat_session_factory()
+        try:
+            chat_message = await run_db(db, save_chat_message, user_id, chat_request.message, "".join(answer).strip())
+        except Exception as e:
+            print(f"Could not save streamed chat message: {e}")
+            yield format_sse("error", {"message": "Failed to save chat message"})
+            return
+        finally:
+            await close_db(db)
+        
+        print(f"Chat message saved: {chat_message.id}")
+        yield format_sse("done", {
+            "message_id": str(chat_message.id),
+            "user_message": chat_message.message,
+            "ai_response": chat_message.response,
+            "timestamp": chat_message.timestamp
+        })
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.get(
     "/api/ai/history/{user_id}",
     response_model=ChatHistoryResponse,
@@ -380,7 +630,7 @@ async def get_chat_history(
     limit: int = 50,
     offset: int = 0,
     requesting_user_id: str = Depends(get_user_id_from_token),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_request_db)
 ):
     """
     Get chat history for a user.
@@ -397,17 +647,7 @@ async def get_chat_history(
             detail="Cannot access other users' chat history"
         )
     
-    # Get total count
-    total = db.query(ChatMessage).filter(
-        ChatMessage.user_id == user_id
-    ).count()
-    
-    # Get messages with pagination
-    messages = db.query(ChatMessage).filter(
-        ChatMessage.user_id == user_id
-    ).order_by(
-        ChatMessage.timestamp.desc()
-    ).limit(limit).offset(offset).all()
+    total, messages = await run_db(db, get_chat_messages, user_id, limit, offset)
     
     # Convert to response format
     history_items = [
@@ -438,7 +678,7 @@ async def get_chat_history(
 async def clear_chat_history(
     user_id: str,
     requesting_user_id: str = Depends(get_user_id_from_token),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_request_db)
 ):
     """
     Clear all chat history for a user.
@@ -453,12 +693,7 @@ async def clear_chat_history(
             detail="Cannot clear other users' chat history"
         )
     
-    # Delete all messages
-    deleted_count = db.query(ChatMessage).filter(
-        ChatMessage.user_id == user_id
-    ).delete()
-    
-    db.commit()
+    deleted_count = await run_db(db, delete_chat_messages, user_id)
     
     return MessageResponse(
         message=f"Cleared {deleted_count} chat messages"
@@ -502,7 +737,7 @@ async def analyze_recipe(
         print(f"Recipe analysis request from user {user_id}")
         
         # Analyze recipe with AI
-        analysis = analyze_recipe_macros(recipe_request.recipe_text)
+        analysis = await analyze_recipe_macros_async(recipe_request.recipe_text)
         
         # Convert to response format
         ingredients = [
@@ -525,6 +760,49 @@ async def analyze_recipe(
         )
 
 
+# One plan generation per user at a time; duplicates attach or replay by Idempotency-Key
+generations = IdempotentGenerations()
+
+# Generations save with a session of their own: duplicates may still be
+# waiting after the request that started the generation has finished
+plan_session_factory = AsyncSessionLocal if DATABASE_ASYNC else SessionLocal
+
+
+def save_meal_plan(db: Session, user_id: str, meal_plan_data: Dict[str, Any]):
+    """
+    Store a generated plan as the user's current meal plan.
+    Failures are logged and swallowed: the plan was generated successfully
+    and the user can still use it.
+    """
+    try:
+        # First, check if user already has a meal plan and update it, or create new one
+        existing_plan = db.query(MealPlan).filter(
+            MealPlan.user_id == uuid.UUID(user_id)
+        ).first()
+        
+        if existing_plan:
+            # Update existing plan
+            existing_plan.plan_data = meal_plan_data
+            db.commit()
+            db.refresh(existing_plan)
+            print(f"Updated meal plan for user {user_id}")
+        else:
+            # Create new plan
+            new_plan = MealPlan(
+                id=uuid.uuid4(),
+                user_id=uuid.UUID(user_id),
+                plan_data=meal_plan_data
+            )
+            db.add(new_plan)
+            db.commit()
+            db.refresh(new_plan)
+            print(f"Created new meal plan for user {user_id}")
+    except Exception as db_error:
+        db.rollback()
+        print(f"Warning: Failed to save meal plan to database: {db_error}")
+        print("Meal plan was generated but not persisted. User can still use it.")
+
+
 # Meal Plan Generation endpoint
 @app.post(
     "/api/ai/generate-plan",
@@ -533,6 +811,8 @@ async def analyze_recipe(
     responses={
         200: {"description": "Meal plan generated successfully"},
         401: {"model": ErrorResponse, "description": "Unauthorized"},
+        409: {"model": ErrorResponse, "description": "A different meal plan is already being generated"},
+        422: {"model": ErrorResponse, "description": "Idempotency-Key reused for a different request"},
         429: {"model": ErrorResponse, "description": "Rate limit exceeded"},
         503: {"model": ErrorResponse, "description": "AI service unavailable"}
     }
@@ -540,9 +820,10 @@ async def analyze_recipe(
 @limiter.limit("5/minute")
 async def generate_meal_plan(
     request: Request,
+    response: Response,
     meal_plan_request: MealPlanRequest,
     user_id: str = Depends(get_user_id_from_token),
-    db: Session = Depends(get_db)
+    idempotency_key: Optional[str] = Header(None, max_length=IDEMPOTENCY_KEY_MAX_LENGTH)
 ):
     """
     Generate a personalized weekly meal plan using AI.
@@ -553,16 +834,18 @@ async def generate_meal_plan(
     - Excludes specified foods
     - Rate limited to 5 requests per minute
     - Uses Gemini AI for meal plan generation
+    - One generation per user at a time: a duplicate request attaches to the
+      running one, and a repeated `Idempotency-Key` header returns the stored
+      plan; both are marked with an `Idempotent-Replayed: true` header
     
     Request body:
     - excluded_foods: Optional list of foods to exclude (e.g., ["mushrooms", "shrimp"])
     """
-    try:
-        print(f"Meal plan generation request from user {user_id}")
-        print(f"Excluded foods: {meal_plan_request.excluded_foods}")
-        
+    excluded_foods = meal_plan_request.excluded_foods or []
+    authorization = request.headers.get("Authorization", "")
+    
+    async def generate() -> Dict[str, Any]:
         # Fetch user profile from auth-service for personalized context
-        authorization = request.headers.get("Authorization", "")
         user_profile = None
         if authorization:
             try:
@@ -573,49 +856,37 @@ async def generate_meal_plan(
                 print(f"Could not fetch user profile (continuing without it): {e}")
         
         # Generate meal plan with AI
-        import asyncio
-        import json
-        loop = asyncio.get_event_loop()
-        meal_plan_data = await loop.run_in_executor(
-            None,
-            generate_weekly_plan,
-            user_profile,
-            meal_plan_request.excluded_foods or []
-        )
+        meal_plan_data = await generate_weekly_plan_async(user_profile, excluded_foods)
         
-        # Save meal plan to database
+        db = plan_session_factory()
         try:
-            # First, check if user already has a meal plan and update it, or create new one
-            existing_plan = db.query(MealPlan).filter(
-                MealPlan.user_id == uuid.UUID(user_id)
-            ).first()
-            
-            if existing_plan:
-                # Update existing plan
-                existing_plan.plan_data = meal_plan_data
-                db.commit()
-                db.refresh(existing_plan)
-                print(f"Updated meal plan for user {user_id}")
-            else:
-                # Create new plan
-                new_plan = MealPlan(
-                    id=uuid.uuid4(),
-                    user_id=uuid.UUID(user_id),
-                    plan_data=meal_plan_data
-                )
-                db.add(new_plan)
-                db.commit()
-                db.refresh(new_plan)
-                print(f"Created new meal plan for user {user_id}")
-        except Exception as db_error:
-            # Log database error but don't fail the request - plan was generated successfully
-            db.rollback()
-            print(f"Warning: Failed to save meal plan to database: {db_error}")
-            print("Meal plan was generated but not persisted. User can still use it.")
+            await run_db(db, save_meal_plan, user_id, meal_plan_data)
+        finally:
+            await close_db(db)
+        return meal_plan_data
+    
+    try:
+        print(f"Meal plan generation request from user {user_id}")
+        print(f"Excluded foods: {excluded_foods}")
+        
+        fingerprint = tuple(sorted(f.strip().lower() for f in excluded_foods))
+        # A disconnect cancels the generation unless another request can still collect it
+        meal_plan_data, outcome = await cancel_on_disconnect(
+            request,
+            generations.run(user_id, idempotency_key, fingerprint, generate)
+        )
+        if outcome != "started":
+            response.headers["Idempotent-Replayed"] = "true"
         
         # Validate and return the meal plan
         return WeeklyPlan(**meal_plan_data)
     
+    except IdempotencyKeyReusedError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    except GenerationInProgressError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except HTTPException:
+        raise
     except RuntimeError as e:
         error_message = str(e)
         print(f"RuntimeError in meal plan generation: {error_message}")
@@ -653,7 +924,7 @@ async def generate_meal_plan(
 )
 async def get_meal_plan(
     user_id: str = Depends(get_user_id_from_token),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_request_db)
 ):
     """
     Get the user's current saved meal plan.
@@ -664,9 +935,7 @@ async def get_meal_plan(
     """
     try:
         # Query for user's meal plan
-        meal_plan = db.query(MealPlan).filter(
-            MealPlan.user_id == uuid.UUID(user_id)
-        ).order_by(MealPlan.updated_at.desc()).first()
+        meal_plan = await run_db(db, get_latest_meal_plan, user_id)
         
         if not meal_plan:
             raise HTTPException(
@@ -1,15 +1,33 @@
 """
 Meal plan generation using Google Gemini AI.
 """
+import asyncio
+import copy
+import hashlib
 import json
+import os
 from typing import Optional, Dict, Any, List
 
-# Get the model from ai_coach (reuse the same Gemini model)
-from ai_coach import model
+# Reuse ai_coach's Gemini model, created on first use
+from ai_coach import get_model, gemini_breaker, gemini_scheduler
+from llm_scheduler import PLAN, LLMSchedulerError, estimate_tokens
+from singleflight import SingleFlight
 
 # Days of the week
 DAYS_OF_WEEK = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
 
+# Seconds a weekly plan may take before generation fails with 503
+GEMINI_PLAN_TIMEOUT_SECONDS = float(os.getenv("GEMINI_PLAN_TIMEOUT_SECONDS", "120"))
+
+# Request JSON response explicitly
+PLAN_GENERATION_CONFIG = {
+    "temperature": 0.7,
+    "max_output_tokens": 8192,
+}
+
+# Concurrent requests with the same prompt share one Gemini call
+plan_flights = SingleFlight("weekly_plan")
+
 
 def create_meal_plan_prompt(
     user_profile: Optional[Dict[str, Any]],
@@ -32,7 +50,7 @@ def create_meal_plan_prompt(
     disliked_foods = user_profile.get("disliked_foods", "") if user_profile else ""
     
     # Combine excluded foods with user's disliked foods
-    all_excluded = excluded_foods.copy()
+    all_excluded = [f.strip() for f in excluded_foods if f.strip()]
     if disliked_foods:
         # Parse disliked_foods if it's a string (comma-separated)
         if isinstance(disliked_foods, str):
@@ -40,8 +58,8 @@ def create_meal_plan_prompt(
         elif isinstance(disliked_foods, list):
             all_excluded.extend(disliked_foods)
     
-    # Remove duplicates
-    all_excluded = list(set(all_excluded))
+    # Remove duplicates; sorted so the same inputs always give the same prompt
+    all_excluded = sorted(set(str(f).strip().lower() for f in all_excluded))
     
     # Build the prompt
     prompt = f"""You are a professional nutritionist creating a personalized weekly meal plan.
@@ -98,89 +116,161 @@ IMPORTANT: Return ONLY the JSON object, no markdown, no code blocks, no explanat
     return prompt
 
 
-def generate_weekly_plan(
+def make_plan_key(prompt: str) -> str:
+    """
+    Build the single-flight key for a meal plan prompt.
+    
+    Args:
+        prompt: Prompt from create_meal_plan_prompt
+    
+    Returns:
+        Hex digest identifying the prompt
+    """
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+def parse_plan_response(response_text: str) -> Dict[str, Any]:
+    """
+    Parse and validate Gemini's weekly plan JSON.
+    
+    Args:
+        response_text: Raw response text, possibly wrapped in a markdown code block
+    
+    Returns:
+        Dictionary matching WeeklyPlan schema
+    
+    Raises:
+        RuntimeError: If the response is not valid plan JSON
+    """
+    response_text = response_text.strip()
+    print(f"Gemini response received (length: {len(response_text)})")
+    
+    # Clean up response - remove markdown code blocks if present
+    if response_text.startswith("```json"):
+        response_text = response_text[7:]  # Remove ```json
+    elif response_text.startswith("```"):
+        response_text = response_text[3:]  # Remove ```
+    
+    if response_text.endswith("```"):
+        response_text = response_text[:-3]  # Remove closing ```
+    
+    response_text = response_text.strip()
+    
+    # Parse JSON
+    try:
+        meal_plan_data = json.loads(response_text)
+    except json.JSONDecodeError as e:
+        print(f"Failed to parse JSON response: {e}")
+        print(f"Response text: {response_text[:500]}...")
+        raise RuntimeError(f"Gemini returned invalid JSON: {str(e)}")
+    
+    # Validate structure
+    if "days" not in meal_plan_data:
+        raise RuntimeError("Gemini response missing 'days' field")
+    
+    if not isinstance(meal_plan_data["days"], list):
+        raise RuntimeError("Gemini response 'days' must be a list")
+    
+    if len(meal_plan_data["days"]) != 7:
+        print(f"Warning: Expected 7 days, got {len(meal_plan_data['days'])}")
+    
+    print(f"Meal plan generated successfully with {len(meal_plan_data['days'])} days")
+    return meal_plan_data
+
+
+async def generate_weekly_plan_async(
     user_profile: Optional[Dict[str, Any]] = None,
-    excluded_foods: List[str] = None
+    excluded_foods: List[str] = None,
+    timeout: Optional[float] = None
 ) -> Dict[str, Any]:
     """
-    Generate a weekly meal plan using Gemini AI.
+    Generate a weekly meal plan using Gemini's async client, so a long
+    generation holds no worker thread. Concurrent calls that produce the
+    same prompt share one Gemini call, which is cancelled once every caller
+    waiting on it has been cancelled.
     
     Args:
         user_profile: User profile dict with calories, goals, preferences
         excluded_foods: List of foods to exclude from the meal plan
+        timeout: Seconds before giving up (defaults to GEMINI_PLAN_TIMEOUT_SECONDS)
     
     Returns:
         Dictionary matching WeeklyPlan schema
     
     Raises:
-        RuntimeError: If Gemini API fails or returns invalid JSON
+        RuntimeError: If Gemini API fails, times out or returns invalid JSON
     """
     if excluded_foods is None:
         excluded_foods = []
     
-    if not model:
+    if not get_model():
         error_msg = "Gemini API key is not configured. Please set GEMINI_API_KEY environment variable."
         print(f"ERROR: {error_msg}")
         raise RuntimeError(error_msg)
     
+    prompt = create_meal_plan_prompt(user_profile, excluded_foods)
+    daily_calories = user_profile.get('daily_calories') if user_profile else None
+    meal_plan_data = await plan_flights.do_async(
+        make_plan_key(prompt),
+        lambda: request_weekly_plan_async(prompt, daily_calories, timeout)
+    )
+    # Every caller gets its own copy of the shared plan
+    return copy.deepcopy(meal_plan_data)
+
+
+async def request_weekly_plan_async(
+    prompt: str,
+    daily_calories: Optional[int] = None,
+    timeout: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    Make the async Gemini call behind generate_weekly_plan_async and
+    validate its JSON.
+    
+    Args:
+        prompt: Prompt from create_meal_plan_prompt
+        daily_calories: User's daily calorie target, for logging
+        timeout: Seconds before giving up (defaults to GEMINI_PLAN_TIMEOUT_SECONDS)
+    
+    Returns:
+        Dictionary matching WeeklyPlan schema
+    
+    Raises:
+        RuntimeError: If Gemini API fails, times out, returns invalid JSON,
+            its circuit breaker is open or no request slot frees up in time
+    """
+    # There is no fallback plan, so an open circuit fails fast instead
+    if not gemini_breaker.allow():
+        raise RuntimeError("Gemini circuit breaker is open, try again shortly")
+    
+    if timeout is None:
+        timeout = GEMINI_PLAN_TIMEOUT_SECONDS
+    
     try:
-        prompt = create_meal_plan_prompt(user_profile, excluded_foods)
-        daily_calories = user_profile.get('daily_calories') if user_profile else None
         print(f"Generating meal plan for {daily_calories if daily_calories else 'default'} calories...")
         
-        # Generate content with Gemini
-        # Request JSON response explicitly
-        generation_config = {
-            "temperature": 0.7,
-            "max_output_tokens": 8192,
-        }
-        
-        response = model.generate_content(
-            prompt,
-            generation_config=generation_config
-        )
-        
-        response_text = response.text.strip()
-        print(f"Gemini response received (length: {len(response_text)})")
-        
-        # Clean up response - remove markdown code blocks if present
-        if response_text.startswith("```json"):
-            response_text = response_text[7:]  # Remove ```json
-        elif response_text.startswith("```"):
-            response_text = response_text[3:]  # Remove ```
-        
-        if response_text.endswith("```"):
-            response_text = response_text[:-3]  # Remove closing ```
-        
-        response_text = response_text.strip()
-        
-        # Parse JSON
         try:
-            meal_plan_data = json.loads(response_text)
-        except json.JSONDecodeError as e:
-            print(f"Failed to parse JSON response: {e}")
-            print(f"Response text: {response_text[:500]}...")
-            raise RuntimeError(f"Gemini returned invalid JSON: {str(e)}")
+            await gemini_scheduler.acquire_async(PLAN, tokens=estimate_tokens(prompt, PLAN_GENERATION_CONFIG["max_output_tokens"]))
+        except LLMSchedulerError as e:
+            gemini_breaker.release()
+            raise RuntimeError(f"Gemini is busy, try again shortly ({e})")
         
-        # Validate structure
-        if "days" not in meal_plan_data:
-            raise RuntimeError("Gemini response missing 'days' field")
+        # A whole week is one long completion, so it does not count towards the slow-call rate
+        with gemini_breaker.track(measure_latency=False):
+            response = await asyncio.wait_for(
+                get_model().generate_content_async(prompt, generation_config=PLAN_GENERATION_CONFIG),
+                timeout
+            )
         
-        if not isinstance(meal_plan_data["days"], list):
-            raise RuntimeError("Gemini response 'days' must be a list")
-        
-        if len(meal_plan_data["days"]) != 7:
-            print(f"Warning: Expected 7 days, got {len(meal_plan_data['days'])}")
-        
-        print(f"Meal plan generated successfully with {len(meal_plan_data['days'])} days")
-        return meal_plan_data
+        return parse_plan_response(response.text)
     
+    except asyncio.TimeoutError:
+        print(f"Meal plan generation timed out after {timeout}s")
+        raise RuntimeError(f"Gemini did not finish the meal plan within {timeout:.0f}s")
     except RuntimeError:
-        # Re-raise RuntimeErrors (API key issues, etc.)
         raise
     except Exception as e:
         error_type = type(e).__name__
         error_message = str(e)
         print(f"Error generating meal plan ({error_type}): {error_message}")
         raise RuntimeError(f"Failed to generate meal plan: {error_message}")
-
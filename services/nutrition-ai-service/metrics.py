@@ -0,0 +1,155 @@
+"""
+Lightweight in-process metrics for a MacroMind service.
+Rendered in Prometheus text format on GET /metrics.
+"""
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+# All metrics created in this process, in registration order
+_registry: Dict[str, "Metric"] = {}
+_registry_lock = threading.Lock()
+
+
+def _label_key(labels: Dict[str, str]) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(label_key: Tuple[Tuple[str, str], ...]) -> str:
+    if not label_key:
+        return ""
+    inner = ",".join(f'{k}="{v}"' for k, v in label_key)
+    return "{" + inner + "}"
+
+
+class Metric:
+    """Base class holding one value per label combination."""
+    metric_type = "untyped"
+
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self._values: Dict[Tuple[Tuple[str, str], ...], float] = {}
+        self._lock = threading.Lock()
+
+    def get(self, **labels) -> float:
+        """Get the current value for a label combination."""
+        return self._values.get(_label_key(labels), 0.0)
+
+    def samples(self) -> List[Tuple[str, Tuple[Tuple[str, str], ...], float]]:
+        """Return (name, labels, value) samples for rendering."""
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+    def reset(self):
+        """Clear all recorded values."""
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(Metric):
+    """Monotonically increasing counter."""
+    metric_type = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(Metric):
+    """Value that can go up and down, or be read from a callback."""
+    metric_type = "gauge"
+
+    def __init__(self, name: str, description: str):
+        super().__init__(name, description)
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], float]):
+        """Read the (unlabelled) value from a callback at render time."""
+        self._function = function
+
+    def samples(self):
+        if self._function is not None:
+            return [(self.name, (), float(self._function()))]
+        return super().samples()
+
+
+class Summary(Metric):
+    """Count and sum of observations, e.g. latencies in seconds."""
+    metric_type = "summary"
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key + (("__stat", "count"),)] = self._values.get(key + (("__stat", "count"),), 0.0) + 1
+            self._values[key + (("__stat", "sum"),)] = self._values.get(key + (("__stat", "sum"),), 0.0) + value
+
+    def get_count(self, **labels) -> float:
+        return self._values.get(_label_key(labels) + (("__stat", "count"),), 0.0)
+
+    def get_sum(self, **labels) -> float:
+        return self._values.get(_label_key(labels) + (("__stat", "sum"),), 0.0)
+
+    def samples(self):
+        result = []
+        with self._lock:
+            for key, value in self._values.items():
+                stat = key[-1][1]
+                result.append((f"{self.name}_{stat}", key[:-1], value))
+        return result
+
+
+def _register(cls, name: str, description: str):
+    with _registry_lock:
+        metric = _registry.get(name)
+        if metric is None:
+            metric = cls(name, description)
+            _registry[name] = metric
+        return metric
+
+
+def counter(name: str, description: str) -> Counter:
+    """Get or create a counter."""
+    return _register(Counter, name, description)
+
+
+def gauge(name: str, description: str) -> Gauge:
+    """Get or create a gauge."""
+    return _register(Gauge, name, description)
+
+
+def summary(name: str, description: str) -> Summary:
+    """Get or create a summary."""
+    return _register(Summary, name, description)
+
+
+def render_metrics() -> str:
+    """
+    Render every registered metric in Prometheus text exposition format.
+
+    Returns:
+        Metrics text for the /metrics endpoint
+    """
+    lines = []
+    with _registry_lock:
+        metrics = list(_registry.values())
+
+    for metric in metrics:
+        lines.append(f"# HELP {metric.name} {metric.description}")
+        lines.append(f"# TYPE {metric.name} {metric.metric_type}")
+        for sample_name, label_key, value in metric.samples():
+            lines.append(f"{sample_name}{_format_labels(label_key)} {value}")
+
+    return "\n".join(lines) + "\n"
@@ -11,6 +11,8 @@ import uuid
 from main import app
 from database import Base, get_db
 from models import ChatMessage
+from ai_coach import gemini_breaker, gemini_scheduler
+from macro_analyzer import openai_breaker, openai_scheduler
 
 # Create in-memory SQLite database for testing
 SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
@@ -24,6 +26,20 @@ engine = create_engine(
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
+@pytest.fixture(autouse=True)
+def reset_circuit_breakers():
+    """
+    Start every test with closed provider circuits and full rate limit buckets.
+    """
+    gemini_breaker.reset()
+    openai_breaker.reset()
+    gemini_scheduler.reset()
+    openai_scheduler.reset()
+    yield
+    gemini_breaker.reset()
+    openai_breaker.reset()
+
+
 @pytest.fixture(scope="function")
 def db_session():
     """
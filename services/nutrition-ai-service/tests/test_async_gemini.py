@@ -0,0 +1,164 @@
+"""
+Tests for the async Gemini calls behind chat and plan generation.
+"""
+import asyncio
+import json
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from ai_coach import chat_with_nutrition_coach_async, get_fallback_response
+from database import get_request_db
+from idempotency import IdempotentGenerations
+from main import app, generations, get_user_id_from_token
+from meal_planner import generate_weekly_plan_async
+
+from tests.test_meal_planner import SAMPLE_PLAN
+
+
+async def hang(*args, **kwargs):
+    await asyncio.sleep(5)
+
+
+class TestAsyncChat:
+    """Tests for chat_with_nutrition_coach_async."""
+
+    @patch('ai_coach.model')
+    def test_uses_async_client(self, mock_model):
+        """Test chat awaits generate_content_async instead of the blocking call."""
+        mock_model.generate_content_async = AsyncMock(return_value=Mock(text=" Eat more protein. "))
+
+        response = asyncio.run(chat_with_nutrition_coach_async("Any tips?"))
+
+        assert response == "Eat more protein."
+        mock_model.generate_content.assert_not_called()
+
+    @patch('ai_coach.model')
+    def test_timeout_falls_back(self, mock_model):
+        """Test a slow Gemini answer gives the fallback response."""
+        mock_model.generate_content_async = AsyncMock(side_effect=hang)
+
+        response = asyncio.run(chat_with_nutrition_coach_async("How much protein?", timeout=0.05))
+
+        assert response == get_fallback_response("How much protein?")
+
+
+class TestAsyncPlanGeneration:
+    """Tests for generate_weekly_plan_async."""
+
+    @patch('ai_coach.model')
+    def test_uses_async_client(self, mock_model):
+        """Test plan generation awaits generate_content_async."""
+        mock_model.generate_content_async = AsyncMock(return_value=Mock(text=json.dumps(SAMPLE_PLAN)))
+
+        plan = asyncio.run(generate_weekly_plan_async({"daily_calories": 2100}))
+
+        assert plan == SAMPLE_PLAN
+        mock_model.generate_content.assert_not_called()
+
+    @patch('ai_coach.model')
+    def test_timeout_raises(self, mock_model):
+        """Test a slow generation raises so the endpoint can answer 503."""
+        mock_model.generate_content_async = AsyncMock(side_effect=hang)
+
+        with pytest.raises(RuntimeError, match="did not finish"):
+            asyncio.run(generate_weekly_plan_async({"daily_calories": 2200}, timeout=0.05))
+
+
+class TestGenerationCancellation:
+    """Tests for cancelling generations nobody can collect."""
+
+    def test_cancelled_without_key(self):
+        """Test cancelling the only request without a key cancels its generation."""
+        cancelled = []
+
+        async def generate():
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        async def run():
+            request = asyncio.ensure_future(IdempotentGenerations().run("user", None, (), generate))
+            await asyncio.sleep(0.01)
+            request.cancel()
+            await asyncio.gather(request, return_exceptions=True)
+            await asyncio.sleep(0.01)
+
+        asyncio.run(run())
+
+        assert cancelled == [True]
+
+    def test_keyed_generation_keeps_running(self):
+        """Test a request with an Idempotency-Key leaves its generation running for a retry."""
+        async def generate():
+            await asyncio.sleep(0.05)
+            return "plan"
+
+        async def run():
+            runner = IdempotentGenerations()
+            request = asyncio.ensure_future(runner.run("user", "key", (), generate))
+            await asyncio.sleep(0.01)
+            request.cancel()
+            await asyncio.gather(request, return_exceptions=True)
+            await asyncio.sleep(0.1)
+            return await runner.run("user", "key", (), generate)
+
+        assert asyncio.run(run()) == ("plan", "replayed")
+
+
+class TestClientDisconnect:
+    """Tests for endpoints stopping their Gemini call when the client goes away."""
+
+    def setup_method(self):
+        app.dependency_overrides[get_user_id_from_token] = lambda: "user-1"
+        app.dependency_overrides[get_request_db] = lambda: None
+
+    def teardown_method(self):
+        app.dependency_overrides.pop(get_user_id_from_token, None)
+        app.dependency_overrides.pop(get_request_db, None)
+
+    @patch('main.DISCONNECT_POLL_SECONDS', 0.01)
+    @patch('starlette.requests.Request.is_disconnected', new_callable=AsyncMock, return_value=True)
+    @patch('ai_coach.model')
+    def test_chat_cancelled(self, mock_model, _):
+        """Test a disconnected chat request cancels the Gemini call."""
+        cancelled = []
+
+        async def generate(*args, **kwargs):
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        mock_model.generate_content_async = AsyncMock(side_effect=generate)
+
+        response = TestClient(app).post("/api/ai/chat", json={"message": "Any tips?"})
+
+        assert response.status_code == 499
+        assert cancelled == [True]
+
+    @patch('main.DISCONNECT_POLL_SECONDS', 0.01)
+    @patch('starlette.requests.Request.is_disconnected', new_callable=AsyncMock, return_value=True)
+    @patch('main.generate_weekly_plan_async')
+    def test_plan_cancelled(self, mock_generate, _):
+        """Test a disconnected plan request without a key cancels its generation."""
+        generations.clear()
+        cancelled = []
+
+        async def generate(*args, **kwargs):
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        mock_generate.side_effect = generate
+
+        response = TestClient(app).post("/api/ai/generate-plan", json={"excluded_foods": []})
+
+        assert response.status_code == 499
+        assert cancelled == [True]
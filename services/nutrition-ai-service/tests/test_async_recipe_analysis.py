@@ -0,0 +1,94 @@
+"""
+Tests for the async OpenAI call behind recipe analysis.
+"""
+import asyncio
+import json
+from unittest.mock import AsyncMock, Mock, patch
+
+from fastapi.testclient import TestClient
+
+from llm_scheduler import INTERACTIVE, PLAN, BATCH
+from macro_analyzer import analyze_recipe_macros_async, get_fallback_recipe_analysis, openai_scheduler
+from main import app, get_user_id_from_token
+
+NO_WAIT = {INTERACTIVE: 0.01, PLAN: 0.01, BATCH: 0.01}
+
+ANALYSIS = {
+    "recipe_name": "Chicken and Rice",
+    "total_calories": 460,
+    "macros": {"protein": 64.0, "carbs": 28.0, "fats": 8.0},
+    "ingredients": [
+        {"name": "chicken breast", "amount": "200g", "calories": 330, "protein": 62.0, "carbs": 0.0, "fats": 7.0}
+    ]
+}
+
+
+def completion(text):
+    return Mock(choices=[Mock(message=Mock(content=text))])
+
+
+async def hang(*args, **kwargs):
+    await asyncio.sleep(5)
+
+
+class TestAsyncRecipeAnalysis:
+    """Tests for analyze_recipe_macros_async."""
+
+    @patch('macro_analyzer.async_client')
+    def test_uses_async_client(self, mock_client):
+        """Test the analysis awaits the async OpenAI client."""
+        mock_client.chat.completions.create = AsyncMock(return_value=completion(json.dumps(ANALYSIS)))
+
+        result = asyncio.run(analyze_recipe_macros_async("200g chicken breast"))
+
+        assert result == ANALYSIS
+
+    @patch('macro_analyzer.async_client')
+    def test_timeout_falls_back(self, mock_client):
+        """Test a slow OpenAI answer gives the fallback estimate."""
+        mock_client.chat.completions.create = AsyncMock(side_effect=hang)
+
+        result = asyncio.run(analyze_recipe_macros_async("2 eggs", timeout=0.05))
+
+        assert result == get_fallback_recipe_analysis("2 eggs")
+
+    @patch('llm_scheduler.LLM_DEADLINES', NO_WAIT)
+    @patch('macro_analyzer.async_client')
+    def test_no_slot_falls_back(self, mock_client):
+        """Test a request that gets no scheduler slot returns the fallback estimate."""
+        mock_client.chat.completions.create = AsyncMock()
+        openai_scheduler.requests.tokens = 0
+        openai_scheduler.tokens.tokens = 0
+
+        result = asyncio.run(analyze_recipe_macros_async("2 eggs"))
+
+        assert result == get_fallback_recipe_analysis("2 eggs")
+        mock_client.chat.completions.create.assert_not_called()
+
+    @patch('macro_analyzer.async_client', None)
+    def test_missing_client_falls_back(self):
+        """Test the fallback estimate is returned without an OpenAI key."""
+        result = asyncio.run(analyze_recipe_macros_async("2 eggs"))
+
+        assert result == get_fallback_recipe_analysis("2 eggs")
+
+
+class TestAnalyzeRecipeEndpoint:
+    """Tests for POST /api/ai/analyze-recipe."""
+
+    def setup_method(self):
+        app.dependency_overrides[get_user_id_from_token] = lambda: "user-1"
+
+    def teardown_method(self):
+        app.dependency_overrides.pop(get_user_id_from_token, None)
+
+    @patch('macro_analyzer.async_client')
+    def test_uses_async_analysis(self, mock_client):
+        """Test the endpoint awaits the async analysis."""
+        mock_client.chat.completions.create = AsyncMock(return_value=completion(json.dumps(ANALYSIS)))
+
+        response = TestClient(app).post("/api/ai/analyze-recipe", json={"recipe_text": "200g chicken breast"})
+
+        assert response.status_code == 200
+        assert response.json()["recipe_name"] == "Chicken and Rice"
+        mock_client.chat.completions.create.assert_awaited_once()
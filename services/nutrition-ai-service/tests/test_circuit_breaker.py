@@ -0,0 +1,59 @@
+"""
+Tests for falling back while a provider circuit is open.
+"""
+import asyncio
+
+import pytest
+from unittest.mock import Mock, patch
+
+from ai_coach import chat_with_nutrition_coach, gemini_breaker, get_fallback_response
+from macro_analyzer import analyze_recipe_macros, openai_breaker
+from meal_planner import generate_weekly_plan_async
+
+
+def open_circuit(breaker):
+    for _ in range(breaker.min_calls):
+        breaker.record(False, 0.1)
+
+
+class TestOpenCircuitFallbacks:
+    """Tests for skipping the provider while its circuit is open."""
+
+    @patch('ai_coach.model')
+    def test_chat_falls_back_without_calling_gemini(self, mock_model):
+        """Test the coach answers with the fallback response."""
+        open_circuit(gemini_breaker)
+
+        response = chat_with_nutrition_coach("How much protein do I need?")
+
+        assert response == get_fallback_response("How much protein do I need?")
+        mock_model.generate_content.assert_not_called()
+
+    @patch('macro_analyzer.client')
+    def test_recipe_analysis_falls_back_without_calling_openai(self, mock_client):
+        """Test recipe analysis returns the fallback estimate."""
+        open_circuit(openai_breaker)
+
+        result = analyze_recipe_macros("200g chicken breast, 100g rice")
+
+        assert result["recipe_name"]
+        mock_client.chat.completions.create.assert_not_called()
+
+    @patch('ai_coach.model')
+    def test_plan_generation_fails_fast(self, mock_model):
+        """Test plan generation raises instead of waiting on Gemini."""
+        open_circuit(gemini_breaker)
+
+        with pytest.raises(RuntimeError, match="circuit breaker is open"):
+            asyncio.run(generate_weekly_plan_async({"daily_calories": 2000}))
+        mock_model.generate_content_async.assert_not_called()
+
+    @patch('ai_coach.model')
+    def test_gemini_errors_open_circuit(self, mock_model):
+        """Test repeated Gemini errors open the circuit."""
+        mock_model.generate_content.side_effect = Exception("503 Service Unavailable")
+
+        for _ in range(gemini_breaker.min_calls):
+            chat_with_nutrition_coach("Any tips?")
+
+        assert gemini_breaker.get_state()["state"] == "open"
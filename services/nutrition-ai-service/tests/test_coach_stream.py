@@ -0,0 +1,153 @@
+"""
+Tests for the token-streamed AI coach.
+"""
+import asyncio
+import json
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock, Mock, patch
+
+from fastapi.testclient import TestClient
+
+from ai_coach import gemini_breaker, get_fallback_response, stream_nutrition_coach, word_cap_index
+from main import app, get_user_id_from_token
+
+
+class FakeStream:
+    """Streamed Gemini response that records how many chunks were read."""
+
+    def __init__(self, texts):
+        self.texts = texts
+        self.read = 0
+        self._iterator = self._chunks()
+
+    async def _chunks(self):
+        for text in self.texts:
+            self.read += 1
+            yield Mock(text=text)
+
+    def __aiter__(self):
+        return self._iterator
+
+
+def collect(pieces):
+    async def run():
+        return [piece async for piece in pieces]
+    return asyncio.run(run())
+
+
+def parse_sse(body):
+    events = []
+    for message in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in message.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+class TestWordCap:
+    """Tests for finding the cut point of streamed text."""
+
+    def test_within_limit(self):
+        """Text with at most max_words words is not cut."""
+        assert word_cap_index("Eat more protein", 3) is None
+
+    def test_cut_after_last_allowed_word(self):
+        """The cut falls right after the last allowed word once another word starts."""
+        assert word_cap_index("Eat more  protein d", 3) == len("Eat more  protein")
+
+
+class TestStreamNutritionCoach:
+    """Tests for stream_nutrition_coach."""
+
+    @patch('ai_coach.model')
+    def test_streams_pieces(self, mock_model):
+        """Each chunk is forwarded as it arrives."""
+        mock_model.generate_content_async = AsyncMock(return_value=FakeStream([" Eat more", " protein."]))
+
+        pieces = collect(stream_nutrition_coach("Any tips?"))
+
+        assert pieces == ["Eat more", " protein."]
+        assert mock_model.generate_content_async.call_args.kwargs["stream"] is True
+
+    @patch('ai_coach.model')
+    def test_word_cap_stops_generation(self, mock_model):
+        """The stream is closed at the word limit and the rest is never read."""
+        stream = FakeStream(["One two ", "three four", " five six", " seven", " eight"])
+        mock_model.generate_content_async = AsyncMock(return_value=stream)
+
+        pieces = collect(stream_nutrition_coach("Any tips?", max_words=3))
+
+        assert "".join(pieces) == "One two three..."
+        assert stream.read == 2
+
+    @patch('ai_coach.model')
+    def test_slow_reader_is_not_a_slow_call(self, mock_model):
+        """Time spent waiting on the client does not count towards the breaker's slow-call rate."""
+        mock_model.generate_content_async = AsyncMock(return_value=FakeStream(["Eat", " more", " protein."]))
+
+        async def read_slowly():
+            async for _ in stream_nutrition_coach("Any tips?"):
+                await asyncio.sleep(0.02)
+
+        with patch.object(gemini_breaker, "slow_call_seconds", 0.01):
+            asyncio.run(read_slowly())
+
+        assert gemini_breaker.get_state()["calls"] == 1
+        assert gemini_breaker.get_state()["slow_call_rate"] == 0.0
+
+    @patch('ai_coach.model')
+    def test_no_first_token_falls_back(self, mock_model):
+        """Gemini not answering in time gives the fallback response."""
+        async def hang(*args, **kwargs):
+            await asyncio.sleep(5)
+
+        mock_model.generate_content_async = AsyncMock(side_effect=hang)
+
+        pieces = collect(stream_nutrition_coach("How much protein?", timeout=0.05))
+
+        assert pieces == [get_fallback_response("How much protein?")]
+
+
+class TestChatStreamEndpoint:
+    """Tests for POST /api/ai/chat/stream."""
+
+    def setup_method(self):
+        app.dependency_overrides[get_user_id_from_token] = lambda: "3f2c6a4e-0000-4000-8000-000000000001"
+
+    def teardown_method(self):
+        app.dependency_overrides.pop(get_user_id_from_token, None)
+
+    @patch('main.chat_session_factory')
+    @patch('main.save_chat_message')
+    @patch('ai_coach.model')
+    def test_streams_tokens_then_saves(self, mock_model, mock_save, mock_session):
+        """Tokens are sent as events and the capped answer is saved before "done"."""
+        words = [f" word{i}" for i in range(200)]
+        mock_model.generate_content_async = AsyncMock(return_value=FakeStream(words))
+        mock_session.return_value = MagicMock()
+        mock_save.side_effect = lambda db, user_id, message, response: Mock(
+            id="m-1", message=message, response=response, timestamp=datetime(2026, 1, 5)
+        )
+
+        response = TestClient(app).post("/api/ai/chat/stream", json={"message": "Any tips?"})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = parse_sse(response.text)
+        tokens = [data["text"] for event, data in events if event == "token"]
+        saved = mock_save.call_args.args[3]
+        assert len(saved.split()) == 150
+        assert "".join(tokens) == saved
+        assert events[-1] == ("done", {
+            "message_id": "m-1",
+            "user_message": "Any tips?",
+            "ai_response": saved,
+            "timestamp": "2026-01-05 00:00:00"
+        })
+
+    @patch('ai_coach.model', None)
+    def test_missing_model_is_503(self):
+        """Without a Gemini model the request fails before streaming starts."""
+        response = TestClient(app).post("/api/ai/chat/stream", json={"message": "Any tips?"})
+
+        assert response.status_code == 503
+        assert "GEMINI_API_KEY" in response.json()["detail"]
@@ -0,0 +1,56 @@
+"""
+Tests for the health endpoints served from the background health monitor.
+"""
+import asyncio
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from health import HealthMonitor
+from main import app, health_monitor, startup_warmup
+
+
+def ok():
+    pass
+
+
+def broken():
+    raise ConnectionError("connection refused")
+
+
+class TestHealthEndpoints:
+    """Tests for /health, /health/live and /health/ready."""
+
+    def test_live_always_ok(self):
+        """/health/live answers without any probe."""
+        assert TestClient(app).get("/health/live").status_code == 200
+
+    def test_ready_needs_database(self):
+        """/health/ready is 503 while the cached database probe is down."""
+        monitor = HealthMonitor("nutrition-ai-service")
+        monitor.add_check("database", broken)
+        asyncio.run(monitor.run_all())
+
+        with patch.object(health_monitor, "checks", monitor.checks):
+            response = TestClient(app).get("/health/ready")
+
+        assert response.status_code == 503
+        assert response.json()["checks"]["database"]["status"] == "down"
+
+    def test_provider_outage_only_degrades(self):
+        """A failing Gemini probe is reported but keeps the service ready."""
+        monitor = HealthMonitor("nutrition-ai-service")
+        monitor.add_check("database", ok)
+        monitor.add_check("gemini", broken, critical=False)
+        asyncio.run(monitor.run_all())
+
+        with patch.object(health_monitor, "checks", monitor.checks), \
+                patch.object(startup_warmup, "complete", True), \
+                patch("database.SessionLocal", side_effect=AssertionError("queried")):
+            ready = TestClient(app).get("/health/ready")
+            health = TestClient(app).get("/health")
+
+        assert ready.status_code == 200
+        assert ready.json()["status"] == "degraded"
+        assert health.json()["database"] == "connected"
+        assert health.json()["checks"]["gemini"]["status"] == "down"
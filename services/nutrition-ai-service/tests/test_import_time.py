@@ -0,0 +1,87 @@
+"""
+Tests that importing the service stays cheap and free of side effects.
+"""
+import os
+import subprocess
+import sys
+from unittest.mock import Mock
+
+import pytest
+
+import ai_coach
+import macro_analyzer
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestLazyImports:
+    """Tests for provider SDKs loading on first use."""
+
+    def test_import_main_skips_provider_sdks(self):
+        """Importing main loads neither provider SDK nor httpx."""
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import main"],
+            cwd=SERVICE_DIR,
+            capture_output=True,
+            text=True,
+            timeout=60
+        )
+
+        imported = {line.rsplit("|", 1)[-1].strip() for line in result.stderr.splitlines() if line.startswith("import time:")}
+        assert result.returncode == 0, result.stderr[-2000:]
+        assert "main" in imported
+        assert "google.generativeai" not in imported
+        assert "openai" not in imported
+        assert "httpx" not in imported
+        assert "Files in current folder" not in result.stdout
+
+    def test_client_created_once(self, monkeypatch):
+        """The OpenAI client is built on first use and then reused."""
+        monkeypatch.setattr(macro_analyzer, "client", macro_analyzer._NOT_LOADED)
+        monkeypatch.setattr(macro_analyzer, "OPENAI_API_KEY", "sk-test")
+
+        first = macro_analyzer.get_client()
+
+        assert first is not None
+        assert macro_analyzer.get_client() is first
+
+    def test_missing_key_means_no_client(self, monkeypatch):
+        """Without OPENAI_API_KEY recipe analysis has no client and falls back."""
+        monkeypatch.setattr(macro_analyzer, "client", macro_analyzer._NOT_LOADED)
+        monkeypatch.setattr(macro_analyzer, "OPENAI_API_KEY", None)
+
+        assert macro_analyzer.get_client() is None
+        assert "total_calories" in macro_analyzer.analyze_recipe_macros("2 eggs")
+
+    def test_model_created_once(self, monkeypatch):
+        """The Gemini model is created on first use and then reused."""
+        created = []
+        monkeypatch.setattr(ai_coach, "model", ai_coach._NOT_LOADED)
+        monkeypatch.setattr(ai_coach, "_create_model", lambda: created.append(1) or object())
+
+        first = ai_coach.get_model()
+
+        assert ai_coach.get_model() is first
+        assert len(created) == 1
+
+    def test_missing_gemini_key_raises(self, monkeypatch):
+        """Without GEMINI_API_KEY the model is not created and the error says why."""
+        monkeypatch.setattr(ai_coach, "model", ai_coach._NOT_LOADED)
+        monkeypatch.delenv("GEMINI_API_KEY", raising=False)
+
+        with pytest.raises(RuntimeError, match="GEMINI_API_KEY"):
+            ai_coach.get_model()
+        assert ai_coach.model is ai_coach._NOT_LOADED
+
+    def test_gemini_key_read_from_environment(self, monkeypatch):
+        """The SDK is configured with GEMINI_API_KEY."""
+        import google.generativeai as genai
+
+        configure = Mock()
+        monkeypatch.setattr(ai_coach, "model", ai_coach._NOT_LOADED)
+        monkeypatch.setenv("GEMINI_API_KEY", "test-gemini-key")
+        monkeypatch.setattr(genai, "configure", configure)
+        monkeypatch.setattr(genai, "GenerativeModel", Mock())
+
+        assert ai_coach.get_model() is not None
+        configure.assert_called_once_with(api_key="test-gemini-key")
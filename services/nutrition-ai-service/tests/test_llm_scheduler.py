@@ -0,0 +1,93 @@
+"""
+Tests for LLM calls waiting on the provider schedulers.
+"""
+import asyncio
+import threading
+import time
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+from ai_coach import chat_with_nutrition_coach, gemini_scheduler, get_fallback_response
+from llm_scheduler import INTERACTIVE, PLAN, BATCH
+from macro_analyzer import analyze_recipe_macros, openai_scheduler
+from meal_planner import generate_weekly_plan_async
+
+NO_WAIT = {INTERACTIVE: 0.01, PLAN: 0.01, BATCH: 0.01}
+
+
+def drain(scheduler):
+    scheduler.requests.tokens = 0
+    scheduler.tokens.tokens = 0
+
+
+class TestNoSlotFallbacks:
+    """Tests for requests that get no slot before their deadline."""
+
+    @patch('llm_scheduler.LLM_DEADLINES', NO_WAIT)
+    @patch('ai_coach.model')
+    def test_chat_falls_back(self, mock_model):
+        """Test the coach answers with the fallback response."""
+        drain(gemini_scheduler)
+
+        response = chat_with_nutrition_coach("How much protein do I need?")
+
+        assert response == get_fallback_response("How much protein do I need?")
+        mock_model.generate_content.assert_not_called()
+
+    @patch('llm_scheduler.LLM_DEADLINES', NO_WAIT)
+    @patch('macro_analyzer.client')
+    def test_recipe_analysis_falls_back(self, mock_client):
+        """Test recipe analysis returns the fallback estimate."""
+        drain(openai_scheduler)
+
+        result = analyze_recipe_macros("200g chicken breast, 100g rice")
+
+        assert result["recipe_name"]
+        mock_client.chat.completions.create.assert_not_called()
+
+    @patch('llm_scheduler.LLM_DEADLINES', NO_WAIT)
+    @patch('ai_coach.model')
+    def test_plan_generation_reports_busy(self, mock_model):
+        """Test plan generation raises so the endpoint can answer 503."""
+        drain(gemini_scheduler)
+
+        with pytest.raises(RuntimeError, match="Gemini is busy"):
+            asyncio.run(generate_weekly_plan_async({"daily_calories": 2000}))
+        mock_model.generate_content_async.assert_not_called()
+
+
+class TestPriorities:
+    """Tests for chat overtaking plan generation."""
+
+    @patch('ai_coach.model')
+    def test_chat_goes_before_queued_plan(self, mock_model):
+        """Test a chat message waiting behind a plan request is sent first."""
+        order = []
+
+        def generate_chat(prompt):
+            order.append("chat")
+            return Mock(text="Hi")
+
+        def generate_plan(prompt, generation_config):
+            order.append("plan")
+            return Mock(text="{}")
+
+        def run_plan():
+            with pytest.raises(RuntimeError):
+                asyncio.run(generate_weekly_plan_async({}))
+
+        mock_model.generate_content.side_effect = generate_chat
+        mock_model.generate_content_async = AsyncMock(side_effect=generate_plan)
+        drain(gemini_scheduler)
+
+        # One request every 50 ms and no reserves, so both requests queue briefly
+        with patch.object(gemini_scheduler.requests, 'rate', 20.0), patch.dict('llm_scheduler.RESERVES', {PLAN: 0.0}):
+            plan = threading.Thread(target=run_plan)
+            plan.start()
+            while gemini_scheduler.queued(PLAN) < 1:
+                time.sleep(0.001)
+            chat_with_nutrition_coach("Any tips?")
+            plan.join()
+
+        assert order == ["chat", "plan"]
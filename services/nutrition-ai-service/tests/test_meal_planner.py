@@ -0,0 +1,103 @@
+"""
+Tests for weekly meal plan generation.
+"""
+import asyncio
+import json
+from unittest.mock import AsyncMock, Mock, patch
+
+from fastapi.testclient import TestClient
+
+from main import app, generations, get_user_id_from_token
+from meal_planner import create_meal_plan_prompt, generate_weekly_plan_async
+
+SAMPLE_MEAL = {
+    "name": "Oats", "calories": 400, "protein": 20, "carbs": 60, "fats": 10,
+    "ingredients": ["oats"], "instructions": "Cook"
+}
+SAMPLE_PLAN = {
+    "days": [
+        {
+            "day": day,
+            "breakfast": SAMPLE_MEAL,
+            "lunch": SAMPLE_MEAL,
+            "dinner": SAMPLE_MEAL,
+            "snack": SAMPLE_MEAL,
+            "total_calories": 1600
+        }
+        for day in ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+    ]
+}
+
+
+class TestMealPlanPrompt:
+    """Tests for meal plan prompt creation."""
+
+    def test_prompt_is_independent_of_exclusion_order(self):
+        """Test the same exclusions always give the same prompt."""
+        profile = {"daily_calories": 2200, "disliked_foods": "Olives, tuna"}
+
+        first = create_meal_plan_prompt(profile, ["shrimp", "mushrooms"])
+        second = create_meal_plan_prompt(profile, ["Mushrooms", "shrimp", " tuna "])
+
+        assert first == second
+        assert "mushrooms, olives, shrimp, tuna" in first
+
+
+class TestMealPlanCoalescing:
+    """Tests for sharing one Gemini call between identical requests."""
+
+    @patch('ai_coach.model')
+    def test_concurrent_identical_requests_share_one_call(self, mock_model):
+        """Test concurrent requests with the same prompt make one Gemini call."""
+        async def slow_generate(prompt, generation_config):
+            await asyncio.sleep(0.05)
+            return Mock(text=json.dumps(SAMPLE_PLAN))
+
+        mock_model.generate_content_async = AsyncMock(side_effect=slow_generate)
+        profile = {"daily_calories": 2000, "fitness_goal": "cut"}
+
+        async def run():
+            return await asyncio.gather(*(generate_weekly_plan_async(profile, ["tuna"]) for _ in range(3)))
+
+        results = asyncio.run(run())
+
+        assert mock_model.generate_content_async.call_count == 1
+        assert results == [SAMPLE_PLAN] * 3
+        assert results[0] is not results[1]
+
+    @patch('ai_coach.model')
+    def test_different_profiles_make_separate_calls(self, mock_model):
+        """Test requests with different prompts are not coalesced."""
+        mock_model.generate_content_async = AsyncMock(return_value=Mock(text=json.dumps(SAMPLE_PLAN)))
+
+        asyncio.run(generate_weekly_plan_async({"daily_calories": 1800}))
+        asyncio.run(generate_weekly_plan_async({"daily_calories": 2600}))
+
+        assert mock_model.generate_content_async.call_count == 2
+
+
+class TestGeneratePlanIdempotency:
+    """Tests for Idempotency-Key handling on POST /api/ai/generate-plan."""
+
+    @patch('main.plan_session_factory')
+    @patch('main.generate_weekly_plan_async')
+    def test_repeated_key_replays_plan(self, mock_generate, mock_session, mock_user_id):
+        """Test a retried request with the same key does not generate again."""
+        generations.clear()
+        mock_generate.return_value = SAMPLE_PLAN
+        app.dependency_overrides[get_user_id_from_token] = lambda: mock_user_id
+        try:
+            client = TestClient(app)
+            headers = {"Idempotency-Key": "retry-after-refresh"}
+            first = client.post("/api/ai/generate-plan", json={"excluded_foods": ["tuna"]}, headers=headers)
+            second = client.post("/api/ai/generate-plan", json={"excluded_foods": ["tuna"]}, headers=headers)
+            reused = client.post("/api/ai/generate-plan", json={"excluded_foods": ["eggs"]}, headers=headers)
+        finally:
+            app.dependency_overrides.pop(get_user_id_from_token, None)
+
+        assert first.status_code == 200
+        assert second.status_code == 200
+        assert second.headers["Idempotent-Replayed"] == "true"
+        assert second.json() == first.json()
+        assert reused.status_code == 422
+        assert mock_generate.call_count == 1
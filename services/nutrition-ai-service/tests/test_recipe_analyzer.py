@@ -3,7 +3,9 @@ Tests for recipe analysis endpoint and functions.
 """
 import pytest
 from fastapi import status
+from fastapi.testclient import TestClient
 from unittest.mock import patch, Mock
+from main import app, get_user_id_from_token
 from macro_analyzer import (
     create_recipe_analysis_prompt,
     parse_recipe_analysis_response,
@@ -16,16 +18,15 @@ from macro_analyzer import (
 class TestRecipeAnalysisEndpoint:
     """Tests for recipe analysis endpoint."""
 
-    @patch('main.get_user_id_from_token')
-    @patch('main.analyze_recipe_macros')
-    def test_analyze_recipe_success(
-        self,
-        mock_analyze,
-        mock_user_id,
-        client,
-        mock_user_id,
-        sample_recipe_text
-    ):
+    def setup_method(self):
+        app.state.limiter.enabled = False
+
+    def teardown_method(self):
+        app.dependency_overrides.pop(get_user_id_from_token, None)
+        app.state.limiter.enabled = True
+
+    @patch('main.analyze_recipe_macros_async')
+    def test_analyze_recipe_success(self, mock_analyze, mock_user_id, sample_recipe_text):
         """Test successful recipe analysis."""
         # Setup mock response
         mock_analyze.return_value = {
@@ -48,9 +49,9 @@ class TestRecipeAnalysisEndpoint:
             ]
         }
         
-        mock_user_id.return_value = mock_user_id
+        app.dependency_overrides[get_user_id_from_token] = lambda: mock_user_id
         
-        response = client.post(
+        response = TestClient(app).post(
             "/api/ai/analyze-recipe",
             json={"recipe_text": sample_recipe_text}
         )
@@ -62,24 +63,20 @@ class TestRecipeAnalysisEndpoint:
         assert "macros" in data
         assert "ingredients" in data
 
-    @patch('main.get_user_id_from_token')
-    def test_analyze_recipe_unauthorized(self, mock_user_id, client):
+    def test_analyze_recipe_unauthorized(self):
         """Test recipe analysis without authentication fails."""
-        mock_user_id.side_effect = Exception("Unauthorized")
-        
-        response = client.post(
+        response = TestClient(app).post(
             "/api/ai/analyze-recipe",
             json={"recipe_text": "Some recipe"}
         )
         
-        assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
 
-    @patch('main.get_user_id_from_token')
-    def test_analyze_recipe_short_text(self, mock_user_id, client, mock_user_id):
+    def test_analyze_recipe_short_text(self, mock_user_id):
         """Test recipe analysis with too short text fails validation."""
-        mock_user_id.return_value = mock_user_id
+        app.dependency_overrides[get_user_id_from_token] = lambda: mock_user_id
         
-        response = client.post(
+        response = TestClient(app).post(
             "/api/ai/analyze-recipe",
             json={"recipe_text": "short"}
         )